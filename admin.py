@@ -1,21 +1,29 @@
-import os
-import requests
 import streamlit as st
-from google import genai
-from google.genai import types
 from dotenv import load_dotenv
-from datetime import datetime
-import hashlib
+import uuid
 
-from function_declarations import (
-    telegram_post_function, add_medicine_function, 
-    stock_out_function, add_stock_function, 
-    delete_medicine_function, update_order_status_function)
+# local modules read their settings from the environment when imported
+load_dotenv()
 
+from scripts.auth import authenticate, session_tokens
+from scripts.providers import gemini_client
+from scripts.chat_turn import run_model_turn
+from scripts.chat_sessions import admin_chat_sessions
+from scripts.telegram_broadcast import telegram_broadcaster
+from scripts.telegram_outbox import telegram_outbox
+from scripts.tracing import TRACE_PANEL, instrument_firestore, tracer, waterfall
+from scripts.metrics import METRICS_PORT, register_cache, registry, turns
+from scripts.admin_functions import add_medicine, add_stock, delete_medicine, stock_out, update_order_status
+from scripts.inventory_bulk import MAX_REPORTED_ERRORS, data_path, export_medicines, import_medicines
 from firebase.db_manager import db
+from firebase.dashboard_metrics import LOW_STOCK_THRESHOLD, dashboard_metrics
 
-load_dotenv()
-client = genai.Client(api_key=os.getenv('GEMINI_API_KEY'))
+# built on the first model turn and shared by every session and rerun
+client = gemini_client.proxy()
+instrument_firestore()
+register_cache("dashboard", dashboard_metrics.stats)
+if METRICS_PORT:
+    registry.serve(METRICS_PORT)
 
 st.set_page_config(
     page_title="Axon Pharmacy Admin",
@@ -30,127 +38,70 @@ st.markdown("""
 """, unsafe_allow_html=True)
 
 # Authentication
-def authenticate_admin(email: str, password: str) -> bool:
-    try:
-        if not email or not password: 
-            return False
-            
-        admin_ref = db.collection("admins").document(email)
-        admin_data = admin_ref.get()
-        
-        if admin_data.exists:
-            hashed_password = hashlib.sha256(password.encode()).hexdigest()
-            stored_password = admin_data.to_dict().get("password")
-            if hashed_password == stored_password:
-                return True
-        return False
-    except Exception as e:
-        st.error(f"Authentication error: {e}")
-        return False
+def authenticate_admin(email: str, password: str) -> dict:
+    if not email or not password:
+        return {"success": False, "message": "Please enter both email and password"}
+    return authenticate("admins", email, password, getattr(st.context, "ip_address", None), app="admin")
 
 def telegram_post(message: str) -> dict:
-    bot_token = os.getenv('TELEGRAM_BOT_TOKEN')
-    targets = {
-        'channel': os.getenv('CHANNEL_USERNAME'),
-        'group': os.getenv('GROUP_USERNAME')
-    }
-    results = {}
-    
-    for name, target in targets.items():
-        try:
-            response = requests.post(
-                f"https://api.telegram.org/bot{bot_token}/sendMessage",
-                data={
-                    'chat_id': target,
-                    'text': message,
-                    'parse_mode': 'HTML',
-                })
-            
-            response = response.json()
-            results[name] = {
-                'success': response.get('ok'),
-                'message': response.get('result').get('text')
-            }
-        except Exception as e:
-            results[name] = {
-                'success': False,
-                'error': str(e)
-            }
-    return results
-
-def add_medicine(name: str, unit_price: float = 15, stock: int = 100, madein: str = "USA", category: str = "General", description: str = "For quality health") -> dict:
     try:
-        name = name.lower().replace(' ', '_')
-        doc_ref = db.collection("medicines").document(name)
-
-        if doc_ref.get().exists:
-            return {"success": False, "error": f"The {name} medicine already exists. instead you can update its stock."}
-        
-        data = {
-            "name": name,
-            "unit_price": unit_price,
-            "stock": stock,
-            "madein": madein,
-            "category": category,
-            "description": description,
-            "created_at": datetime.now(),
-        }
-        doc_ref.set(data)
-        return {"success": True, "message": f"The {name} medicine recorded successfully with the following details: Name: {name}, Unit Price: {unit_price}, Stock: {stock}, Madein: {madein}, Category: {category}, Description: {description}"}
+        announcement_id = telegram_outbox.enqueue(message)
     except Exception as e:
         return {"success": False, "error": str(e)}
+    targets = ", ".join(telegram_broadcaster.targets)
+    return {
+        "success": True,
+        "status": "queued",
+        "announcement_id": announcement_id,
+        "message": f"Announcement queued for delivery to {targets}. Ask for the telegram delivery status to see what was delivered."
+    }
 
-def stock_out(name: str) -> dict:
+def telegram_delivery_status(announcement_id: str = None) -> dict:
     try:
-        name = name.lower().replace(' ', '_')
-        docs = db.collection("medicines").document(name)
-        if docs:
-            docs.update({ "stock": 0})
-
-            return {"success": True, 'message': f"{name} medicine is now out of stock"}
-        
-        return {"success": False, "error": "Medicine not found"}
+        announcements = telegram_outbox.status(announcement_id)
+        if announcement_id and not announcements:
+            return {"success": False, "error": f"No announcement with id {announcement_id}"}
+        return {"success": True, "data": announcements}
     except Exception as e:
         return {"success": False, "error": str(e)}
 
-def add_stock(name: str, quantity: int) -> dict:
+def bulk_import_medicines(file_path: str, mode: str = "upsert") -> dict:
     try:
-        name = name.lower().replace(' ', '_')
-        docs = db.collection("medicines").document(name)
-        if docs.get().exists == True:
-            docs.update({ "stock": docs.get().to_dict().get('stock') + quantity})
-
-            return {"success": True, 'message': f"{name} medicine stock has been updated, increased by {quantity}"}
-        
-        return {"success": False, "error": f"{name} Medicine is not found, please add the medicine first."}
-    
+        report = import_medicines(data_path(file_path), mode)
+        return {
+            "success": True,
+            "message": f"{report['written']} of {report['rows']} rows imported ({mode}) in {report['commits']} commits, {len(report['errors'])} rows with errors.",
+            "errors": report["errors"][:MAX_REPORTED_ERRORS]
+        }
     except Exception as e:
         return {"success": False, "error": str(e)}
 
-def delete_medicine(name: str) -> dict:
+def export_medicines_file(file_path: str) -> dict:
     try:
-        name = name.lower().replace(' ', '_')
-        docs = db.collection("medicines").document(name)
-        if docs:
-            docs.delete()
-            return {"success": True, 'message': f"{name} medicine has been deleted"}
-        
-        return {"success": False, "error": "Medicine not found"}
-    
+        report = export_medicines(data_path(file_path))
+        return {"success": True, "message": f"{report['rows']} medicines exported to {file_path}."}
     except Exception as e:
         return {"success": False, "error": str(e)}
 
-def update_order_status(order_id: str, status: str) -> dict[str, str]:
-    try:
-        doc_ref = db.collection("orders").document(order_id)
-        doc_ref.update({
-            "status": status,
-            "updated_at": datetime.now()
-        })
-        return {"success": True, "message": f"Order {order_id} status updated to {status}."}
-    
-    except Exception as e:
-        return {"success": False, "error": str(e)}
+ADMIN_TOOLS = {
+    "telegram_post": telegram_post,
+    "telegram_delivery_status": telegram_delivery_status,
+    "add_medicine": add_medicine,
+    "stock_out": stock_out,
+    "add_stock": add_stock,
+    "delete_medicine": delete_medicine,
+    "update_order_status": update_order_status,
+    "bulk_import_medicines": bulk_import_medicines,
+    "export_medicines": export_medicines_file,
+}
+
+def execute_admin_tool(name: str, args: dict) -> dict:
+    if name not in ADMIN_TOOLS:
+        return {"success": False, "error": f"Unknown function: {name}"}
+    return ADMIN_TOOLS[name](**args)
+
+# deliver queued announcements in the background (no-op once running)
+telegram_outbox.start()
 
 # Initialize chat session
 if "messages" not in st.session_state:
@@ -159,6 +110,13 @@ if "messages" not in st.session_state:
 if "logged_in" not in st.session_state:
     st.session_state.logged_in = False
 
+# signed at login; checking it needs no Firestore read
+if st.session_state.logged_in and session_tokens.verify(st.session_state.get("auth_token"), "admins") is None:
+    admin_chat_sessions.end(st.session_state.pop("chat_session_id", None))
+    st.session_state.clear()
+    st.session_state.messages = []
+    st.session_state.logged_in = False
+
 if not st.session_state.logged_in:
     with st.sidebar:
         st.title("Admin Login")
@@ -166,12 +124,14 @@ if not st.session_state.logged_in:
         password = st.text_input("Password", type="password")
         
         if st.button("Login"):
-            if authenticate_admin(email, password):
+            auth_result = authenticate_admin(email, password)
+            if auth_result["success"]:
                 st.session_state.logged_in = True
                 st.session_state.admin = email
+                st.session_state.auth_token = auth_result["token"]
                 st.rerun()
             else:
-                st.error("Invalid credentials")
+                st.error(auth_result["message"])
     st.stop()
 
 with st.sidebar:
@@ -181,8 +141,10 @@ with st.sidebar:
     st.info("Settings:")
     if st.button("Refresh"):
         st.session_state.messages = []
+        admin_chat_sessions.end(st.session_state.pop("chat_session_id", None))
         st.rerun()
     if st.button("Logout"):
+        admin_chat_sessions.end(st.session_state.pop("chat_session_id", None))
         st.session_state.logged_in = False
         st.session_state.clear()
         st.rerun()
@@ -190,16 +152,32 @@ with st.sidebar:
     st.title("What can I do for you?")
     st.markdown("""
                 - Automatic telegram post
+                - Check telegram delivery status
                 - Add a new medicine 
                 - Stock out a medicine
                 - Add stock to a medicine
                 - Delete a medicine
                 - Update order status
+                - Bulk import or export medicines (CSV/JSONL)
                """)
     st.markdown("---")
     st.info("Quick Infos:")
-    st.code(f"Medicines in DB: {len(db.collection('medicines').get())}")
-    st.code(f"Pending orders: {len(db.collection('orders').where('status', '==', 'pending').get())}")
+    metrics = dashboard_metrics.snapshot()
+    orders = metrics["orders_by_status"]["value"] or {}
+    st.code(f"Medicines in DB: {metrics['medicines']['value']}")
+    st.code(f"Pending orders: {orders.get('pending')}")
+    st.code(f"Low stock (<= {LOW_STOCK_THRESHOLD}): {metrics['low_stock']['value']}")
+    st.code(f"Stock value: {metrics['stock_value']['value']}")
+    with st.expander("Orders by status"):
+        for status, count in orders.items():
+            st.text(f"{status}: {count}")
+    with st.expander("Metric query latency"):
+        for metric, result in metrics.items():
+            st.text(f"{metric}: {result['latency_ms']:.1f} ms" + (f" (error: {result['error']})" if result["error"] else ""))
+    if TRACE_PANEL and tracer.enabled:
+        with st.expander("Debug: recent turns"):
+            for trace in tracer.recent():
+                st.code(waterfall(trace))
 
 st.title("Axon Pharmacy Service Automation with LLM")
 st.caption("Chat with the admin assistant to manage your pharmacy")
@@ -214,76 +192,34 @@ if prompt := st.chat_input("Enter your message here..."):
     with st.chat_message("🧑"):
         st.markdown(prompt)
 
-    contents = [ types.Content(role="user", parts=[types.Part(text=prompt)]) ]
-
     # generate response
     with st.chat_message("assistant"):
-        with st.spinner("Processing..."):
+        with st.spinner("Processing..."), tracer.turn("admin_chat"):
             try:
-                #  tools
-                tools = types.Tool(function_declarations=[
-                    telegram_post_function,
-                    add_medicine_function,
-                    stock_out_function, add_stock_function,
-                    delete_medicine_function,
-                    update_order_status_function
-                ])
-                config = types.GenerateContentConfig(
-                    tools=[tools],
-                    tool_config=types.ToolConfig(
-                        function_calling_config=types.FunctionCallingConfig(mode="AUTO")
-                    )
-                )
-                
-                chat = client.chats.create(model = "gemini-2.5-flash", config=config)
-                response = chat.send_message(prompt)
-
-
-                i = 0
-                functions_called = []
-                for fn in response.function_calls:
-                    i += 1
-                    st.info(f"{i}. Excuting: {fn.name}() function")
-                    functions_called.append(fn.name)
-                    
-                    tool_call = response.candidates[0].content.parts[i-1].function_call
-                    if tool_call.name == "telegram_post":
-                        result = telegram_post(**tool_call.args)
-                    elif tool_call.name == "add_medicine":
-                        result = add_medicine(**tool_call.args)
-                    elif tool_call.name == "stock_out":
-                        result = stock_out(**tool_call.args)
-                    elif tool_call.name == "add_stock":
-                        result = add_stock(**tool_call.args)
-                    elif tool_call.name == "delete_medicine":
-                        result = delete_medicine(**tool_call.args)
-                    elif tool_call.name == "update_order_status":
-                        result = update_order_status(**tool_call.args)
-
-                    # Create a function response part
-                    function_response_part = types.Part.from_function_response(
-                        name=fn.name,
-                        response={"result": result},
-                    )
-
-                    contents.append(response.candidates[0].content)
-                    contents.append(types.Content(role="user", parts=[function_response_part]))
-
-                final_response = client.models.generate_content(
-                    model="gemini-2.5-flash",
-                    config=config,
-                    contents=contents,
-                )
-
-                st.session_state.messages.append({"role": "model", "content": final_response.text})
-
-                if len(functions_called) == 1:
-                    st.info(f"Function executed: {', '.join(functions_called)}")
-                if len(functions_called) > 1:
-                    st.info(f"Functions executed are: {', '.join(functions_called)}")
-                   
-                st.markdown(final_response.text)
-                    
+                session_id = st.session_state.setdefault("chat_session_id", uuid.uuid4().hex)
+                chat = admin_chat_sessions.chat(session_id, client)
+
+                def show_calls(fn_calls):
+                    for i, fn in enumerate(fn_calls, start=1):
+                        st.info(f"{i}. Excuting: {fn.name}() function")
+
+                def show_executed(fn_calls, results):
+                    functions_called = [fn.name for fn in fn_calls]
+                    if len(functions_called) == 1:
+                        st.info(f"Function executed: {', '.join(functions_called)}")
+                    if len(functions_called) > 1:
+                        st.info(f"Functions executed are: {', '.join(functions_called)}")
+
+                # results go back through the same chat so the session history stays complete
+                turn = run_model_turn(chat, prompt, execute_admin_tool, "admin_chat", st.write_stream, admin_chat_sessions.model,
+                                      on_calls=show_calls, on_results=show_executed)
+                final_text = turn["text"]
+                if not turn["function_calls"]:
+                    st.markdown(final_text)
+                admin_chat_sessions.trim(session_id, client)
+                turns.inc(app="admin", path="llm")
+
+                st.session_state.messages.append({"role": "model", "content": final_text})
             except Exception as e:
                 st.warning("No response from AI, please try again later with quality prompts.")
                 
\ No newline at end of file
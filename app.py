@@ -1,31 +1,33 @@
-import os
 import streamlit as st
-from google import genai
-from google.genai import types
 from dotenv import load_dotenv
-from firebase_admin import firestore
 from datetime import datetime
-import hashlib
-from typing import Dict, Any
+import time
+import uuid
+from typing import Dict, Any, Optional
 
-from function_declarations import (
-    check_availability_function,
-    place_order_function,
-    track_order_function,
-    cancel_order_function,
-    get_health_advice_function)
+# local modules read their settings from the environment when imported
+load_dotenv()
 
-from scripts.user_functions import (
-    check_medicine_availability,
-    place_order,
-    track_order,
-    cancel_order,
-    get_health_advice)
+from scripts.auth import authenticate, hash_password, session_tokens
+from scripts.providers import gemini_client
+from scripts.chat_turn import run_model_turn, user_tool_runner
+from scripts.intent_router import answer_locally, intent_router
+from scripts.chat_sessions import user_chat_sessions
+from scripts.tracing import TRACE_PANEL, instrument_firestore, tracer, waterfall
+from scripts.metrics import METRICS_PORT, register_cache, registry, turns
+from scripts.response_cache import RESPONSE_CACHE_ENABLED, response_cache
 from firebase.db_manager import db
+from firebase.chat_history import chat_history_writer
+from firebase.inventory_cache import inventory_cache
+from firebase.inventory_mirror import inventory_mirror
 
-load_dotenv()
-
-client = genai.Client(api_key=os.getenv('GEMINI_API_KEY'))
+# built on the first model turn and shared by every session and rerun
+client = gemini_client.proxy()
+instrument_firestore()
+register_cache("inventory", inventory_cache.stats)
+register_cache("responses", response_cache.stats)
+if METRICS_PORT:
+    registry.serve(METRICS_PORT)
 st.set_page_config(
     page_title="Axon Pharmacy",
     page_icon="💊",
@@ -45,31 +47,15 @@ st.markdown("""
 </style>
 """, unsafe_allow_html=True)
 
+def reset_chat_session():
+    if "chat_session_id" in st.session_state:
+        user_chat_sessions.end(st.session_state.pop("chat_session_id"))
+
+def client_ip() -> Optional[str]:
+    return getattr(st.context, "ip_address", None)
+
 def authenticate_user(email: str, password: str) -> Dict[str, Any]:
-    try:
-        user_ref = db.collection("users").document(email)
-        user_data = user_ref.get()
-        
-        if user_data.exists:
-            hashed_password = hashlib.sha256(password.encode()).hexdigest()
-            stored_password = user_data.to_dict().get("password")
-            
-            if hashed_password == stored_password:
-                return {
-                    "success": True,
-                    "user_data": user_data.to_dict(),
-                    "message": "Authentication successful"
-                }
-        
-        return {
-            "success": False,
-            "message": "Invalid email or password"
-        }
-    except Exception as e:
-        return {
-            "success": False,
-            "message": f"Authentication error: {str(e)}"
-        }
+    return authenticate("users", email, password, client_ip(), app="user")
 
 def register_user(email: str, password: str, name: str, age: int) -> Dict[str, Any]:
     user_ref = db.collection("users").document(email)
@@ -80,12 +66,11 @@ def register_user(email: str, password: str, name: str, age: int) -> Dict[str, A
         }
     user_data = {
         "email": email,
-        "password": hashlib.sha256(password.encode()).hexdigest(),
+        "password": hash_password(password),
         "name": name,
         "age": age,
         "created_at": datetime.now(),
-        "orders": {},
-        "chat_history": []
+        "recent_orders": []
     }
     user_ref.set(user_data)
     return {
@@ -112,6 +97,7 @@ def login_page():
                 st.session_state.logged_in = True
                 st.session_state.user_email = email
                 st.session_state.user_data = auth_result["user_data"]
+                st.session_state.auth_token = auth_result["token"]
                 st.session_state.messages = [] 
                 st.rerun()
             else:
@@ -199,169 +185,90 @@ def chat_page():
     # User input
     if prompt := st.chat_input("Ask e.g. 'Is paracetamol in stock?' or 'Price of doxycycline'"):
         st.session_state.messages.append({"role": "user", "content": prompt})
-        # add to the chat_history for signed-in users only
+        # add to the chat_history for signed-in users only (written in the background)
         if not st.session_state.get("is_guest", False):
-            user_ref = db.collection("users").document(st.session_state.user_email)
-            user_ref.update({"chat_history": firestore.ArrayUnion([prompt])})
+            chat_history_writer.append(st.session_state.user_email, prompt)
 
         st.markdown(f"<div style='text-align: right;'> {prompt} 🧑</div>", unsafe_allow_html=True)
-        
-        contents = [ types.Content(role="user", parts=[types.Part(text=prompt)]) ]
 
         # generate response
         with st.chat_message("assistant"):
-            with st.spinner("Thinking..."):
+            trace_session = st.session_state.setdefault("trace_session_id", uuid.uuid4().hex)
+            with st.spinner("Thinking..."), tracer.turn("user_chat", session=trace_session):
                 try:
-                    # quick help/price intents: answer immediately without calling tools/model
-                    handled_help = False
-                    handled_price = False
-                    lower = prompt.strip().lower()
-                    if any(phrase in lower for phrase in [
-                        "what can i do", "how to use", "help", "what can i do here", "how do i use this"
-                    ]):
-                        capabilities = [
-                            "Check medicine availability (paracetamol, doxycycline, insulin, citalopram, morphine)",
-                        ]
-                        if st.session_state.get("is_guest", False):
-                            guest_note = "You need to sign in to place orders, track/cancel orders, and get personalized advice."
-                        else:
-                            capabilities.extend([
-                                "Place orders and see total price",
-                                "Track or cancel your orders",
-                                "Get personalized health advice",
-                            ])
-                            guest_note = ""
-                        examples_text = (
-                            "\n\nExamples you can try now:\n"
-                            "- Do you have paracetamol 500mg?\n"
-                            "- What's the price of doxycycline?\n"
-                            "- Is insulin in stock?\n"
-                            "- Check availability for citalopram\n"
-                            "- place an order of paracetamol 2 packs for me\n"
-                            "- track my order of id <your-order-id>\n"
-                            "- cancel my order of id <your-order-id>\n"
-                            "- give me some health advice ... etc\n"
-                        )
-                        reply = "Here’s what you can do:\n- " + "\n- ".join(capabilities) + ("\n\n" + guest_note if guest_note else "") + examples_text
-                        st.session_state.messages.append({"role": "assistant", "content": reply})
-                        st.markdown(reply)
-                        handled_help = True
+                    # common intents are answered locally without calling tools/model
+                    started = time.perf_counter()
+                    is_guest = st.session_state.get("is_guest", False)
+                    user_email = st.session_state.user_email
+                    with tracer.span("intent_router.route", "internal") as span:
+                        route = intent_router.route(prompt)
+                        span.set(intent=route["intent"], local=route["local"])
+                    handled_locally = False
+                    if route["local"]:
+                        local_reply = answer_locally(route, user_email, is_guest)
+                        if local_reply:
+                            st.session_state.messages.append({"role": "assistant", "content": local_reply})
+                            st.markdown(local_reply)
+                            handled_locally = True
 
-                    # Price intent handler using known medicines list
-                    known_medicines = ["paracetamol", "doxycycline", "insulin", "citalopram", "morphine"]
-                    price_keywords = ["price of", "how much is", "cost of", "price for", "what's the price", "price"]
-                    mentioned = None
-                    if any(k in lower for k in price_keywords):
-                        for med in known_medicines:
-                            if med in lower:
-                                mentioned = med
-                                break
-                    if mentioned and not handled_help:
-                        availability = check_medicine_availability(mentioned)
-                        if availability.get("success"):
-                            data = availability["data"]
-                            stock = data.get("stock", 0)
-                            unit_price = data.get("unit_price", 0)
-                            if stock and stock > 0:
-                                price_msg = f"The current price of {data.get('name', mentioned)} is {unit_price}. It is in stock (qty: {stock})."
-                            else:
-                                price_msg = f"{data.get('name', mentioned)} is currently out of stock. Last listed price was {unit_price}."
-                        else:
-                            price_msg = f"I couldn't find {mentioned} in our inventory. Try another medicine."
-                        st.session_state.messages.append({"role": "assistant", "content": price_msg})
-                        st.markdown(price_msg)
-                        handled_price = True
+                    if handled_locally:
+                        intent_router.record("local", time.perf_counter() - started)
+                        turns.inc(app="user", path="local")
+                    else:
+                        session_id = st.session_state.setdefault("chat_session_id", uuid.uuid4().hex)
+                        chat = user_chat_sessions.chat(session_id, client)
 
-                    if not handled_help and not handled_price:
-                        tools = types.Tool(function_declarations=[
-                        check_availability_function, place_order_function, track_order_function, cancel_order_function, get_health_advice_function
-                        ])
-                        config = types.GenerateContentConfig(
-                            tools=[tools],
-                            tool_config=types.ToolConfig(
-                                function_calling_config=types.FunctionCallingConfig(mode="AUTO")
-                            )
-                        )
-                        
-                        chat = client.chats.create(model = "gemini-2.5-flash", config=config)
-                        response = chat.send_message(prompt)
+                        def show_calls(fn_calls):
+                            # Graceful handling when no tool calls are suggested by the model
+                            if len(fn_calls) == 0:
+                                capabilities = [
+                                    "Check medicine availability (paracetamol, doxycycline, insulin, citalopram, morphine)",
+                                ]
+                                guest_note = "You need to sign in to place orders, track/cancel orders, and get personalized advice." if is_guest else ""
+                                if not is_guest:
+                                    capabilities.extend([
+                                        "Place orders and see total price",
+                                        "Track or cancel your orders",
+                                        "Get personalized health advice",
+                                    ])
+                                examples_text = (
+                                    "\n\nExamples you can try now:\n"
+                                    "- Do you have paracetamol 500mg?\n"
+                                    "- What's the price of doxycycline?\n"
+                                    "- Is insulin in stock?\n"
+                                    "- Check availability for citalopram\n"
+                                    + ("" if is_guest else "- Place an order of paracetamol 2 packs for me\n- Track my order of id <your-order-id>\n- Cancel my order of id <your-order-id>\n- Give me some health advice")
+                                )
+                                reply = "Here’s what you can do:\n- " + "\n- ".join(capabilities) + ("\n\n" + guest_note if guest_note else "") + examples_text
+                                st.session_state.messages.append({"role": "assistant", "content": reply})
+                                st.markdown(reply)
 
-                        i = 0
-                        functions_called = []
-                        is_guest = st.session_state.get("is_guest", False)
-                        user_email = st.session_state.user_email
+                            for i, fn in enumerate(fn_calls, start=1):
+                                st.info(f"{i}. Excuting: {fn.name}() function")
 
-                        # Graceful handling when no tool calls are suggested by the model
-                        fn_calls = list(response.function_calls) if getattr(response, "function_calls", None) else []
-                        if len(fn_calls) == 0:
-                            capabilities = [
-                                "Check medicine availability (paracetamol, doxycycline, insulin, citalopram, morphine)",
-                            ]
-                            guest_note = "You need to sign in to place orders, track/cancel orders, and get personalized advice." if is_guest else ""
-                            if not is_guest:
-                                capabilities.extend([
-                                    "Place orders and see total price",
-                                    "Track or cancel your orders",
-                                    "Get personalized health advice",
-                                ])
-                            examples_text = (
-                                "\n\nExamples you can try now:\n"
-                                "- Do you have paracetamol 500mg?\n"
-                                "- What's the price of doxycycline?\n"
-                                "- Is insulin in stock?\n"
-                                "- Check availability for citalopram\n"
-                                + ("" if is_guest else "- Place an order of paracetamol 2 packs for me\n- Track my order of id <your-order-id>\n- Cancel my order of id <your-order-id>\n- Give me some health advice")
-                            )
-                            reply = "Here’s what you can do:\n- " + "\n- ".join(capabilities) + ("\n\n" + guest_note if guest_note else "") + examples_text
-                            st.session_state.messages.append({"role": "assistant", "content": reply})
-                            st.markdown(reply)
-                        
-                        for fn in fn_calls:
-                            i += 1
-                            st.info(f"{i}. Excuting: {fn.name}() function")
-                            functions_called.append(fn.name)
-                            
-                            tool_call = response.candidates[0].content.parts[i-1].function_call
-                            if tool_call.name == "check_medicine_availability":
-                                result = check_medicine_availability(**tool_call.args)
-                            elif is_guest and tool_call.name in [
-                                "place_order", "track_order", "cancel_order", "get_health_advice"
-                            ]:
-                                result = {
-                                    "success": False,
-                                    "message": "Guest mode: this action is not allowed. Please register or login to place, track, or cancel orders, or to get personalized advice."
-                                }
-                            elif tool_call.name == "place_order":
-                                result = place_order(**tool_call.args, user_email=user_email)
-                            elif tool_call.name == "track_order":
-                                result = track_order(**tool_call.args, user_email=user_email)
-                            elif tool_call.name == "cancel_order":
-                                result = cancel_order(**tool_call.args, user_email=user_email)
-                            elif tool_call.name == "get_health_advice":
-                                result = get_health_advice(**tool_call.args, user_email=user_email)
+                        def show_executed(fn_calls, results):
+                            functions_called = [fn.name for fn in fn_calls]
+                            if len(functions_called) == 1:
+                                st.info(f"Function executed: {', '.join(functions_called)}")
+                            if len(functions_called) > 1:
+                                st.info(f"Functions executed are: {', '.join(functions_called)}")
 
-                            function_response_part = types.Part.from_function_response(
-                                name=fn.name,
-                                response={"result": result},
-                            )
-
-                            contents.append(response.candidates[0].content) # from the model
-                            contents.append(types.Content(role="user", parts=[function_response_part])) # from the function
-                        
-                        final_response = client.models.generate_content(
-                            model="gemini-2.5-flash",
-                            config=config,
-                            contents=contents
+                        # results go back through the same chat so the session history stays complete
+                        tools = user_tool_runner(user_email, is_guest)
+                        turn = run_model_turn(
+                            chat, prompt, tools["execute"],
+                            "user_chat", st.write_stream, user_chat_sessions.model,
+                            on_calls=show_calls, on_results=show_executed, dispatch=tools["dispatch"],
+                            cache=response_cache if RESPONSE_CACHE_ENABLED else None, cache_scope=user_email,
                         )
+                        final_text = turn["text"]
+                        if not turn["function_calls"]:
+                            st.markdown(final_text)
+                        user_chat_sessions.trim(session_id, client)
 
-                        st.session_state.messages.append({"role": "model", "content": final_response.text})
-
-                        if len(functions_called) == 1:
-                            st.info(f"Function executed: {', '.join(functions_called)}")
-                        if len(functions_called) > 1:
-                            st.info(f"Functions executed are: {', '.join(functions_called)}")
-                            
-                        st.markdown(final_response.text)                    
+                        st.session_state.messages.append({"role": "model", "content": final_text})
+                        intent_router.record("llm", time.perf_counter() - started)
+                        turns.inc(app="user", path="cache" if turn.get("cached") else "llm")
                 except Exception as e:
                     error_msg = f"Sorry, I unable to process your request: {str(e)}, please try again."
                     st.warning(error_msg)
@@ -390,22 +297,32 @@ def chat_page():
         st.markdown("---")
         if st.button("Refresh"):
             st.session_state.messages = []
+            reset_chat_session()
             st.rerun()
         if st.session_state.get("is_guest", False):
             if st.button("Register"):
+                reset_chat_session()
                 st.session_state.current_page = "register"
                 st.session_state.logged_in = False
                 st.session_state.is_guest = False
                 st.rerun()
             if st.button("Login" ):
+                reset_chat_session()
                 st.session_state.current_page = "login"
                 st.session_state.logged_in = False
                 st.session_state.is_guest = False
                 st.rerun()
         else:
             if st.button("Logout"):
+                reset_chat_session()
                 st.session_state.clear()
                 st.rerun()
+        if TRACE_PANEL and tracer.enabled:
+            with st.expander("Debug: recent turns"):
+                session_traces = [trace for trace in tracer.recent()
+                                  if trace["attrs"].get("session") == st.session_state.get("trace_session_id")]
+                for trace in session_traces:
+                    st.code(waterfall(trace))
         st.markdown("---")
         st.markdown("""
         <div style="text-align: center;">
@@ -416,12 +333,24 @@ def chat_page():
         """, unsafe_allow_html=True)
 
 def main():
+    # one listener per process, shared by every session
+    if inventory_mirror.enabled:
+        inventory_mirror.ensure_started()
     if "current_page" not in st.session_state:
         st.session_state.current_page = "login"
     if "logged_in" not in st.session_state:
         st.session_state.logged_in = False
     if "is_guest" not in st.session_state:
         st.session_state.is_guest = False
+    # signed at login; checking it needs no Firestore read
+    if (st.session_state.logged_in and not st.session_state.is_guest
+            and session_tokens.verify(st.session_state.get("auth_token"), "users") is None):
+        reset_chat_session()
+        st.session_state.clear()
+        st.session_state.current_page = "login"
+        st.session_state.logged_in = False
+        st.session_state.is_guest = False
+        st.warning("Your session has expired. Please log in again.")
 
     if not st.session_state.logged_in:
         if st.session_state.current_page == "login":
@@ -0,0 +1,91 @@
+# benchmarks/async_tools_bench.py
+
+"""A five-call parallel-function-calling turn: thread pool vs event loop.
+
+The turn the model asks for is two availability checks, a track_order, a
+list_my_orders and a get_health_advice. "sync" dispatches them with
+`dispatch_tool_calls` on the tool thread pool; "async" awaits the coroutine
+versions on the shared event loop. Concurrent turns show what each costs
+once TOOL_MAX_WORKERS threads are busy. The in-memory Firestore adds
+RPC_LATENCY to every round trip.
+
+Run from the repository root:
+    python -m benchmarks.async_tools_bench
+"""
+
+import statistics
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from tests.fake_firestore import install_fake_db
+
+db = install_fake_db()
+
+from scripts.chat_turn import execute_user_tool, execute_user_tool_async  # noqa: E402
+from scripts.tool_dispatcher import TOOL_MAX_WORKERS, dispatch_async_tool_calls, dispatch_tool_calls  # noqa: E402
+from scripts.user_functions import place_order  # noqa: E402
+
+RPC_LATENCY = 0.02
+TURNS = 20
+USER_EMAIL = "buyer@example.com"
+
+
+def seed() -> list:
+    db.reset()
+    for name in ("paracetamol", "insulin", "amoxicillin"):
+        db.seed("medicines", name, {"name": name, "stock": 1000, "unit_price": 1})
+    db.seed("users", USER_EMAIL, {"name": "Buyer", "age": 40, "recent_orders": []})
+    order_id = place_order("insulin", 1, USER_EMAIL)["order_id"]
+    return [
+        ("check_medicine_availability", {"medicine_name": "paracetamol"}),
+        ("check_medicine_availability", {"medicine_name": "amoxicillin"}),
+        ("track_order", {"order_id": order_id}),
+        ("list_my_orders", {}),
+        ("get_health_advice", {"symptoms": "fever"}),
+    ]
+
+
+def turn(engine: str, calls: list) -> float:
+    started = time.perf_counter()
+    if engine == "sync":
+        dispatch_tool_calls(calls, lambda name, args: execute_user_tool(name, args, USER_EMAIL, False))
+    else:
+        dispatch_async_tool_calls(calls, lambda name, args: execute_user_tool_async(name, args, USER_EMAIL, False))
+    return time.perf_counter() - started
+
+
+def run(engine: str, concurrent: int) -> dict:
+    from firebase.inventory_cache import inventory_cache
+
+    calls = seed()
+    db.latency = RPC_LATENCY
+    latencies = []
+
+    def one(_):
+        # every turn misses the cache, as the first turn of a session does
+        inventory_cache.clear()
+        latencies.append(turn(engine, calls))
+
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrent) as sessions:
+        list(sessions.map(one, range(TURNS * concurrent)))
+    elapsed = time.perf_counter() - started
+    return {
+        "p50": statistics.median(latencies),
+        "p95": statistics.quantiles(latencies, n=20)[-1],
+        "turns_per_sec": len(latencies) / elapsed,
+    }
+
+
+def main():
+    print(f"rpc_latency={RPC_LATENCY * 1000:.0f}ms tool_workers={TOOL_MAX_WORKERS} turns/session={TURNS}")
+    print(f"{'engine':<7}{'sessions':>9}{'p50 ms':>9}{'p95 ms':>9}{'turns/s':>9}")
+    for concurrent in (1, 4, 16):
+        for engine in ("sync", "async"):
+            stats = run(engine, concurrent)
+            print(f"{engine:<7}{concurrent:>9}{stats['p50'] * 1000:>9.1f}{stats['p95'] * 1000:>9.1f}"
+                  f"{stats['turns_per_sec']:>9.1f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,82 @@
+# benchmarks/auth_bench.py
+
+"""Password hashing cost against login throughput.
+
+Times one hash for the legacy SHA-256 and for scrypt at a few costs, then
+runs concurrent logins against the in-memory Firestore to show how many a
+process can verify per second at each cost, and how many Firestore reads a
+password-guessing burst costs with the throttle in front.
+
+Run from the repository root:
+    python -m benchmarks.auth_bench
+"""
+
+import hashlib
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from tests.fake_firestore import install_fake_db
+
+db = install_fake_db()
+
+from scripts import auth  # noqa: E402
+from scripts.auth import LoginThrottle, authenticate, hash_password  # noqa: E402
+
+COSTS = (2 ** 12, 2 ** 13, 2 ** 14, 2 ** 15)
+ACCOUNTS = 16
+LOGINS = 64
+WORKERS = 8
+GUESSES = 1000
+RPC_LATENCY = 0.005
+
+
+def time_hash(hash_fn, repeat: int = 5) -> float:
+    started = time.perf_counter()
+    for _ in range(repeat):
+        hash_fn("correct horse battery staple")
+    return (time.perf_counter() - started) / repeat
+
+
+def login_throughput(stored_hash) -> float:
+    db.reset()
+    for account in range(ACCOUNTS):
+        db.seed("users", f"user{account}@example.com", {"name": f"User {account}", "password": stored_hash})
+    db.latency = RPC_LATENCY
+    # no throttling here: this measures the server, not the attacker
+    throttle = LoginThrottle(refill_seconds=1e-9)
+
+    def login(number: int) -> bool:
+        email = f"user{number % ACCOUNTS}@example.com"
+        return authenticate("users", email, "correct horse battery staple", throttle=throttle)["success"]
+
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=WORKERS) as pool:
+        assert all(pool.map(login, range(LOGINS)))
+    return LOGINS / (time.perf_counter() - started)
+
+
+def main() -> None:
+    print(f"{'hash':<18}{'ms per hash':>12}{'logins/sec':>12}")
+    sha = lambda password: hashlib.sha256(password.encode()).hexdigest()  # noqa: E731
+    # legacy hashes are rehashed on login, so measure verifying a current one
+    print(f"{'sha256 (legacy)':<18}{time_hash(sha) * 1000:>12.3f}{'-':>12}")
+    for n in COSTS:
+        # as if deployed with SCRYPT_N=n, so logins verify without rehashing
+        auth.SCRYPT_N = n
+        stored = hash_password("correct horse battery staple", n=n)
+        per_hash = time_hash(lambda password: hash_password(password, n=n))
+        print(f"{f'scrypt n=2**{n.bit_length() - 1}':<18}{per_hash * 1000:>12.1f}{login_throughput(stored):>12.1f}")
+
+    auth.SCRYPT_N = COSTS[2]
+    db.reset()
+    db.seed("users", "victim@example.com", {"password": hash_password("correct horse battery staple")})
+    throttle = LoginThrottle()
+    started = time.perf_counter()
+    for guess in range(GUESSES):
+        authenticate("users", "victim@example.com", f"guess{guess}", "203.0.113.7", throttle=throttle)
+    elapsed = time.perf_counter() - started
+    print(f"\n{GUESSES} guesses in {elapsed:.2f}s cost {db.rpc_counts['get']} Firestore reads with the throttle")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,78 @@
+# benchmarks/cart_order_bench.py
+
+"""A prescription of N items: one `place_cart_order` vs N `place_order` calls.
+
+Reports the time and Firestore RPCs per prescription against the in-memory
+Firestore, and what is left behind when the last item is out of stock:
+sequential orders keep the lines placed before it, the cart order keeps
+nothing.
+
+Run from the repository root:
+    python -m benchmarks.cart_order_bench
+"""
+
+import statistics
+import time
+
+from tests.fake_firestore import install_fake_db
+
+db = install_fake_db()
+
+from scripts.user_functions import place_cart_order, place_order  # noqa: E402
+
+RPC_LATENCY = 0.005
+RUNS = 20
+USER_EMAIL = "buyer@example.com"
+
+
+def seed(lines: int, last_stock: int) -> list:
+    from firebase.inventory_cache import inventory_cache
+    from firebase.medicine_index import medicine_index
+
+    db.reset()
+    inventory_cache.clear()
+    medicine_index.invalidate()
+    names = [f"medicine{chr(97 + n)}" for n in range(lines)]
+    for index, name in enumerate(names):
+        stock = last_stock if index == lines - 1 else 1_000_000
+        db.seed("medicines", name, {"name": name, "stock": stock, "unit_price": 1})
+    db.seed("users", USER_EMAIL, {"name": "Buyer", "recent_orders": []})
+    db.latency = RPC_LATENCY
+    return [{"medicine_name": name, "quantity": 1} for name in names]
+
+
+def sequential(items: list) -> list:
+    return [place_order(item["medicine_name"], item["quantity"], USER_EMAIL) for item in items]
+
+
+def cart(items: list) -> list:
+    return [place_cart_order(items, USER_EMAIL)]
+
+
+def run(order_fn, lines: int) -> dict:
+    items = seed(lines, last_stock=1_000_000)
+    timings = []
+    for _ in range(RUNS):
+        started = time.perf_counter()
+        order_fn(items)
+        timings.append(time.perf_counter() - started)
+    rpcs = db.total_rpcs / RUNS
+
+    # the last item is out of stock: count the units that stay reserved anyway
+    items = seed(lines, last_stock=0)
+    order_fn(items)
+    stranded = sum(1_000_000 - db.data(f"medicines/{item['medicine_name']}")["stock"] for item in items[:-1])
+    return {"ms": statistics.median(timings) * 1000, "rpcs": rpcs, "stranded": stranded}
+
+
+def main():
+    print(f"rpc_latency={RPC_LATENCY * 1000:.0f}ms runs={RUNS}")
+    print(f"{'engine':<11}{'items':>6}{'ms':>8}{'rpcs':>7}{'stranded units':>16}")
+    for lines in (1, 3, 5, 10):
+        for name, order_fn in (("sequential", sequential), ("cart", cart)):
+            stats = run(order_fn, lines)
+            print(f"{name:<11}{lines:>6}{stats['ms']:>8.1f}{stats['rpcs']:>7.1f}{stats['stranded']:>16}")
+
+
+if __name__ == "__main__":
+    main()
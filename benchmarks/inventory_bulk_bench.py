@@ -0,0 +1,92 @@
+# benchmarks/inventory_bulk_bench.py
+
+"""Rows/sec of the bulk inventory import against one get + set per medicine.
+
+Runs against the Firestore emulator when FIRESTORE_EMULATOR_HOST is set,
+otherwise against the in-memory Firestore with a simulated round trip.
+
+Run from the repository root:
+    FIRESTORE_EMULATOR_HOST=localhost:8080 python -m benchmarks.inventory_bulk_bench
+    python -m benchmarks.inventory_bulk_bench
+"""
+
+import csv
+import os
+import tempfile
+import time
+from datetime import datetime
+
+from tests.fake_firestore import install_fake_db
+
+fake_db = install_fake_db()
+
+from scripts.inventory_bulk import import_medicines, medicine_id  # noqa: E402
+
+ROWS = 2000
+RPC_LATENCY = 0.002
+
+
+def client():
+    if os.getenv("FIRESTORE_EMULATOR_HOST"):
+        from google.cloud import firestore
+        return firestore.Client(project=os.getenv("GOOGLE_CLOUD_PROJECT", "axon-bench"))
+    fake_db.latency = RPC_LATENCY
+    return fake_db
+
+
+def clear(db):
+    if db is fake_db:
+        fake_db.reset()
+        fake_db.latency = RPC_LATENCY
+        return
+    for snapshot in db.collection("medicines").stream():
+        snapshot.reference.delete()
+
+
+def write_rows(path):
+    with open(path, "w", newline="", encoding="utf-8") as f:
+        writer = csv.DictWriter(f, fieldnames=("name", "unit_price", "stock", "category"))
+        writer.writeheader()
+        for n in range(ROWS):
+            writer.writerow({"name": f"Bench Medicine {n}", "unit_price": n % 50 + 1, "stock": n % 300, "category": "Bench"})
+
+
+def one_by_one(db, path):
+    """The add_medicine sequence: a get to check for the medicine, then a set."""
+    with open(path, newline="", encoding="utf-8") as f:
+        for row in csv.DictReader(f):
+            reference = db.collection("medicines").document(medicine_id(row["name"]))
+            if not reference.get().exists:
+                reference.set({"name": medicine_id(row["name"]), "unit_price": float(row["unit_price"]),
+                               "stock": int(row["stock"]), "category": row["category"], "created_at": datetime.now()})
+
+
+def main():
+    db = client()
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, "medicines.csv")
+        write_rows(path)
+
+        clear(db)
+        started = time.perf_counter()
+        one_by_one(db, path)
+        legacy = ROWS / (time.perf_counter() - started)
+
+        clear(db)
+        report = import_medicines(path, client=db)
+        restock_path = os.path.join(directory, "invoice.csv")
+        with open(restock_path, "w", newline="", encoding="utf-8") as f:
+            writer = csv.writer(f)
+            writer.writerow(("name", "quantity"))
+            writer.writerows((f"Bench Medicine {n}", 10) for n in range(ROWS))
+        restock = import_medicines(restock_path, "restock", client=db)
+
+    target = "emulator" if db is not fake_db else f"in-memory, {RPC_LATENCY * 1000:.0f} ms per RPC"
+    print(f"{ROWS} rows against {target}")
+    print(f"get + set per row:  {legacy:8.0f} rows/s")
+    print(f"bulk upsert:        {report['rows_per_sec']:8.0f} rows/s in {report['commits']} commits")
+    print(f"bulk restock:       {restock['rows_per_sec']:8.0f} rows/s in {restock['commits']} commits")
+
+
+if __name__ == "__main__":
+    main()
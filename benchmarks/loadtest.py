@@ -0,0 +1,239 @@
+# benchmarks/loadtest.py
+
+"""Offline load test of the chat turn: hundreds of concurrent users, no Gemini, no Firestore.
+
+Every simulated user runs its turns back to back through the same code as
+`chat_page`: the intent router and its local answers (help included) first,
+then `run_model_turn` with the session's chat, the app's tool runner, the
+real user or admin functions and, as in the app, the response cache
+(`--no-response-cache` turns it off). Gemini is the scripted fake client and
+Firestore the in-memory double, each with its own latency. Per scenario it
+reports throughput, latency percentiles, how many turns stayed local or
+were answered from the cache, model requests and Firestore RPCs.
+
+Run from the repository root:
+    python -m benchmarks.loadtest
+    python -m benchmarks.loadtest --users 300 --scenarios browse order --save report.json
+    python -m benchmarks.loadtest --baseline report.json   # exit 1 on a regression
+"""
+
+import argparse
+import json
+import random
+import sys
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Dict, List, Optional
+
+from tests.fake_firestore import install_fake_db
+from tests.fake_genai import FakeGenaiClient
+
+fake_db = install_fake_db()
+
+from firebase.inventory_cache import inventory_cache  # noqa: E402
+from firebase.medicine_index import medicine_index  # noqa: E402
+import scripts.user_functions as user_functions  # noqa: E402
+import scripts.user_functions_async as user_functions_async  # noqa: E402
+from benchmarks.loadtest_scenarios import SCENARIOS, Scenario, user_email  # noqa: E402
+from scripts.admin_functions import add_medicine, add_stock, delete_medicine, stock_out, update_order_status  # noqa: E402
+from scripts.chat_sessions import admin_chat_sessions, user_chat_sessions  # noqa: E402
+from scripts.chat_turn import run_model_turn, user_tool_runner  # noqa: E402
+from scripts.intent_router import answer_locally, intent_router  # noqa: E402
+from scripts.response_cache import RESPONSE_CACHE_ENABLED, ResponseCache  # noqa: E402
+
+USERS = 200
+TURNS_PER_USER = 4
+MODEL_LATENCY = 0.3
+CHUNK_LATENCY = 0.0
+RPC_LATENCY = 0.01
+FANOUT = 3
+# growth of p95 latency or RPCs per turn, relative to the baseline, reported as a regression
+MAX_REGRESSION = 0.25
+
+# the admin tools that only touch Firestore (the Telegram and file tools stay out of load tests)
+ADMIN_TOOLS = {
+    "add_medicine": add_medicine,
+    "stock_out": stock_out,
+    "add_stock": add_stock,
+    "delete_medicine": delete_medicine,
+    "update_order_status": update_order_status,
+}
+
+
+def execute_admin_tool(name: str, args: Dict[str, Any]) -> Dict[str, Any]:
+    if name not in ADMIN_TOOLS:
+        return {"success": False, "error": f"Unknown function: {name}"}
+    return ADMIN_TOOLS[name](**args)
+
+
+def percentile(samples: List[float], percentile: float) -> float:
+    if not samples:
+        return 0.0
+    ordered = sorted(samples)
+    return ordered[min(len(ordered) - 1, int(round(percentile / 100 * (len(ordered) - 1))))]
+
+
+def _collect(chunks) -> str:
+    return "".join(chunks)
+
+
+def user_turn(client: FakeGenaiClient, session_id: str, email: str, prompt: str,
+              cache: Optional[ResponseCache] = None) -> Dict[str, Any]:
+    """The customer turn of `chat_page`, without the Streamlit rendering."""
+    route = intent_router.route(prompt)
+    if route["local"] and answer_locally(route, email, False):
+        return {"path": "local", "ok": True}
+    chat = user_chat_sessions.chat(session_id, client)
+    tools = user_tool_runner(email, False)
+    turn = run_model_turn(chat, prompt, tools["execute"], "user_chat", _collect, user_chat_sessions.model,
+                          dispatch=tools["dispatch"], cache=cache, cache_scope=email)
+    user_chat_sessions.trim(session_id, client)
+    return {"path": "cache" if turn.get("cached") else "llm",
+            "ok": all(result.get("success") for result in turn["results"])}
+
+
+def admin_turn(client: FakeGenaiClient, session_id: str, prompt: str) -> Dict[str, Any]:
+    """The admin app's turn, without the Streamlit rendering."""
+    chat = admin_chat_sessions.chat(session_id, client)
+    turn = run_model_turn(chat, prompt, execute_admin_tool, "admin_chat", _collect, admin_chat_sessions.model)
+    admin_chat_sessions.trim(session_id, client)
+    return {"path": "llm", "ok": all(result.get("success") for result in turn["results"])}
+
+
+def run_scenario(scenario: Scenario, users: int = USERS, turns: int = TURNS_PER_USER,
+                 model_latency: float = MODEL_LATENCY, chunk_latency: float = CHUNK_LATENCY,
+                 rpc_latency: float = RPC_LATENCY, seed: int = 0,
+                 response_cache: bool = RESPONSE_CACHE_ENABLED) -> Dict[str, Any]:
+    """Run `users` concurrent users for `turns` turns each and return the scenario's report."""
+    rng = random.Random(seed)
+    fake_db.reset()
+    inventory_cache.clear()
+    medicine_index.invalidate()
+    # a fresh cache per scenario, never the file RESPONSE_CACHE_PATH points the apps at;
+    # orders placed by the users invalidate it, as they do the app's
+    cache = ResponseCache() if response_cache else None
+    user_functions.response_cache = user_functions_async.response_cache = cache or ResponseCache()
+    scenario.setup(fake_db, users, turns, rng)
+    client = FakeGenaiClient(script=scenario.model_calls, final_text="Here is what I found for you.",
+                             latency=model_latency, chunk_latency=chunk_latency)
+    prompts = [[scenario.prompt(user, turn, rng) for turn in range(turns)] for user in range(users)]
+    # the index is built once per process in the apps too
+    medicine_index.find("")
+    fake_db.rpc_counts.clear()
+    fake_db.latency = rpc_latency
+    sessions = {user: f"load-{scenario.name}-{user}-{uuid.uuid4().hex[:8]}" for user in range(users)}
+
+    def run_user(user: int) -> List[Dict[str, Any]]:
+        outcomes = []
+        for prompt in prompts[user]:
+            started = time.perf_counter()
+            try:
+                if scenario.app == "admin":
+                    outcome = admin_turn(client, sessions[user], prompt)
+                else:
+                    outcome = user_turn(client, sessions[user], user_email(user), prompt, cache)
+            except Exception as e:
+                outcome = {"path": "error", "ok": False, "error": str(e)}
+            outcome["seconds"] = time.perf_counter() - started
+            outcomes.append(outcome)
+        return outcomes
+
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=users, thread_name_prefix="load-user") as pool:
+        outcomes = [outcome for user_outcomes in pool.map(run_user, range(users)) for outcome in user_outcomes]
+    elapsed = time.perf_counter() - started
+
+    fake_db.latency = 0.0
+    for session_id in sessions.values():
+        (admin_chat_sessions if scenario.app == "admin" else user_chat_sessions).end(session_id)
+
+    latencies = [outcome["seconds"] for outcome in outcomes]
+    rpcs = dict(sorted(fake_db.rpc_counts.items()))
+    return {
+        "scenario": scenario.name,
+        "users": users,
+        "turns": len(outcomes),
+        "seconds": elapsed,
+        "turns_per_sec": len(outcomes) / elapsed if elapsed else 0.0,
+        "p50_ms": percentile(latencies, 50) * 1000,
+        "p95_ms": percentile(latencies, 95) * 1000,
+        "p99_ms": percentile(latencies, 99) * 1000,
+        "errors": sum(1 for outcome in outcomes if not outcome["ok"]),
+        "local_share": sum(1 for outcome in outcomes if outcome["path"] == "local") / len(outcomes),
+        "cached_share": sum(1 for outcome in outcomes if outcome["path"] == "cache") / len(outcomes),
+        "model_requests": len(client.requests),
+        "rpcs": rpcs,
+        "rpcs_per_turn": sum(rpcs.values()) / len(outcomes),
+    }
+
+
+def compare(reports: List[Dict[str, Any]], baseline: List[Dict[str, Any]],
+            max_regression: float = MAX_REGRESSION) -> List[str]:
+    """Describe every scenario whose p95 latency or Firestore RPCs per turn got worse than the baseline."""
+    previous = {report["scenario"]: report for report in baseline}
+    regressions = []
+    for report in reports:
+        before = previous.get(report["scenario"])
+        if before is None:
+            continue
+        if report["p95_ms"] > before["p95_ms"] * (1 + max_regression):
+            regressions.append(f"{report['scenario']}: p95 {before['p95_ms']:.0f} ms -> {report['p95_ms']:.0f} ms")
+        if report["rpcs_per_turn"] > before["rpcs_per_turn"] * (1 + max_regression):
+            regressions.append(f"{report['scenario']}: RPCs per turn {before['rpcs_per_turn']:.2f} -> "
+                               f"{report['rpcs_per_turn']:.2f}")
+    return regressions
+
+
+def print_reports(reports: List[Dict[str, Any]]) -> None:
+    print(f"{'scenario':<10}{'users':>6}{'turns':>7}{'turns/s':>9}{'p50 ms':>9}{'p95 ms':>9}{'p99 ms':>9}"
+          f"{'errors':>8}{'local':>7}{'cache':>7}{'model':>7}{'rpc/turn':>10}  rpcs")
+    for report in reports:
+        print(f"{report['scenario']:<10}{report['users']:>6}{report['turns']:>7}{report['turns_per_sec']:>9.1f}"
+              f"{report['p50_ms']:>9.0f}{report['p95_ms']:>9.0f}{report['p99_ms']:>9.0f}{report['errors']:>8}"
+              f"{report['local_share']:>7.0%}{report['cached_share']:>7.0%}{report['model_requests']:>7}{report['rpcs_per_turn']:>10.2f}  "
+              + " ".join(f"{kind}={count}" for kind, count in report["rpcs"].items()))
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--scenarios", nargs="+", choices=sorted(SCENARIOS), default=list(SCENARIOS))
+    parser.add_argument("--users", type=int, default=USERS)
+    parser.add_argument("--turns", type=int, default=TURNS_PER_USER, help="turns per user")
+    parser.add_argument("--model-latency", type=float, default=MODEL_LATENCY, help="seconds per Gemini request")
+    parser.add_argument("--chunk-latency", type=float, default=CHUNK_LATENCY,
+                        help="seconds between streamed words")
+    parser.add_argument("--rpc-latency", type=float, default=RPC_LATENCY, help="seconds per Firestore RPC")
+    parser.add_argument("--fanout", type=int, default=FANOUT, help="function calls per multi-item prompt")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--no-response-cache", dest="response_cache", action="store_false",
+                        default=RESPONSE_CACHE_ENABLED, help="send repeated questions to the model, as RESPONSE_CACHE=0 does")
+    parser.add_argument("--save", help="write the reports to this JSON file")
+    parser.add_argument("--baseline", help="compare with reports saved by an earlier run")
+    parser.add_argument("--max-regression", type=float, default=MAX_REGRESSION)
+    args = parser.parse_args(argv)
+
+    print(f"{args.users} users x {args.turns} turns, model {args.model_latency * 1000:.0f} ms, "
+          f"Firestore RPC {args.rpc_latency * 1000:.0f} ms, fan-out {args.fanout}, "
+          f"response cache {'on' if args.response_cache else 'off'}")
+    reports = [
+        run_scenario(SCENARIOS[name](fanout=args.fanout), args.users, args.turns, args.model_latency,
+                     args.chunk_latency, args.rpc_latency, args.seed, args.response_cache)
+        for name in args.scenarios
+    ]
+    print_reports(reports)
+
+    if args.save:
+        with open(args.save, "w", encoding="utf-8") as f:
+            json.dump(reports, f, indent=2)
+    if args.baseline:
+        with open(args.baseline, encoding="utf-8") as f:
+            regressions = compare(reports, json.load(f), args.max_regression)
+        for regression in regressions:
+            print(f"REGRESSION {regression}")
+        return 1 if regressions else 0
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
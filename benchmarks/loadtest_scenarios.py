@@ -0,0 +1,122 @@
+# benchmarks/loadtest_scenarios.py
+
+"""What the simulated users say, and what the scripted model does about it.
+
+A scenario seeds the in-memory Firestore, writes each user's prompts, and
+plays the model: `model_calls(prompt)` returns the function calls Gemini
+would ask for. Prompts the intent router answers locally never reach it.
+"""
+
+import random
+import re
+from abc import ABC, abstractmethod
+from typing import Any, Dict, List
+
+from google.genai import types
+
+from firebase.medicine_index import medicine_index
+from scripts.user_functions import place_order
+
+MEDICINES = (
+    "paracetamol", "insulin", "doxycycline", "citalopram", "morphine", "amoxicillin", "ibuprofen", "metformin",
+    "omeprazole", "atorvastatin", "amlodipine", "salbutamol", "cetirizine", "loratadine", "azithromycin",
+    "ciprofloxacin", "prednisolone", "warfarin", "levothyroxine", "diclofenac",
+)
+# Large enough that no scenario runs out of stock
+SEED_STOCK = 10_000_000
+
+
+def user_email(user: int) -> str:
+    return f"loaduser{user}@example.com"
+
+
+def seed_inventory(db: Any, users: int) -> None:
+    for name in MEDICINES:
+        db.seed("medicines", name, {"name": name, "stock": SEED_STOCK, "unit_price": 5, "category": "General"})
+    for user in range(users):
+        db.seed("users", user_email(user), {"email": user_email(user), "name": f"User {user}", "orders": {}})
+
+
+def call(function: str, **args: Any) -> types.FunctionCall:
+    return types.FunctionCall(name=function, args=args)
+
+
+class Scenario(ABC):
+    """One kind of traffic; `app` is the assistant it talks to (`user` or `admin`)."""
+
+    name = ""
+    app = "user"
+
+    def __init__(self, fanout: int = 3):
+        self.fanout = fanout
+
+    def setup(self, db: Any, users: int, turns: int, rng: random.Random) -> None:
+        seed_inventory(db, users)
+
+    @abstractmethod
+    def prompt(self, user: int, turn: int, rng: random.Random) -> str:
+        """What `user` says on its `turn`-th turn."""
+
+    def model_calls(self, prompt: str) -> List[types.FunctionCall]:
+        return []
+
+
+class Browse(Scenario):
+    """Single-medicine questions (answered locally) alternating with multi-medicine ones for the model."""
+
+    name = "browse"
+
+    def prompt(self, user: int, turn: int, rng: random.Random) -> str:
+        if turn % 2 == 0:
+            return f"Do you have {rng.choice(MEDICINES)}?"
+        names = rng.sample(MEDICINES, self.fanout)
+        return f"Can you check {', '.join(names[:-1])} and {names[-1]} for me?"
+
+    def model_calls(self, prompt: str) -> List[types.FunctionCall]:
+        return [call("check_medicine_availability", medicine_name=name) for name in medicine_index.find(prompt)]
+
+
+class Order(Scenario):
+    name = "order"
+    PATTERN = re.compile(r"order of (\d+) (\w+)")
+
+    def prompt(self, user: int, turn: int, rng: random.Random) -> str:
+        return f"Place an order of {rng.randint(1, 3)} {rng.choice(MEDICINES)} for me"
+
+    def model_calls(self, prompt: str) -> List[types.FunctionCall]:
+        quantity, name = self.PATTERN.search(prompt).groups()
+        return [call("place_order", medicine_name=name, quantity=int(quantity))]
+
+
+class Cancel(Scenario):
+    """Each user cancels orders placed during setup, one per turn."""
+
+    name = "cancel"
+
+    def setup(self, db: Any, users: int, turns: int, rng: random.Random) -> None:
+        super().setup(db, users, turns, rng)
+        self.orders: Dict[int, List[str]] = {}
+        for user in range(users):
+            self.orders[user] = [place_order(rng.choice(MEDICINES), 1, user_email(user))["order_id"]
+                                 for _ in range(turns)]
+
+    def prompt(self, user: int, turn: int, rng: random.Random) -> str:
+        return f"Please cancel my order {self.orders[user][turn]}"
+
+
+class Restock(Scenario):
+    """An admin restocking several medicines per message."""
+
+    name = "restock"
+    app = "admin"
+    PATTERN = re.compile(r"(\w+) by (\d+)")
+
+    def prompt(self, user: int, turn: int, rng: random.Random) -> str:
+        names = rng.sample(MEDICINES, self.fanout)
+        return "Restock " + ", ".join(f"{name} by {rng.randint(1, 50)}" for name in names)
+
+    def model_calls(self, prompt: str) -> List[types.FunctionCall]:
+        return [call("add_stock", name=name, quantity=int(quantity)) for name, quantity in self.PATTERN.findall(prompt)]
+
+
+SCENARIOS = {scenario.name: scenario for scenario in (Browse, Order, Cancel, Restock)}
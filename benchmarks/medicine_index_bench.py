@@ -0,0 +1,87 @@
+# benchmarks/medicine_index_bench.py
+
+"""Fuzzy medicine-name lookups over a few thousand synthetic SKUs.
+
+Typos are one edit away from a name (resolved through the deletion index)
+or two (resolved through the pruned trigram index); `find` scans a chat
+prompt that mentions one misspelled medicine among ordinary words.
+
+Run from the repository root:
+    python -m benchmarks.medicine_index_bench
+"""
+
+import random
+import statistics
+import time
+
+from tests.fake_firestore import install_fake_db
+
+install_fake_db()
+
+from firebase.medicine_index import MedicineIndex  # noqa: E402
+
+SKUS = 5000
+LOOKUPS = 2000
+PROMPT = ("Hello, my daughter has a terrible headache since yesterday evening, "
+          "do you have {} or something similar for children?")
+SYLLABLES = ["am", "ox", "ci", "lin", "par", "ace", "ta", "mol", "dox", "cy", "cline", "met", "for", "min",
+             "ator", "va", "sta", "tin", "lo", "sar", "tan", "pra", "zole", "ome", "cet", "iri", "zine"]
+
+
+def synthetic_catalog(rng):
+    catalog = {}
+    while len(catalog) < SKUS:
+        name = "".join(rng.choice(SYLLABLES) for _ in range(rng.randint(3, 5)))
+        catalog[name] = {"name": name, "aliases": [name[:3] + "-" + name[3:] + " forte"]}
+    return catalog
+
+
+def misspell(rng, name):
+    position = rng.randrange(1, len(name) - 1)
+    edit = rng.choice(("drop", "swap", "double"))
+    if edit == "drop":
+        return name[:position] + name[position + 1:]
+    if edit == "swap":
+        return name[:position - 1] + name[position] + name[position - 1] + name[position + 1:]
+    return name[:position] + name[position] + name[position:]
+
+
+def timed(fn, queries):
+    samples = []
+    for query in queries:
+        started = time.perf_counter()
+        fn(query)
+        samples.append((time.perf_counter() - started) * 1e6)
+    samples.sort()
+    return statistics.median(samples), samples[int(len(samples) * 0.95)]
+
+
+def main():
+    rng = random.Random(7)
+    catalog = synthetic_catalog(rng)
+    index = MedicineIndex(lambda: catalog.items())
+
+    started = time.perf_counter()
+    index.refresh()
+    build_ms = (time.perf_counter() - started) * 1000
+
+    names = rng.sample(sorted(catalog), LOOKUPS)
+    typos = [misspell(rng, name) for name in names]
+    exact_p50, exact_p95 = timed(index.resolve, names)
+    fuzzy_p50, fuzzy_p95 = timed(index.resolve, typos)
+    far_typos = [misspell(rng, misspell(rng, name)) for name in names]
+    far_p50, far_p95 = timed(index.resolve, far_typos)
+    prompt_p50, prompt_p95 = timed(index.find, [PROMPT.format(typo) for typo in typos])
+    resolved = sum(index.resolve(typo) == name for typo, name in zip(typos, names))
+    top3 = sum(name in [medicine for medicine, _ in index.suggest(typo)] for typo, name in zip(typos, names))
+
+    print(f"skus={SKUS} build={build_ms:.1f}ms")
+    print(f"exact  p50={exact_p50:.1f}us p95={exact_p95:.1f}us")
+    print(f"typo   p50={fuzzy_p50:.1f}us p95={fuzzy_p95:.1f}us")
+    print(f"2 typos p50={far_p50:.1f}us p95={far_p95:.1f}us")
+    print(f"find in a prompt p50={prompt_p50:.1f}us p95={prompt_p95:.1f}us")
+    print(f"typo resolved to the right sku: {resolved / LOOKUPS:.1%}, in top-3 suggestions: {top3 / LOOKUPS:.1%}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,82 @@
+# benchmarks/place_order_bench.py
+
+"""Concurrent buyers of one medicine against the in-memory Firestore.
+
+Compares the transactional `place_order` with the previous
+read-then-write sequence and reports orders/sec and oversold units.
+
+Run from the repository root:
+    python -m benchmarks.place_order_bench
+"""
+
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+
+from tests.fake_firestore import install_fake_db
+
+db = install_fake_db()
+
+from scripts.user_functions import place_order  # noqa: E402
+
+STOCK = 200
+ORDERS_PER_BUYER = 8
+RPC_LATENCY = 0.002
+USER_EMAIL = "buyer@example.com"
+
+
+def legacy_place_order(medicine_name: str, quantity: int, user_email: str) -> dict:
+    """The old get, update, set, update sequence kept here as a baseline."""
+    medicine_ref = db.collection("medicines").document(medicine_name)
+    medicine = medicine_ref.get().to_dict()
+    if medicine["stock"] < quantity:
+        return {"success": False}
+    order_id = str(uuid.uuid4())
+    medicine_ref.update({"stock": medicine["stock"] - quantity})
+    db.collection("orders").document(order_id).set({
+        "order_id": order_id,
+        "user_email": user_email,
+        "medicine_name": medicine_name,
+        "quantity": quantity,
+        "created_at": datetime.now(),
+    })
+    db.collection("users").document(user_email).update({f"orders.{order_id}": medicine_name})
+    return {"success": True}
+
+
+def run(order_fn, buyers: int) -> dict:
+    db.reset()
+    db.seed("medicines", "paracetamol", {"name": "paracetamol", "stock": STOCK, "unit_price": 1})
+    db.seed("users", USER_EMAIL, {"name": "Buyer", "orders": {}})
+    db.latency = RPC_LATENCY
+
+    attempts = max(ORDERS_PER_BUYER * buyers, STOCK + buyers)
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=buyers) as pool:
+        results = list(pool.map(lambda _: order_fn("paracetamol", 1, USER_EMAIL), range(attempts)))
+    elapsed = time.perf_counter() - started
+
+    placed = sum(1 for result in results if result["success"])
+    return {
+        "placed": placed,
+        "orders_per_sec": placed / elapsed,
+        "oversold": max(0, placed - STOCK),
+        "write_rpcs": sum(db.rpc_counts[kind] for kind in ("set", "update", "commit")),
+    }
+
+
+def main():
+    print(f"stock={STOCK} rpc_latency={RPC_LATENCY * 1000:.0f}ms")
+    print(f"{'engine':<14}{'buyers':>7}{'placed':>8}{'orders/s':>10}{'oversold':>10}{'write rpcs':>12}")
+    for buyers in (1, 8, 64):
+        for name, order_fn in (("legacy", legacy_place_order), ("transactional", place_order)):
+            stats = run(order_fn, buyers)
+            print(
+                f"{name:<14}{buyers:>7}{stats['placed']:>8}{stats['orders_per_sec']:>10.1f}"
+                f"{stats['oversold']:>10}{stats['write_rpcs']:>12}"
+            )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,103 @@
+# benchmarks/response_cache_bench.py
+
+"""Repeated read-only questions with and without the response cache.
+
+Users ask a skewed mix of availability and health-advice questions, the way
+a few common questions dominate a pharmacy chat, and every twentieth turn
+someone places an order. The fake model takes MODEL_LATENCY per request.
+The report has the turns answered from the cache, the model time they
+saved, and the median turn with and without the cache.
+
+Run from the repository root:
+    python -m benchmarks.response_cache_bench
+"""
+
+import random
+import statistics
+import time
+
+from google.genai import types
+
+from tests.fake_firestore import install_fake_db
+from tests.fake_genai import FakeGenaiClient
+
+db = install_fake_db()
+
+from scripts.chat_turn import execute_user_tool, run_model_turn  # noqa: E402
+from scripts.response_cache import ResponseCache  # noqa: E402
+from scripts.user_functions import place_order  # noqa: E402
+
+MODEL = "gemini-2.5-flash"
+MODEL_LATENCY = 0.05
+RPC_LATENCY = 0.002
+TURNS = 200
+USERS = 10
+MEDICINES = ["paracetamol", "insulin", "doxycycline", "amoxicillin", "ibuprofen"]
+SYMPTOMS = ["headache", "fever", "cough", "back pain"]
+
+
+def questions() -> list:
+    return ([f"Do you have {name}?" for name in MEDICINES]
+            + [f"Any advice for {symptom}?" for symptom in SYMPTOMS])
+
+
+def script(prompt: str) -> list:
+    if prompt.startswith("Any advice"):
+        symptom = prompt[len("Any advice for "):-1]
+        return [types.FunctionCall(name="get_health_advice", args={"symptoms": symptom})]
+    return [types.FunctionCall(name="check_medicine_availability", args={"medicine_name": prompt.split()[-1][:-1]})]
+
+
+def seed() -> None:
+    from firebase.inventory_cache import inventory_cache
+    from firebase.medicine_index import medicine_index
+
+    db.reset()
+    inventory_cache.clear()
+    medicine_index.invalidate()
+    for name in MEDICINES:
+        db.seed("medicines", name, {"name": name, "stock": 10_000, "unit_price": 1})
+    for user in range(USERS):
+        db.seed("users", f"user{user}@example.com", {"name": f"User {user}", "age": 30, "recent_orders": []})
+    db.latency = RPC_LATENCY
+
+
+def run(cache) -> dict:
+    seed()
+    client = FakeGenaiClient(script=script, final_text="Here is what I found.", latency=MODEL_LATENCY)
+    rng = random.Random(7)
+    pool = questions()
+    weights = [1 / (rank + 1) for rank in range(len(pool))]
+    timings = []
+    for index in range(TURNS):
+        email = f"user{rng.randrange(USERS)}@example.com"
+        if index % 20 == 19:
+            place_order(rng.choice(MEDICINES), 1, email)
+        prompt = rng.choices(pool, weights)[0]
+        chat = client.chats.create(model=MODEL)
+        started = time.perf_counter()
+        run_model_turn(chat, prompt, lambda name, args: execute_user_tool(name, args, email, False), "user_chat",
+                       "".join, MODEL, cache=cache, cache_scope=email)
+        timings.append(time.perf_counter() - started)
+    return {"p50": statistics.median(timings), "total": sum(timings), "model_requests": len(client.requests)}
+
+
+def main():
+    import scripts.user_functions as user_functions
+
+    print(f"turns={TURNS} users={USERS} model_latency={MODEL_LATENCY * 1000:.0f}ms")
+    baseline = run(None)
+    cache = ResponseCache()
+    # orders placed by the benchmark invalidate this cache, as they do the app's
+    user_functions.response_cache = cache
+    cached = run(cache)
+    stats = cache.stats()
+    print(f"{'':<10}{'p50 ms':>9}{'total s':>9}{'model requests':>16}")
+    for label, report in (("no cache", baseline), ("cache", cached)):
+        print(f"{label:<10}{report['p50'] * 1000:>9.1f}{report['total']:>9.2f}{report['model_requests']:>16}")
+    print(f"hit rate {stats['hit_ratio']:.0%} ({stats['hits']} of {stats['hits'] + stats['misses']} turns), "
+          f"model time saved {stats['saved_seconds']:.2f}s")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,104 @@
+# benchmarks/startup_profile.py
+
+"""What a cold start of app.py pays before the login page can render.
+
+Each run is a fresh interpreter that imports the modules app.py imports.
+"lazy" stops there, as the app does now; "eager" also builds the Firestore
+and Gemini clients, as importing firebase.db_manager and running app.py used
+to. Credentials are a throwaway service account key, so the run parses a
+real key and builds real clients without touching the network.
+
+Run from the repository root:
+    python -m benchmarks.startup_profile
+    python -m benchmarks.startup_profile --importtime   # slowest imports too
+"""
+
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+
+from cryptography.hazmat.primitives import serialization
+from cryptography.hazmat.primitives.asymmetric import rsa
+
+RUNS = 5
+APP_IMPORTS = (
+    "streamlit", "dotenv", "scripts.auth", "scripts.providers", "scripts.chat_turn", "scripts.intent_router",
+    "scripts.chat_sessions", "scripts.tracing", "scripts.metrics", "scripts.response_cache", "firebase.db_manager",
+    "firebase.chat_history",
+    "firebase.inventory_cache", "firebase.inventory_mirror",
+)
+STARTUP = """
+import json, time
+started = time.perf_counter()
+{imports}
+imported = time.perf_counter()
+from firebase.db_manager import firestore_client
+from scripts.providers import gemini_client
+built_on_import = firestore_client.created or gemini_client.created
+if {eager}:
+    firestore_client.get()
+    gemini_client.get()
+print(json.dumps({{"imports": imported - started, "total": time.perf_counter() - started,
+                  "built_on_import": built_on_import}}))
+"""
+
+
+def throwaway_credentials() -> str:
+    key = rsa.generate_private_key(public_exponent=65537, key_size=2048)
+    pem = key.private_bytes(serialization.Encoding.PEM, serialization.PrivateFormat.PKCS8,
+                            serialization.NoEncryption()).decode()
+    return json.dumps({
+        "type": "service_account",
+        "project_id": "axon-startup-profile",
+        "private_key_id": "profile",
+        "private_key": pem,
+        "client_email": "profile@axon-startup-profile.iam.gserviceaccount.com",
+        "client_id": "1",
+        "token_uri": "https://oauth2.googleapis.com/token",
+    })
+
+
+def run(eager: bool, environ: dict, importtime: bool = False) -> subprocess.CompletedProcess:
+    code = STARTUP.format(imports="\n".join(f"import {module}" for module in APP_IMPORTS), eager=eager)
+    command = [sys.executable] + (["-X", "importtime"] if importtime else []) + ["-c", code]
+    return subprocess.run(command, env=environ, capture_output=True, text=True, check=True)
+
+
+def slowest_imports(stderr: str, count: int = 15) -> list:
+    rows = []
+    for line in stderr.splitlines():
+        if line.startswith("import time:") and "|" in line and "cumulative" not in line:
+            _, cumulative, module = line.split("|")
+            rows.append((int(cumulative), module.rstrip()))
+    return sorted(rows, reverse=True)[:count]
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--runs", type=int, default=RUNS)
+    parser.add_argument("--importtime", action="store_true", help="list the slowest imports of a lazy start")
+    args = parser.parse_args()
+
+    environ = dict(os.environ, FIREBASE_CREDENTIALS=throwaway_credentials(), GEMINI_API_KEY="profile-key")
+    print(f"median of {args.runs} cold starts")
+    print(f"{'startup':<8}{'imports ms':>12}{'clients ms':>12}{'total ms':>10}")
+    for label, eager in (("eager", True), ("lazy", False)):
+        samples = [json.loads(run(eager, environ).stdout) for _ in range(args.runs)]
+        if any(sample["built_on_import"] for sample in samples):
+            # the client time would be counted under "imports" and the split below would be wrong
+            sys.exit("a client was built while importing the app's modules")
+        imports = statistics.median(sample["imports"] for sample in samples) * 1000
+        total = statistics.median(sample["total"] for sample in samples) * 1000
+        print(f"{label:<8}{imports:>12.0f}{total - imports:>12.0f}{total:>10.0f}")
+
+    if args.importtime:
+        print("\nslowest imports (cumulative us)")
+        for cumulative, module in slowest_imports(run(False, environ, importtime=True).stderr):
+            print(f"{cumulative:>10}  {module}")
+
+
+if __name__ == "__main__":
+    main()
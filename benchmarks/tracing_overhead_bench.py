@@ -0,0 +1,69 @@
+# benchmarks/tracing_overhead_bench.py
+
+"""Cost of tracing on a tool-calling turn, with TRACING off and on.
+
+Each turn dispatches three availability checks against the in-memory
+Firestore with a simulated round trip, the shape of a typical chat turn
+minus the model call.
+
+Run from the repository root:
+    python -m benchmarks.tracing_overhead_bench
+"""
+
+import time
+
+from tests.fake_firestore import install_fake_db
+
+fake_db = install_fake_db()
+
+from firebase.inventory_cache import inventory_cache  # noqa: E402
+from scripts.tool_dispatcher import dispatch_tool_calls  # noqa: E402
+from scripts.tracing import tracer  # noqa: E402
+from scripts.user_functions import check_medicine_availability  # noqa: E402
+
+TURNS = 300
+RPC_LATENCY = 0.001
+MEDICINES = ("paracetamol", "insulin", "doxycycline")
+SPANS = 1_000_000
+
+
+def turn():
+    # every turn reads Firestore instead of the inventory cache
+    inventory_cache.clear()
+    with tracer.turn("bench"):
+        dispatch_tool_calls([("check_medicine_availability", {"medicine_name": name}) for name in MEDICINES],
+                            lambda name, args: check_medicine_availability(**args))
+
+
+def seconds_per_turn(enabled):
+    tracer.enabled = enabled
+    turn()
+    started = time.perf_counter()
+    for _ in range(TURNS):
+        turn()
+    return (time.perf_counter() - started) / TURNS
+
+
+def main():
+    for name in MEDICINES:
+        fake_db.seed("medicines", name, {"name": name, "stock": 10, "unit_price": 1})
+    fake_db.latency = RPC_LATENCY
+
+    tracer.enabled = False
+    started = time.perf_counter()
+    for _ in range(SPANS):
+        with tracer.span("firestore.get", "firestore"):
+            pass
+    noop_ns = (time.perf_counter() - started) / SPANS * 1e9
+
+    off = seconds_per_turn(False)
+    on = seconds_per_turn(True)
+    spans = len(tracer.recent()[0]["spans"])
+    print(f"{TURNS} turns of {len(MEDICINES)} tool calls, {RPC_LATENCY * 1000:.0f} ms per RPC")
+    print(f"disabled span:    {noop_ns:8.0f} ns")
+    print(f"tracing off:      {off * 1000:8.2f} ms/turn ({noop_ns * spans / 1e6 / (off * 1000):.4%} spent in no-op spans)")
+    print(f"tracing on:       {on * 1000:8.2f} ms/turn ({spans} spans, {(on - off) / off:+.1%})")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,134 @@
+# firebase/chat_history.py
+
+"""Per-user chat history kept in the `users/{email}/chat_history` subcollection.
+
+Each prompt is its own timestamped document, so the user document stays the
+same size however much someone chats, repeated prompts are kept, and the
+history can be read a page at a time. Prompts are written by a background
+thread: `append` only queues the message, and the writer commits everything
+queued so far in one batch, off the Streamlit request path.
+"""
+
+import logging
+import os
+import queue
+import threading
+import time
+from datetime import datetime, timezone
+from typing import Any, Dict, Optional
+
+from firebase.db_manager import db
+
+logger = logging.getLogger(__name__)
+
+CHAT_HISTORY_COLLECTION = "chat_history"
+CHAT_HISTORY_PAGE_SIZE = 20
+# Messages committed together by the writer (a batch holds at most 500 writes)
+CHAT_HISTORY_BATCH_SIZE = int(os.getenv("CHAT_HISTORY_BATCH_SIZE", "100"))
+CHAT_HISTORY_WRITE_ATTEMPTS = 3
+
+
+def chat_history_ref(user_email: str, client: Any = db):
+    return client.collection("users").document(user_email).collection(CHAT_HISTORY_COLLECTION)
+
+
+class ChatHistoryWriter:
+    def __init__(self, client: Any = db, batch_size: int = CHAT_HISTORY_BATCH_SIZE,
+                 max_attempts: int = CHAT_HISTORY_WRITE_ATTEMPTS, retry_delay: float = 0.5):
+        self._client = client
+        self._batch_size = batch_size
+        self._max_attempts = max_attempts
+        self._retry_delay = retry_delay
+        self._queue: "queue.Queue[tuple]" = queue.Queue()
+        self._thread: Optional[threading.Thread] = None
+        self._start_lock = threading.Lock()
+        self.written = 0
+        self.dropped = 0
+
+    def append(self, user_email: str, text: str, role: str = "user") -> None:
+        """Queue a message for `user_email`; returns without waiting for Firestore."""
+        self._queue.put((user_email, {"text": text, "role": role, "created_at": datetime.now(timezone.utc)}))
+        self._ensure_running()
+
+    def flush(self, timeout: Optional[float] = None) -> bool:
+        """Wait until every queued message is written (or dropped); False on timeout."""
+        deadline = None if timeout is None else time.monotonic() + timeout
+        while self._queue.unfinished_tasks:
+            if deadline is not None and time.monotonic() >= deadline:
+                return False
+            time.sleep(0.005)
+        return True
+
+    def _ensure_running(self) -> None:
+        with self._start_lock:
+            if self._thread is None or not self._thread.is_alive():
+                self._thread = threading.Thread(target=self._run, name="chat-history-writer", daemon=True)
+                self._thread.start()
+
+    def _run(self) -> None:
+        while True:
+            pending = [self._queue.get()]
+            while len(pending) < self._batch_size:
+                try:
+                    pending.append(self._queue.get_nowait())
+                except queue.Empty:
+                    break
+            try:
+                self._write(pending)
+            finally:
+                for _ in pending:
+                    self._queue.task_done()
+
+    def _write(self, pending) -> None:
+        for attempt in range(1, self._max_attempts + 1):
+            batch = self._client.batch()
+            for user_email, message in pending:
+                batch.set(chat_history_ref(user_email, self._client).document(), message)
+            try:
+                batch.commit()
+                self.written += len(pending)
+                return
+            except Exception:
+                if attempt == self._max_attempts:
+                    self.dropped += len(pending)
+                    logger.exception("dropping %d chat history messages after %d attempts", len(pending), attempt)
+                    return
+                time.sleep(self._retry_delay * attempt)
+
+
+def read_chat_history(user_email: str, page_size: int = CHAT_HISTORY_PAGE_SIZE, cursor: Optional[str] = None,
+                      client: Any = db) -> Dict[str, Any]:
+    """Return one page of `user_email`'s messages, newest first.
+
+    Pass the returned `next_cursor` back as `cursor` for the following page;
+    it is None on the last page.
+    """
+    try:
+        history = chat_history_ref(user_email, client)
+        query = history.order_by("created_at", direction="DESCENDING")
+        if cursor:
+            cursor_snapshot = history.document(cursor).get()
+            if not cursor_snapshot.exists:
+                return {
+                    "success": False,
+                    "message": f"Unknown chat history cursor: {cursor}"
+                }
+            query = query.start_after(cursor_snapshot)
+        # one extra document tells whether another page follows
+        snapshots = list(query.limit(page_size + 1).stream())
+        page = snapshots[:page_size]
+        return {
+            "success": True,
+            "data": {
+                "messages": [{"id": snapshot.id, **snapshot.to_dict()} for snapshot in page],
+                "next_cursor": page[-1].id if len(snapshots) > page_size else None,
+            }
+        }
+    except Exception as e:
+        return {
+            "success": False,
+            "message": f"Error reading chat history: {str(e)}"
+        }
+
+
+chat_history_writer = ChatHistoryWriter()
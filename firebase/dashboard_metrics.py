@@ -0,0 +1,115 @@
+# firebase/dashboard_metrics.py
+
+"""Admin dashboard counters computed with server-side aggregation queries.
+
+Counts use Firestore `count()` aggregations, so only the numbers come back
+instead of every matching document. Stock value multiplies two fields, which
+no aggregation can do, so it comes from the inventory mirror when it is
+connected and otherwise from a query projected onto `stock` and
+`unit_price`. All metrics run in parallel and are cached as one snapshot for
+`ttl` seconds, shared by every admin session in the process. Each metric
+reports how long its own query took.
+"""
+
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Dict, Iterable, Optional
+
+from firebase.db_manager import db
+from firebase.inventory_mirror import InventoryMirror, inventory_mirror
+
+DASHBOARD_METRICS_TTL = float(os.getenv("DASHBOARD_METRICS_TTL", "30"))
+LOW_STOCK_THRESHOLD = int(os.getenv("LOW_STOCK_THRESHOLD", "10"))
+# update_order_status accepts only these, so orders_by_status counts every order.
+ORDER_STATUSES = ("pending", "processing", "shipped", "delivered", "cancelled")
+
+
+def _count(query) -> int:
+    return int(query.count(alias="count").get()[0][0].value)
+
+
+def count_medicines(client: Any = db) -> int:
+    return _count(client.collection("medicines"))
+
+
+def count_low_stock(client: Any = db, threshold: int = LOW_STOCK_THRESHOLD) -> int:
+    return _count(client.collection("medicines").where("stock", "<=", threshold))
+
+
+def stock_value(client: Any = db, mirror: Optional[InventoryMirror] = inventory_mirror) -> float:
+    if mirror is not None and mirror.connected:
+        medicines = [mirror.get(medicine_id) or {} for medicine_id in mirror.names()]
+    else:
+        medicines = [snapshot.to_dict() or {} for snapshot in
+                     client.collection("medicines").select(["stock", "unit_price"]).stream()]
+    return round(sum((data.get("stock") or 0) * (data.get("unit_price") or 0) for data in medicines), 2)
+
+
+def orders_by_status(client: Any = db, statuses: Iterable[str] = ORDER_STATUSES) -> Dict[str, int]:
+    return {status: _count(client.collection("orders").where("status", "==", status)) for status in statuses}
+
+
+class DashboardMetrics:
+    def __init__(self, metrics: Dict[str, Callable[[], Any]], ttl: float = DASHBOARD_METRICS_TTL,
+                 clock: Callable[[], float] = time.monotonic):
+        self._metrics = metrics
+        self._ttl = ttl
+        self._clock = clock
+        self._lock = threading.Lock()
+        self._snapshot: Optional[Dict[str, Dict[str, Any]]] = None
+        self._expires = 0.0
+        self.refreshes = 0
+        self.hits = 0
+
+    def snapshot(self) -> Dict[str, Dict[str, Any]]:
+        """Return `{metric: {"value", "latency_ms", "error"}}`, recomputed at most once per TTL.
+
+        A metric whose query fails has a None value and the error message; the
+        other metrics are unaffected.
+        """
+        # one session refreshes while the others wait for its result
+        with self._lock:
+            if self._snapshot is None or self._clock() >= self._expires:
+                self._snapshot = self._compute()
+                self._expires = self._clock() + self._ttl
+                self.refreshes += 1
+            else:
+                self.hits += 1
+            return self._snapshot
+
+    def invalidate(self) -> None:
+        with self._lock:
+            self._expires = 0.0
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            snapshots = self.hits + self.refreshes
+            # a miss is a snapshot that ran the metric queries
+            # nothing resets these, so they are the totals too
+            return {"hits": self.hits, "misses": self.refreshes,
+                    "hit_ratio": self.hits / snapshots if snapshots else 0.0,
+                    "hits_total": self.hits, "misses_total": self.refreshes}
+
+    def _compute(self) -> Dict[str, Dict[str, Any]]:
+        with ThreadPoolExecutor(max_workers=len(self._metrics), thread_name_prefix="dashboard-metric") as pool:
+            futures = {name: pool.submit(self._measure, metric) for name, metric in self._metrics.items()}
+            return {name: future.result() for name, future in futures.items()}
+
+    @staticmethod
+    def _measure(metric: Callable[[], Any]) -> Dict[str, Any]:
+        started = time.perf_counter()
+        try:
+            value, error = metric(), None
+        except Exception as e:
+            value, error = None, str(e)
+        return {"value": value, "latency_ms": (time.perf_counter() - started) * 1000, "error": error}
+
+
+dashboard_metrics = DashboardMetrics({
+    "medicines": count_medicines,
+    "low_stock": count_low_stock,
+    "stock_value": stock_value,
+    "orders_by_status": orders_by_status,
+})
@@ -1,79 +1,114 @@
+# firebase/db_manager.py
+
+"""The shared Firestore client, created on first use.
+
+`db` can be imported anywhere at no cost: Firebase is initialized and the
+client built the first time it is used (see scripts/providers.py). `async_db`
+is the AsyncClient for the coroutine tool functions; use it only on the
+shared event loop (scripts/event_loop.py), which its gRPC channel binds to.
+Tests swap in doubles with `firestore_client.override(...)` and
+`async_firestore_client.override(...)`.
+"""
+
 import os
 import json
 from collections.abc import Mapping
-import firebase_admin
-from firebase_admin import credentials, firestore
-try:
-    import streamlit as st  # Available in Streamlit Cloud
-except Exception:  # Local scripts/tests may not have streamlit loaded here
-    st = None
-
-# Initialize Firebase (Cloud-friendly: secrets/env/file fallbacks)
-if not firebase_admin._apps:
-    init_error = None
+
+from scripts.providers import Provider
+
+
+def initialize_firebase() -> None:
+    """Initialize Firebase (Cloud-friendly: secrets/env/file fallbacks)."""
+    import firebase_admin
+    from firebase_admin import credentials
     try:
-        cred_dict = None
-        explicit_project_id = None
-
-        # 1) Streamlit secrets (supports either a JSON string or a dict)
-        if st is not None:
-            secrets_val = None
-            try:
-                # Prefer explicit key lookup; some Streamlit Secrets mappings don't fully implement .get()
-                if "FIREBASE_CREDENTIALS" in st.secrets:
-                    secrets_val = st.secrets["FIREBASE_CREDENTIALS"]
-                # Also allow explicit project id in secrets
-                explicit_project_id = (
-                    st.secrets.get("FIREBASE_PROJECT_ID")
-                    or st.secrets.get("GOOGLE_CLOUD_PROJECT")
-                )
-            except Exception:
+        import streamlit as st  # Available in Streamlit Cloud
+    except Exception:  # Local scripts/tests may not have streamlit loaded here
+        st = None
+
+    if not firebase_admin._apps:
+        init_error = None
+        try:
+            cred_dict = None
+            explicit_project_id = None
+
+            # 1) Streamlit secrets (supports either a JSON string or a dict)
+            if st is not None:
                 secrets_val = None
-            if secrets_val is not None:
-                if isinstance(secrets_val, str):
-                    cred_dict = json.loads(secrets_val)
-                elif isinstance(secrets_val, Mapping):
-                    cred_dict = dict(secrets_val)
-
-        # 2) Environment variable (JSON string)
-        if cred_dict is None:
-            env_val = os.getenv("FIREBASE_CREDENTIALS")
-            if env_val:
-                cred_dict = json.loads(env_val)
-
-        # 3) Local credentials file fallback
-        if explicit_project_id and not os.getenv("GOOGLE_CLOUD_PROJECT"):
-            os.environ["GOOGLE_CLOUD_PROJECT"] = explicit_project_id
-
-        if cred_dict is None and os.path.exists("firebase_credentials.json"):
-            cred = credentials.Certificate("firebase_credentials.json")
-            # Try to infer project_id from file
-            try:
-                with open("firebase_credentials.json", "r", encoding="utf-8") as f:
-                    _tmp = json.load(f)
-                project_id = _tmp.get("project_id") or _tmp.get("projectId")
-            except Exception:
-                project_id = None
-            if not project_id:
-                project_id = explicit_project_id
-            if project_id and not os.getenv("GOOGLE_CLOUD_PROJECT"):
-                os.environ["GOOGLE_CLOUD_PROJECT"] = project_id
-            options = {"projectId": project_id} if project_id else None
-            firebase_admin.initialize_app(cred, options)
-        elif cred_dict is not None:
-            cred = credentials.Certificate(cred_dict)
-            project_id = cred_dict.get("project_id") or cred_dict.get("projectId") or explicit_project_id
-            if project_id and not os.getenv("GOOGLE_CLOUD_PROJECT"):
-                os.environ["GOOGLE_CLOUD_PROJECT"] = project_id
-            options = {"projectId": project_id} if project_id else None
-            firebase_admin.initialize_app(cred, options)
-        else:
-            # 4) Last resort: try default credentials if available
-            # If project id is available in env, Firebase will pick it up; otherwise user must set GOOGLE_CLOUD_PROJECT
-            firebase_admin.initialize_app()
-    except Exception as e:
-        init_error = e
-        # Re-raise with a clearer message (Streamlit will redact in UI, but logs keep details)
-        raise ValueError("Failed to initialize Firebase app. Ensure FIREBASE_CREDENTIALS are set correctly in Streamlit secrets or environment, or include firebase_credentials.json.") from e
-
-db = firestore.client()
\ No newline at end of file
+                try:
+                    # Prefer explicit key lookup; some Streamlit Secrets mappings don't fully implement .get()
+                    if "FIREBASE_CREDENTIALS" in st.secrets:
+                        secrets_val = st.secrets["FIREBASE_CREDENTIALS"]
+                    # Also allow explicit project id in secrets
+                    explicit_project_id = (
+                        st.secrets.get("FIREBASE_PROJECT_ID")
+                        or st.secrets.get("GOOGLE_CLOUD_PROJECT")
+                    )
+                except Exception:
+                    secrets_val = None
+                if secrets_val is not None:
+                    if isinstance(secrets_val, str):
+                        cred_dict = json.loads(secrets_val)
+                    elif isinstance(secrets_val, Mapping):
+                        cred_dict = dict(secrets_val)
+
+            # 2) Environment variable (JSON string)
+            if cred_dict is None:
+                env_val = os.getenv("FIREBASE_CREDENTIALS")
+                if env_val:
+                    cred_dict = json.loads(env_val)
+
+            # 3) Local credentials file fallback
+            if explicit_project_id and not os.getenv("GOOGLE_CLOUD_PROJECT"):
+                os.environ["GOOGLE_CLOUD_PROJECT"] = explicit_project_id
+
+            if cred_dict is None and os.path.exists("firebase_credentials.json"):
+                cred = credentials.Certificate("firebase_credentials.json")
+                # Try to infer project_id from file
+                try:
+                    with open("firebase_credentials.json", "r", encoding="utf-8") as f:
+                        _tmp = json.load(f)
+                    project_id = _tmp.get("project_id") or _tmp.get("projectId")
+                except Exception:
+                    project_id = None
+                if not project_id:
+                    project_id = explicit_project_id
+                if project_id and not os.getenv("GOOGLE_CLOUD_PROJECT"):
+                    os.environ["GOOGLE_CLOUD_PROJECT"] = project_id
+                options = {"projectId": project_id} if project_id else None
+                firebase_admin.initialize_app(cred, options)
+            elif cred_dict is not None:
+                cred = credentials.Certificate(cred_dict)
+                project_id = cred_dict.get("project_id") or cred_dict.get("projectId") or explicit_project_id
+                if project_id and not os.getenv("GOOGLE_CLOUD_PROJECT"):
+                    os.environ["GOOGLE_CLOUD_PROJECT"] = project_id
+                options = {"projectId": project_id} if project_id else None
+                firebase_admin.initialize_app(cred, options)
+            else:
+                # 4) Last resort: try default credentials if available
+                # If project id is available in env, Firebase will pick it up; otherwise user must set GOOGLE_CLOUD_PROJECT
+                firebase_admin.initialize_app()
+        except Exception as e:
+            init_error = e
+            # Re-raise with a clearer message (Streamlit will redact in UI, but logs keep details)
+            raise ValueError("Failed to initialize Firebase app. Ensure FIREBASE_CREDENTIALS are set correctly in Streamlit secrets or environment, or include firebase_credentials.json.") from e
+
+
+def _create_firestore_client():
+    from firebase_admin import firestore
+
+    initialize_firebase()
+    return firestore.client()
+
+
+def _create_async_firestore_client():
+    from firebase_admin import firestore_async
+
+    initialize_firebase()
+    return firestore_async.client()
+
+
+firestore_client = Provider("firestore", _create_firestore_client)
+db = firestore_client.proxy()
+async_firestore_client = Provider("firestore_async", _create_async_firestore_client)
+async_db = async_firestore_client.proxy()
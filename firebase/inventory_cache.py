@@ -0,0 +1,164 @@
+# firebase/inventory_cache.py
+
+"""Process-wide read-through cache in front of the `medicines` collection.
+
+Entries expire after a TTL and the least recently used ones are evicted once
+the size cap is reached. Write paths call `invalidate` so the next read goes
+back to Firestore. Each Streamlit app runs in its own process, so writes made
+from the admin app reach the user app's cache through the TTL.
+"""
+
+import os
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Tuple
+
+from firebase.db_manager import db
+
+INVENTORY_CACHE_TTL = float(os.getenv("INVENTORY_CACHE_TTL", "30"))
+INVENTORY_CACHE_SIZE = int(os.getenv("INVENTORY_CACHE_SIZE", "512"))
+# Documents per batched read of the medicines a lookup missed
+GET_ALL_CHUNK_SIZE = int(os.getenv("GET_ALL_CHUNK_SIZE", "100"))
+
+
+def _load_medicine(medicine_id: str) -> Optional[Dict[str, Any]]:
+    snapshot = db.collection("medicines").document(medicine_id).get()
+    return snapshot.to_dict() if snapshot.exists else None
+
+
+def load_medicines(medicine_ids: List[str]) -> Dict[str, Optional[Dict[str, Any]]]:
+    """Read the medicines with one `get_all` per GET_ALL_CHUNK_SIZE ids; missing ones map to None."""
+    collection = db.collection("medicines")
+    loaded: Dict[str, Optional[Dict[str, Any]]] = {}
+    for start in range(0, len(medicine_ids), GET_ALL_CHUNK_SIZE):
+        chunk = medicine_ids[start:start + GET_ALL_CHUNK_SIZE]
+        for snapshot in db.get_all([collection.document(medicine_id) for medicine_id in chunk]):
+            loaded[snapshot.id] = snapshot.to_dict() if snapshot.exists else None
+    return loaded
+
+
+class InventoryCache:
+    def __init__(self, loader: Callable[[str], Optional[Dict[str, Any]]], ttl: float = INVENTORY_CACHE_TTL,
+                 max_entries: int = INVENTORY_CACHE_SIZE, clock: Callable[[], float] = time.monotonic):
+        self._loader = loader
+        self._ttl = ttl
+        self._max_entries = max_entries
+        self._clock = clock
+        self._entries: "OrderedDict[str, tuple]" = OrderedDict()
+        self._lock = threading.Lock()
+        # bumped by every invalidation so a load that raced a write is not cached
+        self._generation = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        # what `clear` reset, so the exported totals never go backwards
+        self._cleared_hits = 0
+        self._cleared_misses = 0
+
+    def get(self, medicine_id: str) -> Optional[Dict[str, Any]]:
+        """Return the medicine document (None when it doesn't exist), loading it on a miss."""
+        hit, data, generation = self._lookup(medicine_id)
+        if hit:
+            return data
+        return self._fill(medicine_id, generation, self._loader(medicine_id))
+
+    async def get_async(self, medicine_id: str,
+                        loader: Callable[[str], Awaitable[Optional[Dict[str, Any]]]]) -> Optional[Dict[str, Any]]:
+        """`get` for coroutines: a miss awaits `loader` instead of blocking the event loop."""
+        hit, data, generation = self._lookup(medicine_id)
+        if hit:
+            return data
+        return self._fill(medicine_id, generation, await loader(medicine_id))
+
+    def get_many(self, medicine_ids: List[str],
+                 loader: Callable[[List[str]], Dict[str, Optional[Dict[str, Any]]]] = load_medicines
+                 ) -> Dict[str, Optional[Dict[str, Any]]]:
+        """`get` for several medicines; all misses are handed to `loader` in one call."""
+        found, misses, generation = self._lookup_many(medicine_ids)
+        if misses:
+            found.update(self._fill_many(misses, generation, loader(misses)))
+        return found
+
+    async def get_many_async(self, medicine_ids: List[str],
+                             loader: Callable[[List[str]], Awaitable[Dict[str, Optional[Dict[str, Any]]]]]
+                             ) -> Dict[str, Optional[Dict[str, Any]]]:
+        found, misses, generation = self._lookup_many(medicine_ids)
+        if misses:
+            found.update(self._fill_many(misses, generation, await loader(misses)))
+        return found
+
+    def _lookup_many(self, medicine_ids: List[str]) -> Tuple[Dict[str, Optional[Dict[str, Any]]], List[str], int]:
+        found: Dict[str, Optional[Dict[str, Any]]] = {}
+        misses: List[str] = []
+        generation = None
+        for medicine_id in dict.fromkeys(medicine_ids):
+            hit, data, current = self._lookup(medicine_id)
+            # the oldest generation seen, so an invalidation during the lookups still skips the fill
+            generation = current if generation is None else min(generation, current)
+            if hit:
+                found[medicine_id] = data
+            else:
+                misses.append(medicine_id)
+        return found, misses, generation or 0
+
+    def _fill_many(self, medicine_ids: List[str], generation: int,
+                   loaded: Dict[str, Optional[Dict[str, Any]]]) -> Dict[str, Optional[Dict[str, Any]]]:
+        return {medicine_id: self._fill(medicine_id, generation, loaded.get(medicine_id))
+                for medicine_id in medicine_ids}
+
+    def _lookup(self, medicine_id: str) -> Tuple[bool, Optional[Dict[str, Any]], int]:
+        now = self._clock()
+        with self._lock:
+            entry = self._entries.get(medicine_id)
+            if entry is not None and entry[0] > now:
+                self._entries.move_to_end(medicine_id)
+                self.hits += 1
+                return True, dict(entry[1]) if entry[1] is not None else None, self._generation
+            self.misses += 1
+            return False, None, self._generation
+
+    def _fill(self, medicine_id: str, generation: int, data: Optional[Dict[str, Any]]) -> Optional[Dict[str, Any]]:
+        with self._lock:
+            if generation == self._generation:
+                self._store(medicine_id, data)
+        return dict(data) if data is not None else None
+
+    def _store(self, medicine_id: str, data: Optional[Dict[str, Any]]) -> None:
+        self._entries[medicine_id] = (self._clock() + self._ttl, data)
+        self._entries.move_to_end(medicine_id)
+        while len(self._entries) > self._max_entries:
+            self._entries.popitem(last=False)
+            self.evictions += 1
+
+    def invalidate(self, medicine_id: str) -> None:
+        with self._lock:
+            self._generation += 1
+            self._entries.pop(medicine_id, None)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._generation += 1
+            self._entries.clear()
+            self._cleared_hits += self.hits
+            self._cleared_misses += self.misses
+            self.hits = self.misses = self.evictions = 0
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "size": len(self._entries),
+                "hit_ratio": self.hits / lookups if lookups else 0.0,
+                # every hit is a Firestore document read that never happened
+                "reads_saved": self.hits,
+                # since the process started, across `clear` calls
+                "hits_total": self._cleared_hits + self.hits,
+                "misses_total": self._cleared_misses + self.misses,
+            }
+
+
+inventory_cache = InventoryCache(_load_medicine)
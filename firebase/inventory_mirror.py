@@ -0,0 +1,148 @@
+# firebase/inventory_mirror.py
+
+"""Optional live in-memory mirror of the `medicines` collection.
+
+A single `on_snapshot` listener per process keeps every medicine document in
+a dict that all Streamlit sessions share, so lookups never leave memory. Turn
+it on with INVENTORY_MIRROR=1. While the listener is down (not yet synced or
+disconnected) lookups fall back to the read-through inventory cache and the
+listener is re-subscribed at most once per `resubscribe_interval` seconds.
+"""
+
+import os
+import threading
+import time
+from typing import Any, Awaitable, Callable, Dict, List, Optional
+
+from firebase.db_manager import db
+from firebase.inventory_cache import inventory_cache
+from scripts.event_loop import run_blocking
+
+INVENTORY_MIRROR_ENABLED = os.getenv("INVENTORY_MIRROR", "").lower() in ("1", "true", "yes")
+
+
+class InventoryMirror:
+    def __init__(self, collection: Callable[[], Any], enabled: bool = True, resubscribe_interval: float = 30.0):
+        # called on each subscribe, so importing this module builds no client and an override is picked up
+        self._collection = collection
+        self.enabled = enabled
+        self._resubscribe_interval = resubscribe_interval
+        self._documents: Dict[str, Dict[str, Any]] = {}
+        self._lock = threading.Lock()
+        self._start_lock = threading.Lock()
+        self._watch = None
+        self._synced = False
+        self._last_subscribe = float("-inf")
+        self._listeners: List[Callable[[str, str, Optional[Dict[str, Any]]], None]] = []
+        self.events = 0
+
+    @property
+    def connected(self) -> bool:
+        watch = self._watch
+        return self._synced and watch is not None and watch.is_active
+
+    def start(self) -> None:
+        """Subscribe the listener unless one is already active."""
+        with self._start_lock:
+            if self._watch is not None and self._watch.is_active:
+                return
+            self._synced = False
+            self._last_subscribe = time.monotonic()
+            self._watch = self._collection().on_snapshot(self._on_snapshot)
+
+    def ensure_started(self) -> None:
+        if self.connected or time.monotonic() - self._last_subscribe < self._resubscribe_interval:
+            return
+        try:
+            self.start()
+        except Exception:
+            # reads fall back to Firestore until the next attempt
+            self._watch = None
+
+    def stop(self) -> None:
+        with self._start_lock:
+            if self._watch is not None:
+                self._watch.unsubscribe()
+            self._watch = None
+            self._synced = False
+
+    def add_listener(self, callback: Callable[[str, str, Optional[Dict[str, Any]]], None]) -> None:
+        """Call `callback(change_type, medicine_id, data)` for every change the listener receives."""
+        self._listeners.append(callback)
+
+    def _on_snapshot(self, collection_snapshot, changes, read_time) -> None:
+        applied = []
+        with self._lock:
+            if not self._synced:
+                # the first callback carries the whole collection
+                self._documents = {}
+            for change in changes:
+                data = change.document.to_dict()
+                if change.type.name == "REMOVED":
+                    self._documents.pop(change.document.id, None)
+                else:
+                    self._documents[change.document.id] = data
+                applied.append((change.type.name, change.document.id, data))
+            self.events += len(changes)
+            self._synced = True
+        for callback in self._listeners:
+            for change_type, medicine_id, data in applied:
+                callback(change_type, medicine_id, data)
+
+    def get(self, medicine_id: str) -> Optional[Dict[str, Any]]:
+        with self._lock:
+            data = self._documents.get(medicine_id)
+        return dict(data) if data is not None else None
+
+    def names(self) -> List[str]:
+        with self._lock:
+            return list(self._documents)
+
+    def __len__(self) -> int:
+        with self._lock:
+            return len(self._documents)
+
+
+inventory_mirror = InventoryMirror(lambda: db.collection("medicines"), enabled=INVENTORY_MIRROR_ENABLED)
+
+
+def get_medicine(medicine_id: str, mirror: InventoryMirror = inventory_mirror) -> Optional[Dict[str, Any]]:
+    """Look a medicine up in the live mirror, or through the cache when the mirror is off or down."""
+    if mirror.enabled:
+        mirror.ensure_started()
+        if mirror.connected:
+            return mirror.get(medicine_id)
+    return inventory_cache.get(medicine_id)
+
+
+async def get_medicine_async(medicine_id: str, loader: Callable[[str], Awaitable[Optional[Dict[str, Any]]]],
+                             mirror: InventoryMirror = inventory_mirror) -> Optional[Dict[str, Any]]:
+    """`get_medicine` for coroutines; `loader` reads the document when the cache misses."""
+    if mirror.enabled:
+        if not mirror.connected:
+            # subscribing waits on the network; keep it off the event loop
+            await run_blocking(mirror.ensure_started)
+        if mirror.connected:
+            return mirror.get(medicine_id)
+    return await inventory_cache.get_async(medicine_id, loader)
+
+
+def get_medicines(medicine_ids: List[str], mirror: InventoryMirror = inventory_mirror
+                  ) -> Dict[str, Optional[Dict[str, Any]]]:
+    """`get_medicine` for several ids; what the cache misses is read in one batch."""
+    if mirror.enabled:
+        mirror.ensure_started()
+        if mirror.connected:
+            return {medicine_id: mirror.get(medicine_id) for medicine_id in medicine_ids}
+    return inventory_cache.get_many(medicine_ids)
+
+
+async def get_medicines_async(medicine_ids: List[str],
+                              loader: Callable[[List[str]], Awaitable[Dict[str, Optional[Dict[str, Any]]]]],
+                              mirror: InventoryMirror = inventory_mirror) -> Dict[str, Optional[Dict[str, Any]]]:
+    if mirror.enabled:
+        if not mirror.connected:
+            await run_blocking(mirror.ensure_started)
+        if mirror.connected:
+            return {medicine_id: mirror.get(medicine_id) for medicine_id in medicine_ids}
+    return await inventory_cache.get_many_async(medicine_ids, loader)
@@ -0,0 +1,272 @@
+# firebase/medicine_index.py
+
+"""In-memory fuzzy index over medicine names and aliases.
+
+Every medicine is indexed under its document id, its `name` field and any
+`aliases` listed on the document, normalized to lower-case words without
+dosage or form noise ("Amoxicillin 500mg tablets" -> "amoxicillin"). Exact
+names resolve with a dict lookup; misspellings are ranked by trigram Dice
+similarity through an inverted index, so "paracetmol" still resolves to
+`paracetamol` without touching Firestore.
+
+Most misspellings are one dropped, added, swapped or wrong letter, so every
+name is also indexed under its one-letter deletions and `resolve` first
+scores only the names within one edit of the query. Anything further off
+goes through the trigram index, where only names that can still reach the
+minimum score are scored: their trigram count must be close to the query's,
+and they must share enough of its rarest trigrams (with `t` trigrams needed
+to reach the score, any such name contains one of the `q - t + 1` rarest).
+
+The index is built from the inventory mirror when it is connected, otherwise
+from one query on the collection. The first lookup, and the first after
+`invalidate()`, builds it; after `ttl` seconds it is rebuilt on a background
+thread while lookups keep using the current one. Mirror events and admin
+writes keep it current in between.
+"""
+
+import math
+import re
+import threading
+import time
+from collections import Counter
+from typing import Any, Callable, Dict, Iterable, List, Optional, Set, Tuple
+
+from firebase.db_manager import db
+from firebase.inventory_mirror import inventory_mirror
+
+MEDICINE_INDEX_TTL = 300.0
+# Minimum similarity for a misspelled name to resolve without asking the user
+MEDICINE_MATCH_SCORE = 0.6
+# Minimum similarity for a name to be offered as a "did you mean" suggestion
+MEDICINE_SUGGEST_SCORE = 0.3
+
+_DOSAGE_PATTERN = re.compile(r"\b\d+(\.\d+)?\s*(mg|mcg|g|ml|iu|units?|%)?\b")
+_FORM_WORDS = {"tablet", "tablets", "tab", "tabs", "capsule", "capsules", "caps", "syrup", "injection", "pack", "packs"}
+# Words that appear around medicine names in prompts and must never match one
+_STOPWORDS = {
+    "price", "prices", "stock", "available", "availability", "order", "orders", "please", "cancel",
+    "track", "status", "about", "there", "which", "where", "medicine", "medicines", "today", "would",
+}
+
+
+def normalize_name(name: str) -> str:
+    text = re.sub(r"[_\-/,.?!']", " ", str(name).lower())
+    text = _DOSAGE_PATTERN.sub(" ", text)
+    return " ".join(word for word in text.split() if word not in _FORM_WORDS)
+
+
+def _trigrams(text: str) -> Set[str]:
+    padded = f"  {text} "
+    return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+
+def _deletions(text: str) -> Set[str]:
+    return {text[:i] + text[i + 1:] for i in range(len(text))}
+
+
+def _load_from_firestore() -> Iterable[Tuple[str, Dict[str, Any]]]:
+    if inventory_mirror.connected:
+        return [(medicine_id, inventory_mirror.get(medicine_id) or {}) for medicine_id in inventory_mirror.names()]
+    return [(snapshot.id, snapshot.to_dict() or {}) for snapshot in db.collection("medicines").stream()]
+
+
+class MedicineIndex:
+    def __init__(self, loader: Callable[[], Iterable[Tuple[str, Dict[str, Any]]]], ttl: float = MEDICINE_INDEX_TTL,
+                 min_score: float = MEDICINE_MATCH_SCORE):
+        self._loader = loader
+        self._ttl = ttl
+        self._min_score = min_score
+        self._lock = threading.RLock()
+        self._expires = 0.0
+        self._stale = True
+        self._refreshing = False
+        self._aliases: Dict[str, str] = {}
+        self._alias_grams: Dict[str, Set[str]] = {}
+        self._postings: Dict[str, Set[str]] = {}
+        # one-letter deletion of an alias -> aliases
+        self._deletes: Dict[str, Set[str]] = {}
+        self._by_medicine: Dict[str, Set[str]] = {}
+
+    # maintenance
+
+    def refresh(self) -> None:
+        documents = list(self._loader())
+        with self._lock:
+            self._aliases, self._alias_grams, self._postings, self._deletes, self._by_medicine = {}, {}, {}, {}, {}
+            for medicine_id, data in documents:
+                self._add(medicine_id, data)
+            self._expires = time.monotonic() + self._ttl
+            self._stale = False
+
+    def invalidate(self) -> None:
+        """Rebuild the index before the next lookup."""
+        with self._lock:
+            self._stale = True
+
+    def upsert(self, medicine_id: str, data: Optional[Dict[str, Any]] = None) -> None:
+        with self._lock:
+            self._remove(medicine_id)
+            self._add(medicine_id, data or {})
+
+    def remove(self, medicine_id: str) -> None:
+        with self._lock:
+            self._remove(medicine_id)
+
+    def on_mirror_change(self, change_type: str, medicine_id: str, data: Optional[Dict[str, Any]]) -> None:
+        if change_type == "REMOVED":
+            self.remove(medicine_id)
+        else:
+            self.upsert(medicine_id, data)
+
+    def _ensure_fresh(self) -> None:
+        with self._lock:
+            stale = self._stale
+            if not stale:
+                if self._refreshing or time.monotonic() < self._expires:
+                    return
+                self._refreshing = True
+        if stale:
+            self.refresh()
+            return
+        # an expired index keeps serving lookups; a user request never waits on the collection read
+        threading.Thread(target=self._refresh_in_background, name="medicine-index-refresh", daemon=True).start()
+
+    def _refresh_in_background(self) -> None:
+        try:
+            self.refresh()
+        except Exception:
+            # the current index stays in use and the next lookup tries again
+            pass
+        finally:
+            with self._lock:
+                self._refreshing = False
+
+    def _add(self, medicine_id: str, data: Dict[str, Any]) -> None:
+        names = [medicine_id, data.get("name") or "", *(data.get("aliases") or [])]
+        aliases = {normalize_name(name) for name in names} - {""}
+        self._by_medicine[medicine_id] = aliases
+        for alias in aliases:
+            self._aliases[alias] = medicine_id
+            grams = _trigrams(alias)
+            self._alias_grams[alias] = grams
+            for gram in grams:
+                self._postings.setdefault(gram, set()).add(alias)
+            for deletion in _deletions(alias):
+                self._deletes.setdefault(deletion, set()).add(alias)
+
+    def _remove(self, medicine_id: str) -> None:
+        for alias in self._by_medicine.pop(medicine_id, set()):
+            if self._aliases.get(alias) != medicine_id:
+                continue
+            del self._aliases[alias]
+            for gram in self._alias_grams.pop(alias, set()):
+                postings = self._postings.get(gram)
+                if postings is not None:
+                    postings.discard(alias)
+                    if not postings:
+                        del self._postings[gram]
+            for deletion in _deletions(alias):
+                aliases = self._deletes.get(deletion)
+                if aliases is not None:
+                    aliases.discard(alias)
+                    if not aliases:
+                        del self._deletes[deletion]
+
+    def _score(self, grams: Set[str], aliases: Iterable[str], min_score: float) -> Dict[str, float]:
+        """Best Dice score per medicine among `aliases` that score at least `min_score` against `grams`."""
+        # callers hold self._lock
+        best: Dict[str, float] = {}
+        for alias in aliases:
+            alias_grams = self._alias_grams[alias]
+            score = 2 * len(grams & alias_grams) / (len(grams) + len(alias_grams))
+            medicine_id = self._aliases[alias]
+            if score >= min_score and score > best.get(medicine_id, 0.0):
+                best[medicine_id] = score
+        return best
+
+    def _near(self, query: str, min_score: float) -> Dict[str, float]:
+        """Score the aliases one dropped, added, swapped or substituted letter away from `query`."""
+        # callers hold self._lock
+        candidates = set(self._deletes.get(query, ()))
+        for deletion in _deletions(query):
+            if deletion in self._aliases:
+                candidates.add(deletion)
+            candidates.update(self._deletes.get(deletion, ()))
+        return self._score(_trigrams(query), candidates, min_score)
+
+    def _rank(self, query: str, min_score: float) -> Dict[str, float]:
+        """Best Dice score per medicine whose alias scores at least `min_score` against `query`."""
+        # callers hold self._lock
+        grams = _trigrams(query)
+        size = len(grams)
+        # 2c / (q + a) >= s with c <= min(q, a) bounds the alias trigram count a
+        shortest = math.ceil(min_score * size / (2 - min_score))
+        longest = math.floor((2 - min_score) * size / min_score)
+        needed = max(1, math.ceil(min_score * (size + shortest) / 2))
+        probed = sorted(grams, key=lambda gram: len(self._postings.get(gram, ())))[:size - needed + 1]
+        shared = Counter()
+        for gram in probed:
+            shared.update(self._postings.get(gram, ()))
+        return self._score(grams, (alias for alias in shared
+                                   if shortest <= len(self._alias_grams[alias]) <= longest), min_score)
+
+    # lookups
+
+    def exact(self, name: str) -> Optional[str]:
+        """Return the medicine id whose id, name or alias is exactly `name` once normalized, or None."""
+        self._ensure_fresh()
+        with self._lock:
+            return self._aliases.get(normalize_name(name))
+
+    def suggest(self, name: str, limit: int = 3, min_score: float = MEDICINE_SUGGEST_SCORE) -> List[Tuple[str, float]]:
+        """Rank medicines scoring at least `min_score` against `name`, best first, as (medicine id, score) pairs."""
+        self._ensure_fresh()
+        query = normalize_name(name)
+        if not query:
+            return []
+        with self._lock:
+            if query in self._aliases:
+                return [(self._aliases[query], 1.0)]
+            best = self._rank(query, min_score)
+        return sorted(best.items(), key=lambda item: (-item[1], item[0]))[:limit]
+
+    def resolve(self, name: str) -> Optional[str]:
+        """Return the canonical medicine id for `name`, or None if nothing is close enough."""
+        self._ensure_fresh()
+        query = normalize_name(name)
+        if not query:
+            return None
+        with self._lock:
+            if query in self._aliases:
+                return self._aliases[query]
+            best = self._near(query, self._min_score) or self._rank(query, self._min_score)
+        return min(best.items(), key=lambda item: (-item[1], item[0]))[0] if best else None
+
+    def find(self, text: str) -> List[str]:
+        """Return the distinct medicine ids mentioned in free text, in order of appearance."""
+        self._ensure_fresh()
+        words = normalize_name(text).split()
+        found: List[str] = []
+        position = 0
+        while position < len(words):
+            for size in (3, 2, 1):
+                phrase = " ".join(words[position:position + size])
+                with self._lock:
+                    medicine_id = self._aliases.get(phrase)
+                if medicine_id is None and size == 1 and len(phrase) >= 5 and phrase not in _STOPWORDS:
+                    medicine_id = self.resolve(phrase)
+                if medicine_id is not None:
+                    found.append(medicine_id)
+                    position += size
+                    break
+            else:
+                position += 1
+        return list(dict.fromkeys(found))
+
+    def __len__(self) -> int:
+        with self._lock:
+            return len(self._by_medicine)
+
+
+medicine_index = MedicineIndex(_load_from_firestore)
+inventory_mirror.add_listener(medicine_index.on_mirror_change)
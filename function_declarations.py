@@ -23,6 +23,20 @@ telegram_post_function = {
     },
 }
 
+telegram_delivery_status_function = {
+    "name": "telegram_delivery_status",
+    "description": "Shows whether queued telegram announcements were delivered, per channel/group, with any delivery error. Without an id it shows the most recent announcements.",
+    "parameters": {
+        "type": "object",
+        "properties": {
+            "announcement_id": {
+                "type": "string",
+                "description": "The announcement id returned by telegram_post (optional)"
+            }
+        }
+    }
+}
+
 add_medicine_function = {
     "name": "add_medicine",
     "description": "Adds a new medicine to the pharmacy",
@@ -119,13 +133,49 @@ update_order_status_function = {
             },
             "status": {
                 "type": "string",
-                "description": "The new status of the order (e.g., 'pending', 'processing', 'completed', 'deliverd', 'shipped', 'cancelled').",
+                "enum": ["pending", "processing", "shipped", "delivered", "cancelled"],
+                "description": "The new status of the order.",
             },
         },
         "required": ["order_id", "status"]
     }
 }
 
+bulk_import_medicines_function = {
+    "name": "bulk_import_medicines",
+    "description": "Imports many medicines at once from a CSV or JSONL file in the server's data directory, e.g. a supplier invoice. Mode 'upsert' adds or updates medicines (columns: name, unit_price, stock, and optional madein, category, description). Mode 'restock' adds the quantity column to the stock of existing medicines (columns: name, quantity).",
+    "parameters": {
+        "type": "object",
+        "properties": {
+            "file_path": {
+                "type": "string",
+                "description": "Path of the .csv or .jsonl file to import, relative to the data directory"
+            },
+            "mode": {
+                "type": "string",
+                "enum": ["upsert", "restock"],
+                "description": "upsert to add or update medicines, restock to increase stock of existing medicines"
+            }
+        },
+        "required": ["file_path"]
+    }
+}
+
+export_medicines_function = {
+    "name": "export_medicines",
+    "description": "Exports every medicine in the pharmacy to a CSV or JSONL file in the server's data directory",
+    "parameters": {
+        "type": "object",
+        "properties": {
+            "file_path": {
+                "type": "string",
+                "description": "Path of the .csv or .jsonl file to write, relative to the data directory"
+            }
+        },
+        "required": ["file_path"]
+    }
+}
+
 check_availability_function = {
     "name": "check_medicine_availability",
     "description": "Check if a medicine is available in the pharmacy",
@@ -142,6 +192,22 @@ check_availability_function = {
     }
 }
 
+check_medicines_availability_function = {
+    "name": "check_medicines_availability",
+    "description": "Check the availability of several medicines at once, eg a shopping list. Use it instead of several check_medicine_availability calls when the user asks about more than one medicine",
+    "parameters": {
+        "type": "object",
+        "properties": {
+            "medicine_names": {
+                "type": "array",
+                "items": {"type": "string"},
+                "description": "Names of the medicines, at most 50, eg [\"Paracetamol\", \"Insulin\"]"
+            }
+        },
+        "required": ["medicine_names"]
+    }
+}
+
 place_order_function = {
     "name": "place_order",
     "description": "Places an order for a specified quantity of a medicine for the currently logged-in user",
@@ -161,6 +227,35 @@ place_order_function = {
     }
 }
 
+place_cart_order_function = {
+    "name": "place_cart_order",
+    "description": "Places one order for several medicines at once, eg all the items of a prescription, for the currently logged-in user. Either every item is ordered or, if any is unavailable, none is. Use it instead of several place_order calls",
+    "parameters": {
+        "type": "object",
+        "properties": {
+            "items": {
+                "type": "array",
+                "description": "The line items of the order, at most 20",
+                "items": {
+                    "type": "object",
+                    "properties": {
+                        "medicine_name": {
+                            "type": "string",
+                            "description": "Name of the medicine eg Paracetamol, Ibuprofen, Aspirin"
+                        },
+                        "quantity": {
+                            "type": "number",
+                            "description": "Quantity of the medicine to be ordered"
+                        }
+                    },
+                    "required": ["medicine_name", "quantity"]
+                }
+            }
+        },
+        "required": ["items"]
+    }
+}
+
 track_order_function = {
     "name": "track_order",
     "description": "Check the status of an order",
@@ -178,7 +273,7 @@ track_order_function = {
 
 cancel_order_function = {
     "name": "cancel_order",
-    "description": "Cancel an order",
+    "description": "Cancel an order; every item of a multi-item order is cancelled and put back in stock",
     "parameters": {
         "type": "object", 
         "properties": { 
@@ -191,6 +286,24 @@ cancel_order_function = {
     }
 }
 
+list_my_orders_function = {
+    "name": "list_my_orders",
+    "description": "Lists the orders of the currently logged-in user, newest first, with their ids, medicine, quantity, total price and status. Use it when the user asks about their orders without giving an order id.",
+    "parameters": {
+        "type": "object",
+        "properties": {
+            "limit": {
+                "type": "number",
+                "description": "How many orders to list, at most 50 (default 10)"
+            },
+            "cursor": {
+                "type": "string",
+                "description": "The next_cursor of a previous list_my_orders result, to get the next page"
+            }
+        }
+    }
+}
+
 get_health_advice_function = {
     "name": "get_health_advice",
     "description": "Get health advice for a specific medicine without any parameters since we can get a user from his details"
@@ -0,0 +1,96 @@
+# scripts/admin_functions.py
+
+from datetime import datetime
+from google.api_core.exceptions import AlreadyExists, NotFound
+from firebase_admin import firestore
+
+from firebase.dashboard_metrics import ORDER_STATUSES, dashboard_metrics
+from firebase.db_manager import db
+from firebase.inventory_cache import inventory_cache
+from firebase.medicine_index import medicine_index
+
+# Every write here is a single RPC whose precondition decides the outcome:
+# `create` fails with AlreadyExists if the medicine is there, and `update` or
+# `delete` with exists=True fail with NotFound if it isn't. Stock increments
+# are applied by the server, so concurrent orders, cancellations and restocks
+# never lose units.
+
+def add_medicine(name: str, unit_price: float = 15, stock: int = 100, madein: str = "USA", category: str = "General", description: str = "For quality health") -> dict:
+    try:
+        name = name.lower().replace(' ', '_')
+        data = {
+            "name": name,
+            "unit_price": unit_price,
+            "stock": stock,
+            "madein": madein,
+            "category": category,
+            "description": description,
+            "created_at": datetime.now(),
+        }
+        db.collection("medicines").document(name).create(data)
+        inventory_cache.invalidate(name)
+        dashboard_metrics.invalidate()
+        medicine_index.upsert(name, data)
+        return {"success": True, "message": f"The {name} medicine recorded successfully with the following details: Name: {name}, Unit Price: {unit_price}, Stock: {stock}, Madein: {madein}, Category: {category}, Description: {description}"}
+    except AlreadyExists:
+        return {"success": False, "error": f"The {name} medicine already exists. instead you can update its stock."}
+    except Exception as e:
+        return {"success": False, "error": str(e)}
+
+def stock_out(name: str) -> dict:
+    try:
+        name = name.lower().replace(' ', '_')
+        db.collection("medicines").document(name).update({"stock": 0, "updated_at": datetime.now()})
+        inventory_cache.invalidate(name)
+        dashboard_metrics.invalidate()
+        return {"success": True, 'message': f"{name} medicine is now out of stock"}
+    except NotFound:
+        return {"success": False, "error": "Medicine not found"}
+    except Exception as e:
+        return {"success": False, "error": str(e)}
+
+def add_stock(name: str, quantity: int) -> dict:
+    try:
+        name = name.lower().replace(' ', '_')
+        if quantity != int(quantity) or quantity <= 0:
+            return {"success": False, "error": f"Quantity must be a positive whole number, got {quantity}"}
+        db.collection("medicines").document(name).update({
+            "stock": firestore.Increment(int(quantity)),
+            "updated_at": datetime.now()
+        })
+        inventory_cache.invalidate(name)
+        dashboard_metrics.invalidate()
+        return {"success": True, 'message': f"{name} medicine stock has been updated, increased by {int(quantity)}"}
+    except NotFound:
+        return {"success": False, "error": f"{name} Medicine is not found, please add the medicine first."}
+    except Exception as e:
+        return {"success": False, "error": str(e)}
+
+def delete_medicine(name: str) -> dict:
+    try:
+        name = name.lower().replace(' ', '_')
+        db.collection("medicines").document(name).delete(option=db.write_option(exists=True))
+        inventory_cache.invalidate(name)
+        dashboard_metrics.invalidate()
+        medicine_index.remove(name)
+        return {"success": True, 'message': f"{name} medicine has been deleted"}
+    except NotFound:
+        return {"success": False, "error": "Medicine not found"}
+    except Exception as e:
+        return {"success": False, "error": str(e)}
+
+def update_order_status(order_id: str, status: str) -> dict[str, str]:
+    status = status.strip().lower()
+    if status not in ORDER_STATUSES:
+        return {"success": False, "error": f"Unknown order status '{status}' (use one of: {', '.join(ORDER_STATUSES)})"}
+    try:
+        db.collection("orders").document(order_id).update({
+            "status": status,
+            "updated_at": datetime.now()
+        })
+        dashboard_metrics.invalidate()
+        return {"success": True, "message": f"Order {order_id} status updated to {status}."}
+    except NotFound:
+        return {"success": False, "error": f"Order {order_id} not found"}
+    except Exception as e:
+        return {"success": False, "error": str(e)}
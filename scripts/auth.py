@@ -0,0 +1,231 @@
+# scripts/auth.py
+
+"""Password hashing, login throttling and signed session tokens for both apps.
+
+Passwords are hashed with scrypt, a salted memory-hard KDF from the standard
+library, and stored as `scrypt$n$r$p$salt$hash`. Accounts still holding the
+old unsalted SHA-256 hex digest are rehashed on their next successful login.
+
+Every attempt first takes a token from a per-email and a per-IP bucket held
+in memory, so guessing is rejected before it costs a Firestore read. A
+successful login returns a session token signed with AUTH_SECRET that
+carries the profile the app shows; the apps verify it on every rerun instead
+of reading the user document again. AUTH_SECRET is required with
+AXON_ENV=production; elsewhere a missing one is logged loudly and replaced
+with a per-process key.
+"""
+
+import base64
+import hashlib
+import hmac
+import json
+import logging
+import os
+import secrets
+import threading
+import time
+from collections import OrderedDict
+from functools import lru_cache
+from typing import Any, Callable, Dict, Optional, Tuple
+
+from firebase.db_manager import db
+from scripts.metrics import logins
+
+# scrypt cost: 2**14 x 8 uses 16 MiB and about 50 ms per hash
+SCRYPT_N = int(os.getenv("SCRYPT_N", str(2 ** 14)))
+SCRYPT_R = int(os.getenv("SCRYPT_R", "8"))
+SCRYPT_P = int(os.getenv("SCRYPT_P", "1"))
+# Failed or not, each attempt takes a token; one comes back every LOGIN_REFILL_SECONDS
+LOGIN_BURST = int(os.getenv("LOGIN_BURST", "5"))
+LOGIN_IP_BURST = int(os.getenv("LOGIN_IP_BURST", "20"))
+LOGIN_REFILL_SECONDS = float(os.getenv("LOGIN_REFILL_SECONDS", "30"))
+LOGIN_MAX_TRACKED = int(os.getenv("LOGIN_MAX_TRACKED", "10000"))
+AXON_ENV = os.getenv("AXON_ENV", "development").lower()
+SESSION_TTL_SECONDS = float(os.getenv("SESSION_TTL_SECONDS", str(12 * 3600)))
+# What a session token carries about the account
+PROFILE_FIELDS = ("email", "name", "age")
+
+logger = logging.getLogger(__name__)
+
+
+def auth_secret(secret: Optional[str], environment: str = AXON_ENV) -> str:
+    """The key session tokens are signed with; production refuses to start without one."""
+    if secret:
+        return secret
+    if environment == "production":
+        raise RuntimeError("AUTH_SECRET must be set when AXON_ENV=production: "
+                           "it signs login sessions, which must survive restarts and work on every replica")
+    logger.warning("AUTH_SECRET is not set: login sessions are signed with a per-process key, so they end when "
+                   "the process restarts and are rejected by other replicas. Set AUTH_SECRET for any deployment.")
+    return secrets.token_hex(32)
+
+
+AUTH_SECRET = auth_secret(os.getenv("AUTH_SECRET"))
+
+
+def _b64encode(data: bytes) -> str:
+    return base64.urlsafe_b64encode(data).decode().rstrip("=")
+
+
+def _b64decode(text: str) -> bytes:
+    return base64.urlsafe_b64decode(text + "=" * (-len(text) % 4))
+
+
+def hash_password(password: str, n: int = SCRYPT_N, r: int = SCRYPT_R, p: int = SCRYPT_P) -> str:
+    salt = secrets.token_bytes(16)
+    digest = hashlib.scrypt(password.encode(), salt=salt, n=n, r=r, p=p, maxmem=256 * n * r + 2 ** 20, dklen=32)
+    return f"scrypt${n}${r}${p}${_b64encode(salt)}${_b64encode(digest)}"
+
+
+@lru_cache(maxsize=1)
+def _unknown_account_hash() -> str:
+    return hash_password(secrets.token_hex(16))
+
+
+def verify_password(password: str, stored: Optional[str]) -> Tuple[bool, bool]:
+    """Return `(valid, needs_rehash)`; legacy SHA-256 and weaker scrypt hashes need a rehash."""
+    if not stored:
+        return False, False
+    if stored.startswith("scrypt$"):
+        try:
+            _, n, r, p, salt, digest = stored.split("$")
+            n, r, p = int(n), int(r), int(p)
+            computed = hashlib.scrypt(password.encode(), salt=_b64decode(salt), n=n, r=r, p=p,
+                                      maxmem=256 * n * r + 2 ** 20, dklen=32)
+        except ValueError:
+            return False, False
+        valid = hmac.compare_digest(computed, _b64decode(digest))
+        return valid, valid and (n, r, p) != (SCRYPT_N, SCRYPT_R, SCRYPT_P)
+    valid = hmac.compare_digest(hashlib.sha256(password.encode()).hexdigest(), stored)
+    return valid, valid
+
+
+class LoginThrottle:
+    """Token buckets per key; an attempt needs a token from every bucket it is checked against."""
+
+    def __init__(self, refill_seconds: float = LOGIN_REFILL_SECONDS, max_tracked: int = LOGIN_MAX_TRACKED,
+                 clock: Callable[[], float] = time.monotonic):
+        self._refill_seconds = refill_seconds
+        self._max_tracked = max_tracked
+        self._clock = clock
+        # key -> (tokens, last refill); least recently used first
+        self._buckets: "OrderedDict[str, Tuple[float, float]]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def _tokens(self, key: str, burst: int, now: float) -> float:
+        tokens, updated = self._buckets.get(key, (burst, now))
+        return min(burst, tokens + (now - updated) / self._refill_seconds)
+
+    def acquire(self, buckets: Dict[str, int]) -> float:
+        """Take a token from each `{key: burst}` bucket; returns 0, or the seconds to wait when one is empty."""
+        with self._lock:
+            now = self._clock()
+            available = {key: self._tokens(key, burst, now) for key, burst in buckets.items()}
+            short = max(1 - tokens for tokens in available.values())
+            if short > 0:
+                return short * self._refill_seconds
+            for key, tokens in available.items():
+                self._buckets[key] = (tokens - 1, now)
+                self._buckets.move_to_end(key)
+            while len(self._buckets) > self._max_tracked:
+                self._buckets.popitem(last=False)
+            return 0.0
+
+    def reset(self, key: str) -> None:
+        with self._lock:
+            self._buckets.pop(key, None)
+
+
+class SessionTokens:
+    """HMAC-signed `payload.signature` tokens with an expiry and a role."""
+
+    def __init__(self, secret: str = AUTH_SECRET, ttl: float = SESSION_TTL_SECONDS,
+                 clock: Callable[[], float] = time.time):
+        self._key = secret.encode()
+        self._ttl = ttl
+        self._clock = clock
+
+    def _sign(self, payload: str) -> str:
+        return _b64encode(hmac.new(self._key, payload.encode(), hashlib.sha256).digest())
+
+    def issue(self, subject: str, role: str, profile: Optional[Dict[str, Any]] = None) -> str:
+        claims = {"sub": subject, "role": role, "exp": self._clock() + self._ttl, "profile": profile or {}}
+        payload = _b64encode(json.dumps(claims, separators=(",", ":"), default=str).encode())
+        return f"{payload}.{self._sign(payload)}"
+
+    def verify(self, token: Optional[str], role: str) -> Optional[Dict[str, Any]]:
+        """The token's claims, or None when it is missing, forged, expired or for another role."""
+        if not token or "." not in token:
+            return None
+        payload, signature = token.rsplit(".", 1)
+        if not hmac.compare_digest(self._sign(payload), signature):
+            return None
+        try:
+            claims = json.loads(_b64decode(payload))
+        except ValueError:
+            return None
+        if claims.get("role") != role or claims.get("exp", 0) < self._clock():
+            return None
+        return claims
+
+
+def authenticate(collection: str, email: str, password: str, client_ip: Optional[str] = None,
+                 app: str = "user", client: Any = db, throttle: Optional[LoginThrottle] = None,
+                 tokens: Optional[SessionTokens] = None) -> Dict[str, Any]:
+    """Check `password` for the `collection/email` account; one document read, none when throttled.
+
+    On success the result has the account's `user_data` (the PROFILE_FIELDS
+    only) and a session `token` for the `collection` role.
+    """
+    throttle = throttle or login_throttle
+    tokens = tokens or session_tokens
+    buckets = {f"email:{email}": LOGIN_BURST}
+    if client_ip:
+        buckets[f"ip:{client_ip}"] = LOGIN_IP_BURST
+    wait = throttle.acquire(buckets)
+    if wait:
+        logins.inc(app=app, outcome="throttled")
+        return {
+            "success": False,
+            "message": f"Too many login attempts. Please try again in {int(wait) + 1} seconds"
+        }
+
+    try:
+        user_ref = client.collection(collection).document(email)
+        user_snapshot = user_ref.get()
+        user_data = user_snapshot.to_dict() if user_snapshot.exists else None
+        # unknown accounts cost a hash too, so timing doesn't tell which emails exist
+        valid, needs_rehash = verify_password(password, (user_data or {}).get("password") or _unknown_account_hash())
+        if not valid or user_data is None:
+            logins.inc(app=app, outcome="invalid")
+            return {
+                "success": False,
+                "message": "Invalid email or password"
+            }
+
+        if needs_rehash:
+            try:
+                user_ref.update({"password": hash_password(password)})
+            except Exception:
+                # the old hash keeps working; the next login tries again
+                pass
+        throttle.reset(f"email:{email}")
+        profile = {field: user_data.get(field) for field in PROFILE_FIELDS if field in user_data}
+        profile.setdefault("email", email)
+        logins.inc(app=app, outcome="ok")
+        return {
+            "success": True,
+            "user_data": profile,
+            "token": tokens.issue(email, collection, profile),
+            "message": "Authentication successful"
+        }
+    except Exception as e:
+        logins.inc(app=app, outcome="error")
+        return {
+            "success": False,
+            "message": f"Authentication error: {str(e)}"
+        }
+
+
+login_throttle = LoginThrottle()
+session_tokens = SessionTokens()
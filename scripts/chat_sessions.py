@@ -0,0 +1,150 @@
+# scripts/chat_sessions.py
+
+"""Long-lived Gemini chats, one per Streamlit session.
+
+The tool configs are built once when this module is imported instead of on
+every prompt, and each session keeps its chat between reruns so the model
+sees earlier turns. History is trimmed to a token budget after every turn,
+and chats idle longer than `idle_ttl` (or beyond `max_sessions`, least
+recently used first) are dropped so memory stays bounded.
+"""
+
+import os
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Callable, List
+
+from google.genai import types
+
+from function_declarations import (
+    add_medicine_function,
+    add_stock_function,
+    bulk_import_medicines_function,
+    cancel_order_function,
+    check_availability_function,
+    check_medicines_availability_function,
+    delete_medicine_function,
+    export_medicines_function,
+    get_health_advice_function,
+    list_my_orders_function,
+    place_cart_order_function,
+    place_order_function,
+    stock_out_function,
+    telegram_delivery_status_function,
+    telegram_post_function,
+    track_order_function,
+    update_order_status_function,
+)
+
+CHAT_MODEL = "gemini-2.5-flash"
+CHAT_HISTORY_TOKENS = int(os.getenv("CHAT_HISTORY_TOKENS", "6000"))
+CHAT_SESSION_IDLE_SECONDS = float(os.getenv("CHAT_SESSION_IDLE_SECONDS", "1800"))
+CHAT_MAX_SESSIONS = int(os.getenv("CHAT_MAX_SESSIONS", "1000"))
+
+
+def build_tool_config(function_declarations: List[dict]) -> types.GenerateContentConfig:
+    return types.GenerateContentConfig(
+        tools=[types.Tool(function_declarations=function_declarations)],
+        tool_config=types.ToolConfig(
+            function_calling_config=types.FunctionCallingConfig(mode="AUTO")
+        )
+    )
+
+
+USER_TOOL_CONFIG = build_tool_config([
+    check_availability_function, check_medicines_availability_function, place_order_function,
+    place_cart_order_function, track_order_function, cancel_order_function, list_my_orders_function,
+    get_health_advice_function
+])
+
+ADMIN_TOOL_CONFIG = build_tool_config([
+    telegram_post_function, telegram_delivery_status_function, add_medicine_function, stock_out_function,
+    add_stock_function, delete_medicine_function, update_order_status_function,
+    bulk_import_medicines_function, export_medicines_function
+])
+
+
+def estimate_tokens(contents: List[types.Content]) -> int:
+    """Rough token count (about four bytes per token) that needs no API call."""
+    return sum(len(content.model_dump_json(exclude_none=True)) for content in contents) // 4
+
+
+def trim_history(history: List[types.Content], max_tokens: int) -> List[types.Content]:
+    """Drop the oldest turns until the history fits, always restarting on a user's text turn.
+
+    Starting on a text turn keeps function calls and their responses together.
+    """
+    sizes = [estimate_tokens([content]) for content in history]
+    total = sum(sizes)
+    start = 0
+    while start < len(history) and total > max_tokens:
+        total -= sizes[start]
+        start += 1
+        while start < len(history) and not (
+            history[start].role == "user" and any(part.text for part in history[start].parts or [])
+        ):
+            total -= sizes[start]
+            start += 1
+    return history[start:]
+
+
+class ChatSessionManager:
+    def __init__(self, config: types.GenerateContentConfig, model: str = CHAT_MODEL,
+                 max_history_tokens: int = CHAT_HISTORY_TOKENS, idle_ttl: float = CHAT_SESSION_IDLE_SECONDS,
+                 max_sessions: int = CHAT_MAX_SESSIONS, clock: Callable[[], float] = time.monotonic):
+        self.config = config
+        self.model = model
+        self._max_history_tokens = max_history_tokens
+        self._idle_ttl = idle_ttl
+        self._max_sessions = max_sessions
+        self._clock = clock
+        self._sessions: "OrderedDict[str, list]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def chat(self, session_id: str, client: Any):
+        """Return the session's chat, creating it on first use."""
+        now = self._clock()
+        with self._lock:
+            self._evict_idle(now)
+            entry = self._sessions.get(session_id)
+            if entry is None:
+                while len(self._sessions) >= self._max_sessions:
+                    self._sessions.popitem(last=False)
+                entry = [client.chats.create(model=self.model, config=self.config), now]
+                self._sessions[session_id] = entry
+            entry[1] = now
+            self._sessions.move_to_end(session_id)
+            return entry[0]
+
+    def trim(self, session_id: str, client: Any) -> None:
+        """Rebuild the session's chat from a trimmed history once it exceeds the token budget."""
+        with self._lock:
+            entry = self._sessions.get(session_id)
+        if entry is None:
+            return
+        history = entry[0].get_history(curated=True)
+        if estimate_tokens(history) <= self._max_history_tokens:
+            return
+        trimmed = trim_history(history, self._max_history_tokens)
+        entry[0] = client.chats.create(model=self.model, config=self.config, history=trimmed)
+
+    def end(self, session_id: str) -> None:
+        with self._lock:
+            self._sessions.pop(session_id, None)
+
+    def _evict_idle(self, now: float) -> None:
+        # entries are kept in last-used order, so idle ones sit at the front
+        while self._sessions:
+            oldest_id, (_, last_used) = next(iter(self._sessions.items()))
+            if now - last_used < self._idle_ttl:
+                break
+            del self._sessions[oldest_id]
+
+    def __len__(self) -> int:
+        with self._lock:
+            return len(self._sessions)
+
+
+user_chat_sessions = ChatSessionManager(USER_TOOL_CONFIG)
+admin_chat_sessions = ChatSessionManager(ADMIN_TOOL_CONFIG)
@@ -0,0 +1,199 @@
+# scripts/chat_turn.py
+
+"""One assistant turn that goes through the model, shared by both apps and the load tests.
+
+The prompt is sent on the session's chat, the function calls the model asks
+for are dispatched concurrently, and their results go back on the same chat
+for the final answer. `on_calls` and `on_results` let the apps show progress
+between the steps. Passing `dispatch=dispatch_async_tool_calls` with
+`execute_user_tool_async` runs the calls as coroutines on the shared event
+loop instead of the thread pool. With a response cache, repeated read-only
+questions are answered from it when their tool results have not changed.
+"""
+
+import os
+import time
+from typing import Any, Callable, Dict, Iterable, List, Optional, Tuple
+
+from google.genai import types
+
+from scripts.metrics import llm_call
+from scripts.response_cache import ResponseCache
+from scripts.response_stream import final_answer
+from scripts.tool_dispatcher import dispatch_async_tool_calls, dispatch_tool_calls, tool_response_parts
+from scripts.tracing import tracer
+from scripts.user_functions import (
+    cancel_order,
+    check_medicine_availability,
+    check_medicines_availability,
+    get_health_advice,
+    list_my_orders,
+    place_cart_order,
+    place_order,
+    track_order,
+)
+from scripts.user_functions_async import (
+    cancel_order_async,
+    check_medicine_availability_async,
+    check_medicines_availability_async,
+    get_health_advice_async,
+    list_my_orders_async,
+    place_cart_order_async,
+    place_order_async,
+    track_order_async,
+)
+
+# Run the user app's tool calls as coroutines on the Firestore AsyncClient
+ASYNC_TOOLS = os.getenv("ASYNC_TOOLS", "0").lower() in ("1", "true", "yes")
+
+GUEST_BLOCKED_TOOLS = [
+    "place_order", "place_cart_order", "track_order", "cancel_order", "list_my_orders", "get_health_advice"
+]
+GUEST_BLOCKED_RESULT = {
+    "success": False,
+    "message": "Guest mode: this action is not allowed. Please register or login to place, track, or cancel orders, or to get personalized advice."
+}
+
+
+def execute_user_tool(name: str, args: Dict[str, Any], user_email: str, is_guest: bool) -> Dict[str, Any]:
+    if name == "check_medicine_availability":
+        return check_medicine_availability(**args)
+    if name == "check_medicines_availability":
+        return check_medicines_availability(**args)
+    if is_guest and name in GUEST_BLOCKED_TOOLS:
+        return dict(GUEST_BLOCKED_RESULT)
+    if name == "place_order":
+        return place_order(**args, user_email=user_email)
+    if name == "place_cart_order":
+        return place_cart_order(**args, user_email=user_email)
+    if name == "track_order":
+        return track_order(**args, user_email=user_email)
+    if name == "cancel_order":
+        return cancel_order(**args, user_email=user_email)
+    if name == "list_my_orders":
+        return list_my_orders(**args, user_email=user_email)
+    if name == "get_health_advice":
+        return get_health_advice(**args, user_email=user_email)
+    return {
+        "success": False,
+        "message": f"Unknown function: {name}"
+    }
+
+
+async def execute_user_tool_async(name: str, args: Dict[str, Any], user_email: str, is_guest: bool) -> Dict[str, Any]:
+    """`execute_user_tool` with the coroutine tool functions; the same guest rules and results."""
+    if name == "check_medicine_availability":
+        return await check_medicine_availability_async(**args)
+    if name == "check_medicines_availability":
+        return await check_medicines_availability_async(**args)
+    if is_guest and name in GUEST_BLOCKED_TOOLS:
+        return dict(GUEST_BLOCKED_RESULT)
+    if name == "place_order":
+        return await place_order_async(**args, user_email=user_email)
+    if name == "place_cart_order":
+        return await place_cart_order_async(**args, user_email=user_email)
+    if name == "track_order":
+        return await track_order_async(**args, user_email=user_email)
+    if name == "cancel_order":
+        return await cancel_order_async(**args, user_email=user_email)
+    if name == "list_my_orders":
+        return await list_my_orders_async(**args, user_email=user_email)
+    if name == "get_health_advice":
+        return await get_health_advice_async(**args, user_email=user_email)
+    return {
+        "success": False,
+        "message": f"Unknown function: {name}"
+    }
+
+
+def user_tool_runner(user_email: str, is_guest: bool, use_async: Optional[bool] = None) -> Dict[str, Any]:
+    """The `execute` and `dispatch` arguments of `run_model_turn` for a user session."""
+    if ASYNC_TOOLS if use_async is None else use_async:
+        return {
+            "execute": lambda name, args: execute_user_tool_async(name, args, user_email, is_guest),
+            "dispatch": dispatch_async_tool_calls,
+        }
+    return {
+        "execute": lambda name, args: execute_user_tool(name, args, user_email, is_guest),
+        "dispatch": dispatch_tool_calls,
+    }
+
+
+def _last_model_text(chat: Any) -> str:
+    """What the model said last in the chat; a cached answer must reply to the same thing."""
+    for content in reversed(chat.get_history(curated=True)):
+        if content.role == "model":
+            return "".join(part.text or "" for part in content.parts or [])
+    return ""
+
+
+def _cached_turn(chat: Any, prompt: str, text: str, calls: List[Tuple[str, Dict[str, Any]]], results: List[Any],
+                 write_stream: Callable[[Iterable[str]], Any], on_calls: Optional[Callable],
+                 on_results: Optional[Callable]) -> Dict[str, Any]:
+    """Finish a turn with a remembered answer to the remembered calls, whose results were just read again."""
+    fn_calls = [types.FunctionCall(name=name, args=args) for name, args in calls]
+    if on_calls:
+        on_calls(fn_calls)
+    if on_results:
+        on_results(fn_calls, results)
+    # the session history stays the same as if the model had answered
+    chat.record_history(types.Content(role="user", parts=[types.Part(text=prompt)]),
+                        [types.Content(role="model", parts=[types.Part(text=text)])], [], True)
+    write_stream([text])
+    return {"text": text, "function_calls": fn_calls, "results": results, "cached": True}
+
+
+def run_model_turn(chat: Any, prompt: str, execute: Callable[[str, Dict[str, Any]], Any], label: str,
+                   write_stream: Callable[[Iterable[str]], Any], model: str,
+                   on_calls: Optional[Callable[[List[Any]], None]] = None,
+                   on_results: Optional[Callable[[List[Any], List[Any]], None]] = None,
+                   dispatch: Callable[[List[Tuple[str, Dict[str, Any]]], Callable], List[Any]] = dispatch_tool_calls,
+                   cache: Optional[ResponseCache] = None, cache_scope: str = "") -> Dict[str, Any]:
+    """Answer `prompt` with the model and its tools; returns the text, the calls made and their results.
+
+    Without function calls the model's text is returned as is and nothing is
+    written with `write_stream`. With a `cache`, a repeated read-only question
+    whose tool results are unchanged is answered from it without a model call
+    (the result then has `cached` set); `cache_scope` is the user it belongs to.
+    """
+    plan_key = None
+    # the remembered calls and their fresh results, when the plan hit but the answer did not
+    replayed = None
+    if cache is not None:
+        plan_key = cache.plan_key(model, cache_scope, prompt, _last_model_text(chat))
+        with tracer.span("response_cache.lookup", "cache") as span:
+            text = None
+            planned = cache.plan(plan_key)
+            if planned is not None:
+                replayed = (planned, dispatch(planned, execute))
+                text = cache.answer(plan_key, replayed[1])
+            span.set(hit=text is not None)
+        if text is not None:
+            return _cached_turn(chat, prompt, text, *replayed, write_stream, on_calls, on_results)
+
+    model_started = time.perf_counter()
+    with tracer.span("gemini.send_message", "llm", model=model), llm_call(model, "send_message"):
+        response = chat.send_message(prompt)
+    model_seconds = time.perf_counter() - model_started
+
+    fn_calls = list(response.function_calls) if getattr(response, "function_calls", None) else []
+    if on_calls:
+        on_calls(fn_calls)
+    calls = [(fn.name, dict(fn.args or {})) for fn in fn_calls]
+    if replayed is not None and calls == replayed[0]:
+        # the data changed since the answer was cached; the model gets the results just read, not a second read
+        results = replayed[1]
+    else:
+        results = dispatch(calls, execute)
+    if on_results:
+        on_results(fn_calls, results)
+
+    if fn_calls:
+        answer_started = time.perf_counter()
+        text = final_answer(chat, tool_response_parts(fn_calls, results), label, write_stream, model=model)
+        model_seconds += time.perf_counter() - answer_started
+        if cache is not None:
+            cache.store(plan_key, cache_scope, calls, results, text, model_seconds)
+    else:
+        text = response.text or ""
+    return {"text": text, "function_calls": fn_calls, "results": results}
@@ -0,0 +1,74 @@
+# scripts/event_loop.py
+
+"""The process-wide event loop the coroutine tool functions run on.
+
+Streamlit runs every session's script on its own thread, so coroutines are
+not awaited there: `run` hands them to one long-lived loop on a daemon
+thread and blocks until they finish. Keeping a single loop matters because
+the Firestore AsyncClient's gRPC channel belongs to the loop it was first
+used on. The caller's context (the current trace span) goes along with the
+coroutine.
+
+Synchronous code that can block (a full collection read, a listener
+subscribe, SQLite) must not run on the loop itself, where it would stall
+every other tool call in flight; coroutines await it through `run_blocking`.
+"""
+
+import asyncio
+import contextvars
+import functools
+import threading
+from concurrent.futures import Future
+from typing import Any, Callable, Coroutine, Optional
+
+_loop: Optional[asyncio.AbstractEventLoop] = None
+_lock = threading.Lock()
+
+
+def get_loop() -> asyncio.AbstractEventLoop:
+    """Start the shared loop on first use and return it."""
+    global _loop
+    if _loop is None:
+        with _lock:
+            if _loop is None:
+                loop = asyncio.new_event_loop()
+                threading.Thread(target=loop.run_forever, name="tool-event-loop", daemon=True).start()
+                _loop = loop
+    return _loop
+
+
+def run(coroutine: Coroutine[Any, Any, Any], timeout: Optional[float] = None) -> Any:
+    """Run `coroutine` on the shared loop and return its result; the sync facade for callers off the loop."""
+    loop = get_loop()
+    try:
+        running = asyncio.get_running_loop()
+    except RuntimeError:
+        running = None
+    if running is loop:
+        coroutine.close()
+        raise RuntimeError("run() would block the shared event loop; await the coroutine instead")
+    context = contextvars.copy_context()
+    done: Future = Future()
+
+    def start() -> None:
+        # tasks copy the context current when they are created
+        task = context.run(loop.create_task, coroutine)
+
+        def finish(task: asyncio.Task) -> None:
+            if task.cancelled():
+                done.cancel()
+            elif task.exception() is not None:
+                done.set_exception(task.exception())
+            else:
+                done.set_result(task.result())
+
+        task.add_done_callback(finish)
+
+    loop.call_soon_threadsafe(start)
+    return done.result(timeout)
+
+
+async def run_blocking(function: Callable[..., Any], *args: Any) -> Any:
+    """Await `function(*args)` on the loop's default executor, with the caller's context."""
+    context = contextvars.copy_context()
+    return await asyncio.get_running_loop().run_in_executor(None, functools.partial(context.run, function, *args))
@@ -0,0 +1,177 @@
+# scripts/intent_router.py
+
+"""Answer common customer questions locally, without a Gemini round trip.
+
+Prompts are matched against compiled keyword patterns and the fuzzy index of
+medicine names built from the `medicines` collection. Help, availability,
+price, track-by-order-id and cancel-by-order-id are answered directly when
+exactly one intent and its slot are found; anything ambiguous (several
+medicines, ordering, advice, ...) goes to the model. Cancelling is the one
+local answer that changes data, so only an imperative "cancel order <id>"
+is served locally; questions and negations that mention cancelling ("did you
+cancel ...?", "don't cancel ...") go to the model.
+
+The router keeps the share of prompts served locally and latency
+percentiles for both paths, and exports them as `axon_turn_seconds` (by
+path) and `axon_router_local_share` on the metrics endpoint.
+"""
+
+import re
+import threading
+from collections import deque
+from typing import Any, Dict, List, Optional
+
+from firebase.medicine_index import MedicineIndex, medicine_index
+from scripts.metrics import registry, turn_latency
+from scripts.user_functions import cancel_order, check_medicine_availability, track_order
+
+# Confidence required before a prompt is answered without the model
+ROUTER_MIN_CONFIDENCE = 0.8
+
+ORDER_ID_PATTERN = re.compile(r"\b[0-9a-f]{8}-?[0-9a-f]{4}-?[0-9a-f]{4}-?[0-9a-f]{4}-?[0-9a-f]{12}\b")
+HELP_PATTERN = re.compile(r"\b(help|what can i do|how (do i|to) use)\b")
+PRICE_PATTERN = re.compile(r"\b(price|prices|cost|costs|how much)\b")
+AVAILABILITY_PATTERN = re.compile(r"\b(do you have|have you got|in stock|stock|available|availability|got any)\b")
+TRACK_PATTERN = re.compile(r"\b(track|tracking|status|where is)\b")
+CANCEL_PATTERN = re.compile(r"\bcancel+(ed|ing)?\b")
+# A request to cancel, as opposed to a question or a negation that mentions cancelling
+CANCEL_COMMAND_PATTERN = re.compile(r"^(please\s+)?cancel\b[^?]*$")
+NEGATION_PATTERN = re.compile(r"\b(not|never|don'?t|dont|won'?t|no)\b")
+# Anything that needs the model's judgement, or a tool the router doesn't call
+LLM_ONLY_PATTERN = re.compile(r"\b(order (some|me|for)|place|buy|purchase|advice|symptom|symptoms|recommend|should i|instead)\b")
+
+
+def _percentile(samples: List[float], percentile: float) -> float:
+    if not samples:
+        return 0.0
+    ordered = sorted(samples)
+    return ordered[min(len(ordered) - 1, int(round(percentile / 100 * (len(ordered) - 1))))]
+
+
+class IntentRouter:
+    def __init__(self, medicine_index: MedicineIndex, min_confidence: float = ROUTER_MIN_CONFIDENCE,
+                 max_samples: int = 1000):
+        self.medicine_index = medicine_index
+        self._min_confidence = min_confidence
+        self._lock = threading.Lock()
+        self._latencies = {"local": deque(maxlen=max_samples), "llm": deque(maxlen=max_samples)}
+        self._counts = {"local": 0, "llm": 0}
+
+    def route(self, prompt: str) -> Dict[str, Any]:
+        """Classify `prompt` into an intent with its slots and a confidence in [0, 1]."""
+        lower = prompt.strip().lower().replace("\u2019", "'")
+        route: Dict[str, Any] = {"intent": None, "medicine": None, "order_id": None, "confidence": 0.0}
+
+        if HELP_PATTERN.search(lower):
+            route.update(intent="help", confidence=1.0)
+        elif LLM_ONLY_PATTERN.search(lower):
+            return self._finish(route)
+        elif order_ids := list(dict.fromkeys(ORDER_ID_PATTERN.findall(lower))):
+            wants_cancel = bool(CANCEL_PATTERN.search(lower))
+            if wants_cancel and (not CANCEL_COMMAND_PATTERN.match(lower) or NEGATION_PATTERN.search(lower)):
+                # cancelling can't be undone: the model asks when the user didn't plainly say to
+                return self._finish(route)
+            route.update(
+                intent="cancel" if wants_cancel else "track",
+                order_id=order_ids[0],
+                confidence=1.0 if len(order_ids) == 1 and (wants_cancel or TRACK_PATTERN.search(lower)) else 0.5,
+            )
+        elif medicines := self.medicine_index.find(lower):
+            asks_price = bool(PRICE_PATTERN.search(lower))
+            asks_stock = bool(AVAILABILITY_PATTERN.search(lower))
+            route.update(
+                intent="price" if asks_price else "availability",
+                medicine=medicines[0],
+                confidence=1.0 if len(medicines) == 1 and (asks_price or asks_stock) else 0.5,
+            )
+        return self._finish(route)
+
+    def _finish(self, route: Dict[str, Any]) -> Dict[str, Any]:
+        route["local"] = route["intent"] is not None and route["confidence"] >= self._min_confidence
+        return route
+
+    def record(self, path: str, seconds: float) -> None:
+        """Record how long a prompt took on the `local` or `llm` path."""
+        with self._lock:
+            self._counts[path] += 1
+            self._latencies[path].append(seconds)
+        turn_latency.observe(seconds, app="user", path=path)
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            total = sum(self._counts.values())
+            report: Dict[str, Any] = {"local_share": self._counts["local"] / total if total else 0.0}
+            for path, samples in self._latencies.items():
+                report[path] = {
+                    "count": self._counts[path],
+                    "p50_ms": _percentile(list(samples), 50) * 1000,
+                    "p95_ms": _percentile(list(samples), 95) * 1000,
+                }
+            return report
+
+
+def help_reply(is_guest: bool) -> str:
+    capabilities = [
+        "Check medicine availability (paracetamol, doxycycline, insulin, citalopram, morphine)",
+    ]
+    if is_guest:
+        guest_note = "You need to sign in to place orders, track/cancel orders, and get personalized advice."
+    else:
+        capabilities.extend([
+            "Place orders and see total price",
+            "Track or cancel your orders",
+            "Get personalized health advice",
+        ])
+        guest_note = ""
+    examples_text = (
+        "\n\nExamples you can try now:\n"
+        "- Do you have paracetamol 500mg?\n"
+        "- What's the price of doxycycline?\n"
+        "- Is insulin in stock?\n"
+        "- Check availability for citalopram\n"
+        "- place an order of paracetamol 2 packs for me\n"
+        "- track my order of id <your-order-id>\n"
+        "- cancel my order of id <your-order-id>\n"
+        "- give me some health advice ... etc\n"
+    )
+    return "Here’s what you can do:\n- " + "\n- ".join(capabilities) + ("\n\n" + guest_note if guest_note else "") + examples_text
+
+
+def answer_locally(route: Dict[str, Any], user_email: str, is_guest: bool) -> Optional[str]:
+    """Reply to a confident help, availability, price, track or cancel route; None for anything else."""
+    intent = route["intent"]
+    if intent == "help":
+        return help_reply(is_guest)
+    if intent in ("availability", "price"):
+        medicine = route["medicine"]
+        availability = check_medicine_availability(medicine)
+        if not availability.get("success"):
+            return f"I couldn't find {medicine} in our inventory. Try another medicine."
+        data = availability["data"]
+        name = data.get("name") or medicine
+        stock = data.get("stock", 0)
+        unit_price = data.get("unit_price", 0)
+        if intent == "price":
+            if stock and stock > 0:
+                return f"The current price of {name} is {unit_price}. It is in stock (qty: {stock})."
+            return f"{name} is currently out of stock. Last listed price was {unit_price}."
+        if stock and stock > 0:
+            return f"Yes, {name} is available (qty: {stock}) at {unit_price} per unit."
+        return f"Sorry, {name} is currently out of stock."
+    if intent in ("track", "cancel"):
+        if is_guest:
+            return "Guest mode: please register or login to track or cancel orders."
+        order_id = route["order_id"]
+        if intent == "track":
+            result = track_order(order_id, user_email)
+            if result.get("success"):
+                order = result["data"]
+                return f"Order {order_id} ({order.get('medicine_name')} x {order.get('quantity')}) is {order.get('status', 'unknown')}."
+            return result.get("message", "I couldn't find that order.")
+        return cancel_order(order_id, user_email).get("message")
+    return None
+
+
+intent_router = IntentRouter(medicine_index)
+registry.callback("axon_router_local_share", "Share of user chat turns answered without the model", "gauge", (),
+                  lambda: {(): intent_router.stats()["local_share"]})
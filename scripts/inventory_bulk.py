@@ -0,0 +1,346 @@
+# scripts/inventory_bulk.py
+
+"""Bulk import and export of the `medicines` collection.
+
+Rows are streamed from a CSV or JSONL file, validated one by one, and written
+in chunks of `chunk_size` per commit instead of a read and a write per
+medicine. Two import modes:
+
+- `upsert` writes the given fields (`name`, `unit_price` and `stock` are
+  required) onto new or existing medicines in a batch; new ones also get
+  `created_at`.
+- `restock` adds `quantity` to the stock of existing medicines. Each chunk
+  is one transaction that reads the stock and writes the new value, so an
+  order placed meanwhile makes it retry instead of being overwritten, and a
+  negative quantity never takes stock below zero.
+
+Each chunk reads the medicines it touches with a single `get_all`.
+
+Invalid rows and rows whose write fails are reported with their line number;
+the rest of the file still goes in. Export pages through the collection and
+writes every medicine (with its `id`) in the same formats.
+
+The admin assistant passes paths it was given by the model, so those go
+through `data_path`, which keeps them inside INVENTORY_DATA_DIR.
+
+Run from the repository root:
+    python -m scripts.inventory_bulk import invoice.csv --mode restock
+    python -m scripts.inventory_bulk export medicines.jsonl
+"""
+
+import argparse
+import csv
+import json
+import os
+import time
+from datetime import date, datetime
+from typing import Any, Callable, Dict, Iterator, List, Optional, Tuple
+
+from firebase_admin import firestore
+
+from firebase.dashboard_metrics import dashboard_metrics
+from firebase.db_manager import db
+from firebase.inventory_cache import inventory_cache
+from firebase.medicine_index import medicine_index
+
+# Writes per batch commit; Firestore allows 500
+BULK_CHUNK_SIZE = 400
+# Attempts per restock transaction when orders contend for the same medicines
+BULK_MAX_ATTEMPTS = 5
+IMPORT_MODES = ("upsert", "restock")
+MEDICINE_FIELDS = ("name", "unit_price", "stock", "madein", "category", "description")
+# Errors echoed back to the admin assistant; the CLI prints them all
+MAX_REPORTED_ERRORS = 20
+# The only directory the admin assistant may import from or export to
+INVENTORY_DATA_DIR = os.getenv("INVENTORY_DATA_DIR", "data")
+
+
+def data_path(path: str, data_dir: str = INVENTORY_DATA_DIR) -> str:
+    """Resolve `path` inside `data_dir`, or raise ValueError if it could lead anywhere else."""
+    path = str(path or "").strip()
+    if not path or os.path.isabs(path) or ".." in path.replace("\\", "/").split("/"):
+        raise ValueError(f"File path must be relative to the data directory, without '..': {path!r}")
+    root = os.path.realpath(data_dir)
+    # realpath follows symlinks, so a link pointing out of the directory is caught too
+    resolved = os.path.realpath(os.path.join(root, path))
+    if os.path.commonpath([root, resolved]) != root:
+        raise ValueError(f"File path leads outside the data directory: {path!r}")
+    return resolved
+
+
+def medicine_id(name: str) -> str:
+    return str(name).strip().lower().replace(' ', '_')
+
+
+def _file_format(path: str, file_format: Optional[str]) -> str:
+    file_format = (file_format or path.rsplit(".", 1)[-1]).lower()
+    if file_format not in ("csv", "jsonl"):
+        raise ValueError(f"Unsupported file format: {file_format} (use csv or jsonl)")
+    return file_format
+
+
+def read_rows(path: str, file_format: Optional[str] = None) -> Iterator[Tuple[int, Any]]:
+    """Yield `(line number, row)` pairs one at a time; a JSONL line that isn't JSON yields its error."""
+    if _file_format(path, file_format) == "csv":
+        with open(path, newline="", encoding="utf-8") as f:
+            reader = csv.DictReader(f)
+            for row in reader:
+                yield reader.line_num, row
+    else:
+        with open(path, encoding="utf-8") as f:
+            for line_number, line in enumerate(f, start=1):
+                if not line.strip():
+                    continue
+                try:
+                    yield line_number, json.loads(line)
+                except json.JSONDecodeError as e:
+                    yield line_number, ValueError(f"invalid JSON: {e.msg}")
+
+
+def _number(row: Dict[str, Any], field: str, cast: type, required: bool) -> Any:
+    value = row.get(field)
+    if value is None or (isinstance(value, str) and not value.strip()):
+        if required:
+            raise ValueError(f"{field} is required")
+        return None
+    try:
+        number = float(value)
+    except (TypeError, ValueError):
+        raise ValueError(f"{field} must be a number, got {value!r}")
+    if cast is int:
+        if not number.is_integer():
+            raise ValueError(f"{field} must be a whole number, got {value!r}")
+        return int(number)
+    return number
+
+
+def validate_row(row: Any, mode: str) -> Tuple[str, Dict[str, Any]]:
+    """Return `(medicine id, fields to write)` or raise ValueError describing what is wrong."""
+    if isinstance(row, Exception):
+        raise row
+    if not isinstance(row, dict):
+        raise ValueError("row must be an object")
+    name = str(row.get("name") or "").strip()
+    if not name:
+        raise ValueError("name is required")
+
+    if mode == "restock":
+        quantity = _number(row, "quantity", int, required=True)
+        if quantity == 0:
+            raise ValueError("quantity must not be 0")
+        return medicine_id(name), {"quantity": quantity}
+
+    fields: Dict[str, Any] = {"name": medicine_id(name)}
+    fields["unit_price"] = _number(row, "unit_price", float, required=True)
+    fields["stock"] = _number(row, "stock", int, required=True)
+    if fields["unit_price"] < 0 or fields["stock"] < 0:
+        raise ValueError("unit_price and stock must not be negative")
+    for field in ("madein", "category", "description"):
+        if str(row.get(field) or "").strip():
+            fields[field] = str(row[field]).strip()
+    return fields["name"], fields
+
+
+def _restock(transaction, references: Dict[str, Any],
+             rows: List[Tuple[int, str, Dict[str, Any]]]) -> Tuple[int, List[Dict[str, Any]]]:
+    """Apply restock rows in `transaction`; returns the rows written and the rows rejected."""
+    stock = {snapshot.id: (snapshot.to_dict() or {}).get("stock") or 0
+             for snapshot in transaction.get_all([references[document_id] for _, document_id, _ in rows])
+             if snapshot.exists}
+    written, rejected, changed = 0, [], {}
+    for line, document_id, fields in rows:
+        if document_id not in stock:
+            rejected.append({"line": line, "name": document_id, "error": "medicine not found"})
+        elif stock[document_id] + fields["quantity"] < 0:
+            rejected.append({"line": line, "name": document_id,
+                             "error": f"quantity {fields['quantity']} would leave stock below zero "
+                                      f"(available: {stock[document_id]})"})
+        else:
+            # later rows of the same medicine see the stock this one leaves
+            stock[document_id] += fields["quantity"]
+            changed[document_id] = stock[document_id]
+            written += 1
+    for document_id, new_stock in changed.items():
+        transaction.update(references[document_id], {"stock": new_stock, "updated_at": datetime.now()})
+    return written, rejected
+
+
+def _commit_restock(client: Any, references: Dict[str, Any], chunk: List[Tuple[int, str, Dict[str, Any]]],
+                    errors: List[Dict[str, Any]], report: Dict[str, Any]) -> None:
+    def run(rows):
+        # a fresh wrapper per call: the transactional decorator keeps retry ids on itself
+        written, rejected = firestore.transactional(_restock)(
+            client.transaction(max_attempts=BULK_MAX_ATTEMPTS), references, rows)
+        errors.extend(rejected)
+        if written:
+            report["commits"] += 1
+            report["written"] += written
+
+    try:
+        run(chunk)
+        return
+    except Exception:
+        # a transaction is all or nothing: find the failing rows by writing them one at a time
+        pass
+    for row in chunk:
+        try:
+            run([row])
+        except Exception as e:
+            errors.append({"line": row[0], "name": row[1], "error": str(e)})
+
+
+def _commit(client: Any, chunk: List[Tuple[int, str, Dict[str, Any]]], mode: str,
+            errors: List[Dict[str, Any]], report: Dict[str, Any]) -> None:
+    collection = client.collection("medicines")
+    references = {document_id: collection.document(document_id) for _, document_id, _ in chunk}
+    if mode == "restock":
+        _commit_restock(client, references, chunk, errors, report)
+        return
+    existing = {snapshot.id for snapshot in client.get_all(list(references.values())) if snapshot.exists}
+
+    def write(batch, document_id, fields):
+        reference = references[document_id]
+        if document_id in existing:
+            batch.set(reference, {**fields, "updated_at": datetime.now()}, merge=True)
+        else:
+            batch.set(reference, {**fields, "created_at": datetime.now(), "updated_at": datetime.now()}, merge=True)
+
+    batch = client.batch()
+    for _, document_id, fields in chunk:
+        write(batch, document_id, fields)
+    try:
+        batch.commit()
+        report["commits"] += 1
+        report["written"] += len(chunk)
+        return
+    except Exception:
+        # a batch is all or nothing: find the failing rows by writing them one at a time
+        pass
+    for line, document_id, fields in chunk:
+        batch = client.batch()
+        write(batch, document_id, fields)
+        try:
+            batch.commit()
+            report["commits"] += 1
+            report["written"] += 1
+        except Exception as e:
+            errors.append({"line": line, "name": document_id, "error": str(e)})
+
+
+def import_medicines(path: str, mode: str = "upsert", file_format: Optional[str] = None, client: Any = db,
+                     chunk_size: int = BULK_CHUNK_SIZE, dry_run: bool = False,
+                     progress: Optional[Callable[[Dict[str, Any]], None]] = None) -> Dict[str, Any]:
+    """Import a CSV/JSONL file and return counts, per-row errors and throughput."""
+    if mode not in IMPORT_MODES:
+        raise ValueError(f"Unknown import mode: {mode} (use {' or '.join(IMPORT_MODES)})")
+    started = time.perf_counter()
+    report: Dict[str, Any] = {"mode": mode, "rows": 0, "written": 0, "commits": 0, "errors": []}
+    errors: List[Dict[str, Any]] = report["errors"]
+    chunk: List[Tuple[int, str, Dict[str, Any]]] = []
+
+    def flush():
+        if chunk and not dry_run:
+            _commit(client, chunk, mode, errors, report)
+        chunk.clear()
+        if progress:
+            progress(report)
+
+    for line, row in read_rows(path, file_format):
+        report["rows"] += 1
+        try:
+            document_id, fields = validate_row(row, mode)
+        except ValueError as e:
+            name = row.get("name") if isinstance(row, dict) else None
+            errors.append({"line": line, "name": name, "error": str(e)})
+            continue
+        chunk.append((line, document_id, fields))
+        if len(chunk) >= chunk_size:
+            flush()
+    flush()
+
+    if report["written"]:
+        inventory_cache.clear()
+        medicine_index.invalidate()
+        dashboard_metrics.invalidate()
+    report["seconds"] = time.perf_counter() - started
+    report["rows_per_sec"] = report["rows"] / report["seconds"] if report["seconds"] else 0.0
+    return report
+
+
+def _jsonable(value: Any) -> Any:
+    if isinstance(value, (datetime, date)):
+        return value.isoformat()
+    return value
+
+
+def export_medicines(path: str, file_format: Optional[str] = None, client: Any = db,
+                     page_size: int = BULK_CHUNK_SIZE,
+                     progress: Optional[Callable[[Dict[str, Any]], None]] = None) -> Dict[str, Any]:
+    """Write every medicine to a CSV/JSONL file, reading the collection a page at a time."""
+    file_format = _file_format(path, file_format)
+    started = time.perf_counter()
+    report: Dict[str, Any] = {"rows": 0, "pages": 0}
+    query = client.collection("medicines").order_by("__name__").limit(page_size)
+
+    directory = os.path.dirname(path)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+    with open(path, "w", newline="", encoding="utf-8") as f:
+        writer = None
+        if file_format == "csv":
+            writer = csv.DictWriter(f, fieldnames=("id", *MEDICINE_FIELDS, "created_at", "updated_at"),
+                                    extrasaction="ignore")
+            writer.writeheader()
+        last = None
+        while True:
+            page = list((query.start_after(last) if last is not None else query).stream())
+            report["pages"] += 1
+            for snapshot in page:
+                row = {"id": snapshot.id, **{k: _jsonable(v) for k, v in (snapshot.to_dict() or {}).items()}}
+                if writer:
+                    writer.writerow(row)
+                else:
+                    f.write(json.dumps(row, ensure_ascii=False) + "\n")
+            report["rows"] += len(page)
+            if progress:
+                progress(report)
+            if len(page) < page_size:
+                break
+            last = page[-1]
+
+    report["seconds"] = time.perf_counter() - started
+    report["rows_per_sec"] = report["rows"] / report["seconds"] if report["seconds"] else 0.0
+    return report
+
+
+def main(argv=None) -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    commands = parser.add_subparsers(dest="command", required=True)
+    import_parser = commands.add_parser("import", help="import medicines from a CSV or JSONL file")
+    import_parser.add_argument("path")
+    import_parser.add_argument("--mode", choices=IMPORT_MODES, default="upsert")
+    import_parser.add_argument("--format", choices=("csv", "jsonl"))
+    import_parser.add_argument("--chunk-size", type=int, default=BULK_CHUNK_SIZE)
+    import_parser.add_argument("--dry-run", action="store_true", help="validate without writing")
+    export_parser = commands.add_parser("export", help="export the medicines collection")
+    export_parser.add_argument("path")
+    export_parser.add_argument("--format", choices=("csv", "jsonl"))
+    args = parser.parse_args(argv)
+
+    if args.command == "import":
+        report = import_medicines(args.path, args.mode, args.format, chunk_size=args.chunk_size,
+                                  dry_run=args.dry_run,
+                                  progress=lambda r: print(f"{r['rows']} rows read, {r['written']} written, "
+                                                           f"{len(r['errors'])} errors", flush=True))
+        for error in report["errors"]:
+            print(f"line {error['line']} ({error['name']}): {error['error']}")
+        print(f"{report['written']} of {report['rows']} rows written in {report['commits']} commits, "
+              f"{report['rows_per_sec']:.0f} rows/s")
+    else:
+        report = export_medicines(args.path, args.format,
+                                  progress=lambda r: print(f"{r['rows']} rows exported", flush=True))
+        print(f"{report['rows']} medicines exported to {args.path}, {report['rows_per_sec']:.0f} rows/s")
+
+
+if __name__ == "__main__":
+    main()
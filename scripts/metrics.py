@@ -0,0 +1,358 @@
+# scripts/metrics.py
+
+"""Process-wide operational metrics, served in the Prometheus text format.
+
+Counters and histograms are updated inline by the apps, the tool
+dispatcher, the Telegram broadcaster and the Firestore instrumentation;
+callback metrics (cache hit ratios) are read from their owners when the
+endpoint is scraped. Rates such as turns per second are left to the
+scraper: `rate(axon_turns_total[1m])`.
+
+The endpoint is a small HTTP server on a daemon thread, started by the apps
+when METRICS_PORT is set:
+    METRICS_PORT=9464 streamlit run app.py
+    curl localhost:9464/metrics
+"""
+
+import bisect
+import logging
+import os
+import threading
+import time
+from contextlib import contextmanager
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Callable, Dict, Iterator, List, Optional, Sequence, Tuple
+
+import function_declarations
+
+logger = logging.getLogger(__name__)
+
+METRICS_PORT = int(os.getenv("METRICS_PORT", "0"))
+METRICS_HOST = os.getenv("METRICS_HOST", "127.0.0.1")
+# Seconds; Gemini calls take from a few hundred ms to tens of seconds
+LLM_LATENCY_BUCKETS = (0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+# Turns answered locally take milliseconds, turns through the model seconds
+TURN_LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05) + LLM_LATENCY_BUCKETS
+
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+# tool names the model may call; anything else is counted as "unknown" to keep label values bounded
+TOOL_NAMES = tuple(sorted(
+    declaration["name"] for name, declaration in vars(function_declarations).items()
+    if name.endswith("_function") and isinstance(declaration, dict)
+))
+
+
+def _escape(value: Any) -> str:
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _labels(names: Sequence[str], values: Sequence[Any], extra: str = "") -> str:
+    pairs = [f'{name}="{_escape(value)}"' for name, value in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+def _number(value: float) -> str:
+    if value == float("inf"):
+        return "+Inf"
+    return repr(float(value)) if isinstance(value, float) and not value.is_integer() else str(int(value))
+
+
+class _Metric:
+    kind = "untyped"
+
+    def __init__(self, name: str, help: str, labelnames: Sequence[str] = ()):
+        self.name = name
+        self.help = help
+        self.labelnames = tuple(labelnames)
+        self._lock = threading.Lock()
+
+    def _key(self, labels: Dict[str, Any]) -> Tuple[str, ...]:
+        if set(labels) != set(self.labelnames):
+            raise ValueError(f"{self.name} takes labels {self.labelnames}, got {tuple(labels)}")
+        return tuple(str(labels[name]) for name in self.labelnames)
+
+    def header(self) -> List[str]:
+        return [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} {self.kind}"]
+
+
+class Counter(_Metric):
+    kind = "counter"
+
+    def __init__(self, name: str, help: str, labelnames: Sequence[str] = ()):
+        super().__init__(name, help, labelnames)
+        self._values: Dict[Tuple[str, ...], float] = {}
+
+    def inc(self, amount: float = 1, **labels: Any) -> None:
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def value(self, **labels: Any) -> float:
+        with self._lock:
+            return self._values.get(self._key(labels), 0)
+
+    def render(self) -> List[str]:
+        with self._lock:
+            values = sorted(self._values.items())
+        return self.header() + [f"{self.name}{_labels(self.labelnames, key)} {_number(value)}" for key, value in values]
+
+
+class Histogram(_Metric):
+    kind = "histogram"
+
+    def __init__(self, name: str, help: str, labelnames: Sequence[str] = (),
+                 buckets: Sequence[float] = LLM_LATENCY_BUCKETS):
+        super().__init__(name, help, labelnames)
+        self.buckets = tuple(sorted(buckets))
+        # per label set: [count per bucket (the last one is +Inf), sum]
+        self._values: Dict[Tuple[str, ...], list] = {}
+
+    def observe(self, value: float, **labels: Any) -> None:
+        key = self._key(labels)
+        index = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            entry = self._values.setdefault(key, [[0] * (len(self.buckets) + 1), 0.0])
+            entry[0][index] += 1
+            entry[1] += value
+
+    @contextmanager
+    def time(self, **labels: Any) -> Iterator[None]:
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - started, **labels)
+
+    def count(self, **labels: Any) -> int:
+        with self._lock:
+            entry = self._values.get(self._key(labels))
+            return sum(entry[0]) if entry else 0
+
+    def render(self) -> List[str]:
+        with self._lock:
+            values = sorted((key, (list(counts), total)) for key, (counts, total) in self._values.items())
+        lines = self.header()
+        for key, (counts, total) in values:
+            cumulative = 0
+            for bound, count in zip(self.buckets + (float("inf"),), counts):
+                cumulative += count
+                le = f'le="{_number(bound)}"'
+                lines.append(f"{self.name}_bucket{_labels(self.labelnames, key, le)} {cumulative}")
+            lines.append(f"{self.name}_sum{_labels(self.labelnames, key)} {_number(total)}")
+            lines.append(f"{self.name}_count{_labels(self.labelnames, key)} {cumulative}")
+        return lines
+
+
+class CallbackMetric(_Metric):
+    """A counter or gauge whose values are read from `callback` at scrape time.
+
+    `callback` returns `{label values tuple: value}`.
+    """
+
+    def __init__(self, name: str, help: str, kind: str, labelnames: Sequence[str],
+                 callback: Callable[[], Dict[Tuple[Any, ...], float]]):
+        super().__init__(name, help, labelnames)
+        self.kind = kind
+        self.callback = callback
+
+    def render(self) -> List[str]:
+        try:
+            values = sorted(self.callback().items())
+        except Exception:
+            logger.exception("metric callback %s failed", self.name)
+            values = []
+        return self.header() + [f"{self.name}{_labels(self.labelnames, key)} {_number(value)}" for key, value in values]
+
+
+class MetricsRegistry:
+    def __init__(self):
+        self._metrics: Dict[str, _Metric] = {}
+        self._lock = threading.Lock()
+        self._server: Optional[ThreadingHTTPServer] = None
+
+    def _register(self, metric: _Metric) -> Any:
+        # Streamlit re-runs the app scripts on every interaction: registering again returns the existing metric
+        with self._lock:
+            existing = self._metrics.get(metric.name)
+            if existing is not None:
+                if type(existing) is not type(metric) or existing.labelnames != metric.labelnames:
+                    raise ValueError(f"Metric {metric.name} is already registered differently")
+                if isinstance(metric, CallbackMetric):
+                    existing.callback = metric.callback
+                return existing
+            self._metrics[metric.name] = metric
+            return metric
+
+    def counter(self, name: str, help: str, labelnames: Sequence[str] = ()) -> Counter:
+        return self._register(Counter(name, help, labelnames))
+
+    def histogram(self, name: str, help: str, labelnames: Sequence[str] = (),
+                  buckets: Sequence[float] = LLM_LATENCY_BUCKETS) -> Histogram:
+        return self._register(Histogram(name, help, labelnames, buckets))
+
+    def callback(self, name: str, help: str, kind: str, labelnames: Sequence[str],
+                 callback: Callable[[], Dict[Tuple[Any, ...], float]]) -> CallbackMetric:
+        return self._register(CallbackMetric(name, help, kind, labelnames, callback))
+
+    def render(self) -> str:
+        with self._lock:
+            metrics = sorted(self._metrics.values(), key=lambda metric: metric.name)
+        return "\n".join(line for metric in metrics for line in metric.render()) + "\n"
+
+    def serve(self, port: int = METRICS_PORT, host: str = METRICS_HOST) -> Optional[ThreadingHTTPServer]:
+        """Start the /metrics endpoint once per process; a port of 0 picks a free one."""
+        with self._lock:
+            if self._server is not None:
+                return self._server
+            registry = self
+
+            class Handler(BaseHTTPRequestHandler):
+                def do_GET(self):
+                    if self.path.split("?", 1)[0] != "/metrics":
+                        self.send_error(404)
+                        return
+                    body = registry.render().encode()
+                    self.send_response(200)
+                    self.send_header("Content-Type", CONTENT_TYPE)
+                    self.send_header("Content-Length", str(len(body)))
+                    self.end_headers()
+                    self.wfile.write(body)
+
+                def log_message(self, format, *args):
+                    pass
+
+            try:
+                self._server = ThreadingHTTPServer((host, port), Handler)
+            except OSError as e:
+                logger.warning("metrics endpoint not started on %s:%s: %s", host, port, e)
+                return None
+            self._server.daemon_threads = True
+            threading.Thread(target=self._server.serve_forever, name="metrics-endpoint", daemon=True).start()
+            return self._server
+
+    def stop(self) -> None:
+        with self._lock:
+            server, self._server = self._server, None
+        if server is not None:
+            server.shutdown()
+            server.server_close()
+
+
+_caches: Dict[str, Callable[[], Dict[str, Any]]] = {}
+
+
+def register_cache(name: str, stats: Callable[[], Dict[str, Any]]) -> None:
+    """Expose a cache whose `stats()` returns `hit_ratio`, `hits_total` and `misses_total`.
+
+    The totals back Prometheus counters, so they must never go backwards: a
+    cache whose `clear()` resets `hits` and `misses` keeps counting them on.
+    `saved_seconds_total` is exported too when the cache reports it.
+    """
+    _caches[name] = stats
+
+
+def _cache_stat(field: str) -> Callable[[], Dict[Tuple[str, ...], float]]:
+    def collect() -> Dict[Tuple[str, ...], float]:
+        values = {}
+        for name, stats in list(_caches.items()):
+            report = stats()
+            if field in report:
+                values[(name,)] = report[field]
+        return values
+    return collect
+
+
+def tool_label(name: str) -> str:
+    return name if name in TOOL_NAMES else "unknown"
+
+
+@contextmanager
+def llm_call(model: str, call: str) -> Iterator[None]:
+    """Count and time one Gemini request."""
+    started = time.perf_counter()
+    outcome = "error"
+    try:
+        yield
+        outcome = "ok"
+    finally:
+        llm_calls.inc(model=model, call=call, outcome=outcome)
+        llm_latency.observe(time.perf_counter() - started, model=model, call=call)
+
+
+def _collection(document_path: str) -> Optional[str]:
+    """The collection id of `projects/p/databases/d/documents/.../collection/doc`."""
+    parts = document_path.split("/documents/", 1)[-1].split("/")
+    return parts[-2] if len(parts) >= 2 else None
+
+
+def _count_documents(operation: str, document_paths) -> None:
+    for path in document_paths:
+        collection = _collection(path) if path else None
+        if collection:
+            firestore_documents.inc(collection=collection, operation=operation)
+
+
+def count_firestore_request(method_name: str, request: Any) -> None:
+    """Count what a Firestore gapic request reads or writes, as far as the request alone tells."""
+    if not isinstance(request, dict):
+        return
+    if method_name == "get_document":
+        _count_documents("read", [request.get("name")])
+    elif method_name in ("commit", "batch_write"):
+        for write in request.get("writes") or ():
+            _count_documents("write", [write.update.name or write.delete or write.transform.document])
+    elif method_name == "run_aggregation_query":
+        query = request.get("structured_aggregation_query")
+        if query is not None and query.structured_query.from_:
+            # billed as one read per batch of up to 1000 index entries
+            firestore_documents.inc(collection=query.structured_query.from_[0].collection_id, operation="read")
+
+
+def count_firestore_response(method_name: str, response: Any) -> None:
+    """Count the documents one streamed response of `batch_get_documents` or `run_query` returns."""
+    if method_name == "batch_get_documents":
+        _count_documents("read", [response.found.name or response.missing])
+    elif method_name == "run_query":
+        _count_documents("read", [response.document.name])
+
+
+registry = MetricsRegistry()
+
+turns = registry.counter("axon_turns_total", "Chat turns handled, by app and by whether the model was called",
+                         ("app", "path"))
+turn_latency = registry.histogram("axon_turn_seconds", "Chat turn latency by app and by whether the model was called",
+                                  ("app", "path"), TURN_LATENCY_BUCKETS)
+llm_calls = registry.counter("axon_llm_calls_total", "Gemini requests by model, call and outcome",
+                             ("model", "call", "outcome"))
+llm_latency = registry.histogram("axon_llm_call_seconds", "Gemini request latency by model and call",
+                                 ("model", "call"))
+tool_calls = registry.counter("axon_tool_calls_total", "Tool function invocations", ("function",))
+tool_errors = registry.counter("axon_tool_errors_total", "Tool function invocations that failed", ("function",))
+firestore_documents = registry.counter("axon_firestore_documents_total",
+                                       "Firestore documents read or written, by collection",
+                                       ("collection", "operation"))
+telegram_sends = registry.counter("axon_telegram_sends_total",
+                                  "Telegram messages delivered, rejected by Telegram or failed after retries",
+                                  ("outcome",))
+telegram_retries = registry.counter("axon_telegram_retries_total", "Telegram sendMessage attempts that are retried",
+                                    ("reason",))
+orders = registry.counter("axon_orders_total", "Order placements and cancellations by outcome",
+                          ("action", "outcome"))
+logins = registry.counter("axon_logins_total", "Login attempts by app and outcome (ok, invalid, throttled, error)",
+                          ("app", "outcome"))
+registry.callback("axon_cache_hits_total", "Lookups served from a cache", "counter", ("cache",),
+                  _cache_stat("hits_total"))
+registry.callback("axon_cache_misses_total", "Lookups that missed a cache", "counter", ("cache",),
+                  _cache_stat("misses_total"))
+registry.callback("axon_cache_hit_ratio", "Share of lookups served from a cache", "gauge", ("cache",),
+                  _cache_stat("hit_ratio"))
+registry.callback("axon_cache_saved_seconds_total", "Model time not spent because a cache answered instead",
+                  "counter", ("cache",), _cache_stat("saved_seconds_total"))
+
+# every declared tool shows up with a zero count before its first call
+for _name in TOOL_NAMES:
+    tool_calls.inc(0, function=_name)
+    tool_errors.inc(0, function=_name)
@@ -0,0 +1,83 @@
+# scripts/migrate_chat_history.py
+
+"""One-off move of the legacy `chat_history` array into the subcollection.
+
+For every user document that still carries a `chat_history` array, each entry
+becomes a document in `users/{email}/chat_history` and the array is removed
+from the user document. The old entries have no timestamps, so they are
+spaced one millisecond apart after the user's `created_at` to keep their
+order. Document ids are derived from the array position, so re-running after
+a partial failure overwrites instead of duplicating.
+
+Run from the repository root:
+    python -m scripts.migrate_chat_history [--dry-run] [--batch-size N]
+"""
+
+import argparse
+from datetime import datetime, timedelta, timezone
+from typing import Any, Dict
+
+from firebase_admin import firestore
+
+from firebase.chat_history import chat_history_ref
+from firebase.db_manager import db
+
+# Writes per batch commit; Firestore allows 500
+MIGRATION_BATCH_SIZE = 400
+
+
+def migrate_user(user_snapshot, client: Any = db, batch_size: int = MIGRATION_BATCH_SIZE,
+                 dry_run: bool = False) -> int:
+    """Move one user's `chat_history` array into the subcollection and return how many entries moved."""
+    user_data = user_snapshot.to_dict() or {}
+    entries = user_data.get("chat_history")
+    if not isinstance(entries, list):
+        return 0
+    if dry_run:
+        return len(entries)
+
+    started = user_data.get("created_at") or datetime.now(timezone.utc)
+    if started.tzinfo is None:
+        started = started.replace(tzinfo=timezone.utc)
+    history = chat_history_ref(user_snapshot.id, client)
+    batch = client.batch()
+    for position, text in enumerate(entries):
+        batch.set(history.document(f"legacy-{position:06d}"), {
+            "text": text,
+            "role": "user",
+            "created_at": started + timedelta(milliseconds=position),
+            "migrated": True,
+        })
+        if len(batch) >= batch_size:
+            batch.commit()
+            batch = client.batch()
+    # the array only goes once every entry is safely in the subcollection
+    batch.update(user_snapshot.reference, {"chat_history": firestore.DELETE_FIELD})
+    batch.commit()
+    return len(entries)
+
+
+def migrate_all(client: Any = db, batch_size: int = MIGRATION_BATCH_SIZE, dry_run: bool = False) -> Dict[str, int]:
+    report = {"users": 0, "migrated_users": 0, "messages": 0}
+    for user_snapshot in client.collection("users").stream():
+        report["users"] += 1
+        moved = migrate_user(user_snapshot, client, batch_size=batch_size, dry_run=dry_run)
+        if moved or "chat_history" in (user_snapshot.to_dict() or {}):
+            report["migrated_users"] += 1
+            report["messages"] += moved
+    return report
+
+
+def main(argv=None) -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--dry-run", action="store_true", help="count what would move without writing")
+    parser.add_argument("--batch-size", type=int, default=MIGRATION_BATCH_SIZE)
+    args = parser.parse_args(argv)
+
+    report = migrate_all(batch_size=args.batch_size, dry_run=args.dry_run)
+    prefix = "would move" if args.dry_run else "moved"
+    print(f"{prefix} {report['messages']} messages for {report['migrated_users']} of {report['users']} users")
+
+
+if __name__ == "__main__":
+    main()
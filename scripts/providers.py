@@ -0,0 +1,90 @@
+# scripts/providers.py
+
+"""Lazy, thread-safe clients that are built on first use.
+
+A `Provider` calls its factory the first time the client is needed and hands
+out the same instance afterwards; concurrent first calls build it once. In a
+running Streamlit app the factory goes through `st.cache_resource`, so the
+client also outlives script reruns and module reloads. The login page and
+test imports no longer pay for credentials and client construction.
+
+`provider.override(fake)` makes every caller (including `LazyClient`
+handles taken at import) use `fake` instead, which is how tests, benchmarks
+and the load test swap in their doubles.
+"""
+
+import os
+import threading
+from typing import Any, Callable, Optional
+
+
+def _streamlit_cached(factory: Callable[[], Any]) -> Optional[Callable[[], Any]]:
+    try:
+        import streamlit as st
+        from streamlit import runtime
+    except ImportError:
+        return None
+    if not runtime.exists():
+        return None
+    return st.cache_resource(show_spinner=False)(factory)
+
+
+class Provider:
+    def __init__(self, name: str, factory: Callable[[], Any]):
+        self.name = name
+        self._factory = factory
+        self._instance: Any = None
+        self._override: Any = None
+        self._lock = threading.Lock()
+
+    def get(self) -> Any:
+        override = self._override
+        if override is not None:
+            return override
+        instance = self._instance
+        if instance is not None:
+            return instance
+        with self._lock:
+            if self._instance is None:
+                factory = _streamlit_cached(self._factory) or self._factory
+                self._instance = factory()
+            return self._instance
+
+    @property
+    def created(self) -> bool:
+        return self._instance is not None
+
+    def override(self, instance: Any) -> None:
+        """Use `instance` instead of the real client; None goes back to the real one."""
+        self._override = instance
+
+    @property
+    def overridden(self) -> Any:
+        return self._override
+
+    def proxy(self) -> "LazyClient":
+        return LazyClient(self)
+
+
+class LazyClient:
+    """Stands in for the provider's client and builds it on the first attribute access."""
+
+    __slots__ = ("_provider",)
+
+    def __init__(self, provider: Provider):
+        object.__setattr__(self, "_provider", provider)
+
+    def __getattr__(self, name: str) -> Any:
+        return getattr(self._provider.get(), name)
+
+    def __repr__(self) -> str:
+        return f"<LazyClient {self._provider.name}>"
+
+
+def _create_gemini_client() -> Any:
+    from google import genai
+
+    return genai.Client(api_key=os.getenv("GEMINI_API_KEY"))
+
+
+gemini_client = Provider("gemini", _create_gemini_client)
@@ -0,0 +1,223 @@
+# scripts/response_cache.py
+
+"""Answers to repeated read-only questions, served without calling the model.
+
+A turn whose function calls are all read-only (availability, order status
+and listings, health advice) is remembered in two steps: the *plan*, which
+calls the model asked for, keyed by the model id, the user, the normalized
+prompt and the model turn it replies to; and the *answer*, keyed by the plan
+key plus a hash of the tool results. A repeat runs the remembered calls
+again, so the answer is only reused when the data behind it is unchanged,
+and costs no model call at all when it is.
+
+Entries expire after RESPONSE_CACHE_TTL seconds and the least recently used
+go once RESPONSE_CACHE_SIZE is reached. With RESPONSE_CACHE_PATH set they are
+also written to a SQLite file, so a restart starts warm; evicted and expired
+entries are deleted from it too, and it is pruned back to RESPONSE_CACHE_SIZE
+rows on open and every RESPONSE_CACHE_SIZE writes. Placing or cancelling an
+order drops everything cached for that user.
+"""
+
+import hashlib
+import json
+import os
+import re
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+RESPONSE_CACHE_ENABLED = os.getenv("RESPONSE_CACHE", "1").lower() not in ("0", "false", "no")
+RESPONSE_CACHE_TTL = float(os.getenv("RESPONSE_CACHE_TTL", "600"))
+RESPONSE_CACHE_SIZE = int(os.getenv("RESPONSE_CACHE_SIZE", "1024"))
+RESPONSE_CACHE_PATH = os.getenv("RESPONSE_CACHE_PATH", "")
+# Tools whose results depend only on stored data; turns calling anything else are never cached
+CACHEABLE_TOOLS = frozenset({
+    "check_medicine_availability", "check_medicines_availability", "track_order", "list_my_orders",
+    "get_health_advice",
+})
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS responses (
+    key TEXT PRIMARY KEY,
+    scope TEXT NOT NULL,
+    value TEXT NOT NULL,
+    model_seconds REAL NOT NULL,
+    expires_at REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS responses_scope ON responses (scope);
+"""
+
+
+def normalize_prompt(prompt: str) -> str:
+    """Lower-case words without punctuation, so "Any advice for a headache?" matches "any advice for a headache"."""
+    return " ".join(re.sub(r"[^\w\s]", " ", str(prompt).lower()).split())
+
+
+def fingerprint(value: Any) -> str:
+    return hashlib.sha256(json.dumps(value, sort_keys=True, default=str).encode()).hexdigest()
+
+
+def cacheable(calls: List[Tuple[str, Dict[str, Any]]], results: List[Any]) -> bool:
+    return bool(calls) and all(name in CACHEABLE_TOOLS for name, _ in calls) and all(
+        isinstance(result, dict) and result.get("success") for result in results)
+
+
+class ResponseCache:
+    def __init__(self, ttl: float = RESPONSE_CACHE_TTL, max_entries: int = RESPONSE_CACHE_SIZE,
+                 path: Optional[str] = None, clock: Callable[[], float] = time.time):
+        self._ttl = ttl
+        self._max_entries = max_entries
+        self.path = path
+        self._clock = clock
+        # key -> (expires_at, scope, value, model_seconds); least recently used first
+        self._entries: "OrderedDict[str, tuple]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._connection: Optional[sqlite3.Connection] = None
+        self._writes_since_prune = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.saved_seconds = 0.0
+        # what `clear` reset, so the exported totals never go backwards
+        self._cleared = {"hits": 0, "misses": 0, "saved_seconds": 0.0}
+
+    @staticmethod
+    def plan_key(model: str, scope: str, prompt: str, context: str = "") -> str:
+        return fingerprint(["plan", model, scope, normalize_prompt(prompt), context])
+
+    @staticmethod
+    def answer_key(plan_key: str, results: List[Any]) -> str:
+        return fingerprint(["answer", plan_key, results])
+
+    def plan(self, plan_key: str) -> Optional[List[Tuple[str, Dict[str, Any]]]]:
+        """The `(name, args)` calls remembered for the prompt, or None (a miss)."""
+        entry = self._get(plan_key)
+        if entry is None:
+            with self._lock:
+                self.misses += 1
+            return None
+        return [(name, args) for name, args in entry[0]]
+
+    def answer(self, plan_key: str, results: List[Any]) -> Optional[str]:
+        """The answer given for these tool results, or None; a hit counts as a saved model round trip."""
+        entry = self._get(self.answer_key(plan_key, results))
+        with self._lock:
+            if entry is None:
+                self.misses += 1
+                return None
+            self.hits += 1
+            self.saved_seconds += entry[1]
+        return entry[0]
+
+    def store(self, plan_key: str, scope: str, calls: List[Tuple[str, Dict[str, Any]]], results: List[Any],
+              text: str, model_seconds: float) -> bool:
+        """Remember a turn's calls and answer; returns False when the turn is not cacheable."""
+        if not text or not cacheable(calls, results):
+            return False
+        self._put(plan_key, scope, [[name, args] for name, args in calls], 0.0)
+        self._put(self.answer_key(plan_key, results), scope, text, model_seconds)
+        return True
+
+    def invalidate(self, scope: str) -> None:
+        """Drop everything cached for `scope` (a user's email)."""
+        with self._lock:
+            for key in [key for key, entry in self._entries.items() if entry[1] == scope]:
+                del self._entries[key]
+            if self.path:
+                self._db().execute("DELETE FROM responses WHERE scope = ?", (scope,))
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+            if self.path:
+                self._db().execute("DELETE FROM responses")
+            self._cleared["hits"] += self.hits
+            self._cleared["misses"] += self.misses
+            self._cleared["saved_seconds"] += self.saved_seconds
+            self.hits = self.misses = self.evictions = 0
+            self.saved_seconds = 0.0
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "size": len(self._entries),
+                "hit_ratio": self.hits / lookups if lookups else 0.0,
+                # model time the hits would have spent, as measured when each answer was cached
+                "saved_seconds": self.saved_seconds,
+                # since the process started, across `clear` calls
+                "hits_total": self._cleared["hits"] + self.hits,
+                "misses_total": self._cleared["misses"] + self.misses,
+                "saved_seconds_total": self._cleared["saved_seconds"] + self.saved_seconds,
+            }
+
+    def _get(self, key: str) -> Optional[Tuple[Any, float]]:
+        now = self._clock()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None and self.path:
+                row = self._db().execute(
+                    "SELECT expires_at, scope, value, model_seconds FROM responses WHERE key = ?", (key,)).fetchone()
+                if row is not None:
+                    entry = (row[0], row[1], json.loads(row[2]), row[3])
+                    self._remember(key, entry)
+            if entry is None:
+                return None
+            if entry[0] <= now:
+                self._entries.pop(key, None)
+                if self.path:
+                    self._db().execute("DELETE FROM responses WHERE key = ?", (key,))
+                return None
+            self._entries.move_to_end(key)
+            return entry[2], entry[3]
+
+    def _put(self, key: str, scope: str, value: Any, model_seconds: float) -> None:
+        entry = (self._clock() + self._ttl, scope, value, model_seconds)
+        with self._lock:
+            self._remember(key, entry)
+            if self.path:
+                self._db().execute(
+                    "INSERT OR REPLACE INTO responses (key, scope, value, model_seconds, expires_at)"
+                    " VALUES (?, ?, ?, ?, ?)",
+                    (key, scope, json.dumps(value, default=str), model_seconds, entry[0]),
+                )
+                self._writes_since_prune += 1
+                if self._writes_since_prune >= self._max_entries:
+                    self._prune()
+
+    def _remember(self, key: str, entry: tuple) -> None:
+        # callers hold self._lock
+        self._entries[key] = entry
+        self._entries.move_to_end(key)
+        while len(self._entries) > self._max_entries:
+            evicted, _ = self._entries.popitem(last=False)
+            self.evictions += 1
+            if self.path:
+                self._db().execute("DELETE FROM responses WHERE key = ?", (evicted,))
+
+    def _prune(self) -> None:
+        """Delete expired rows, then all but the `max_entries` that expire last (rows of earlier runs too)."""
+        # callers hold self._lock
+        connection = self._db()
+        connection.execute("DELETE FROM responses WHERE expires_at <= ?", (self._clock(),))
+        connection.execute(
+            "DELETE FROM responses WHERE key NOT IN"
+            " (SELECT key FROM responses ORDER BY expires_at DESC LIMIT ?)", (self._max_entries,))
+        self._writes_since_prune = 0
+
+    def _db(self) -> sqlite3.Connection:
+        # callers hold self._lock
+        if self._connection is None:
+            self._connection = sqlite3.connect(self.path, check_same_thread=False, isolation_level=None)
+            self._connection.execute("PRAGMA journal_mode=WAL")
+            self._connection.executescript(_SCHEMA)
+            self._prune()
+        return self._connection
+
+
+response_cache = ResponseCache(path=RESPONSE_CACHE_PATH or None)
@@ -0,0 +1,58 @@
+# scripts/response_stream.py
+
+"""Deliver the model's final answer to the chat UI, streamed or in one piece.
+
+With STREAM_RESPONSES on (the default) the answer is written into the chat
+container chunk by chunk as Gemini produces it. Either way the time to first
+token and the total time are logged per request, so both paths can be
+compared from the logs.
+"""
+
+import logging
+import os
+import time
+from typing import Any, Callable, Dict, Iterable
+
+from scripts.metrics import llm_call
+from scripts.tracing import tracer
+
+logger = logging.getLogger(__name__)
+
+STREAM_RESPONSES = os.getenv("STREAM_RESPONSES", "1").lower() not in ("0", "false", "no")
+
+
+def final_answer(chat: Any, message: Any, label: str, write_stream: Callable[[Iterable[str]], Any],
+                 stream: bool = STREAM_RESPONSES, model: str = "unknown") -> str:
+    """Send `message` on `chat`, render the reply with `write_stream` and return its full text.
+
+    `write_stream` is `st.write_stream` in the apps: it renders an iterable of
+    strings and returns the concatenated text.
+    """
+    timing: Dict[str, float] = {"started": time.perf_counter()}
+
+    with tracer.span("gemini.final_answer", "llm", label=label, stream=stream) as span, \
+            llm_call(model, "final_answer"):
+        if stream:
+            def chunks():
+                for chunk in chat.send_message_stream(message):
+                    if chunk.text:
+                        timing.setdefault("first_token", time.perf_counter())
+                        yield chunk.text
+            text = write_stream(chunks())
+        else:
+            text = chat.send_message(message).text or ""
+            timing["first_token"] = time.perf_counter()
+            write_stream([text])
+
+        finished = time.perf_counter()
+        first_token = timing.get("first_token", finished)
+        span.set(ttft_ms=round((first_token - timing["started"]) * 1000, 1))
+    logger.info(
+        "final answer label=%s mode=%s ttft_ms=%.1f total_ms=%.1f chars=%d",
+        label,
+        "stream" if stream else "blocking",
+        (first_token - timing["started"]) * 1000,
+        (finished - timing["started"]) * 1000,
+        len(text or ""),
+    )
+    return text if isinstance(text, str) else "".join(str(part) for part in text)
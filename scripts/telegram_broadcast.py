@@ -0,0 +1,175 @@
+# scripts/telegram_broadcast.py
+
+"""Send one announcement to every configured Telegram chat at once.
+
+All chats are posted to concurrently over one pooled keep-alive session, and
+every request has a timeout. Telegram allows roughly one message per second
+per chat: sends to the same chat are spaced `chat_interval` apart, and a 429
+answer pushes that chat's next slot back by the `retry_after` Telegram asks
+for before the send is retried. Timeouts, connection errors and 5xx answers
+are retried with backoff; other errors are reported with Telegram's
+description.
+
+Targets come from TELEGRAM_TARGETS as comma-separated `name=chat_id` pairs
+(a bare chat id is its own name), falling back to CHANNEL_USERNAME and
+GROUP_USERNAME.
+"""
+
+import os
+import threading
+import time
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Any, Callable, Dict, Optional
+
+import requests
+from requests.adapters import HTTPAdapter
+
+from scripts.metrics import telegram_retries, telegram_sends
+from scripts.tracing import tracer
+
+TELEGRAM_API_URL = os.getenv("TELEGRAM_API_URL", "https://api.telegram.org")
+TELEGRAM_TIMEOUT = float(os.getenv("TELEGRAM_TIMEOUT", "10"))
+TELEGRAM_MAX_ATTEMPTS = int(os.getenv("TELEGRAM_MAX_ATTEMPTS", "3"))
+# Minimum spacing between two messages to the same chat
+TELEGRAM_CHAT_INTERVAL = float(os.getenv("TELEGRAM_CHAT_INTERVAL", "1.0"))
+# Longer retry_after answers are reported instead of waited out
+TELEGRAM_MAX_RETRY_AFTER = float(os.getenv("TELEGRAM_MAX_RETRY_AFTER", "30"))
+TELEGRAM_MAX_WORKERS = int(os.getenv("TELEGRAM_MAX_WORKERS", "8"))
+
+
+def load_targets(environ=os.environ) -> Dict[str, str]:
+    """Return `{name: chat_id}` from TELEGRAM_TARGETS, or the channel and group usernames."""
+    configured = environ.get("TELEGRAM_TARGETS", "").strip()
+    if configured:
+        targets = {}
+        for entry in configured.split(","):
+            name, _, chat_id = entry.strip().rpartition("=")
+            if chat_id:
+                targets[name.strip() or chat_id] = chat_id.strip()
+        return targets
+    legacy = {"channel": environ.get("CHANNEL_USERNAME"), "group": environ.get("GROUP_USERNAME")}
+    return {name: chat_id for name, chat_id in legacy.items() if chat_id}
+
+
+class ChatRateLimiter:
+    """Hands out send slots per chat, at least `interval` seconds apart."""
+
+    def __init__(self, interval: float = TELEGRAM_CHAT_INTERVAL, clock: Callable[[], float] = time.monotonic,
+                 sleep: Callable[[float], None] = time.sleep):
+        self._interval = interval
+        self._clock = clock
+        self._sleep = sleep
+        self._next_slot: Dict[str, float] = {}
+        self._lock = threading.Lock()
+
+    def wait(self, chat_id: str) -> None:
+        with self._lock:
+            now = self._clock()
+            slot = max(now, self._next_slot.get(chat_id, now))
+            self._next_slot[chat_id] = slot + self._interval
+        if slot > now:
+            self._sleep(slot - now)
+
+    def back_off(self, chat_id: str, seconds: float) -> None:
+        """Keep `chat_id` quiet for `seconds`, as asked by a 429 answer."""
+        with self._lock:
+            resume = self._clock() + seconds
+            self._next_slot[chat_id] = max(self._next_slot.get(chat_id, resume), resume)
+
+
+class TelegramBroadcaster:
+    def __init__(self, bot_token: Optional[str], targets: Dict[str, str], api_url: str = TELEGRAM_API_URL,
+                 timeout: float = TELEGRAM_TIMEOUT, max_attempts: int = TELEGRAM_MAX_ATTEMPTS,
+                 max_retry_after: float = TELEGRAM_MAX_RETRY_AFTER, max_workers: int = TELEGRAM_MAX_WORKERS,
+                 rate_limiter: Optional[ChatRateLimiter] = None, retry_delay: float = 0.5):
+        self.bot_token = bot_token
+        self.targets = dict(targets)
+        self._url = f"{api_url.rstrip('/')}/bot{bot_token}/sendMessage"
+        self._timeout = timeout
+        self._max_attempts = max_attempts
+        self._max_retry_after = max_retry_after
+        self._retry_delay = retry_delay
+        self._rate_limiter = rate_limiter or ChatRateLimiter()
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="telegram")
+        self._session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=max_workers)
+        self._session.mount("https://", adapter)
+        self._session.mount("http://", adapter)
+
+    def broadcast(self, message: str) -> Dict[str, Dict[str, Any]]:
+        """Send `message` to every target concurrently and return one result per target name."""
+        if not self.bot_token:
+            return {"telegram": {"success": False, "error": "TELEGRAM_BOT_TOKEN is not set"}}
+        if not self.targets:
+            return {"telegram": {"success": False, "error": "No Telegram targets are configured"}}
+        futures = {name: self.submit(chat_id, message) for name, chat_id in self.targets.items()}
+        return {name: future.result() for name, future in futures.items()}
+
+    def submit(self, chat_id: str, message: str) -> "Future[Dict[str, Any]]":
+        """Start `send` on the broadcaster's pool and return its future."""
+        return self._executor.submit(tracer.propagate(self.send), chat_id, message)
+
+    def send(self, chat_id: str, message: str) -> Dict[str, Any]:
+        """Post `message` to one chat, retrying rate limits and transient failures."""
+        started = time.perf_counter()
+        error, retryable = "not sent", True
+        for attempt in range(1, self._max_attempts + 1):
+            self._rate_limiter.wait(chat_id)
+            try:
+                with tracer.span("telegram.sendMessage", "http", chat_id=chat_id, attempt=attempt) as span:
+                    response = self._session.post(
+                        self._url,
+                        data={"chat_id": chat_id, "text": message, "parse_mode": "HTML"},
+                        timeout=self._timeout,
+                    )
+                    span.set(status=response.status_code)
+                body = response.json()
+            except (requests.Timeout, requests.ConnectionError) as e:
+                error = f"{type(e).__name__}: {e}"
+                telegram_retries.inc(reason="network_error")
+                self._pause(attempt)
+                continue
+            except ValueError:
+                body = {"ok": False, "description": f"HTTP {response.status_code} with a non-JSON body"}
+
+            if body.get("ok"):
+                result = body.get("result") or {}
+                telegram_sends.inc(outcome="delivered")
+                return {
+                    "success": True,
+                    "message": result.get("text"),
+                    "message_id": result.get("message_id"),
+                    "attempts": attempt,
+                    "latency_ms": (time.perf_counter() - started) * 1000,
+                }
+
+            error = body.get("description") or f"HTTP {response.status_code}"
+            if response.status_code == 429:
+                retry_after = float((body.get("parameters") or {}).get("retry_after", 1))
+                if retry_after > self._max_retry_after:
+                    error = f"{error} (retry after {retry_after:g}s)"
+                    break
+                telegram_retries.inc(reason="rate_limited")
+                self._rate_limiter.back_off(chat_id, retry_after)
+            elif response.status_code >= 500:
+                telegram_retries.inc(reason="server_error")
+                self._pause(attempt)
+            else:
+                # bad chat id, bad markup, bot not in the chat: retrying won't help
+                retryable = False
+                break
+        telegram_sends.inc(outcome="failed" if retryable else "rejected")
+        return {
+            "success": False,
+            "error": error,
+            "retryable": retryable,
+            "attempts": attempt,
+            "latency_ms": (time.perf_counter() - started) * 1000,
+        }
+
+    def _pause(self, attempt: int) -> None:
+        if attempt < self._max_attempts:
+            time.sleep(self._retry_delay * attempt)
+
+
+telegram_broadcaster = TelegramBroadcaster(os.getenv("TELEGRAM_BOT_TOKEN"), load_targets())
@@ -0,0 +1,246 @@
+# scripts/telegram_outbox.py
+
+"""Durable outbox between the admin assistant and Telegram.
+
+`enqueue` stores one row per target in a local SQLite file and returns at
+once, so a slow Bot API never holds up the admin's chat turn and a crash
+never loses an announcement. A background worker claims due rows, sends them
+through the broadcaster, and records delivery or the error. Failed rows are
+retried with exponential backoff until `max_attempts`; errors Telegram will
+never accept (unknown chat, bad markup) fail straight away.
+
+A claimed row carries a lease: the claiming outbox's owner id and an expiry
+`lease_seconds` ahead. Several processes can share the file (every admin app
+process starts a worker), and none of them touches a row another one holds. A row whose
+lease expires while still `sending`, because its worker crashed or hung, is
+claimed again, so delivery is at least once.
+"""
+
+import logging
+import os
+import sqlite3
+import threading
+import time
+import uuid
+from typing import Any, Callable, Dict, List, Optional
+
+from scripts.telegram_broadcast import TelegramBroadcaster, telegram_broadcaster
+from scripts.tracing import tracer
+
+logger = logging.getLogger(__name__)
+
+TELEGRAM_OUTBOX_PATH = os.getenv("TELEGRAM_OUTBOX_PATH", "telegram_outbox.db")
+TELEGRAM_OUTBOX_MAX_ATTEMPTS = int(os.getenv("TELEGRAM_OUTBOX_MAX_ATTEMPTS", "5"))
+# Rows claimed per round; they are sent concurrently
+TELEGRAM_OUTBOX_BATCH = 32
+# How long a claimed row belongs to its worker; longer than a round of sends with their retries can take
+TELEGRAM_OUTBOX_LEASE = float(os.getenv("TELEGRAM_OUTBOX_LEASE", "300"))
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS outbox (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    announcement_id TEXT NOT NULL,
+    target TEXT NOT NULL,
+    chat_id TEXT NOT NULL,
+    message TEXT NOT NULL,
+    status TEXT NOT NULL DEFAULT 'queued',
+    attempts INTEGER NOT NULL DEFAULT 0,
+    last_error TEXT,
+    telegram_message_id INTEGER,
+    created_at REAL NOT NULL,
+    updated_at REAL NOT NULL,
+    next_attempt_at REAL NOT NULL,
+    lease_owner TEXT,
+    lease_expires_at REAL
+);
+CREATE INDEX IF NOT EXISTS outbox_due ON outbox (status, next_attempt_at);
+CREATE INDEX IF NOT EXISTS outbox_announcement ON outbox (announcement_id);
+"""
+
+
+class TelegramOutbox:
+    def __init__(self, path: str, broadcaster: TelegramBroadcaster, max_attempts: int = TELEGRAM_OUTBOX_MAX_ATTEMPTS,
+                 batch_size: int = TELEGRAM_OUTBOX_BATCH, retry_delay: float = 2.0, poll_interval: float = 5.0,
+                 lease_seconds: float = TELEGRAM_OUTBOX_LEASE, clock: Callable[[], float] = time.time):
+        self.path = path
+        # identifies this outbox's leases among every process sharing the file
+        self.owner = uuid.uuid4().hex
+        self._lease_seconds = lease_seconds
+        self.broadcaster = broadcaster
+        self._max_attempts = max_attempts
+        self._batch_size = batch_size
+        self._retry_delay = retry_delay
+        self._poll_interval = poll_interval
+        self._clock = clock
+        self._connection: Optional[sqlite3.Connection] = None
+        self._db_lock = threading.Lock()
+        self._start_lock = threading.Lock()
+        self._wake = threading.Event()
+        self._stopping = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    # queue side
+
+    def enqueue(self, message: str, targets: Optional[Dict[str, str]] = None) -> str:
+        """Store `message` for every target (the broadcaster's by default) and return its announcement id."""
+        targets = self.broadcaster.targets if targets is None else targets
+        if not targets:
+            raise ValueError("No Telegram targets are configured")
+        announcement_id = uuid.uuid4().hex
+        now = self._clock()
+        with self._db() as connection:
+            connection.executemany(
+                "INSERT INTO outbox (announcement_id, target, chat_id, message, created_at, updated_at, next_attempt_at)"
+                " VALUES (?, ?, ?, ?, ?, ?, ?)",
+                [(announcement_id, name, chat_id, message, now, now, now) for name, chat_id in targets.items()],
+            )
+        self._wake.set()
+        return announcement_id
+
+    def status(self, announcement_id: Optional[str] = None, limit: int = 5) -> List[Dict[str, Any]]:
+        """Delivery status per target for one announcement, or for the `limit` most recent ones."""
+        with self._db() as connection:
+            if announcement_id:
+                ids = [announcement_id]
+            else:
+                ids = [row[0] for row in connection.execute(
+                    "SELECT announcement_id FROM outbox GROUP BY announcement_id ORDER BY MAX(id) DESC LIMIT ?", (limit,))]
+            rows = connection.execute(
+                f"SELECT announcement_id, target, message, status, attempts, last_error, telegram_message_id, created_at,"
+                f" updated_at FROM outbox WHERE announcement_id IN ({','.join('?' * len(ids))}) ORDER BY id",
+                ids,
+            ).fetchall()
+        announcements: Dict[str, Dict[str, Any]] = {}
+        for announcement, target, message, status, attempts, error, message_id, created_at, updated_at in rows:
+            entry = announcements.setdefault(announcement, {
+                "announcement_id": announcement,
+                "message": message,
+                "created_at": created_at,
+                "targets": {},
+            })
+            entry["targets"][target] = {
+                "status": status,
+                "attempts": attempts,
+                "error": error,
+                "telegram_message_id": message_id,
+                "updated_at": updated_at,
+            }
+        return [announcements[announcement] for announcement in ids if announcement in announcements]
+
+    def pending(self) -> int:
+        with self._db() as connection:
+            return connection.execute("SELECT COUNT(*) FROM outbox WHERE status IN ('queued', 'sending')").fetchone()[0]
+
+    # worker side
+
+    def start(self) -> None:
+        """Start the background worker unless it is already running."""
+        with self._start_lock:
+            if self._thread is not None and self._thread.is_alive():
+                return
+            self._stopping.clear()
+            self._thread = threading.Thread(target=self._run, name="telegram-outbox", daemon=True)
+            self._thread.start()
+
+    def stop(self, timeout: Optional[float] = None) -> None:
+        self._stopping.set()
+        self._wake.set()
+        if self._thread is not None:
+            self._thread.join(timeout)
+
+    def drain_once(self) -> int:
+        """Send every due row once and return how many were attempted."""
+        claimed = self._claim()
+        if not claimed:
+            return 0
+        with tracer.turn("telegram_outbox", rows=len(claimed)):
+            futures = [(row, self.broadcaster.submit(row[1], row[2])) for row in claimed]
+            for (row_id, _, _, attempts), future in futures:
+                try:
+                    result = future.result()
+                except Exception as e:
+                    result = {"success": False, "error": str(e)}
+                self._record(row_id, attempts + 1, result)
+        return len(claimed)
+
+    def _run(self) -> None:
+        while not self._stopping.is_set():
+            try:
+                if self.drain_once():
+                    continue
+            except Exception:
+                logger.exception("telegram outbox round failed")
+            self._wake.wait(self._poll_interval)
+            self._wake.clear()
+
+    def _claim(self) -> List[tuple]:
+        now = self._clock()
+        with self._db() as connection:
+            # due rows, and rows whose worker's lease ran out mid-send
+            rows = connection.execute(
+                "SELECT id, chat_id, message, attempts FROM outbox"
+                " WHERE (status = 'queued' AND next_attempt_at <= ?)"
+                " OR (status = 'sending' AND lease_expires_at <= ?)"
+                " ORDER BY id LIMIT ?",
+                (now, now, self._batch_size),
+            ).fetchall()
+            connection.executemany(
+                "UPDATE outbox SET status = 'sending', lease_owner = ?, lease_expires_at = ?, updated_at = ?"
+                " WHERE id = ?",
+                [(self.owner, now + self._lease_seconds, now, row[0]) for row in rows],
+            )
+        return rows
+
+    def _record(self, row_id: int, attempts: int, result: Dict[str, Any]) -> None:
+        now = self._clock()
+        # a row whose lease ran out belongs to whoever claimed it since; their result is the one recorded
+        with self._db() as connection:
+            if result.get("success"):
+                connection.execute(
+                    "UPDATE outbox SET status = 'delivered', attempts = ?, last_error = NULL, telegram_message_id = ?,"
+                    " lease_owner = NULL, lease_expires_at = NULL, updated_at = ? WHERE id = ? AND lease_owner = ?",
+                    (attempts, result.get("message_id"), now, row_id, self.owner),
+                )
+                return
+            give_up = attempts >= self._max_attempts or result.get("retryable") is False
+            connection.execute(
+                "UPDATE outbox SET status = ?, attempts = ?, last_error = ?, lease_owner = NULL,"
+                " lease_expires_at = NULL, updated_at = ?, next_attempt_at = ? WHERE id = ? AND lease_owner = ?",
+                ("failed" if give_up else "queued", attempts, result.get("error"), now,
+                 now + self._retry_delay * 2 ** (attempts - 1), row_id, self.owner),
+            )
+        if not give_up:
+            # wake up for the retry instead of sleeping a whole poll interval
+            timer = threading.Timer(self._retry_delay * 2 ** (attempts - 1), self._wake.set)
+            timer.daemon = True
+            timer.start()
+
+    def _db(self) -> "_Transaction":
+        with self._db_lock:
+            if self._connection is None:
+                self._connection = sqlite3.connect(self.path, check_same_thread=False, isolation_level=None)
+                self._connection.execute("PRAGMA journal_mode=WAL")
+                self._connection.executescript(_SCHEMA)
+        return _Transaction(self._connection, self._db_lock)
+
+
+class _Transaction:
+    """Holds the connection lock for one write transaction."""
+
+    def __init__(self, connection: sqlite3.Connection, lock: threading.Lock):
+        self._connection = connection
+        self._lock = lock
+
+    def __enter__(self) -> sqlite3.Connection:
+        self._lock.acquire()
+        self._connection.execute("BEGIN IMMEDIATE")
+        return self._connection
+
+    def __exit__(self, exc_type, exc, traceback) -> None:
+        try:
+            self._connection.execute("COMMIT" if exc_type is None else "ROLLBACK")
+        finally:
+            self._lock.release()
+
+
+telegram_outbox = TelegramOutbox(TELEGRAM_OUTBOX_PATH, telegram_broadcaster)
@@ -0,0 +1,133 @@
+# scripts/tool_dispatcher.py
+
+"""Run the function calls of one model turn concurrently and assemble the replies.
+
+Gemini can return several function calls at once. Each is a blocking
+Firestore or Telegram round trip, so independent calls run on a bounded,
+process-wide thread pool and the turn takes as long as its slowest call.
+Calls touching the same medicine or order are chained in their original
+order so they never race each other. Results come back in call order.
+
+`dispatch_tool_calls_async` does the same for coroutine tool functions
+(scripts/user_functions_async.py): every chain is a task on the shared event
+loop, so concurrent calls overlap their I/O without a thread each.
+
+Tool functions must not call Streamlit: they run outside the script thread.
+"""
+
+import asyncio
+import os
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Tuple
+
+from google.genai import types
+
+from scripts import event_loop
+from scripts.metrics import tool_calls, tool_errors, tool_label
+from scripts.tracing import tracer
+
+TOOL_MAX_WORKERS = int(os.getenv("TOOL_MAX_WORKERS", "8"))
+
+_executor = ThreadPoolExecutor(max_workers=TOOL_MAX_WORKERS, thread_name_prefix="tool-call")
+
+
+def tool_conflict_key(name: str, args: Dict[str, Any]) -> Optional[str]:
+    """Return the resource a call mutates or reads, or None if it touches nothing shared."""
+    if args.get("order_id"):
+        return f"order:{args['order_id']}"
+    medicine = args.get("medicine_name") or args.get("name")
+    if medicine:
+        return f"medicine:{str(medicine).lower().replace(' ', '_')}"
+    return None
+
+
+def _record(span: Any, name: str, result: Any) -> None:
+    succeeded = not isinstance(result, dict) or result.get("success") is not False
+    span.set(success=succeeded)
+    tool_calls.inc(function=tool_label(name))
+    if not succeeded:
+        tool_errors.inc(function=tool_label(name))
+
+
+def _run(execute: Callable[[str, Dict[str, Any]], Any], name: str, args: Dict[str, Any]) -> Any:
+    with tracer.span(f"tool.{name}", "tool") as span:
+        try:
+            result = execute(name, args)
+        except Exception as e:
+            result = {"success": False, "message": f"Error running {name}: {str(e)}"}
+        _record(span, name, result)
+        return result
+
+
+async def _run_async(execute: Callable[[str, Dict[str, Any]], Awaitable[Any]], name: str,
+                     args: Dict[str, Any]) -> Any:
+    with tracer.span(f"tool.{name}", "tool") as span:
+        try:
+            result = await execute(name, args)
+        except Exception as e:
+            result = {"success": False, "message": f"Error running {name}: {str(e)}"}
+        _record(span, name, result)
+        return result
+
+
+def _chains(calls: List[Tuple[str, Dict[str, Any]]]) -> List[List[int]]:
+    """Group call indexes: calls sharing a conflict key form one chain; every other call is its own chain."""
+    chains: Dict[Any, List[int]] = {}
+    for index, (name, args) in enumerate(calls):
+        key = tool_conflict_key(name, args)
+        chains.setdefault(key if key is not None else index, []).append(index)
+    return list(chains.values())
+
+
+def dispatch_tool_calls(calls: List[Tuple[str, Dict[str, Any]]],
+                        execute: Callable[[str, Dict[str, Any]], Any]) -> List[Any]:
+    """Execute `(name, args)` calls with `execute` and return their results in call order."""
+    if len(calls) <= 1:
+        return [_run(execute, name, args) for name, args in calls]
+
+    results: List[Any] = [None] * len(calls)
+
+    def run_chain(indexes: List[int]) -> None:
+        for index in indexes:
+            name, args = calls[index]
+            results[index] = _run(execute, name, args)
+
+    futures = [_executor.submit(tracer.propagate(run_chain), indexes) for indexes in _chains(calls)]
+    for future in futures:
+        future.result()
+    return results
+
+
+async def dispatch_tool_calls_async(calls: List[Tuple[str, Dict[str, Any]]],
+                                    execute: Callable[[str, Dict[str, Any]], Awaitable[Any]]) -> List[Any]:
+    """`dispatch_tool_calls` for a coroutine `execute`; chains run as concurrent tasks."""
+    results: List[Any] = [None] * len(calls)
+
+    async def run_chain(indexes: List[int]) -> None:
+        for index in indexes:
+            name, args = calls[index]
+            results[index] = await _run_async(execute, name, args)
+
+    await asyncio.gather(*(run_chain(indexes) for indexes in _chains(calls)))
+    return results
+
+
+def dispatch_async_tool_calls(calls: List[Tuple[str, Dict[str, Any]]],
+                              execute: Callable[[str, Dict[str, Any]], Awaitable[Any]]) -> List[Any]:
+    """Blocking facade over `dispatch_tool_calls_async` for the script thread; same signature as `dispatch_tool_calls`."""
+    if not calls:
+        return []
+    return event_loop.run(dispatch_tool_calls_async(calls, execute))
+
+
+def tool_response_parts(function_calls: List[types.FunctionCall], results: List[Any]) -> List[types.Part]:
+    """Build the function-response parts for one user turn, in call order.
+
+    All results go back in a single turn after the model's function-call turn;
+    a turn per call made the follow-up request grow with the square of the
+    number of calls.
+    """
+    return [
+        types.Part.from_function_response(name=fn.name, response={"result": result})
+        for fn, result in zip(function_calls, results)
+    ]
@@ -0,0 +1,317 @@
+# scripts/tracing.py
+
+"""Per-turn tracing: nested, timed spans for model calls, Firestore RPCs and HTTP calls.
+
+Each chat turn runs inside `tracer.turn(label)`, which gives it a trace id,
+and the work it does is wrapped in `tracer.span(name, kind)`. Spans nest
+through a context variable; `tracer.propagate` carries it into the thread
+pools a turn fans out to. When a turn ends it is logged as one JSON line on
+the `axon.trace` logger and kept in memory for the last TRACE_HISTORY turns,
+which the apps show as a waterfall when TRACE_PANEL is on.
+
+With TRACING off (the default) `turn` and `span` return a shared no-op after
+a single flag check, so instrumented code pays well under a microsecond per
+span. `instrument_firestore` (sync and AsyncClient) also feeds the
+per-collection document counts in `scripts.metrics`, so the apps install it
+whether or not tracing is on.
+"""
+
+import contextvars
+import functools
+import json
+import logging
+import os
+import threading
+import time
+import uuid
+from collections import deque
+from typing import Any, Callable, Dict, List, Optional
+
+from scripts.metrics import count_firestore_request, count_firestore_response
+
+TRACING = os.getenv("TRACING", "0").lower() in ("1", "true", "yes")
+TRACE_PANEL = os.getenv("TRACE_PANEL", "0").lower() in ("1", "true", "yes")
+TRACE_HISTORY = int(os.getenv("TRACE_HISTORY", "20"))
+
+# gapic methods that make one request (the streaming ones finish when their stream is consumed)
+FIRESTORE_RPCS = (
+    "get_document", "list_documents", "create_document", "update_document", "delete_document",
+    "batch_get_documents", "begin_transaction", "commit", "rollback", "run_query",
+    "run_aggregation_query", "partition_query", "batch_write", "list_collection_ids",
+)
+FIRESTORE_STREAMING_RPCS = ("batch_get_documents", "run_query", "run_aggregation_query")
+
+logger = logging.getLogger("axon.trace")
+
+_current_span: contextvars.ContextVar = contextvars.ContextVar("axon_current_span", default=None)
+
+
+class Span:
+    """One timed operation. Use it as a context manager, or call `finish` yourself."""
+
+    __slots__ = ("trace", "span_id", "parent_id", "name", "kind", "attrs", "start", "end", "error", "_token")
+
+    def __init__(self, trace: "Trace", name: str, kind: str, parent_id: Optional[str], attrs: Dict[str, Any]):
+        self.trace = trace
+        self.span_id = uuid.uuid4().hex[:16]
+        self.parent_id = parent_id
+        self.name = name
+        self.kind = kind
+        self.attrs = attrs
+        self.error: Optional[str] = None
+        self.end: Optional[float] = None
+        self.start = time.perf_counter()
+
+    def set(self, **attrs: Any) -> None:
+        self.attrs.update(attrs)
+
+    def finish(self, error: Optional[BaseException] = None) -> None:
+        if self.end is not None:
+            return
+        self.end = time.perf_counter()
+        if error is not None:
+            self.error = f"{type(error).__name__}: {error}"
+        self.trace.finished(self)
+
+    def __enter__(self) -> "Span":
+        self._token = _current_span.set(self)
+        return self
+
+    def __exit__(self, exc_type, exc, tb) -> bool:
+        _current_span.reset(self._token)
+        self.finish(exc)
+        return False
+
+    def to_dict(self) -> Dict[str, Any]:
+        end = self.end if self.end is not None else time.perf_counter()
+        return {
+            "span_id": self.span_id,
+            "parent_id": self.parent_id,
+            "name": self.name,
+            "kind": self.kind,
+            "start_ms": round((self.start - self.trace.start) * 1000, 3),
+            "duration_ms": round((end - self.start) * 1000, 3),
+            "attrs": self.attrs,
+            "error": self.error,
+        }
+
+
+class _NoopSpan:
+    """Stands in for a span when tracing is off or no turn is being traced."""
+
+    __slots__ = ()
+
+    def set(self, **attrs: Any) -> None:
+        pass
+
+    def finish(self, error: Optional[BaseException] = None) -> None:
+        pass
+
+    def __enter__(self) -> "_NoopSpan":
+        return self
+
+    def __exit__(self, exc_type, exc, tb) -> bool:
+        return False
+
+
+NOOP_SPAN = _NoopSpan()
+
+
+class Trace:
+    """The spans of one turn; the root span's end completes the trace."""
+
+    def __init__(self, tracer: "Tracer", label: str):
+        self.tracer = tracer
+        self.trace_id = uuid.uuid4().hex
+        self.label = label
+        self.started_at = time.time()
+        self.start = time.perf_counter()
+        self.spans: List[Span] = []
+        self._lock = threading.Lock()
+
+    def finished(self, span: Span) -> None:
+        with self._lock:
+            self.spans.append(span)
+        if span.parent_id is None:
+            self.tracer.record(self)
+
+    def to_dict(self) -> Dict[str, Any]:
+        with self._lock:
+            spans = sorted(self.spans, key=lambda span: span.start)
+        root = next((span for span in spans if span.parent_id is None), None)
+        return {
+            "trace_id": self.trace_id,
+            "label": self.label,
+            "attrs": root.attrs if root else {},
+            "started_at": self.started_at,
+            "duration_ms": round(((root.end if root else time.perf_counter()) - self.start) * 1000, 3),
+            "spans": [span.to_dict() for span in spans],
+        }
+
+
+class Tracer:
+    def __init__(self, enabled: bool = TRACING, history: int = TRACE_HISTORY, log: logging.Logger = logger):
+        self.enabled = enabled
+        self._log = log
+        self._recent: "deque[Dict[str, Any]]" = deque(maxlen=history)
+        self._lock = threading.Lock()
+
+    def turn(self, label: str, **attrs: Any):
+        """Start a trace whose root span covers one chat turn."""
+        if not self.enabled:
+            return NOOP_SPAN
+        trace = Trace(self, label)
+        span = Span(trace, label, "turn", None, attrs)
+        span.start = trace.start
+        return span
+
+    def span(self, name: str, kind: str = "internal", **attrs: Any):
+        """Start a child of the current span; a no-op outside a traced turn."""
+        if not self.enabled:
+            return NOOP_SPAN
+        parent = _current_span.get()
+        if parent is None:
+            return NOOP_SPAN
+        return Span(parent.trace, name, kind, parent.span_id, attrs)
+
+    def current_trace_id(self) -> Optional[str]:
+        span = _current_span.get()
+        return span.trace.trace_id if span is not None else None
+
+    def propagate(self, fn: Callable) -> Callable:
+        """Bind `fn` to the caller's trace context before handing it to another thread.
+
+        Call it once per submission: a copied context can't run in two threads at once.
+        """
+        if not self.enabled or _current_span.get() is None:
+            return fn
+        return functools.partial(contextvars.copy_context().run, fn)
+
+    def record(self, trace: Trace) -> None:
+        entry = trace.to_dict()
+        with self._lock:
+            self._recent.append(entry)
+        self._log.info(json.dumps(entry, default=str))
+
+    def recent(self) -> List[Dict[str, Any]]:
+        """The last finished turns, newest first."""
+        with self._lock:
+            return list(reversed(self._recent))
+
+    def clear(self) -> None:
+        with self._lock:
+            self._recent.clear()
+
+
+def waterfall(trace: Dict[str, Any], width: int = 40) -> str:
+    """Render a finished trace as text bars, one line per span, indented by depth."""
+    total = max(trace["duration_ms"], 0.001)
+    depth = {None: -1}
+    lines = [f"{trace['label']} {trace['trace_id'][:8]} {trace['duration_ms']:.1f} ms"]
+    rows = []
+    for span in trace["spans"]:
+        depth[span["span_id"]] = depth.get(span["parent_id"], 0) + 1
+        rows.append((("  " * depth[span["span_id"]]) + span["name"], span))
+    name_width = max((len(name) for name, _ in rows), default=0)
+    for name, span in rows:
+        offset = min(int(span["start_ms"] / total * width), width - 1)
+        length = max(1, min(round(span["duration_ms"] / total * width), width - offset))
+        bar = " " * offset + "█" * length
+        lines.append(f"{name:<{name_width}} |{bar:<{width}}| {span['duration_ms']:8.1f} ms"
+                     + (f"  ! {span['error']}" if span["error"] else ""))
+    return "\n".join(lines)
+
+
+def instrument_firestore(api_class: Optional[type] = None, asynchronous: bool = False) -> None:
+    """Wrap each Firestore gapic RPC method in a span and count its documents (once per class).
+
+    With no class, both the sync client and the AsyncClient's gapic client are
+    instrumented; pass `asynchronous=True` with a class whose methods are awaited.
+    """
+    if api_class is None:
+        from google.cloud.firestore_v1.services.firestore.async_client import FirestoreAsyncClient
+        from google.cloud.firestore_v1.services.firestore.client import FirestoreClient
+
+        instrument_firestore(FirestoreClient)
+        instrument_firestore(FirestoreAsyncClient, asynchronous=True)
+        return
+    if getattr(api_class, "_axon_traced", False):
+        return
+    wrap = _traced_async_rpc if asynchronous else _traced_rpc
+    for method_name in FIRESTORE_RPCS:
+        method = getattr(api_class, method_name, None)
+        if method is not None:
+            setattr(api_class, method_name, wrap(method, method_name))
+    api_class._axon_traced = True
+
+
+def _traced_rpc(method: Callable, method_name: str) -> Callable:
+    name = f"firestore.{method_name}"
+    streaming = method_name in FIRESTORE_STREAMING_RPCS
+
+    @functools.wraps(method)
+    def traced(*args, **kwargs):
+        span = tracer.span(name, "firestore")
+        try:
+            result = method(*args, **kwargs)
+        except BaseException as e:
+            span.finish(e)
+            raise
+        count_firestore_request(method_name, kwargs.get("request"))
+        if not streaming:
+            span.finish()
+            return result
+        return _finish_when_consumed(result, span, method_name)
+
+    return traced
+
+
+def _finish_when_consumed(responses, span, method_name: str):
+    error = None
+    try:
+        for response in responses:
+            count_firestore_response(method_name, response)
+            yield response
+    except Exception as e:
+        error = e
+        raise
+    finally:
+        span.finish(error)
+
+
+def _traced_async_rpc(method: Callable, method_name: str) -> Callable:
+    name = f"firestore.{method_name}"
+    streaming = method_name in FIRESTORE_STREAMING_RPCS
+
+    # the async gapic methods are all awaited; the streaming ones resolve to an async iterator
+    @functools.wraps(method)
+    async def traced(*args, **kwargs):
+        span = tracer.span(name, "firestore")
+        try:
+            result = await method(*args, **kwargs)
+        except BaseException as e:
+            span.finish(e)
+            raise
+        count_firestore_request(method_name, kwargs.get("request"))
+        if not streaming:
+            span.finish()
+            return result
+        return _finish_when_consumed_async(result, span, method_name)
+
+    return traced
+
+
+async def _finish_when_consumed_async(responses, span, method_name: str):
+    error = None
+    try:
+        async for response in responses:
+            count_firestore_response(method_name, response)
+            yield response
+    except Exception as e:
+        error = e
+        raise
+    finally:
+        span.finish(error)
+
+
+tracer = Tracer()
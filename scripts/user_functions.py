@@ -1,42 +1,200 @@
 # scripts/user_functions.py
 
 from datetime import datetime
-import hashlib
 from typing import Optional, Dict, Any
 import uuid
 from firebase_admin import firestore
 
 from firebase.db_manager import db
+from firebase.inventory_cache import inventory_cache
+from firebase.inventory_mirror import get_medicine, get_medicines
+from firebase.medicine_index import medicine_index
+from scripts.metrics import orders
+from scripts.response_cache import response_cache
+
+def resolve_medicine_id(medicine_name: str) -> str:
+    """The medicine a lookup is for: an exact id, name or alias, else the closest misspelling.
+
+    Only reads use this, since their results name the medicine found; orders go
+    through `order_medicine_id`.
+    """
+    return (medicine_index.exact(medicine_name) or medicine_index.resolve(medicine_name)
+            or medicine_name.lower().replace(' ', '_'))
+
+def order_medicine_id(medicine_name: str) -> str:
+    """The medicine an order is for: an exact id, name or alias only, never a fuzzy match."""
+    return medicine_index.exact(medicine_name) or medicine_name.lower().replace(' ', '_')
+
+def suggest_missing(result: Dict[str, Any], requested_names: Dict[str, str]) -> Dict[str, Any]:
+    """Turn the `missing` medicine ids of a rejected order into "did you mean" suggestions.
+
+    `requested_names` maps each medicine id to the name the user gave for it;
+    `suggestions` maps that name to the closest medicine ids.
+    """
+    missing = result.pop("missing", None)
+    if not missing:
+        return result
+    suggestions = {}
+    for medicine_id in missing:
+        name = requested_names.get(medicine_id, medicine_id)
+        suggestions[name] = [match for match, _ in medicine_index.suggest(name) if match != medicine_id]
+    hints = [f"{', '.join(matches)} for '{name}'" for name, matches in suggestions.items() if matches]
+    if hints:
+        result["message"] += f". Did you mean {'; '.join(hints)}? Nothing was ordered"
+    result["suggestions"] = suggestions
+    return result
+
+def availability_result(requested_name: str, medicine_name: str, medicine_dict: Optional[Dict[str, Any]]) -> Dict[str, Any]:
+    if medicine_dict is None:
+        suggestions = [name for name, _ in medicine_index.suggest(requested_name)]
+        return {
+            "success": False,
+            "message": f"Medicine '{medicine_name}' not found"
+            + (f". Did you mean: {', '.join(suggestions)}?" if suggestions else ""),
+            "suggestions": suggestions
+        }
+
+    return {
+        "success": True,
+        "data": {
+            "name": medicine_dict.get("name"),
+            "stock": medicine_dict.get("stock", 0),
+            "unit_price": medicine_dict.get("unit_price", 0),
+            "description": medicine_dict.get("description", ""),
+            "category": medicine_dict.get("category", "General")
+        }
+    }
 
 def check_medicine_availability(medicine_name: str) -> Dict[str, Any]:
     try:
-        medicine_name = medicine_name.lower().replace(' ', '_')
-        medicine_ref = db.collection("medicines").document(medicine_name)
-        medicine_data = medicine_ref.get()
-        
-        if not medicine_data.exists:
-            return {
-                "success": False,
-                "message": f"Medicine '{medicine_name}' not found"
-            }
-        
-        medicine_dict = medicine_data.to_dict()
-        return {
-            "success": True,
-            "data": {
-                "name": medicine_dict.get("name"),
-                "stock": medicine_dict.get("stock", 0),
-                "unit_price": medicine_dict.get("unit_price", 0),
-                "description": medicine_dict.get("description", ""),
-                "category": medicine_dict.get("category", "General")
-            }
-        }
+        medicine_id = resolve_medicine_id(medicine_name)
+        return availability_result(medicine_name, medicine_id, get_medicine(medicine_id))
     except Exception as e:
         return {
             "success": False,
             "message": f"Error checking medicine: {str(e)}"
         }
 
+# Most medicines one check_medicines_availability call may ask about
+MAX_AVAILABILITY_BATCH = 50
+
+def availability_report(medicine_names: list, lookup) -> Dict[str, Any]:
+    """Per-medicine availability results, in request order, from `lookup(medicine_ids)`."""
+    medicine_names = [str(name) for name in medicine_names or []]
+    if not medicine_names:
+        return {
+            "success": False,
+            "message": "No medicines given"
+        }
+    if len(medicine_names) > MAX_AVAILABILITY_BATCH:
+        return {
+            "success": False,
+            "message": f"At most {MAX_AVAILABILITY_BATCH} medicines can be checked at once"
+        }
+
+    medicine_ids = [resolve_medicine_id(name) for name in medicine_names]
+    medicines = lookup(medicine_ids)
+    items = [
+        {"medicine_name": name, **availability_result(name, medicine_id, medicines.get(medicine_id))}
+        for name, medicine_id in zip(medicine_names, medicine_ids)
+    ]
+    in_stock = sum(1 for item in items if item["success"] and item["data"]["stock"] > 0)
+    return {
+        "success": True,
+        "data": items,
+        "message": f"{in_stock} of {len(items)} medicines in stock"
+    }
+
+def check_medicines_availability(medicine_names: list) -> Dict[str, Any]:
+    """Check a shopping list of medicines; everything the cache misses is read in one batch."""
+    try:
+        return availability_report(medicine_names, get_medicines)
+    except Exception as e:
+        return {
+            "success": False,
+            "message": f"Error checking medicines: {str(e)}"
+        }
+
+# Attempts per order before contention on a hot medicine is reported to the user
+ORDER_MAX_ATTEMPTS = 5
+# Orders summarized on the user document; the full history is listed from the orders collection
+RECENT_ORDERS_LIMIT = 5
+# Page size of list_my_orders, and the most one call may ask for
+ORDERS_PAGE_SIZE = 10
+MAX_ORDERS_PAGE_SIZE = 50
+ORDER_SUMMARY_FIELDS = ["order_id", "medicine_name", "quantity", "items", "total_price", "status", "created_at"]
+# Most line items one cart order may have
+MAX_CART_ITEMS = 20
+
+def plan_order(medicine_snapshot, user_snapshot, medicine_name: str, quantity: int, user_email: str) -> Dict[str, Any]:
+    """Decide an order from the medicine and user documents read in its transaction.
+
+    On success the result also has the `writes` to commit: the new `stock`,
+    the `order` document and the `user` document update, which is merged so
+    that a user without a document still orders.
+    """
+    if not medicine_snapshot.exists:
+        return {
+            "success": False,
+            "message": f"Medicine '{medicine_snapshot.id}' not found",
+            "missing": [medicine_snapshot.id]
+        }
+
+    medicine_dict = medicine_snapshot.to_dict()
+    stock = medicine_dict.get("stock", 0)
+    if stock < quantity:
+        return {
+            "success": False,
+            "message": f"Not enough stock. Available: {stock}"
+        }
+
+    order_id = str(uuid.uuid4())
+    unit_price = medicine_dict.get("unit_price", 0)
+    order_data = {
+        "order_id": order_id,
+        "user_email": user_email,
+        "medicine_name": medicine_name,
+        "quantity": quantity,
+        "unit_price": unit_price,
+        "total_price": quantity * unit_price,
+        "status": "pending",
+        "created_at": datetime.now(),
+        "updated_at": datetime.now()
+    }
+
+    return {
+        "success": True,
+        "order_id": order_id,
+        "data": order_data,
+        "message": f"Order placed successfully! Order ID: {order_id}",
+        "writes": {
+            "stock": stock - quantity,
+            "order": order_data,
+            "user": recent_orders_update(user_snapshot, order_data)
+        }
+    }
+
+def recent_orders_update(user_snapshot, order_data: Dict[str, Any]) -> Dict[str, Any]:
+    """The user document update that puts `order_data` first in its recent orders; the document may not exist."""
+    summary = {field: order_data[field] for field in ("order_id", "medicine_name", "quantity", "created_at")}
+    user_update = {"recent_orders": [summary, *(user_snapshot.get("recent_orders") or [])][:RECENT_ORDERS_LIMIT]}
+    if user_snapshot.get("orders") is not None:
+        # the unbounded order map of older accounts goes once they order again
+        user_update["orders"] = firestore.DELETE_FIELD
+    return user_update
+
+def _reserve_and_create_order(transaction, medicine_ref, user_ref, medicine_name: str, quantity: int, user_email: str) -> Dict[str, Any]:
+    """Check stock, decrement it, create the order and add it to the user's recent orders in one commit."""
+    # one batched read for both documents; results come back in any order
+    snapshots = {snapshot.reference.path: snapshot for snapshot in transaction.get_all([medicine_ref, user_ref])}
+    result = plan_order(snapshots[medicine_ref.path], snapshots[user_ref.path], medicine_name, quantity, user_email)
+    writes = result.pop("writes", None)
+    if writes:
+        transaction.update(medicine_ref, {"stock": writes["stock"]})
+        transaction.set(db.collection("orders").document(result["order_id"]), writes["order"])
+        transaction.set(user_ref, writes["user"], merge=True)
+    return result
+
 def place_order(medicine_name: str, quantity: int, user_email: str) -> Dict[str, Any]:
     try:
         if quantity <= 0:
@@ -44,144 +202,355 @@ def place_order(medicine_name: str, quantity: int, user_email: str) -> Dict[str,
                 "success": False,
                 "message": "Quantity must be positive"
             }
-        
-        availability = check_medicine_availability(medicine_name)
-        if not availability["success"]:
-            return availability
-        
-        medicine_data = availability["data"]
-        if medicine_data["stock"] < quantity:
+
+        # orders record the canonical id so cancellation restocks the right document
+        requested_name, medicine_name = medicine_name, order_medicine_id(medicine_name)
+        medicine_ref = db.collection("medicines").document(medicine_name)
+        user_ref = db.collection("users").document(user_email)
+        transaction = db.transaction(max_attempts=ORDER_MAX_ATTEMPTS)
+        # a fresh wrapper per call: the transactional decorator keeps retry ids on itself
+        reserve = firestore.transactional(_reserve_and_create_order)
+        result = suggest_missing(reserve(transaction, medicine_ref, user_ref, medicine_name, quantity, user_email),
+                                 {medicine_name: requested_name})
+        if result["success"]:
+            inventory_cache.invalidate(medicine_ref.id)
+            response_cache.invalidate(user_email)
+        orders.inc(action="place", outcome="placed" if result["success"] else "rejected")
+        return result
+    except ValueError as e:
+        orders.inc(action="place", outcome="contended")
+        return {
+            "success": False,
+            "message": f"The medicine is in high demand right now, please try again: {str(e)}"
+        }
+    except Exception as e:
+        orders.inc(action="place", outcome="error")
+        return {
+            "success": False,
+            "message": f"Error placing order: {str(e)}"
+        }
+
+def cart_lines(items: list) -> Dict[str, Any]:
+    """Validate cart line items and merge them per medicine.
+
+    `lines` maps medicine id to quantity and `names` maps it to the name the
+    user gave for it.
+    """
+    if not items:
+        return {
+            "success": False,
+            "message": "The cart is empty"
+        }
+    if len(items) > MAX_CART_ITEMS:
+        return {
+            "success": False,
+            "message": f"A cart order can have at most {MAX_CART_ITEMS} items"
+        }
+
+    lines: Dict[str, int] = {}
+    names: Dict[str, str] = {}
+    for item in items:
+        name = (item or {}).get("medicine_name")
+        quantity = (item or {}).get("quantity")
+        if not name or not isinstance(quantity, (int, float)) or quantity <= 0 or quantity != int(quantity):
             return {
                 "success": False,
-                "message": f"Not enough stock. Available: {medicine_data['stock']}"
+                "message": f"Each item needs a medicine_name and a positive whole quantity: {item}"
             }
-        
-        order_id = str(uuid.uuid4())
-        total_price = quantity * medicine_data["unit_price"]
-        
-        order_data = {
-            "order_id": order_id,
-            "user_email": user_email,
-            "medicine_name": medicine_name,
+        # orders record canonical ids so cancellation restocks the right documents
+        medicine_id = order_medicine_id(str(name))
+        lines[medicine_id] = lines.get(medicine_id, 0) + int(quantity)
+        names.setdefault(medicine_id, str(name))
+    return {
+        "success": True,
+        "lines": lines,
+        "names": names
+    }
+
+def plan_cart_order(medicine_snapshots: Dict[str, Any], user_snapshot, lines: Dict[str, int],
+                    user_email: str) -> Dict[str, Any]:
+    """Decide a cart order from the documents read in its transaction; every line or none.
+
+    `medicine_snapshots` maps medicine id to snapshot. On success the result
+    has the `writes` to commit: the new `stock` per medicine id, the `order`
+    document and the `user` document update, merged as in `plan_order`.
+    """
+    missing = [medicine_id for medicine_id in lines if not medicine_snapshots[medicine_id].exists]
+    if missing:
+        return {
+            "success": False,
+            "message": f"Medicines not found: {', '.join(missing)}",
+            "missing": missing
+        }
+
+    medicines = {medicine_id: medicine_snapshots[medicine_id].to_dict() for medicine_id in lines}
+    short = [f"{medicine_id} (available: {medicines[medicine_id].get('stock', 0)})"
+             for medicine_id, quantity in lines.items() if medicines[medicine_id].get("stock", 0) < quantity]
+    if short:
+        return {
+            "success": False,
+            "message": f"Not enough stock for {', '.join(short)}. Nothing was ordered"
+        }
+
+    items = []
+    for medicine_id, quantity in lines.items():
+        unit_price = medicines[medicine_id].get("unit_price", 0)
+        items.append({
+            "medicine_name": medicine_id,
             "quantity": quantity,
-            "unit_price": medicine_data["unit_price"],
-            "total_price": total_price,
-            "status": "pending",
-            "created_at": datetime.now(),
-            "updated_at": datetime.now()
+            "unit_price": unit_price,
+            "total_price": quantity * unit_price
+        })
+
+    order_id = str(uuid.uuid4())
+    order_data = {
+        "order_id": order_id,
+        "user_email": user_email,
+        "items": items,
+        # summary fields, so order listings and tracking read like single orders
+        "medicine_name": ", ".join(item["medicine_name"] for item in items),
+        "quantity": sum(item["quantity"] for item in items),
+        "total_price": sum(item["total_price"] for item in items),
+        "status": "pending",
+        "created_at": datetime.now(),
+        "updated_at": datetime.now()
+    }
+
+    return {
+        "success": True,
+        "order_id": order_id,
+        "data": order_data,
+        "message": f"Order placed successfully! Order ID: {order_id}",
+        "writes": {
+            "stock": {medicine_id: medicines[medicine_id].get("stock", 0) - quantity
+                      for medicine_id, quantity in lines.items()},
+            "order": order_data,
+            "user": recent_orders_update(user_snapshot, order_data)
         }
-        
-        new_stock = medicine_data["stock"] - quantity
-        name = medicine_name.lower().replace(' ', '_')
-        db.collection("medicines").document(name).update({"stock": new_stock})
-        db.collection("orders").document(order_id).set(order_data)
-        
+    }
+
+def _reserve_cart(transaction, medicine_refs, user_ref, lines: Dict[str, int], user_email: str) -> Dict[str, Any]:
+    """Check and decrement the stock of every line, create the order and update the user in one commit."""
+    snapshots = {snapshot.reference.path: snapshot
+                 for snapshot in transaction.get_all([*medicine_refs.values(), user_ref])}
+    result = plan_cart_order({medicine_id: snapshots[ref.path] for medicine_id, ref in medicine_refs.items()},
+                             snapshots[user_ref.path], lines, user_email)
+    writes = result.pop("writes", None)
+    if writes:
+        for medicine_id, stock in writes["stock"].items():
+            transaction.update(medicine_refs[medicine_id], {"stock": stock})
+        transaction.set(db.collection("orders").document(result["order_id"]), writes["order"])
+        transaction.set(user_ref, writes["user"], merge=True)
+    return result
+
+def place_cart_order(items: list, user_email: str) -> Dict[str, Any]:
+    """Order several medicines at once: `items` is a list of `{"medicine_name", "quantity"}`.
+
+    Stock for all lines is reserved in one transaction, so either every line
+    is ordered or nothing is, and the order is a single document with `items`.
+    """
+    try:
+        cart = cart_lines(items)
+        if not cart["success"]:
+            orders.inc(action="place_cart", outcome="rejected")
+            return cart
+
+        lines = cart["lines"]
+        medicines_ref = db.collection("medicines")
+        medicine_refs = {medicine_id: medicines_ref.document(medicine_id) for medicine_id in lines}
         user_ref = db.collection("users").document(user_email)
-        user_ref.update({f"orders.{order_id}": medicine_name})
-        
+        transaction = db.transaction(max_attempts=ORDER_MAX_ATTEMPTS)
+        reserve = firestore.transactional(_reserve_cart)
+        result = suggest_missing(reserve(transaction, medicine_refs, user_ref, lines, user_email), cart["names"])
+        if result["success"]:
+            for medicine_id in lines:
+                inventory_cache.invalidate(medicine_id)
+            response_cache.invalidate(user_email)
+        orders.inc(action="place_cart", outcome="placed" if result["success"] else "rejected")
+        return result
+    except ValueError as e:
+        orders.inc(action="place_cart", outcome="contended")
         return {
-            "success": True,
-            "order_id": order_id,
-            "data": order_data,
-            "message": f"Order placed successfully! Order ID: {order_id}"
+            "success": False,
+            "message": f"These medicines are in high demand right now, please try again: {str(e)}"
         }
     except Exception as e:
+        orders.inc(action="place_cart", outcome="error")
         return {
             "success": False,
             "message": f"Error placing order: {str(e)}"
         }
 
-def track_order(order_id: str, user_email: str) -> Dict[str, Any]:
-    try:
-        order_ref = db.collection("orders").document(order_id)
-        order_data = order_ref.get()
-        
-        if not order_data.exists:
-            return {
-                "success": False,
-                "message": "Order not found"
-            }
-        
-        order_dict = order_data.to_dict()
-        
-        if order_dict["user_email"] != user_email:
-            return {
-                "success": False,
-                "message": "This order doesn't belong to you"
-            }
-        
+def tracking_result(order_data, user_email: str) -> Dict[str, Any]:
+    if not order_data.exists:
+        return {
+            "success": False,
+            "message": "Order not found"
+        }
+
+    order_dict = order_data.to_dict()
+
+    if order_dict["user_email"] != user_email:
         return {
-            "success": True,
-            "data": order_dict,
-            "message": f"Order status: {order_dict.get('status', 'unknown')}"
+            "success": False,
+            "message": "This order doesn't belong to you"
         }
+
+    return {
+        "success": True,
+        "data": order_dict,
+        "message": f"Order status: {order_dict.get('status', 'unknown')}"
+    }
+
+def track_order(order_id: str, user_email: str) -> Dict[str, Any]:
+    try:
+        return tracking_result(db.collection("orders").document(order_id).get(), user_email)
     except Exception as e:
         return {
             "success": False,
             "message": f"Error tracking order: {str(e)}"
         }
 
-def cancel_order(order_id: str, user_email: str) -> Dict[str, Any]:
+def orders_page_query(orders_ref, user_email: str):
+    return (
+        orders_ref.where("user_email", "==", user_email)
+        .order_by("created_at", direction="DESCENDING")
+        .select(ORDER_SUMMARY_FIELDS)
+    )
+
+def valid_cursor(cursor_snapshot, user_email: str) -> bool:
+    return cursor_snapshot.exists and cursor_snapshot.get("user_email") == user_email
+
+def orders_page(rows, limit: int) -> Dict[str, Any]:
+    has_more = len(rows) > limit
+    page = rows[:limit]
+    return {
+        "success": True,
+        "data": {
+            "orders": page,
+            "next_cursor": page[-1]["order_id"] if has_more else None
+        },
+        "message": f"Found {len(page)} orders" + (", more are available" if has_more else "")
+    }
+
+def list_my_orders(user_email: str, limit: int = ORDERS_PAGE_SIZE, cursor: Optional[str] = None) -> Dict[str, Any]:
+    """One page of the user's orders, newest first.
+
+    Served by the composite index on (user_email, created_at desc) in
+    firestore.indexes.json. Pass the returned `next_cursor` to get the next
+    page; it is None on the last one.
+    """
     try:
-        track_result = track_order(order_id, user_email)
-        if not track_result["success"]:
-            return track_result
-        
-        order_data = track_result["data"]
-        
-        if order_data["status"].lower() not in ["pending", "processing"]:
-            return {
-                "success": False,
-                "message": f"Cannot cancel order with status: {order_data['status']}"
-            }
-        
-        db.collection("orders").document(order_id).update({
+        limit = max(1, min(int(limit), MAX_ORDERS_PAGE_SIZE))
+        orders_ref = db.collection("orders")
+        query = orders_page_query(orders_ref, user_email)
+        if cursor:
+            cursor_snapshot = orders_ref.document(cursor).get()
+            if not valid_cursor(cursor_snapshot, user_email):
+                return {
+                    "success": False,
+                    "message": "Invalid cursor"
+                }
+            query = query.start_after(cursor_snapshot)
+
+        # one extra order tells whether there is another page
+        return orders_page([snapshot.to_dict() for snapshot in query.limit(limit + 1).stream()], limit)
+    except Exception as e:
+        return {
+            "success": False,
+            "message": f"Error listing orders: {str(e)}"
+        }
+
+def cancellable(order_data: Dict[str, Any]) -> bool:
+    return order_data["status"].lower() in ["pending", "processing"]
+
+def order_lines(order_data: Dict[str, Any]) -> Dict[str, int]:
+    """Medicine id to quantity for every line of an order; orders before carts have one line."""
+    lines: Dict[str, int] = {}
+    for item in order_data.get("items") or [order_data]:
+        medicine_id = item["medicine_name"].lower().replace(' ', '_')
+        lines[medicine_id] = lines.get(medicine_id, 0) + item["quantity"]
+    return lines
+
+def plan_cancel(order_snapshot, order_id: str, user_email: str) -> Dict[str, Any]:
+    """Decide a cancellation from the order read in its transaction; on success `restock` has the lines to restore."""
+    result = tracking_result(order_snapshot, user_email)
+    if not result["success"]:
+        return result
+
+    order_data = result["data"]
+    if not cancellable(order_data):
+        return {
+            "success": False,
+            "message": f"Cannot cancel order with status: {order_data['status']}"
+        }
+
+    return {
+        "success": True,
+        "message": f"Order {order_id} cancelled successfully",
+        "restock": order_lines(order_data)
+    }
+
+def _cancel_and_restock(transaction, order_ref, user_email: str) -> Dict[str, Any]:
+    """Mark the order cancelled and put every line back in stock in one commit."""
+    result = plan_cancel(order_ref.get(transaction=transaction), order_ref.id, user_email)
+    restock = result.get("restock")
+    if restock:
+        transaction.update(order_ref, {
             "status": "cancelled",
             "updated_at": datetime.now()
         })
-        
-        medicine_name = order_data["medicine_name"]
-        quantity = order_data["quantity"]
-        
-        medicine_ref = db.collection("medicines").document(medicine_name.lower().replace(' ', '_'))
-        medicine_ref.update({"stock": firestore.Increment(quantity)})
-        
-        return {
-            "success": True,
-            "message": f"Order {order_id} cancelled successfully"
-        }
+        medicines_ref = db.collection("medicines")
+        for medicine_id, quantity in restock.items():
+            transaction.update(medicines_ref.document(medicine_id), {"stock": firestore.Increment(quantity)})
+    return result
+
+def cancel_order(order_id: str, user_email: str) -> Dict[str, Any]:
+    try:
+        transaction = db.transaction(max_attempts=ORDER_MAX_ATTEMPTS)
+        cancel = firestore.transactional(_cancel_and_restock)
+        result = cancel(transaction, db.collection("orders").document(order_id), user_email)
+        for medicine_id in result.pop("restock", None) or []:
+            inventory_cache.invalidate(medicine_id)
+        if result["success"]:
+            response_cache.invalidate(user_email)
+        orders.inc(action="cancel", outcome="cancelled" if result["success"] else "rejected")
+        return result
     except Exception as e:
+        orders.inc(action="cancel", outcome="error")
         return {
             "success": False,
             "message": f"Error cancelling order: {str(e)}"
         }
 
+def health_context(user_data: Optional[Dict[str, Any]], symptoms: Optional[str]) -> Dict[str, Any]:
+    if not user_data:
+        return {
+            "success": False,
+            "message": "User data not found"
+        }
+
+    recent_orders = user_data.get("recent_orders") or []
+    context = {
+        "user": {
+            "name": user_data.get("name"),
+            "age": user_data.get("age"),
+            "order_history": [order["medicine_name"] for order in recent_orders]
+            or list(user_data.get("orders", {}).values())
+        },
+        "symptoms": symptoms
+    }
+
+    return {
+        "success": True,
+        "data": context,
+        "message": "Context collected for health advice"
+    }
+
 def get_health_advice(user_email: str, symptoms: Optional[str] = None) -> Dict[str, Any]:
     try:
         user_ref = db.collection("users").document(user_email)
-        user_data = user_ref.get().to_dict()
-        
-        if not user_data:
-            return {
-                "success": False,
-                "message": "User data not found"
-            }
-        
-        orders = user_data.get("orders", {})
-        context = {
-            "user": {
-                "name": user_data.get("name"),
-                "age": user_data.get("age"),
-                "order_history": list(orders.values())
-            },
-            "symptoms": symptoms
-        }
-        
-        return {
-            "success": True,
-            "data": context,
-            "message": "Context collected for health advice"
-        }
+        return health_context(user_ref.get().to_dict(), symptoms)
     except Exception as e:
         return {
             "success": False,
@@ -0,0 +1,274 @@
+# scripts/user_functions_async.py
+
+"""Coroutine versions of the user tool functions on the Firestore AsyncClient.
+
+Each returns exactly what its namesake in scripts/user_functions.py returns;
+the decisions themselves (stock checks, ownership, paging) are the shared
+helpers from that module, only the I/O is awaited. Awaiting lets the calls
+of one model turn, and the independent reads and writes inside a call,
+overlap on one thread instead of each holding a pool thread while it waits.
+
+They must run on the shared loop of scripts/event_loop.py; synchronous
+callers go through its facade, and the synchronous helpers that can block
+(the medicine index, the SQLite response cache) are awaited off the loop:
+
+    event_loop.run(place_order_async("paracetamol", 2, user_email))
+"""
+
+import asyncio
+from datetime import datetime
+from typing import Any, Dict, List, Optional
+
+from firebase_admin import firestore
+from google.cloud.firestore_v1.async_transaction import async_transactional
+
+from firebase.db_manager import async_db
+from firebase.inventory_cache import GET_ALL_CHUNK_SIZE, inventory_cache
+from firebase.inventory_mirror import get_medicine_async, get_medicines_async
+from scripts.event_loop import run_blocking
+from scripts.metrics import orders
+from scripts.response_cache import response_cache
+from scripts.user_functions import (
+    MAX_AVAILABILITY_BATCH,
+    MAX_ORDERS_PAGE_SIZE,
+    ORDER_MAX_ATTEMPTS,
+    ORDERS_PAGE_SIZE,
+    availability_report,
+    availability_result,
+    cart_lines,
+    health_context,
+    order_medicine_id,
+    orders_page,
+    orders_page_query,
+    plan_cancel,
+    plan_cart_order,
+    plan_order,
+    resolve_medicine_id,
+    suggest_missing,
+    tracking_result,
+    valid_cursor,
+)
+
+
+async def _load_medicine(medicine_id: str) -> Optional[Dict[str, Any]]:
+    snapshot = await async_db.collection("medicines").document(medicine_id).get()
+    return snapshot.to_dict() if snapshot.exists else None
+
+
+async def check_medicine_availability_async(medicine_name: str) -> Dict[str, Any]:
+    try:
+        medicine_id = await run_blocking(resolve_medicine_id, medicine_name)
+        return availability_result(medicine_name, medicine_id, await get_medicine_async(medicine_id, _load_medicine))
+    except Exception as e:
+        return {
+            "success": False,
+            "message": f"Error checking medicine: {str(e)}"
+        }
+
+
+async def _load_medicines(medicine_ids: List[str]) -> Dict[str, Optional[Dict[str, Any]]]:
+    collection = async_db.collection("medicines")
+    chunks = [medicine_ids[start:start + GET_ALL_CHUNK_SIZE]
+              for start in range(0, len(medicine_ids), GET_ALL_CHUNK_SIZE)]
+
+    async def load(chunk):
+        references = [collection.document(medicine_id) for medicine_id in chunk]
+        return [snapshot async for snapshot in async_db.get_all(references)]
+
+    # the chunks of a long list are read concurrently
+    loaded = {}
+    for snapshots in await asyncio.gather(*(load(chunk) for chunk in chunks)):
+        for snapshot in snapshots:
+            loaded[snapshot.id] = snapshot.to_dict() if snapshot.exists else None
+    return loaded
+
+
+async def check_medicines_availability_async(medicine_names: list) -> Dict[str, Any]:
+    try:
+        names = [str(name) for name in medicine_names or []]
+        medicines = {}
+        if 0 < len(names) <= MAX_AVAILABILITY_BATCH:
+            medicine_ids = await run_blocking(lambda: [resolve_medicine_id(name) for name in names])
+            medicines = await get_medicines_async(medicine_ids, _load_medicines)
+        return availability_report(names, lambda medicine_ids: medicines)
+    except Exception as e:
+        return {
+            "success": False,
+            "message": f"Error checking medicines: {str(e)}"
+        }
+
+
+async def _reserve_and_create_order(transaction, medicine_ref, user_ref, medicine_name: str, quantity: int,
+                                    user_email: str) -> Dict[str, Any]:
+    # AsyncTransaction.get_all is broken in google-cloud-firestore; the client's takes the transaction
+    snapshots = {snapshot.reference.path: snapshot
+                 async for snapshot in async_db.get_all([medicine_ref, user_ref], transaction=transaction)}
+    result = plan_order(snapshots[medicine_ref.path], snapshots[user_ref.path], medicine_name, quantity, user_email)
+    writes = result.pop("writes", None)
+    if writes:
+        transaction.update(medicine_ref, {"stock": writes["stock"]})
+        transaction.set(async_db.collection("orders").document(result["order_id"]), writes["order"])
+        transaction.set(user_ref, writes["user"], merge=True)
+    return result
+
+
+async def place_order_async(medicine_name: str, quantity: int, user_email: str) -> Dict[str, Any]:
+    try:
+        if quantity <= 0:
+            return {
+                "success": False,
+                "message": "Quantity must be positive"
+            }
+
+        requested_name, medicine_name = medicine_name, await run_blocking(order_medicine_id, medicine_name)
+        medicine_ref = async_db.collection("medicines").document(medicine_name)
+        user_ref = async_db.collection("users").document(user_email)
+        transaction = async_db.transaction(max_attempts=ORDER_MAX_ATTEMPTS)
+        reserve = async_transactional(_reserve_and_create_order)
+        result = await reserve(transaction, medicine_ref, user_ref, medicine_name, quantity, user_email)
+        if "missing" in result:
+            result = await run_blocking(suggest_missing, result, {medicine_name: requested_name})
+        if result["success"]:
+            inventory_cache.invalidate(medicine_ref.id)
+            await run_blocking(response_cache.invalidate, user_email)
+        orders.inc(action="place", outcome="placed" if result["success"] else "rejected")
+        return result
+    except ValueError as e:
+        orders.inc(action="place", outcome="contended")
+        return {
+            "success": False,
+            "message": f"The medicine is in high demand right now, please try again: {str(e)}"
+        }
+    except Exception as e:
+        orders.inc(action="place", outcome="error")
+        return {
+            "success": False,
+            "message": f"Error placing order: {str(e)}"
+        }
+
+
+async def _reserve_cart(transaction, medicine_refs, user_ref, lines: Dict[str, int], user_email: str) -> Dict[str, Any]:
+    snapshots = {snapshot.reference.path: snapshot
+                 async for snapshot in async_db.get_all([*medicine_refs.values(), user_ref], transaction=transaction)}
+    result = plan_cart_order({medicine_id: snapshots[ref.path] for medicine_id, ref in medicine_refs.items()},
+                             snapshots[user_ref.path], lines, user_email)
+    writes = result.pop("writes", None)
+    if writes:
+        for medicine_id, stock in writes["stock"].items():
+            transaction.update(medicine_refs[medicine_id], {"stock": stock})
+        transaction.set(async_db.collection("orders").document(result["order_id"]), writes["order"])
+        transaction.set(user_ref, writes["user"], merge=True)
+    return result
+
+
+async def place_cart_order_async(items: list, user_email: str) -> Dict[str, Any]:
+    try:
+        cart = await run_blocking(cart_lines, items)
+        if not cart["success"]:
+            orders.inc(action="place_cart", outcome="rejected")
+            return cart
+
+        lines = cart["lines"]
+        medicines_ref = async_db.collection("medicines")
+        medicine_refs = {medicine_id: medicines_ref.document(medicine_id) for medicine_id in lines}
+        user_ref = async_db.collection("users").document(user_email)
+        transaction = async_db.transaction(max_attempts=ORDER_MAX_ATTEMPTS)
+        reserve = async_transactional(_reserve_cart)
+        result = await reserve(transaction, medicine_refs, user_ref, lines, user_email)
+        if "missing" in result:
+            result = await run_blocking(suggest_missing, result, cart["names"])
+        if result["success"]:
+            for medicine_id in lines:
+                inventory_cache.invalidate(medicine_id)
+            await run_blocking(response_cache.invalidate, user_email)
+        orders.inc(action="place_cart", outcome="placed" if result["success"] else "rejected")
+        return result
+    except ValueError as e:
+        orders.inc(action="place_cart", outcome="contended")
+        return {
+            "success": False,
+            "message": f"These medicines are in high demand right now, please try again: {str(e)}"
+        }
+    except Exception as e:
+        orders.inc(action="place_cart", outcome="error")
+        return {
+            "success": False,
+            "message": f"Error placing order: {str(e)}"
+        }
+
+
+async def track_order_async(order_id: str, user_email: str) -> Dict[str, Any]:
+    try:
+        return tracking_result(await async_db.collection("orders").document(order_id).get(), user_email)
+    except Exception as e:
+        return {
+            "success": False,
+            "message": f"Error tracking order: {str(e)}"
+        }
+
+
+async def list_my_orders_async(user_email: str, limit: int = ORDERS_PAGE_SIZE,
+                               cursor: Optional[str] = None) -> Dict[str, Any]:
+    try:
+        limit = max(1, min(int(limit), MAX_ORDERS_PAGE_SIZE))
+        orders_ref = async_db.collection("orders")
+        query = orders_page_query(orders_ref, user_email)
+        if cursor:
+            cursor_snapshot = await orders_ref.document(cursor).get()
+            if not valid_cursor(cursor_snapshot, user_email):
+                return {
+                    "success": False,
+                    "message": "Invalid cursor"
+                }
+            query = query.start_after(cursor_snapshot)
+
+        return orders_page([snapshot.to_dict() async for snapshot in query.limit(limit + 1).stream()], limit)
+    except Exception as e:
+        return {
+            "success": False,
+            "message": f"Error listing orders: {str(e)}"
+        }
+
+
+async def _cancel_and_restock(transaction, order_ref, user_email: str) -> Dict[str, Any]:
+    result = plan_cancel(await order_ref.get(transaction=transaction), order_ref.id, user_email)
+    restock = result.get("restock")
+    if restock:
+        transaction.update(order_ref, {
+            "status": "cancelled",
+            "updated_at": datetime.now()
+        })
+        medicines_ref = async_db.collection("medicines")
+        for medicine_id, quantity in restock.items():
+            transaction.update(medicines_ref.document(medicine_id), {"stock": firestore.Increment(quantity)})
+    return result
+
+
+async def cancel_order_async(order_id: str, user_email: str) -> Dict[str, Any]:
+    try:
+        transaction = async_db.transaction(max_attempts=ORDER_MAX_ATTEMPTS)
+        cancel = async_transactional(_cancel_and_restock)
+        result = await cancel(transaction, async_db.collection("orders").document(order_id), user_email)
+        for medicine_id in result.pop("restock", None) or []:
+            inventory_cache.invalidate(medicine_id)
+        if result["success"]:
+            await run_blocking(response_cache.invalidate, user_email)
+        orders.inc(action="cancel", outcome="cancelled" if result["success"] else "rejected")
+        return result
+    except Exception as e:
+        orders.inc(action="cancel", outcome="error")
+        return {
+            "success": False,
+            "message": f"Error cancelling order: {str(e)}"
+        }
+
+
+async def get_health_advice_async(user_email: str, symptoms: Optional[str] = None) -> Dict[str, Any]:
+    try:
+        user_snapshot = await async_db.collection("users").document(user_email).get()
+        return health_context(user_snapshot.to_dict(), symptoms)
+    except Exception as e:
+        return {
+            "success": False,
+            "message": f"Error getting health advice: {str(e)}"
+        }
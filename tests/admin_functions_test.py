@@ -0,0 +1,131 @@
+# tests/admin_functions_test.py
+
+import random
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+from firebase.medicine_index import medicine_index
+from scripts.admin_functions import add_medicine, add_stock, delete_medicine, stock_out, update_order_status
+from scripts.user_functions import cancel_order, place_order
+
+
+def seed_medicine(db, stock=10):
+    db.seed("medicines", "paracetamol", {"name": "paracetamol", "stock": stock, "unit_price": 1})
+
+
+def test_add_medicine_is_one_create(db):
+    result = add_medicine("Vitamin C", unit_price=3, stock=40)
+
+    assert result["success"]
+    assert db.data("medicines/vitamin_c")["stock"] == 40
+    assert db.rpc_counts == {"create": 1}
+    assert medicine_index.resolve("vitamin c") == "vitamin_c"
+
+
+def test_add_medicine_never_overwrites_an_existing_one(db):
+    seed_medicine(db, stock=7)
+
+    result = add_medicine("paracetamol", stock=100)
+
+    assert not result["success"]
+    assert "already exists" in result["error"]
+    assert db.data("medicines/paracetamol")["stock"] == 7
+    assert db.rpc_counts == {"create": 1}
+
+
+def test_delete_medicine_is_one_delete_with_a_precondition(db):
+    seed_medicine(db)
+
+    assert delete_medicine("Paracetamol")["success"]
+    assert db.data("medicines/paracetamol") is None
+    assert db.rpc_counts == {"delete": 1}
+
+
+def test_update_order_status(db):
+    db.seed("orders", "order-1", {"status": "pending"})
+
+    assert update_order_status("order-1", "shipped")["success"]
+    assert db.data("orders/order-1")["status"] == "shipped"
+    assert db.rpc_counts == {"update": 1}
+
+
+def test_update_order_status_rejects_statuses_the_dashboard_does_not_count(db):
+    db.seed("orders", "order-1", {"status": "pending"})
+
+    assert update_order_status("order-1", " Delivered ")["success"]
+    assert db.data("orders/order-1")["status"] == "delivered"
+
+    result = update_order_status("order-1", "completed")
+    assert not result["success"]
+    assert "completed" in result["error"]
+    assert db.data("orders/order-1")["status"] == "delivered"
+
+
+def test_update_unknown_order_is_reported_without_creating_it(db):
+    result = update_order_status("order-404", "shipped")
+
+    assert result == {"success": False, "error": "Order order-404 not found"}
+    assert db.data("orders/order-404") is None
+
+
+def test_add_stock_is_one_update(db):
+    seed_medicine(db)
+
+    result = add_stock("Paracetamol", 5)
+
+    assert result["success"]
+    assert db.data("medicines/paracetamol")["stock"] == 15
+    assert db.rpc_counts == {"update": 1}
+
+
+def test_add_stock_rejects_bad_quantities(db):
+    seed_medicine(db)
+
+    assert not add_stock("paracetamol", 0)["success"]
+    assert not add_stock("paracetamol", 2.5)["success"]
+    assert db.data("medicines/paracetamol")["stock"] == 10
+
+
+def test_stock_out_is_one_update(db):
+    seed_medicine(db)
+
+    assert stock_out("paracetamol")["success"]
+    assert db.data("medicines/paracetamol")["stock"] == 0
+    assert db.rpc_counts == {"update": 1}
+
+
+@pytest.mark.parametrize("mutation", [stock_out, lambda name: add_stock(name, 1), delete_medicine])
+def test_mutations_of_unknown_medicines_write_nothing(db, mutation):
+    result = mutation("unknownium")
+
+    assert not result["success"]
+    assert "not found" in result["error"].lower()
+    assert db.data("medicines/unknownium") is None
+    assert db.total_rpcs == 1
+
+
+def test_no_units_are_lost_under_parallel_orders_restocks_and_cancellations(db):
+    seed_medicine(db, stock=50)
+    db.seed("users", "abebe@example.com", {"name": "Abebe", "orders": {}})
+    db.latency = 0.001
+    operations = ["order"] * 120 + ["restock"] * 60
+    random.Random(3).shuffle(operations)
+
+    def run(operation):
+        if operation == "restock":
+            return operation, add_stock("paracetamol", 2)
+        result = place_order("paracetamol", 1, "abebe@example.com")
+        if result["success"] and random.random() < 0.25:
+            return "cancelled", cancel_order(result["order_id"], "abebe@example.com")
+        return operation, result
+
+    with ThreadPoolExecutor(max_workers=16) as pool:
+        results = list(pool.map(run, operations))
+
+    restocked = 2 * sum(1 for operation, result in results if operation == "restock" and result["success"])
+    ordered = sum(1 for operation, result in results if operation == "order" and result["success"])
+    assert restocked == 120
+    assert all(result["success"] for operation, result in results if operation == "cancelled")
+    assert db.data("medicines/paracetamol")["stock"] == 50 + restocked - ordered
+    assert db.data("medicines/paracetamol")["stock"] >= 0
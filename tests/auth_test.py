@@ -0,0 +1,88 @@
+# tests/auth_test.py
+
+import hashlib
+import logging
+
+import pytest
+
+from scripts.auth import LoginThrottle, SessionTokens, auth_secret, authenticate, hash_password, verify_password
+
+
+class ManualClock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+
+def test_legacy_sha256_hash_is_replaced_on_login(db):
+    legacy = hashlib.sha256(b"secret").hexdigest()
+    db.seed("users", "abebe@example.com", {"email": "abebe@example.com", "name": "Abebe", "age": 30,
+                                           "password": legacy, "recent_orders": []})
+
+    result = authenticate("users", "abebe@example.com", "secret", throttle=LoginThrottle())
+
+    assert result["success"]
+    assert result["user_data"] == {"email": "abebe@example.com", "name": "Abebe", "age": 30}
+    stored = db.data("users/abebe@example.com")["password"]
+    assert stored.startswith("scrypt$") and verify_password("secret", stored) == (True, False)
+    assert not authenticate("users", "abebe@example.com", "wrong", throttle=LoginThrottle())["success"]
+
+
+def test_salted_hashes_differ_and_only_match_their_password():
+    first, second = hash_password("secret", n=2 ** 10), hash_password("secret", n=2 ** 10)
+
+    assert first != second
+    # hashed with weaker parameters than configured: valid, and due for a rehash
+    assert verify_password("secret", first) == (True, True)
+    assert verify_password("Secret", first) == (False, False)
+    assert verify_password("secret", "scrypt$broken") == (False, False)
+
+
+def test_throttled_attempts_never_reach_firestore(db):
+    clock = ManualClock()
+    throttle = LoginThrottle(refill_seconds=30, clock=clock)
+    db.seed("admins", "admin@example.com", {"password": hash_password("secret")})
+
+    results = [authenticate("admins", "admin@example.com", "guess", "10.0.0.1", throttle=throttle) for _ in range(8)]
+
+    assert [result["message"] for result in results[:5]] == ["Invalid email or password"] * 5
+    assert all(result["message"].startswith("Too many login attempts") for result in results[5:])
+    assert db.rpc_counts["get"] == 5
+    clock.now += 30
+    assert authenticate("admins", "admin@example.com", "secret", "10.0.0.1", throttle=throttle)["success"]
+
+
+def test_one_address_cannot_spray_many_accounts():
+    throttle = LoginThrottle(refill_seconds=30, clock=ManualClock())
+
+    allowed = [throttle.acquire({f"email:user{n}@example.com": 5, "ip:10.0.0.9": 20}) == 0 for n in range(25)]
+
+    assert allowed == [True] * 20 + [False] * 5
+    assert throttle.acquire({"email:user0@example.com": 5, "ip:10.0.0.10": 20}) == 0
+
+
+def test_session_tokens_are_signed_scoped_and_expire():
+    clock = ManualClock()
+    tokens = SessionTokens(secret="test-secret", ttl=60, clock=clock)
+    token = tokens.issue("abebe@example.com", "users", {"name": "Abebe"})
+
+    assert tokens.verify(token, "users")["profile"] == {"name": "Abebe"}
+    assert tokens.verify(token, "admins") is None
+    assert SessionTokens(secret="other-secret", clock=clock).verify(token, "users") is None
+    payload, signature = token.split(".")
+    assert tokens.verify(payload[:-2] + "xx." + signature, "users") is None
+    clock.now += 61
+    assert tokens.verify(token, "users") is None
+
+
+def test_a_missing_auth_secret_stops_production_and_is_logged_elsewhere(caplog):
+    assert auth_secret("configured", "production") == "configured"
+    with pytest.raises(RuntimeError, match="AUTH_SECRET must be set"):
+        auth_secret(None, "production")
+
+    with caplog.at_level(logging.WARNING, logger="scripts.auth"):
+        first, second = auth_secret(None, "development"), auth_secret("", "development")
+    assert first != second and len(first) == 64
+    assert "AUTH_SECRET is not set" in caplog.text
@@ -0,0 +1,114 @@
+# tests/chat_history_test.py
+
+import threading
+from datetime import datetime
+
+from firebase.chat_history import ChatHistoryWriter, read_chat_history
+from scripts.migrate_chat_history import migrate_all
+
+
+def test_writer_appends_to_subcollection_and_keeps_repeated_prompts(db):
+    db.seed("users", "ann@example.com", {"name": "Ann", "orders": {}})
+    writer = ChatHistoryWriter(db)
+
+    for prompt in ["hi", "is insulin in stock?", "hi"]:
+        writer.append("ann@example.com", prompt)
+    assert writer.flush(timeout=2)
+
+    page = read_chat_history("ann@example.com", client=db)["data"]
+    assert [message["text"] for message in page["messages"]] == ["hi", "is insulin in stock?", "hi"][::-1]
+    assert "chat_history" not in db.data("users/ann@example.com")
+    assert writer.written == 3
+
+
+class GatedClient:
+    """Passes through to the fake db, holding every commit until `release` is set."""
+
+    def __init__(self, db):
+        self.db = db
+        self.release = threading.Event()
+
+    def collection(self, name):
+        return self.db.collection(name)
+
+    def batch(self):
+        batch, release = self.db.batch(), self.release
+
+        class GatedBatch:
+            def set(self, reference, data):
+                batch.set(reference, data)
+
+            def commit(self):
+                release.wait(2)
+                return batch.commit()
+
+        return GatedBatch()
+
+
+def test_append_does_not_wait_for_firestore(db):
+    client = GatedClient(db)
+    writer = ChatHistoryWriter(client)
+
+    writer.append("ann@example.com", "hello")
+    assert not writer.flush(timeout=0.05)
+
+    client.release.set()
+    assert writer.flush(timeout=2)
+    assert db.rpc_counts["commit"] == 1
+
+
+def test_messages_queued_during_a_write_are_committed_together(db):
+    client = GatedClient(db)
+    writer = ChatHistoryWriter(client, batch_size=50)
+
+    writer.append("ann@example.com", "first")
+    for number in range(120):
+        writer.append("bob@example.com", f"prompt {number}")
+    client.release.set()
+
+    assert writer.flush(timeout=2)
+    # the first commit may or may not include some of the prompts queued behind it
+    assert db.rpc_counts["commit"] <= 1 + 3
+    assert writer.written == 121
+
+
+def test_reader_pages_newest_first(db):
+    history = db.collection("users").document("ann@example.com").collection("chat_history")
+    for minute in range(5):
+        history.document(f"m{minute}").set({"text": f"prompt {minute}", "role": "user",
+                                             "created_at": datetime(2025, 1, 1, 12, minute)})
+
+    first = read_chat_history("ann@example.com", page_size=2, client=db)["data"]
+    second = read_chat_history("ann@example.com", page_size=2, cursor=first["next_cursor"], client=db)["data"]
+    last = read_chat_history("ann@example.com", page_size=2, cursor=second["next_cursor"], client=db)["data"]
+
+    assert [m["id"] for m in first["messages"]] == ["m4", "m3"]
+    assert [m["id"] for m in second["messages"]] == ["m2", "m1"]
+    assert [m["id"] for m in last["messages"]] == ["m0"]
+    assert last["next_cursor"] is None
+    assert not read_chat_history("ann@example.com", cursor="missing", client=db)["success"]
+
+
+def test_migration_moves_array_in_order_and_is_idempotent(db):
+    db.seed("users", "ann@example.com", {"name": "Ann", "created_at": datetime(2025, 1, 1),
+                                         "chat_history": [f"prompt {n}" for n in range(7)]})
+    db.seed("users", "bob@example.com", {"name": "Bob"})
+
+    report = migrate_all(client=db, batch_size=3)
+
+    assert report == {"users": 2, "migrated_users": 1, "messages": 7}
+    assert "chat_history" not in db.data("users/ann@example.com")
+    page = read_chat_history("ann@example.com", page_size=10, client=db)["data"]
+    assert [m["text"] for m in page["messages"]] == [f"prompt {n}" for n in reversed(range(7))]
+
+    assert migrate_all(client=db)["messages"] == 0
+    assert len(read_chat_history("ann@example.com", page_size=10, client=db)["data"]["messages"]) == 7
+
+
+def test_migration_dry_run_writes_nothing(db):
+    db.seed("users", "ann@example.com", {"name": "Ann", "chat_history": ["a", "b"]})
+    db.rpc_counts.clear()
+
+    assert migrate_all(client=db, dry_run=True)["messages"] == 2
+    assert db.rpc_counts["commit"] == 0
+    assert db.data("users/ann@example.com")["chat_history"] == ["a", "b"]
@@ -0,0 +1,77 @@
+# tests/chat_sessions_test.py
+
+from google.genai import types
+
+from tests.fake_genai import FakeGenaiClient
+from scripts.chat_sessions import USER_TOOL_CONFIG, ChatSessionManager, estimate_tokens, trim_history
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+def text_turn(role, text):
+    return types.Content(role=role, parts=[types.Part(text=text)])
+
+
+def test_session_keeps_one_chat_and_sees_previous_turns():
+    client = FakeGenaiClient()
+    sessions = ChatSessionManager(USER_TOOL_CONFIG)
+
+    sessions.chat("abc", client).send_message("do you have insulin?")
+    sessions.chat("abc", client).send_message("and its price?")
+
+    assert client.chats_created == 1
+    assert [content.role for content in client.requests[-1]["contents"]] == ["user", "model", "user"]
+
+
+def test_sessions_are_isolated():
+    client = FakeGenaiClient()
+    sessions = ChatSessionManager(USER_TOOL_CONFIG)
+
+    assert sessions.chat("guest-1", client) is not sessions.chat("guest-2", client)
+
+
+def test_history_is_trimmed_to_the_token_budget():
+    client = FakeGenaiClient(final_text="x" * 400)
+    sessions = ChatSessionManager(USER_TOOL_CONFIG, max_history_tokens=300)
+
+    for turn in range(10):
+        sessions.chat("abc", client).send_message(f"question {turn}")
+        sessions.trim("abc", client)
+
+    history = sessions.chat("abc", client).get_history()
+    assert estimate_tokens(history) <= 300
+    assert history[0].role == "user"
+    assert history[-1].parts[0].text == "x" * 400
+
+
+def test_trim_never_starts_on_a_function_response():
+    call = types.Content(role="model", parts=[types.Part(function_call=types.FunctionCall(name="track_order", args={}))])
+    reply = types.Content(role="user", parts=[types.Part.from_function_response(name="track_order", response={"result": {}})])
+    history = [text_turn("user", "a" * 400), call, reply, text_turn("model", "done"), text_turn("user", "next"), text_turn("model", "ok")]
+
+    trimmed = trim_history(history, estimate_tokens(history) - 10)
+
+    assert trimmed == history[4:]
+
+
+def test_idle_and_excess_sessions_are_evicted():
+    client = FakeGenaiClient()
+    clock = FakeClock()
+    sessions = ChatSessionManager(USER_TOOL_CONFIG, idle_ttl=60, max_sessions=2, clock=clock)
+
+    sessions.chat("a", client)
+    clock.now = 30
+    sessions.chat("b", client)
+    clock.now = 61
+    sessions.chat("b", client)
+    assert len(sessions) == 1
+
+    sessions.chat("c", client)
+    sessions.chat("d", client)
+    assert len(sessions) == 2
@@ -0,0 +1,70 @@
+# tests/check_medicines_availability_test.py
+
+from firebase import inventory_cache as cache_module
+from scripts import event_loop
+from scripts.user_functions import MAX_AVAILABILITY_BATCH, check_medicine_availability, check_medicines_availability
+from scripts.user_functions_async import check_medicines_availability_async
+
+NAMES = ["paracetamol", "insulin", "doxycycline", "morphine"]
+
+
+def seed(db, names=NAMES):
+    for stock, name in enumerate(names):
+        db.seed("medicines", name, {"name": name, "stock": stock, "unit_price": 1})
+
+
+def test_a_shopping_list_is_one_batched_read(db):
+    seed(db)
+
+    result = check_medicines_availability(["Paracetamol", "insulin", "doxycycline", "morphine", "unknownium"])
+
+    assert db.rpc_counts["batch_get"] == 1
+    assert db.rpc_counts["get"] == 0
+    assert result["success"]
+    assert [item["medicine_name"] for item in result["data"]] == ["Paracetamol", "insulin", "doxycycline", "morphine",
+                                                                   "unknownium"]
+    assert [item["data"]["stock"] for item in result["data"][:4]] == [0, 1, 2, 3]
+    assert not result["data"][4]["success"]
+    assert result["message"] == "3 of 5 medicines in stock"
+
+
+def test_items_match_the_single_medicine_tool(db):
+    seed(db)
+
+    items = check_medicines_availability(["insulin", "unknownium"])["data"]
+
+    for item in items:
+        assert {key: value for key, value in item.items() if key != "medicine_name"} == \
+            check_medicine_availability(item["medicine_name"])
+
+
+def test_cached_medicines_are_not_read_again(db):
+    seed(db)
+    check_medicine_availability("insulin")
+
+    check_medicines_availability(NAMES)
+    check_medicines_availability(NAMES)
+
+    assert (db.rpc_counts["get"], db.rpc_counts["batch_get"]) == (1, 1)
+
+
+def test_long_lists_are_read_in_chunks(db, monkeypatch):
+    names = [f"drug{chr(97 + n // 26)}{chr(97 + n % 26)}" for n in range(MAX_AVAILABILITY_BATCH)]
+    seed(db, names)
+    monkeypatch.setattr(cache_module, "GET_ALL_CHUNK_SIZE", 20)
+
+    result = check_medicines_availability(names)
+
+    assert db.rpc_counts["batch_get"] == 3
+    assert [item["data"]["name"] for item in result["data"]] == names
+    assert not check_medicines_availability(names + ["paracetamol"])["success"]
+
+
+def test_async_version_returns_the_same_in_one_read(db):
+    seed(db)
+    expected = check_medicines_availability(NAMES + ["unknownium"])
+    db.rpc_counts.clear()
+    cache_module.inventory_cache.clear()
+
+    assert event_loop.run(check_medicines_availability_async(NAMES + ["unknownium"])) == expected
+    assert db.rpc_counts["batch_get"] == 1
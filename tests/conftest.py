@@ -0,0 +1,28 @@
+# tests/conftest.py
+
+import pytest
+
+from tests.fake_firestore import install_fake_db
+from tests.telegram_stub import start_stub
+
+# Every `db` handle in the app serves the in-memory Firestore
+fake_db = install_fake_db()
+
+
+@pytest.fixture
+def db():
+    from firebase.inventory_cache import inventory_cache
+    from firebase.medicine_index import medicine_index
+
+    fake_db.reset()
+    inventory_cache.clear()
+    medicine_index.invalidate()
+    return fake_db
+
+
+@pytest.fixture
+def stub():
+    server = start_stub()
+    yield server
+    server.shutdown()
+    server.server_close()
@@ -0,0 +1,83 @@
+# tests/dashboard_metrics_test.py
+
+import time
+
+from firebase.dashboard_metrics import DashboardMetrics, count_low_stock, count_medicines, orders_by_status, stock_value
+from firebase.inventory_mirror import InventoryMirror
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+def seed_inventory(db):
+    db.seed("medicines", "paracetamol", {"stock": 100, "unit_price": 2.5, "description": "x" * 1000})
+    db.seed("medicines", "insulin", {"stock": 4, "unit_price": 30})
+    db.seed("medicines", "morphine", {"stock": 0, "unit_price": 12})
+    for number, status in enumerate(["pending", "pending", "delivered", "cancelled"]):
+        db.seed("orders", f"order-{number}", {"status": status})
+
+
+def test_counts_use_one_aggregation_each_and_download_no_documents(db):
+    seed_inventory(db)
+
+    assert count_medicines(db) == 3
+    assert count_low_stock(db, threshold=10) == 2
+    assert orders_by_status(db, ["pending", "delivered", "shipped"]) == {"pending": 2, "delivered": 1, "shipped": 0}
+    assert db.rpc_counts == {"aggregation": 5}
+
+
+def test_stock_value_projects_two_fields_or_uses_the_connected_mirror(db):
+    seed_inventory(db)
+    assert stock_value(db, mirror=None) == 100 * 2.5 + 4 * 30
+    assert db.rpc_counts == {"query": 1}
+
+    mirror = InventoryMirror(lambda: db.collection("medicines"))
+    mirror.start()
+    db.rpc_counts.clear()
+    assert stock_value(db, mirror=mirror) == 370
+    assert db.total_rpcs == 0
+
+
+def test_snapshot_is_cached_for_ttl_and_shared(db):
+    clock = FakeClock()
+    calls = []
+    metrics = DashboardMetrics({"medicines": lambda: calls.append(1) or len(calls)}, ttl=30, clock=clock)
+
+    first = metrics.snapshot()
+    clock.now = 29
+    assert metrics.snapshot() is first
+    clock.now = 30
+    assert metrics.snapshot()["medicines"]["value"] == 2
+    metrics.invalidate()
+    assert metrics.snapshot()["medicines"]["value"] == 3
+    assert metrics.refreshes == 3
+
+
+def test_each_metric_reports_its_own_latency_and_errors(db):
+    def slow():
+        time.sleep(0.05)
+        return 1
+
+    def broken():
+        raise RuntimeError("index missing")
+
+    snapshot = DashboardMetrics({"slow": slow, "fast": lambda: 2, "broken": broken}).snapshot()
+
+    assert snapshot["slow"]["value"] == 1 and snapshot["slow"]["latency_ms"] >= 50
+    assert snapshot["fast"]["value"] == 2 and snapshot["fast"]["latency_ms"] < 50
+    assert snapshot["broken"] == {"value": None, "latency_ms": snapshot["broken"]["latency_ms"], "error": "index missing"}
+
+
+def test_metrics_run_in_parallel(db):
+    def slow():
+        time.sleep(0.1)
+        return 0
+
+    started = time.perf_counter()
+    DashboardMetrics({f"metric-{n}": slow for n in range(4)}).snapshot()
+    assert time.perf_counter() - started < 0.3
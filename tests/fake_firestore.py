@@ -0,0 +1,826 @@
+# tests/fake_firestore.py
+
+"""In-memory stand-in for the Firestore client used by tests and benchmarks.
+
+Only the surface the app touches is implemented: collections, documents,
+simple queries and aggregations, batches, ``get_all`` and transactions that
+work with ``firestore.transactional``, plus an ``AsyncClient`` double over the
+same documents for the coroutine tool functions. Every simulated RPC is counted in
+``rpc_counts``, traced like the instrumented gapic client, and can be
+slowed down with ``latency`` so races and round trips show up the same way
+they would against the emulator.
+"""
+
+import asyncio
+import copy
+import threading
+import time
+import uuid
+from collections import Counter
+from datetime import datetime, timezone
+
+from google.api_core import exceptions
+from google.cloud.firestore_v1 import transforms
+from google.cloud.firestore_v1._helpers import ExistsOption
+from google.cloud.firestore_v1.base_aggregation import AggregationResult
+from google.cloud.firestore_v1.base_client import BaseClient
+from google.cloud.firestore_v1.watch import ChangeType, DocumentChange
+
+from firebase.db_manager import async_firestore_client, firestore_client
+from scripts.tracing import tracer
+
+
+def _split_field_path(field_path):
+    return field_path.split(".")
+
+
+def _get_field(data, field_path):
+    value = data
+    for part in _split_field_path(field_path):
+        if not isinstance(value, dict) or part not in value:
+            return None
+        value = value[part]
+    return value
+
+
+def _apply_value(current, value):
+    if isinstance(value, transforms.Increment):
+        return (current or 0) + value.value
+    if isinstance(value, transforms.ArrayUnion):
+        merged = list(current or [])
+        merged.extend(v for v in value.values if v not in merged)
+        return merged
+    if isinstance(value, transforms.ArrayRemove):
+        return [v for v in (current or []) if v not in value.values]
+    if value is transforms.SERVER_TIMESTAMP:
+        return datetime.now(timezone.utc)
+    return copy.deepcopy(value)
+
+
+def _set_field(data, field_path, value):
+    parts = _split_field_path(field_path)
+    target = data
+    for part in parts[:-1]:
+        if not isinstance(target.get(part), dict):
+            target[part] = {}
+        target = target[part]
+    if value is transforms.DELETE_FIELD:
+        target.pop(parts[-1], None)
+    else:
+        target[parts[-1]] = _apply_value(target.get(parts[-1]), value)
+
+
+def _resolve_values(data):
+    resolved = {}
+    for key, value in data.items():
+        if isinstance(value, dict):
+            resolved[key] = _resolve_values(value)
+        elif value is not transforms.DELETE_FIELD:
+            resolved[key] = _apply_value(None, value)
+    return resolved
+
+
+class FakeSnapshot:
+    def __init__(self, reference, data, update_time=None):
+        self.reference = reference
+        self._data = data
+        self.update_time = update_time
+
+    @property
+    def id(self):
+        return self.reference.id
+
+    @property
+    def exists(self):
+        return self._data is not None
+
+    def to_dict(self):
+        return copy.deepcopy(self._data)
+
+    def get(self, field_path):
+        return _get_field(self._data or {}, field_path)
+
+
+class FakeDocumentReference:
+    def __init__(self, client, path):
+        self._client = client
+        self.path = path
+
+    @property
+    def id(self):
+        return self.path.rsplit("/", 1)[-1]
+
+    @property
+    def parent(self):
+        return FakeCollectionReference(self._client, self.path.rsplit("/", 1)[0])
+
+    def collection(self, name):
+        return FakeCollectionReference(self._client, f"{self.path}/{name}")
+
+    def get(self, field_paths=None, transaction=None, **kwargs):
+        if transaction is not None:
+            return transaction._read(self)
+        self._client._rpc("get", self)
+        return self._client._snapshot(self)
+
+    def set(self, document_data, merge=False, **kwargs):
+        self._client._rpc("set", self)
+        return self._client._commit_writes([("set", self, document_data, merge)])
+
+    def create(self, document_data, **kwargs):
+        self._client._rpc("create", self)
+        return self._client._commit_writes([("create", self, document_data, None)])
+
+    def update(self, field_updates, option=None, **kwargs):
+        self._client._rpc("update", self)
+        return self._client._commit_writes([("update", self, field_updates, option)])
+
+    def delete(self, option=None, **kwargs):
+        self._client._rpc("delete", self)
+        return self._client._commit_writes([("delete", self, None, option)])
+
+    def __eq__(self, other):
+        return isinstance(other, FakeDocumentReference) and other.path == self.path
+
+    def __hash__(self):
+        return hash(self.path)
+
+
+class FakeQuery:
+    _OPERATORS = {
+        "==": lambda a, b: a == b,
+        "!=": lambda a, b: a != b,
+        "<": lambda a, b: a is not None and a < b,
+        "<=": lambda a, b: a is not None and a <= b,
+        ">": lambda a, b: a is not None and a > b,
+        ">=": lambda a, b: a is not None and a >= b,
+        "in": lambda a, b: a in b,
+        "array_contains": lambda a, b: isinstance(a, list) and b in a,
+    }
+
+    def __init__(self, client, path, filters=(), orders=(), limit=None, start_after=None, projection=None):
+        self._client = client
+        self._path = path
+        self._filters = tuple(filters)
+        self._orders = tuple(orders)
+        self._limit = limit
+        self._start_after = start_after
+        self._projection = projection
+
+    def _copy(self, **changes):
+        params = {
+            "filters": self._filters,
+            "orders": self._orders,
+            "limit": self._limit,
+            "start_after": self._start_after,
+            "projection": self._projection,
+        }
+        params.update(changes)
+        return FakeQuery(self._client, self._path, **params)
+
+    def where(self, field_path=None, op_string=None, value=None, *, filter=None):
+        if filter is not None:
+            field_path, op_string, value = filter.field_path, filter.op_string, filter.value
+        return self._copy(filters=self._filters + ((field_path, op_string, value),))
+
+    def order_by(self, field_path, direction="ASCENDING"):
+        return self._copy(orders=self._orders + ((field_path, direction),))
+
+    def limit(self, count):
+        return self._copy(limit=count)
+
+    def start_after(self, document_fields_or_snapshot):
+        return self._copy(start_after=document_fields_or_snapshot)
+
+    def select(self, field_paths):
+        return self._copy(projection=tuple(field_paths))
+
+    def count(self, alias=None):
+        return FakeAggregationQuery(self).count(alias=alias)
+
+    def sum(self, field_ref, alias=None):
+        return FakeAggregationQuery(self).sum(field_ref, alias=alias)
+
+    def avg(self, field_ref, alias=None):
+        return FakeAggregationQuery(self).avg(field_ref, alias=alias)
+
+    def _matches(self):
+        docs = []
+        for ref, data in self._client._children(self._path):
+            if all(self._OPERATORS[op](_get_field(data, field), value) for field, op, value in self._filters):
+                docs.append(FakeSnapshot(ref, data))
+        for field, direction in reversed(self._orders):
+            if field == "__name__":
+                docs.sort(key=lambda snap: snap.reference.path, reverse=direction == "DESCENDING")
+            else:
+                docs.sort(key=lambda snap: _get_field(snap._data, field), reverse=direction == "DESCENDING")
+        if self._start_after is not None:
+            cursor_path = self._start_after.reference.path
+            paths = [snap.reference.path for snap in docs]
+            docs = docs[paths.index(cursor_path) + 1:] if cursor_path in paths else []
+        if self._limit is not None:
+            docs = docs[:self._limit]
+        if self._projection is not None:
+            docs = [
+                FakeSnapshot(snap.reference, {field: snap._data[field] for field in self._projection if field in snap._data})
+                for snap in docs
+            ]
+        return docs
+
+    def stream(self, transaction=None, **kwargs):
+        self._client._rpc("query", self._path)
+        return iter(self._matches())
+
+    def get(self, transaction=None, **kwargs):
+        return list(self.stream(transaction=transaction))
+
+
+class FakeAggregationQuery:
+    """``count``/``sum``/``avg`` over a query, answered in a single "aggregation" RPC."""
+
+    def __init__(self, query):
+        self._query = query
+        self._aggregations = []
+
+    def _add(self, kind, field_path, alias):
+        self._aggregations.append((kind, field_path, alias or f"field_{len(self._aggregations) + 1}"))
+        return self
+
+    def count(self, alias=None):
+        return self._add("count", None, alias)
+
+    def sum(self, field_ref, alias=None):
+        return self._add("sum", field_ref, alias)
+
+    def avg(self, field_ref, alias=None):
+        return self._add("avg", field_ref, alias)
+
+    def get(self, transaction=None, **kwargs):
+        self._query._client._rpc("aggregation", self._query._path)
+        docs = self._query._matches()
+        results = []
+        for kind, field_path, alias in self._aggregations:
+            if kind == "count":
+                value = len(docs)
+            else:
+                numbers = [v for v in (_get_field(d._data, field_path) for d in docs) if isinstance(v, (int, float))]
+                value = sum(numbers) if kind == "sum" else (sum(numbers) / len(numbers) if numbers else None)
+            results.append(AggregationResult(alias=alias, value=value))
+        return [results]
+
+
+class FakeCollectionReference(FakeQuery):
+    def __init__(self, client, path):
+        super().__init__(client, path)
+
+    @property
+    def id(self):
+        return self._path.rsplit("/", 1)[-1]
+
+    def document(self, document_id=None):
+        return FakeDocumentReference(self._client, f"{self._path}/{document_id or uuid.uuid4().hex}")
+
+    def add(self, document_data, document_id=None, **kwargs):
+        ref = self.document(document_id)
+        return ref.create(document_data), ref
+
+    def on_snapshot(self, callback):
+        return self._client._listen(self._path, callback)
+
+
+class FakeWatch:
+    """Listener handle returned by ``on_snapshot``; ``disconnect`` simulates a dropped stream."""
+
+    def __init__(self, client, path, callback):
+        self._client = client
+        self._path = path
+        self._callback = callback
+        self.is_active = True
+
+    def unsubscribe(self):
+        self.is_active = False
+        self._client._unlisten(self)
+
+    def disconnect(self):
+        self.is_active = False
+        self._client._unlisten(self)
+
+    def replay(self, changes):
+        """Deliver ``(change_type_name, document_id, data)`` events as if sent by the server."""
+        document_changes = [
+            DocumentChange(
+                ChangeType[change_type],
+                FakeSnapshot(FakeDocumentReference(self._client, f"{self._path}/{document_id}"), copy.deepcopy(data)),
+                -1,
+                -1,
+            )
+            for change_type, document_id, data in changes
+        ]
+        self._deliver(document_changes)
+
+    def _deliver(self, changes):
+        if not self.is_active or not changes:
+            return
+        collection = [FakeSnapshot(ref, data) for ref, data in self._client._children(self._path)]
+        self._callback(collection, changes, datetime.now(timezone.utc))
+
+
+class FakeWriteBatch:
+    def __init__(self, client):
+        self._client = client
+        self._writes = []
+
+    def __len__(self):
+        return len(self._writes)
+
+    def set(self, reference, document_data, merge=False):
+        self._writes.append(("set", reference, document_data, merge))
+
+    def create(self, reference, document_data):
+        self._writes.append(("create", reference, document_data, None))
+
+    def update(self, reference, field_updates, option=None):
+        self._writes.append(("update", reference, field_updates, option))
+
+    def delete(self, reference, option=None):
+        self._writes.append(("delete", reference, None, option))
+
+    def commit(self, **kwargs):
+        writes, self._writes = self._writes, []
+        self._client._rpc("commit", writes[0][1] if writes else None)
+        return self._client._commit_writes(writes, transaction=self._transaction())
+
+    def _transaction(self):
+        return None
+
+
+class FakeTransaction(FakeWriteBatch):
+    """Pessimistic transaction: reads lock documents until commit or rollback.
+
+    Lock waits time out with ``Aborted`` so that ``firestore.transactional``
+    retries the attempt, the same way the server resolves contention.
+    """
+
+    def __init__(self, client, max_attempts=5, read_only=False, lock_timeout=2.0):
+        super().__init__(client)
+        self._max_attempts = max_attempts
+        self._read_only = read_only
+        self._lock_timeout = lock_timeout
+        self._id = None
+        self._held = []
+
+    @property
+    def in_progress(self):
+        return self._id is not None
+
+    @property
+    def id(self):
+        return self._id
+
+    def _begin(self, retry_id=None):
+        self._id = uuid.uuid4().bytes
+
+    def _release(self):
+        for lock in reversed(self._held):
+            lock.release()
+        self._held = []
+
+    def _clean_up(self):
+        self._release()
+        self._writes = []
+        self._id = None
+
+    def _rollback(self):
+        self._clean_up()
+
+    def _lock(self, reference):
+        lock = self._client._doc_lock(reference.path)
+        if lock in self._held:
+            return
+        if not lock.acquire(timeout=self._lock_timeout):
+            raise exceptions.Aborted("Transaction lock timeout")
+        self._held.append(lock)
+
+    def _read(self, reference):
+        if self._writes:
+            raise ValueError("Firestore transactions require all reads to be executed before all writes.")
+        self._lock(reference)
+        self._client._rpc("get", reference)
+        return self._client._snapshot(reference)
+
+    def get_all(self, references, **kwargs):
+        return self._client.get_all(references, transaction=self)
+
+    def get(self, ref_or_query, **kwargs):
+        if isinstance(ref_or_query, FakeDocumentReference):
+            return self.get_all([ref_or_query])
+        return ref_or_query.stream(transaction=self)
+
+    def commit(self, **kwargs):
+        raise RuntimeError("Use firestore.transactional to commit a transaction")
+
+    def _transaction(self):
+        return self
+
+    def _commit(self):
+        try:
+            return super().commit()
+        finally:
+            self._clean_up()
+
+
+class FakeFirestore:
+    """Thread-safe in-memory Firestore client double."""
+
+    def __init__(self, latency=0.0):
+        self.latency = latency
+        self.rpc_counts = Counter()
+        self._lock = threading.RLock()
+        self._docs = {}
+        self._doc_locks = {}
+        self._watches = []
+
+    def reset(self):
+        with self._lock:
+            self._docs.clear()
+            self._doc_locks.clear()
+            self._watches.clear()
+            self.rpc_counts.clear()
+            self.latency = 0.0
+
+    @property
+    def total_rpcs(self):
+        return sum(self.rpc_counts.values())
+
+    # Client API
+
+    def collection(self, name):
+        return FakeCollectionReference(self, name)
+
+    def document(self, path):
+        return FakeDocumentReference(self, path)
+
+    def batch(self):
+        return FakeWriteBatch(self)
+
+    def transaction(self, max_attempts=5, read_only=False):
+        return FakeTransaction(self, max_attempts=max_attempts, read_only=read_only)
+
+    write_option = staticmethod(BaseClient.write_option)
+
+    def get_all(self, references, field_paths=None, transaction=None, **kwargs):
+        references = list(references)
+        if transaction is not None:
+            if transaction._writes:
+                raise ValueError("Firestore transactions require all reads to be executed before all writes.")
+            for ref in sorted(set(references), key=lambda r: r.path):
+                transaction._lock(ref)
+        self._rpc("batch_get", references[0] if references else None)
+        return iter([self._snapshot(ref) for ref in references])
+
+    # Test helpers
+
+    def seed(self, collection, document_id, data):
+        with self._lock:
+            self._docs[f"{collection}/{document_id}"] = copy.deepcopy(data)
+
+    def data(self, path):
+        with self._lock:
+            return copy.deepcopy(self._docs.get(path))
+
+    # Internals
+
+    def _rpc(self, kind, target):
+        self.rpc_counts[kind] += 1
+        with tracer.span(f"firestore.{kind}", "firestore"):
+            if self.latency:
+                time.sleep(self.latency)
+
+    def _doc_lock(self, path):
+        with self._lock:
+            return self._doc_locks.setdefault(path, threading.Lock())
+
+    def _snapshot(self, reference):
+        with self._lock:
+            data = self._docs.get(reference.path)
+            return FakeSnapshot(reference, copy.deepcopy(data), datetime.now(timezone.utc) if data is not None else None)
+
+    def _children(self, collection_path):
+        prefix = collection_path + "/"
+        with self._lock:
+            return [
+                (FakeDocumentReference(self, path), copy.deepcopy(data))
+                for path, data in self._docs.items()
+                if path.startswith(prefix) and "/" not in path[len(prefix):]
+            ]
+
+    def _listen(self, collection_path, callback):
+        watch = FakeWatch(self, collection_path, callback)
+        with self._lock:
+            self._watches.append(watch)
+        watch._deliver([
+            DocumentChange(ChangeType.ADDED, FakeSnapshot(ref, data), -1, index)
+            for index, (ref, data) in enumerate(self._children(collection_path))
+        ])
+        return watch
+
+    def _unlisten(self, watch):
+        with self._lock:
+            if watch in self._watches:
+                self._watches.remove(watch)
+
+    def _notify(self, before, after, paths):
+        with self._lock:
+            watches = list(self._watches)
+        for watch in watches:
+            changes = []
+            for path in paths:
+                parent, _, document_id = path.rpartition("/")
+                if parent != watch._path:
+                    continue
+                old, new = before.get(path), after.get(path)
+                if old == new:
+                    continue
+                change_type = ChangeType.REMOVED if new is None else ChangeType.ADDED if old is None else ChangeType.MODIFIED
+                snapshot = FakeSnapshot(FakeDocumentReference(self, path), copy.deepcopy(new if new is not None else old))
+                changes.append(DocumentChange(change_type, snapshot, -1, -1))
+            watch._deliver(changes)
+
+    def _commit_writes(self, writes, transaction=None):
+        """Apply `writes` while holding their document locks, like the server does.
+
+        A transaction takes the locks it doesn't hold yet (timing out with
+        ``Aborted``). Other writes wait for transactions holding their
+        documents; to avoid deadlocking with one, they back off and retry
+        when a lock isn't free in time.
+        """
+        references = sorted({ref.path: ref for _, ref, _, _ in writes}.values(), key=lambda ref: ref.path)
+        if transaction is not None:
+            for ref in references:
+                transaction._lock(ref)
+            return self._apply(writes)
+        while True:
+            acquired = []
+            for ref in references:
+                lock = self._doc_lock(ref.path)
+                if not lock.acquire(timeout=0.05):
+                    break
+                acquired.append(lock)
+            else:
+                try:
+                    return self._apply(writes)
+                finally:
+                    for lock in reversed(acquired):
+                        lock.release()
+            for lock in reversed(acquired):
+                lock.release()
+            time.sleep(0.001)
+
+    def _apply(self, writes):
+        with self._lock:
+            before = self._docs
+            staged = dict(self._docs)
+            for kind, ref, data, option in writes:
+                current = staged.get(ref.path)
+                if kind == "create":
+                    if current is not None:
+                        raise exceptions.AlreadyExists(f"Document already exists: {ref.path}")
+                    staged[ref.path] = _resolve_values(data)
+                elif kind == "set":
+                    if option and current is not None:
+                        merged = copy.deepcopy(current)
+                        for key, value in data.items():
+                            _set_field(merged, key, value)
+                        staged[ref.path] = merged
+                    else:
+                        staged[ref.path] = _resolve_values(data)
+                elif kind == "update":
+                    if current is None:
+                        raise exceptions.NotFound(f"No document to update: {ref.path}")
+                    updated = copy.deepcopy(current)
+                    for field_path, value in data.items():
+                        _set_field(updated, field_path, value)
+                    staged[ref.path] = updated
+                elif kind == "delete":
+                    if isinstance(option, ExistsOption) and option._exists and current is None:
+                        raise exceptions.NotFound(f"No document to delete: {ref.path}")
+                    staged.pop(ref.path, None)
+            self._docs = staged
+            results = [datetime.now(timezone.utc) for _ in writes]
+        if self._watches:
+            self._notify(before, staged, list(dict.fromkeys(ref.path for _, ref, _, _ in writes)))
+        return results
+
+
+class FakeAsyncDocumentReference:
+    def __init__(self, client, path):
+        self._client = client
+        self.path = path
+
+    @property
+    def id(self):
+        return self.path.rsplit("/", 1)[-1]
+
+    def collection(self, name):
+        return FakeAsyncCollectionReference(self._client, f"{self.path}/{name}")
+
+    async def get(self, field_paths=None, transaction=None, **kwargs):
+        await self._client._rpc("get")
+        if transaction is not None:
+            return transaction._read(self)
+        return self._client._sync._snapshot(self)
+
+    async def set(self, document_data, merge=False, **kwargs):
+        await self._client._rpc("set")
+        return await self._client._write([("set", self, document_data, merge)])
+
+    async def create(self, document_data, **kwargs):
+        await self._client._rpc("create")
+        return await self._client._write([("create", self, document_data, None)])
+
+    async def update(self, field_updates, option=None, **kwargs):
+        await self._client._rpc("update")
+        return await self._client._write([("update", self, field_updates, option)])
+
+    async def delete(self, option=None, **kwargs):
+        await self._client._rpc("delete")
+        return await self._client._write([("delete", self, None, option)])
+
+
+class FakeAsyncQuery:
+    def __init__(self, client, query):
+        self._client = client
+        self._query = query
+
+    def where(self, *args, **kwargs):
+        return FakeAsyncQuery(self._client, self._query.where(*args, **kwargs))
+
+    def order_by(self, *args, **kwargs):
+        return FakeAsyncQuery(self._client, self._query.order_by(*args, **kwargs))
+
+    def limit(self, count):
+        return FakeAsyncQuery(self._client, self._query.limit(count))
+
+    def start_after(self, document_fields_or_snapshot):
+        return FakeAsyncQuery(self._client, self._query.start_after(document_fields_or_snapshot))
+
+    def select(self, field_paths):
+        return FakeAsyncQuery(self._client, self._query.select(field_paths))
+
+    async def stream(self, transaction=None, **kwargs):
+        await self._client._rpc("query")
+        for snapshot in self._query._matches():
+            yield snapshot
+
+    async def get(self, transaction=None, **kwargs):
+        return [snapshot async for snapshot in self.stream(transaction=transaction)]
+
+
+class FakeAsyncCollectionReference(FakeAsyncQuery):
+    def __init__(self, client, path):
+        super().__init__(client, FakeQuery(client._sync, path))
+        self._path = path
+
+    @property
+    def id(self):
+        return self._path.rsplit("/", 1)[-1]
+
+    def document(self, document_id=None):
+        return FakeAsyncDocumentReference(self._client, f"{self._path}/{document_id or uuid.uuid4().hex}")
+
+
+class FakeAsyncTransaction:
+    """Optimistic transaction for ``async_transactional``.
+
+    Reads remember the version of each document they saw; the commit is
+    refused with ``Aborted`` (and the attempt retried) when one of them has
+    changed or a synchronous transaction holds it. Nothing ever waits on a
+    lock, so coroutines sharing the event loop cannot deadlock each other.
+    """
+
+    def __init__(self, client, max_attempts=5, read_only=False):
+        self._client = client
+        self._max_attempts = max_attempts
+        self._read_only = read_only
+        self._id = None
+        self._writes = []
+        self._versions = {}
+
+    @property
+    def in_progress(self):
+        return self._id is not None
+
+    def _clean_up(self):
+        self._id = None
+        self._writes = []
+        self._versions = {}
+
+    async def _begin(self, retry_id=None):
+        self._id = uuid.uuid4().bytes
+
+    async def _rollback(self):
+        self._clean_up()
+
+    def _read(self, reference):
+        if self._writes:
+            raise ValueError("Firestore transactions require all reads to be executed before all writes.")
+        sync = self._client._sync
+        with sync._lock:
+            self._versions.setdefault(reference.path, sync._docs.get(reference.path))
+        return sync._snapshot(reference)
+
+    async def get_all(self, references, **kwargs):
+        return self._client.get_all(references, transaction=self)
+
+    def set(self, reference, document_data, merge=False):
+        self._writes.append(("set", reference, document_data, merge))
+
+    def create(self, reference, document_data):
+        self._writes.append(("create", reference, document_data, None))
+
+    def update(self, reference, field_updates, option=None):
+        self._writes.append(("update", reference, field_updates, option))
+
+    def delete(self, reference, option=None):
+        self._writes.append(("delete", reference, None, option))
+
+    async def _commit(self):
+        writes = self._writes
+        await self._client._rpc("commit")
+        try:
+            if not self._client._try_apply(writes, self._versions):
+                raise exceptions.Aborted("Transaction contention")
+        finally:
+            self._clean_up()
+
+
+class FakeAsyncFirestore:
+    """``AsyncClient`` double over the same documents and ``rpc_counts`` as a ``FakeFirestore``.
+
+    RPC latency is awaited rather than slept, so concurrent coroutines
+    overlap their round trips the way they do against the real AsyncClient.
+    """
+
+    def __init__(self, sync):
+        self._sync = sync
+
+    def collection(self, name):
+        return FakeAsyncCollectionReference(self, name)
+
+    def document(self, path):
+        return FakeAsyncDocumentReference(self, path)
+
+    def transaction(self, max_attempts=5, read_only=False):
+        return FakeAsyncTransaction(self, max_attempts=max_attempts, read_only=read_only)
+
+    async def get_all(self, references, field_paths=None, transaction=None, **kwargs):
+        references = list(references)
+        await self._rpc("batch_get")
+        for reference in references:
+            yield transaction._read(reference) if transaction is not None else self._sync._snapshot(reference)
+
+    async def _rpc(self, kind):
+        self._sync.rpc_counts[kind] += 1
+        with tracer.span(f"firestore.{kind}", "firestore"):
+            if self._sync.latency:
+                await asyncio.sleep(self._sync.latency)
+
+    def _try_apply(self, writes, versions=None):
+        """Apply `writes` unless a document is locked by a transaction or changed since it was read."""
+        versions = versions or {}
+        paths = sorted({ref.path for _, ref, _, _ in writes} | set(versions))
+        acquired = []
+        try:
+            for path in paths:
+                lock = self._sync._doc_lock(path)
+                if not lock.acquire(blocking=False):
+                    return False
+                acquired.append(lock)
+            with self._sync._lock:
+                if any(self._sync._docs.get(path) is not version for path, version in versions.items()):
+                    return False
+                if writes:
+                    self._sync._apply(writes)
+            return True
+        finally:
+            for lock in reversed(acquired):
+                lock.release()
+
+    async def _write(self, writes):
+        while not self._try_apply(writes):
+            await asyncio.sleep(0.001)
+        return [datetime.now(timezone.utc) for _ in writes]
+
+
+def install_fake_db(latency=0.0):
+    """Serve ``firebase.db_manager.db`` (and ``async_db``) from a shared ``FakeFirestore``; returns the fake.
+
+    Works before or after the app modules import ``db``.
+    """
+    fake = firestore_client.overridden
+    if not isinstance(fake, FakeFirestore):
+        fake = FakeFirestore()
+        firestore_client.override(fake)
+        async_firestore_client.override(FakeAsyncFirestore(fake))
+    fake.latency = latency
+    return fake
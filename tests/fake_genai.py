@@ -0,0 +1,109 @@
+# tests/fake_genai.py
+
+"""Recorded stand-in for `genai.Client` used by tests and benchmarks.
+
+A chat answers a text message with the scripted function calls and a turn of
+function responses with a fixed text, keeping its history like the SDK does.
+Every request is recorded with its size so tests can reason about prompt
+growth without calling Gemini.
+"""
+
+import time
+
+from google.genai import types
+
+
+class FakeResponse:
+    def __init__(self, function_calls=None, text=""):
+        self.function_calls = function_calls or None
+        self.text = text
+        parts = [types.Part(function_call=fn) for fn in function_calls or []] or [types.Part(text=text)]
+        self.candidates = [types.Candidate(content=types.Content(role="model", parts=parts))]
+
+
+def content_size(contents):
+    """Serialized request size in bytes, a stable proxy for prompt tokens."""
+    return sum(len(content.model_dump_json(exclude_none=True)) for content in contents)
+
+
+class FakeChat:
+    def __init__(self, client, model, config, history=None):
+        self._client = client
+        self.model = model
+        self.config = config
+        self._history = list(history or [])
+
+    def get_history(self, curated=False):
+        return list(self._history)
+
+    def send_message(self, message, config=None):
+        parts = [types.Part(text=message)] if isinstance(message, str) else list(message)
+        user_turn = types.Content(role="user", parts=parts)
+        contents = [*self._history, user_turn]
+        self._client.requests.append({
+            "kind": "send_message",
+            "model": self.model,
+            "contents": contents,
+            "size": content_size(contents),
+        })
+        time.sleep(self._client.latency)
+        if any(part.function_response for part in parts):
+            response = FakeResponse(text=self._client.final_text)
+        else:
+            response = FakeResponse(function_calls=self._client.script(message), text=self._client.final_text)
+        self._history.extend([user_turn, response.candidates[0].content])
+        return response
+
+    def record_history(self, user_input, model_output, automatic_function_calling_history, is_valid):
+        self._history.extend([user_input, *model_output])
+
+    def send_message_stream(self, message, config=None):
+        """Yield the reply word by word, `chunk_latency` apart, after the request latency."""
+        parts = [types.Part(text=message)] if isinstance(message, str) else list(message)
+        user_turn = types.Content(role="user", parts=parts)
+        self._client.requests.append({"kind": "send_message_stream", "model": self.model, "contents": [*self._history, user_turn]})
+        time.sleep(self._client.latency)
+        words = self._client.final_text.split(" ")
+        for index, word in enumerate(words):
+            if index:
+                time.sleep(self._client.chunk_latency)
+            yield FakeResponse(text=word if index == 0 else " " + word)
+        self._history.extend([user_turn, types.Content(role="model", parts=[types.Part(text=self._client.final_text)])])
+
+
+class FakeChats:
+    def __init__(self, client):
+        self._client = client
+
+    def create(self, model, config=None, history=None):
+        self._client.chats_created += 1
+        return FakeChat(self._client, model, config, history)
+
+
+class FakeModels:
+    def __init__(self, client):
+        self._client = client
+
+    def generate_content(self, model, contents, config=None):
+        self._client.requests.append({
+            "kind": "generate_content",
+            "model": model,
+            "contents": list(contents),
+            "size": content_size(contents),
+        })
+        time.sleep(self._client.latency)
+        return FakeResponse(text=self._client.final_text)
+
+
+class FakeGenaiClient:
+    """`script(prompt)` returns the function calls the fake model asks for."""
+
+    def __init__(self, script=lambda prompt: [], final_text="Done.", latency=0.0, chunk_latency=0.0):
+        self.script = script
+        self.final_text = final_text
+        self.latency = latency
+        self.chunk_latency = chunk_latency
+        self.requests = []
+        self.chats_created = 0
+        self.chats = FakeChats(self)
+        self.models = FakeModels(self)
@@ -0,0 +1,113 @@
+# tests/intent_router_test.py
+
+import pytest
+
+from firebase.medicine_index import medicine_index
+from scripts.intent_router import IntentRouter, answer_locally
+from scripts.metrics import turn_latency
+
+ORDER_ID = "0b527cd5-3884-4e7a-b93c-4f656f314cd7"
+
+
+@pytest.fixture
+def router(db):
+    for name, stock in (("paracetamol", 12), ("vitamin_c", 0), ("insulin", 3)):
+        db.seed("medicines", name, {"name": name, "stock": stock, "unit_price": 4})
+    return IntentRouter(medicine_index)
+
+
+@pytest.mark.parametrize("prompt, intent, slot", [
+    ("What's the price of paracetamol?", "price", "paracetamol"),
+    ("how much is Vitamin C", "price", "vitamin_c"),
+    ("Do you have insulin?", "availability", "insulin"),
+    ("is vitamin-c in stock", "availability", "vitamin_c"),
+    ("is paracetmol available?", "availability", "paracetamol"),
+    (f"track my order {ORDER_ID}", "track", ORDER_ID),
+    (f"Cancel my order of id {ORDER_ID}", "cancel", ORDER_ID),
+    (f"please cancel order {ORDER_ID}", "cancel", ORDER_ID),
+    ("help", "help", None),
+])
+def test_confident_routes_are_served_locally(router, prompt, intent, slot):
+    route = router.route(prompt)
+
+    assert route["local"]
+    assert route["intent"] == intent
+    assert slot in (route["medicine"], route["order_id"])
+
+
+@pytest.mark.parametrize("prompt", [
+    "do you have paracetamol and insulin?",
+    "place an order of paracetamol 2 packs for me",
+    "give me some health advice",
+    "I have a headache, what should I take?",
+    "paracetamol",
+    f"{ORDER_ID}",
+])
+def test_ambiguous_prompts_go_to_the_model(router, prompt):
+    assert not router.route(prompt)["local"]
+
+
+@pytest.mark.parametrize("prompt", [
+    f"did you cancel order {ORDER_ID}?",
+    f"can you cancel order {ORDER_ID}",
+    f"was {ORDER_ID} cancelled?",
+    f"don't cancel order {ORDER_ID}",
+    f"Don\u2019t cancel {ORDER_ID}, I still need it",
+    f"cancel order {ORDER_ID}?",
+    f"I'm not cancelling {ORDER_ID}, where is it?",
+])
+def test_questions_and_negations_about_cancelling_go_to_the_model(router, db, prompt):
+    db.seed("orders", ORDER_ID, {"user_email": "abebe@example.com", "medicine_name": "insulin", "quantity": 2,
+                                 "status": "pending"})
+    route = router.route(prompt)
+
+    assert not route["local"]
+    assert answer_locally(route, "abebe@example.com", False) is None
+    assert db.data(f"orders/{ORDER_ID}")["status"] == "pending"
+
+
+def test_medicine_index_reflects_the_collection(router, db):
+    assert router.route("price of doxycycline")["intent"] is None
+
+    db.seed("medicines", "doxycycline", {"name": "doxycycline", "stock": 1, "unit_price": 9})
+    router.medicine_index.upsert("doxycycline", {"name": "doxycycline"})
+
+    assert router.route("price of doxycycline")["medicine"] == "doxycycline"
+
+
+def test_local_answers(router, db):
+    db.seed("users", "abebe@example.com", {"orders": {}})
+    db.seed("orders", ORDER_ID, {"user_email": "abebe@example.com", "medicine_name": "insulin", "quantity": 2, "status": "pending"})
+
+    assert answer_locally(router.route("price of paracetamol"), "abebe@example.com", False) == \
+        "The current price of paracetamol is 4. It is in stock (qty: 12)."
+    assert answer_locally(router.route("do you have vitamin c"), "guest", True) == "Sorry, vitamin_c is currently out of stock."
+    assert answer_locally(router.route(f"status of {ORDER_ID}"), "guest", True).startswith("Guest mode")
+    assert answer_locally(router.route(f"track {ORDER_ID}"), "abebe@example.com", False) == \
+        f"Order {ORDER_ID} (insulin x 2) is pending."
+    assert answer_locally(router.route(f"cancel {ORDER_ID}"), "abebe@example.com", False) == \
+        f"Order {ORDER_ID} cancelled successfully"
+    assert db.data("medicines/insulin")["stock"] == 5
+
+
+def test_stats_report_local_share_and_percentiles(router):
+    for ms in range(1, 101):
+        router.record("local", ms / 1000)
+    router.record("llm", 2.0)
+
+    stats = router.stats()
+
+    assert stats["local_share"] == pytest.approx(100 / 101)
+    assert stats["local"]["p50_ms"] == pytest.approx(51)
+    assert stats["local"]["p95_ms"] == pytest.approx(95, abs=1)
+    assert stats["llm"] == {"count": 1, "p50_ms": 2000.0, "p95_ms": 2000.0}
+
+
+def test_recorded_turns_are_exported_as_a_latency_histogram(router):
+    before = {path: turn_latency.count(app="user", path=path) for path in ("local", "llm")}
+
+    router.record("local", 0.002)
+    router.record("llm", 1.5)
+
+    assert turn_latency.count(app="user", path="local") == before["local"] + 1
+    assert turn_latency.count(app="user", path="llm") == before["llm"] + 1
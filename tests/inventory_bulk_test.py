@@ -0,0 +1,188 @@
+# tests/inventory_bulk_test.py
+
+import csv
+import json
+import os
+import threading
+import time
+
+import pytest
+
+from firebase.inventory_cache import inventory_cache
+from scripts.inventory_bulk import data_path, export_medicines, import_medicines, validate_row
+from scripts.user_functions import place_order
+
+
+def write_csv(path, rows, fields=("name", "unit_price", "stock", "category")):
+    with open(path, "w", newline="", encoding="utf-8") as f:
+        writer = csv.DictWriter(f, fieldnames=fields)
+        writer.writeheader()
+        writer.writerows(rows)
+    return str(path)
+
+
+def test_upsert_writes_chunks_and_reports_bad_rows(db, tmp_path):
+    rows = [{"name": f"Medicine {n}", "unit_price": "2.5", "stock": str(n), "category": "General"} for n in range(10)]
+    rows[3]["stock"] = "lots"
+    rows[7]["name"] = ""
+    path = write_csv(tmp_path / "medicines.csv", rows)
+    progress = []
+
+    report = import_medicines(path, "upsert", client=db, chunk_size=4, progress=lambda r: progress.append(r["rows"]))
+
+    assert report["rows"] == 10 and report["written"] == 8
+    assert report["errors"] == [
+        {"line": 5, "name": "Medicine 3", "error": "stock must be a number, got 'lots'"},
+        {"line": 9, "name": "", "error": "name is required"},
+    ]
+    assert db.rpc_counts == {"batch_get": 2, "commit": 2}
+    assert progress == [5, 10, 10]
+    saved = db.data("medicines/medicine_9")
+    assert (saved["name"], saved["unit_price"], saved["stock"], saved["category"]) == ("medicine_9", 2.5, 9, "General")
+    assert "created_at" in saved
+
+
+def test_upsert_keeps_fields_the_file_does_not_mention(db, tmp_path):
+    db.seed("medicines", "insulin", {"name": "insulin", "unit_price": 30, "stock": 5, "madein": "Denmark"})
+    path = write_csv(tmp_path / "medicines.csv", [{"name": "Insulin", "unit_price": "32", "stock": "50", "category": ""}])
+
+    import_medicines(path, client=db)
+
+    assert db.data("medicines/insulin")["madein"] == "Denmark"
+    assert "created_at" not in db.data("medicines/insulin")
+    assert (db.data("medicines/insulin")["unit_price"], db.data("medicines/insulin")["stock"]) == (32.0, 50)
+
+
+def test_restock_increments_existing_medicines_and_reports_unknown_ones(db, tmp_path):
+    db.seed("medicines", "paracetamol", {"name": "paracetamol", "stock": 10})
+    db.seed("medicines", "insulin", {"name": "insulin", "stock": 4})
+    inventory_cache.get("paracetamol")
+    db.rpc_counts.clear()
+    path = tmp_path / "invoice.jsonl"
+    path.write_text("\n".join([
+        json.dumps({"name": "Paracetamol", "quantity": 90}),
+        json.dumps({"name": "insulin", "quantity": -4}),
+        json.dumps({"name": "unobtainium", "quantity": 5}),
+        "{not json",
+        json.dumps({"name": "insulin", "quantity": 1.5}),
+    ]) + "\n")
+
+    report = import_medicines(str(path), "restock", client=db)
+
+    assert db.data("medicines/paracetamol")["stock"] == 100
+    assert db.data("medicines/insulin")["stock"] == 0
+    assert [(error["line"], error["error"]) for error in report["errors"]] == [
+        (4, "invalid JSON: Expecting property name enclosed in double quotes"),
+        (5, "quantity must be a whole number, got 1.5"),
+        (3, "medicine not found"),
+    ]
+    # one existence check and one commit for the whole chunk
+    assert db.rpc_counts == {"batch_get": 1, "commit": 1}
+    assert inventory_cache.get("paracetamol")["stock"] == 100
+
+
+def test_restock_never_takes_stock_below_zero(db, tmp_path):
+    db.seed("medicines", "insulin", {"name": "insulin", "stock": 4})
+    path = write_csv(tmp_path / "invoice.csv", [{"name": "insulin", "quantity": -3}, {"name": "insulin", "quantity": -3}],
+                     fields=("name", "quantity"))
+
+    report = import_medicines(path, "restock", client=db)
+
+    assert report["written"] == 1
+    assert [(error["line"], error["error"]) for error in report["errors"]] == [
+        (3, "quantity -3 would leave stock below zero (available: 1)")]
+    assert db.data("medicines/insulin")["stock"] == 1
+
+
+def test_a_failing_chunk_falls_back_to_row_by_row_writes(db, tmp_path):
+    db.seed("medicines", "paracetamol", {"stock": 10})
+    # a stock the transaction can't add to fails the whole chunk
+    db.seed("medicines", "insulin", {"stock": "four"})
+    path = write_csv(tmp_path / "invoice.csv", [{"name": "paracetamol", "quantity": 1}, {"name": "insulin", "quantity": 1}],
+                     fields=("name", "quantity"))
+
+    report = import_medicines(path, "restock", client=db)
+
+    assert report["written"] == 1
+    assert [error["name"] for error in report["errors"]] == ["insulin"]
+    assert db.data("medicines/paracetamol")["stock"] == 11
+    assert db.data("medicines/insulin")["stock"] == "four"
+
+
+def test_an_order_placed_during_a_restock_cannot_take_stock_below_zero(db, tmp_path):
+    db.seed("medicines", "insulin", {"name": "insulin", "stock": 4, "unit_price": 1})
+    db.seed("users", "abebe@example.com", {"name": "Abebe", "recent_orders": []})
+    path = write_csv(tmp_path / "invoice.csv", [{"name": "insulin", "quantity": -3}], fields=("name", "quantity"))
+    original_get_all = db.get_all
+    results = []
+
+    def get_all_then_order(references, **kwargs):
+        snapshots = list(original_get_all(references, **kwargs))
+        if kwargs.get("transaction") is not None and not results:
+            # an order for 2 arrives after the restock has read a stock of 4
+            order = threading.Thread(target=lambda: results.append(place_order("insulin", 2, "abebe@example.com")))
+            results.append(order)
+            order.start()
+            time.sleep(0.1)
+        return snapshots
+
+    db.get_all = get_all_then_order
+    try:
+        report = import_medicines(path, "restock", client=db)
+        results[0].join(timeout=10)
+    finally:
+        del db.get_all
+
+    assert report["written"] == 1
+    # the order waited for the restock and saw the stock it left
+    assert not results[1]["success"]
+    assert db.data("medicines/insulin")["stock"] == 1
+
+
+def test_dry_run_only_validates(db, tmp_path):
+    path = write_csv(tmp_path / "medicines.csv", [{"name": "a", "unit_price": "1", "stock": "1", "category": ""}])
+
+    report = import_medicines(path, client=db, dry_run=True)
+
+    assert report["rows"] == 1 and report["written"] == 0
+    assert db.total_rpcs == 0
+
+
+def test_export_pages_through_the_collection(db, tmp_path):
+    for n in range(7):
+        db.seed("medicines", f"medicine_{n}", {"name": f"medicine_{n}", "unit_price": n, "stock": n * 10})
+
+    jsonl = tmp_path / "medicines.jsonl"
+    report = export_medicines(str(jsonl), client=db, page_size=3)
+    assert (report["rows"], report["pages"]) == (7, 3)
+    exported = [json.loads(line) for line in jsonl.read_text().splitlines()]
+    assert [row["id"] for row in exported] == [f"medicine_{n}" for n in range(7)]
+
+    csv_path = tmp_path / "medicines.csv"
+    export_medicines(str(csv_path), client=db)
+    db.reset()
+    db.seed("medicines", "medicine_0", {"stock": 0})
+    assert import_medicines(str(csv_path), client=db)["written"] == 7
+    assert db.data("medicines/medicine_6")["stock"] == 60
+
+
+@pytest.mark.parametrize("row, error", [
+    ({"name": "a", "unit_price": "-1", "stock": "1"}, "unit_price and stock must not be negative"),
+    ({"name": "a", "stock": "1"}, "unit_price is required"),
+    ({"name": "a", "unit_price": "1", "stock": "2.5"}, "stock must be a whole number, got '2.5'"),
+    (["a"], "row must be an object"),
+])
+def test_validation_errors(row, error):
+    with pytest.raises(ValueError, match=error.replace("(", r"\(")):
+        validate_row(row, "upsert")
+
+
+def test_data_paths_stay_inside_the_data_directory(tmp_path):
+    data_dir = tmp_path / "data"
+    data_dir.mkdir()
+    os.symlink(tmp_path, data_dir / "escape")
+
+    assert data_path("invoices/may.csv", str(data_dir)) == os.path.realpath(data_dir / "invoices" / "may.csv")
+    for path in ("/etc/passwd", "../app.py", "invoices/../../app.py", "escape/app.py", ""):
+        with pytest.raises(ValueError):
+            data_path(path, str(data_dir))
@@ -0,0 +1,86 @@
+# tests/inventory_cache_test.py
+
+from firebase.inventory_cache import InventoryCache, inventory_cache
+from scripts.user_functions import cancel_order, check_medicine_availability, place_order
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+def test_entries_expire_after_ttl():
+    clock = FakeClock()
+    loads = []
+    cache = InventoryCache(lambda name: loads.append(name) or {"stock": len(loads)}, ttl=10, clock=clock)
+
+    assert cache.get("insulin") == {"stock": 1}
+    clock.now = 9.9
+    assert cache.get("insulin") == {"stock": 1}
+    clock.now = 10.0
+    assert cache.get("insulin") == {"stock": 2}
+    assert (cache.hits, cache.misses) == (1, 2)
+
+
+def test_least_recently_used_entry_is_evicted():
+    cache = InventoryCache(lambda name: {"name": name}, max_entries=2)
+
+    cache.get("a")
+    cache.get("b")
+    cache.get("a")
+    cache.get("c")
+
+    assert cache.stats()["size"] == 2
+    assert cache.stats()["evictions"] == 1
+    cache.get("a")
+    assert cache.hits == 2
+    cache.get("b")
+    assert cache.misses == 4
+
+
+def test_totals_keep_counting_across_clear():
+    cache = InventoryCache(lambda name: {"name": name})
+    cache.get("a")
+    cache.get("a")
+
+    cache.clear()
+    cache.get("a")
+
+    stats = cache.stats()
+    assert (stats["hits"], stats["misses"]) == (0, 1)
+    # exported as Prometheus counters, which must never go backwards
+    assert (stats["hits_total"], stats["misses_total"]) == (1, 2)
+
+
+def test_missing_medicines_are_cached_too():
+    loads = []
+    cache = InventoryCache(lambda name: loads.append(name))
+
+    assert cache.get("unknownium") is None
+    assert cache.get("unknownium") is None
+    assert loads == ["unknownium"]
+
+
+def test_availability_checks_hit_the_cache(db):
+    db.seed("medicines", "paracetamol", {"name": "paracetamol", "stock": 10, "unit_price": 2})
+
+    for _ in range(5):
+        assert check_medicine_availability("Paracetamol")["data"]["stock"] == 10
+
+    assert db.rpc_counts["get"] == 1
+    assert inventory_cache.stats()["reads_saved"] == 4
+
+
+def test_orders_and_cancellations_invalidate_the_entry(db):
+    db.seed("medicines", "paracetamol", {"name": "paracetamol", "stock": 10, "unit_price": 2})
+    db.seed("users", "abebe@example.com", {"orders": {}})
+    check_medicine_availability("paracetamol")
+
+    order = place_order("paracetamol", 4, "abebe@example.com")
+    assert check_medicine_availability("paracetamol")["data"]["stock"] == 6
+
+    cancel_order(order["order_id"], "abebe@example.com")
+    assert check_medicine_availability("paracetamol")["data"]["stock"] == 10
@@ -0,0 +1,79 @@
+# tests/inventory_mirror_test.py
+
+from firebase.inventory_mirror import InventoryMirror, get_medicine
+
+
+def start_mirror(db):
+    mirror = InventoryMirror(lambda: db.collection("medicines"))
+    mirror.start()
+    return mirror
+
+
+def test_initial_snapshot_loads_the_whole_collection(db):
+    db.seed("medicines", "insulin", {"name": "insulin", "stock": 4})
+    db.seed("medicines", "morphine", {"name": "morphine", "stock": 0})
+
+    mirror = start_mirror(db)
+
+    assert mirror.connected
+    assert len(mirror) == 2
+    assert mirror.get("insulin") == {"name": "insulin", "stock": 4}
+
+
+def test_writes_are_mirrored_without_reads(db):
+    db.seed("medicines", "insulin", {"name": "insulin", "stock": 4})
+    mirror = start_mirror(db)
+    medicines = db.collection("medicines")
+
+    medicines.document("insulin").update({"stock": 9})
+    medicines.document("citalopram").set({"name": "citalopram", "stock": 1})
+    medicines.document("insulin").delete()
+    db.rpc_counts.clear()
+
+    assert mirror.get("insulin") is None
+    assert get_medicine("citalopram", mirror) == {"name": "citalopram", "stock": 1}
+    assert db.total_rpcs == 0
+
+
+def test_replayed_events_are_applied_in_order(db):
+    mirror = start_mirror(db)
+
+    mirror._watch.replay([
+        ("ADDED", "doxycycline", {"stock": 3}),
+        ("MODIFIED", "doxycycline", {"stock": 2}),
+        ("ADDED", "aspirin", {"stock": 7}),
+        ("REMOVED", "aspirin", {"stock": 7}),
+    ])
+
+    assert mirror.get("doxycycline") == {"stock": 2}
+    assert mirror.get("aspirin") is None
+    assert mirror.events == 4
+
+
+def test_disconnected_mirror_falls_back_to_direct_reads(db):
+    db.seed("medicines", "insulin", {"name": "insulin", "stock": 4})
+    mirror = start_mirror(db)
+    mirror._watch.disconnect()
+    db.collection("medicines").document("insulin").update({"stock": 1})
+    db.rpc_counts.clear()
+
+    assert not mirror.connected
+    assert get_medicine("insulin", mirror)["stock"] == 1
+    assert db.rpc_counts["get"] == 1
+
+
+def test_disabled_mirror_never_subscribes(db):
+    db.seed("medicines", "insulin", {"name": "insulin", "stock": 4})
+    mirror = InventoryMirror(lambda: db.collection("medicines"), enabled=False)
+
+    assert get_medicine("insulin", mirror)["stock"] == 4
+    assert mirror._watch is None
+
+
+def test_the_collection_is_resolved_on_subscribe(db):
+    resolved = []
+    mirror = InventoryMirror(lambda: resolved.append(True) or db.collection("medicines"))
+    assert resolved == []
+
+    mirror.start()
+    assert resolved == [True]
@@ -0,0 +1,58 @@
+# tests/list_my_orders_test.py
+
+from datetime import datetime, timedelta
+
+from scripts.user_functions import get_health_advice, list_my_orders
+
+
+def seed_orders(db, count, user_email="abebe@example.com", prefix="order"):
+    start = datetime(2025, 1, 1)
+    for number in range(count):
+        db.seed("orders", f"{prefix}-{number:02d}", {
+            "order_id": f"{prefix}-{number:02d}",
+            "user_email": user_email,
+            "medicine_name": "insulin",
+            "quantity": 1,
+            "total_price": 4,
+            "status": "pending",
+            "created_at": start + timedelta(minutes=number),
+            "updated_at": start,
+        })
+
+
+def test_pages_run_newest_first_until_the_cursor_runs_out(db):
+    seed_orders(db, 12)
+    seed_orders(db, 3, user_email="someone@example.com", prefix="other")
+
+    first = list_my_orders("abebe@example.com", limit=5)
+    ids = [order["order_id"] for order in first["data"]["orders"]]
+    assert ids == ["order-11", "order-10", "order-09", "order-08", "order-07"]
+    assert first["data"]["next_cursor"] == "order-07"
+    # a page is one indexed query, and only the summary fields come back
+    assert db.rpc_counts == {"query": 1}
+    assert "updated_at" not in first["data"]["orders"][0]
+
+    second = list_my_orders("abebe@example.com", limit=5, cursor=first["data"]["next_cursor"])
+    last = list_my_orders("abebe@example.com", limit=5, cursor=second["data"]["next_cursor"])
+    pages = [first, second, last]
+    assert [order["order_id"] for page in pages for order in page["data"]["orders"]] == [
+        f"order-{number:02d}" for number in range(11, -1, -1)]
+    assert last["data"]["next_cursor"] is None
+
+
+def test_a_cursor_from_someone_elses_order_is_rejected(db):
+    seed_orders(db, 2, user_email="someone@example.com")
+
+    result = list_my_orders("abebe@example.com", cursor="order-01")
+
+    assert not result["success"]
+    assert result["message"] == "Invalid cursor"
+
+
+def test_health_advice_reads_the_recent_orders_summary(db):
+    db.seed("users", "abebe@example.com", {"name": "Abebe", "age": 30, "recent_orders": [
+        {"order_id": "order-02", "medicine_name": "insulin", "quantity": 1}]})
+    db.seed("users", "old@example.com", {"name": "Old", "age": 60, "orders": {"order-01": "morphine"}})
+
+    assert get_health_advice("abebe@example.com")["data"]["user"]["order_history"] == ["insulin"]
+    assert get_health_advice("old@example.com")["data"]["user"]["order_history"] == ["morphine"]
@@ -0,0 +1,69 @@
+# tests/loadtest_test.py
+
+import pytest
+
+from benchmarks.loadtest import compare, run_scenario, user_turn
+from benchmarks.loadtest_scenarios import MEDICINES, SCENARIOS, SEED_STOCK, Scenario, seed_inventory, user_email
+from scripts.response_cache import ResponseCache
+from tests.fake_genai import FakeGenaiClient
+
+
+@pytest.mark.parametrize("name", sorted(SCENARIOS))
+def test_every_scenario_runs_through_the_chat_turn_without_errors(db, name):
+    report = run_scenario(SCENARIOS[name](fanout=2), users=8, turns=2, model_latency=0.0, rpc_latency=0.0)
+
+    assert report["turns"] == 16
+    assert report["errors"] == 0
+    assert report["p50_ms"] <= report["p95_ms"] <= report["p99_ms"]
+    if name == "cancel":
+        # cancelling is answered by the router: no model call, one read and one commit per order
+        assert (report["local_share"], report["model_requests"]) == (1.0, 0)
+        assert report["rpcs"] == {"get": 16, "commit": 16}
+    elif name == "order":
+        # one request for the calls and one for the final answer
+        assert report["model_requests"] == 32
+        assert report["rpcs"] == {"batch_get": 16, "commit": 16}
+    elif name == "restock":
+        assert report["rpcs"] == {"update": 32}
+
+
+def test_user_turns_take_the_apps_local_and_cached_paths(db):
+    seed_inventory(db, 1)
+    scenario = SCENARIOS["browse"]()
+    client = FakeGenaiClient(script=scenario.model_calls, final_text="Both are in stock.")
+    cache = ResponseCache()
+    prompt = "Can you check insulin and ibuprofen for me?"
+
+    assert user_turn(client, "load-help", user_email(0), "help", cache)["path"] == "local"
+    assert user_turn(client, "load-first", user_email(0), prompt, cache)["path"] == "llm"
+    assert user_turn(client, "load-second", user_email(0), prompt, cache)["path"] == "cache"
+    # the calls and the answer of the first turn only
+    assert len(client.requests) == 2
+
+
+def test_a_scenario_must_write_its_prompts():
+    class Silent(Scenario):
+        name = "silent"
+
+    with pytest.raises(TypeError):
+        Silent()
+
+
+def test_concurrent_orders_all_come_out_of_stock(db):
+    run_scenario(SCENARIOS["order"](), users=20, turns=3, model_latency=0.0, rpc_latency=0.001)
+
+    stock = sum(db.data(f"medicines/{name}")["stock"] for name in MEDICINES)
+    orders = [data for path, data in db._docs.items() if path.startswith("orders/")]
+    assert len(orders) == 60
+    assert stock + sum(order["quantity"] for order in orders) == len(MEDICINES) * SEED_STOCK
+
+
+def test_compare_flags_p95_and_rpc_regressions():
+    baseline = [{"scenario": "browse", "p95_ms": 100.0, "rpcs_per_turn": 1.0},
+                {"scenario": "order", "p95_ms": 100.0, "rpcs_per_turn": 2.0}]
+    reports = [{"scenario": "browse", "p95_ms": 110.0, "rpcs_per_turn": 1.0},
+               {"scenario": "order", "p95_ms": 200.0, "rpcs_per_turn": 3.0},
+               {"scenario": "restock", "p95_ms": 900.0, "rpcs_per_turn": 9.0}]
+
+    regressions = compare(reports, baseline, max_regression=0.25)
+    assert regressions == ["order: p95 100 ms -> 200 ms", "order: RPCs per turn 2.00 -> 3.00"]
@@ -0,0 +1,127 @@
+# tests/medicine_index_test.py
+
+import threading
+import time
+
+import pytest
+
+from firebase.inventory_mirror import InventoryMirror
+from firebase.medicine_index import MedicineIndex, normalize_name
+from scripts.user_functions import check_medicine_availability
+
+CATALOG = {
+    "paracetamol": {"name": "paracetamol", "aliases": ["acetaminophen", "panadol"]},
+    "aspirin": {"name": "aspirin"},
+    "amoxicillin": {"name": "Amoxicillin"},
+    "vitamin_c": {"name": "vitamin_c"},
+    "ibuprofen": {"name": "ibuprofen"},
+}
+
+
+@pytest.fixture
+def index():
+    return MedicineIndex(lambda: CATALOG.items())
+
+
+@pytest.mark.parametrize("query, expected", [
+    ("Paracetamol", "paracetamol"),
+    ("paracetmol", "paracetamol"),
+    ("Aspririn", "aspirin"),
+    ("amoxicilin 500mg", "amoxicillin"),
+    ("Amoxicillin 250 mg capsules", "amoxicillin"),
+    ("Vitamin-C", "vitamin_c"),
+    ("panadol", "paracetamol"),
+    ("acetaminophen tablets", "paracetamol"),
+])
+def test_names_and_misspellings_resolve_to_the_document_id(index, query, expected):
+    assert index.resolve(query) == expected
+
+
+def test_unrelated_names_do_not_resolve_but_get_suggestions(index):
+    assert index.resolve("morphine") is None
+    assert index.resolve("ibu") is None
+    assert index.suggest("ibu")[0][0] == "ibuprofen"
+
+
+def test_typos_one_edit_away_and_further_both_resolve(index):
+    # dropped, added, swapped and wrong letters are found through the deletion index
+    assert [index.resolve(query) for query in ("ibuprofn", "ibuprofeen", "ibuporfen", "ibuprafen")] == ["ibuprofen"] * 4
+    # two edits away ("ph" spelled "f") only the trigram index finds it
+    assert index.resolve("acetaminofen") == "paracetamol"
+    index.remove("ibuprofen")
+    assert index.resolve("ibuprofn") is None
+    assert index.suggest("ibuprofn") == []
+
+
+def test_free_text_mentions(index):
+    assert index.find("do you have paracetmol and vitamin c 500mg?") == ["paracetamol", "vitamin_c"]
+    assert index.find("what is the price of it") == []
+
+
+def test_incremental_updates(index):
+    index.resolve("aspirin")
+    index.upsert("insulin", {"name": "insulin", "aliases": ["humulin"]})
+    index.remove("aspirin")
+
+    assert index.resolve("humulin") == "insulin"
+    assert index.resolve("aspirin") is None
+
+
+def test_mirror_events_keep_the_index_current(db):
+    index = MedicineIndex(lambda: [])
+    mirror = InventoryMirror(lambda: db.collection("medicines"))
+    mirror.add_listener(index.on_mirror_change)
+    mirror.start()
+    index.resolve("warm up")
+
+    db.collection("medicines").document("doxycycline").set({"name": "doxycycline"})
+    assert index.resolve("doxycyclin") == "doxycycline"
+
+    db.collection("medicines").document("doxycycline").delete()
+    assert index.resolve("doxycycline") is None
+
+
+def test_exact_matches_ignore_misspellings(index):
+    assert index.exact("Panadol 500mg tablets") == "paracetamol"
+    assert index.exact("vitamin c") == "vitamin_c"
+    assert index.exact("paracetmol") is None
+
+
+def test_an_expired_index_is_rebuilt_in_the_background():
+    catalog = dict(CATALOG)
+    release = threading.Event()
+    loads = []
+
+    def loader():
+        loads.append(True)
+        if len(loads) == 2:
+            release.wait(5)
+        return list(catalog.items())
+
+    index = MedicineIndex(loader, ttl=0)
+    assert index.exact("aspirin") == "aspirin"
+    catalog["insulin"] = {"name": "insulin"}
+
+    # the rebuild is blocked, yet the lookup is answered from the current index
+    assert index.exact("insulin") is None
+    release.set()
+    deadline = time.monotonic() + 5
+    while index.exact("insulin") is None and time.monotonic() < deadline:
+        time.sleep(0.01)
+    assert index.exact("insulin") == "insulin"
+
+
+def test_normalize_name():
+    assert normalize_name("Amoxicillin 500mg Tablets") == "amoxicillin"
+    assert normalize_name("vitamin_c") == "vitamin c"
+
+
+def test_availability_check_corrects_spelling_and_suggests(db):
+    db.seed("medicines", "paracetamol", {"name": "paracetamol", "stock": 3, "unit_price": 1})
+    db.seed("medicines", "ibuprofen", {"name": "ibuprofen", "stock": 3, "unit_price": 1})
+
+    assert check_medicine_availability("paracetmol")["data"]["name"] == "paracetamol"
+    missing = check_medicine_availability("ibu")
+    assert not missing["success"]
+    assert missing["suggestions"][0] == "ibuprofen"
+    assert "Did you mean: ibuprofen" in missing["message"]
@@ -0,0 +1,155 @@
+# tests/metrics_test.py
+
+import pytest
+import requests
+from google.auth.credentials import AnonymousCredentials
+from google.cloud import firestore_v1
+from google.cloud.firestore_v1.types import BatchGetDocumentsResponse, Document, RunQueryResponse
+
+from scripts.metrics import (
+    MetricsRegistry,
+    firestore_documents,
+    llm_call,
+    llm_calls,
+    llm_latency,
+    register_cache,
+    registry,
+)
+from scripts.telegram_broadcast import ChatRateLimiter, TelegramBroadcaster
+from scripts.tool_dispatcher import dispatch_tool_calls
+from scripts.tracing import instrument_firestore
+from scripts.user_functions import check_medicine_availability, place_order
+
+
+def scrape(server):
+    response = requests.get(f"http://127.0.0.1:{server.server_address[1]}/metrics", timeout=5)
+    assert response.status_code == 200
+    assert response.headers["Content-Type"].startswith("text/plain; version=0.0.4")
+    samples = {}
+    for line in response.text.splitlines():
+        if line and not line.startswith("#"):
+            name, value = line.rsplit(" ", 1)
+            samples[name] = float(value)
+    return response.text, samples
+
+
+@pytest.fixture
+def endpoint():
+    server = registry.serve(port=0)
+    yield server
+    registry.stop()
+
+
+def test_scraping_the_endpoint_after_tool_calls_orders_and_announcements(db, stub, endpoint):
+    db.seed("medicines", "paracetamol", {"name": "paracetamol", "stock": 1, "unit_price": 2})
+    db.seed("users", "abebe@example.com", {"name": "Abebe", "orders": {}})
+    _, before = scrape(endpoint)
+    calls = [("check_medicine_availability", {"medicine_name": "paracetamol"}),
+             ("place_order", {"medicine_name": "paracetamol", "quantity": 1}),
+             ("hallucinated_tool", {})]
+
+    def execute(name, args):
+        if name == "check_medicine_availability":
+            return check_medicine_availability(**args)
+        if name == "place_order":
+            return place_order(**args, user_email="abebe@example.com")
+        raise KeyError(name)
+
+    dispatch_tool_calls(calls, execute)
+    place_order("paracetamol", 1, "abebe@example.com")
+    TelegramBroadcaster("TOKEN", {"channel": "@channel", "missing": "@missing"}, api_url=stub.url,
+                        rate_limiter=ChatRateLimiter(interval=0.0)).broadcast("hello")
+    register_cache("test", lambda: {"hits": 3, "misses": 1, "hit_ratio": 0.75, "hits_total": 3, "misses_total": 1})
+    text, after = scrape(endpoint)
+
+    def delta(sample):
+        return after.get(sample, 0) - before.get(sample, 0)
+
+    assert "# TYPE axon_tool_calls_total counter" in text
+    assert delta('axon_tool_calls_total{function="check_medicine_availability"}') == 1
+    assert delta('axon_tool_calls_total{function="place_order"}') == 1
+    assert delta('axon_tool_calls_total{function="unknown"}') == 1
+    assert delta('axon_tool_errors_total{function="unknown"}') == 1
+    assert delta('axon_tool_errors_total{function="place_order"}') == 0
+    # every declared tool is listed before it is first called
+    assert 'axon_tool_calls_total{function="telegram_post"}' in after
+    assert delta('axon_orders_total{action="place",outcome="placed"}') == 1
+    assert delta('axon_orders_total{action="place",outcome="rejected"}') == 1
+    assert delta('axon_telegram_sends_total{outcome="delivered"}') == 1
+    assert delta('axon_telegram_sends_total{outcome="rejected"}') == 1
+    assert after['axon_cache_hit_ratio{cache="test"}'] == 0.75
+    assert after['axon_cache_hits_total{cache="test"}'] == 3
+
+
+def test_llm_calls_are_counted_and_timed_per_model():
+    local = MetricsRegistry()
+    histogram = local.histogram("llm_seconds", "latency", ("model",), buckets=(0.5, 1.0))
+    for seconds in (0.2, 0.5, 0.7, 3.0):
+        histogram.observe(seconds, model="gemini-2.5-flash")
+
+    lines = local.render().splitlines()
+    assert lines[2:] == [
+        'llm_seconds_bucket{model="gemini-2.5-flash",le="0.5"} 2',
+        'llm_seconds_bucket{model="gemini-2.5-flash",le="1"} 3',
+        'llm_seconds_bucket{model="gemini-2.5-flash",le="+Inf"} 4',
+        'llm_seconds_sum{model="gemini-2.5-flash"} 4.4',
+        'llm_seconds_count{model="gemini-2.5-flash"} 4',
+    ]
+
+    failed = llm_calls.value(model="test-model", call="send_message", outcome="error")
+    with pytest.raises(RuntimeError):
+        with llm_call("test-model", "send_message"):
+            raise RuntimeError("quota")
+    assert llm_calls.value(model="test-model", call="send_message", outcome="error") == failed + 1
+    assert llm_latency.count(model="test-model", call="send_message") >= 1
+
+
+def test_registering_again_returns_the_same_metric():
+    local = MetricsRegistry()
+    counter = local.counter("turns_total", "turns", ("app",))
+    assert local.counter("turns_total", "turns", ("app",)) is counter
+    with pytest.raises(ValueError):
+        local.counter("turns_total", "turns", ("path",))
+    with pytest.raises(ValueError):
+        counter.inc(app="user", path="llm")
+
+
+def test_firestore_documents_are_counted_per_collection_from_gapic_requests():
+    client = firestore_v1.Client(project="axon-test", credentials=AnonymousCredentials())
+    batch = client.batch()
+    batch.update(client.collection("medicines").document("paracetamol"), {"stock": firestore_v1.Increment(-1)})
+    batch.set(client.collection("orders").document("order-1"), {"status": "pending"})
+    batch.delete(client.collection("users").document("abebe@example.com").collection("chat_history").document("x"))
+    root = client._database_string + "/documents"
+
+    class FakeFirestoreApi:
+        def commit(self, request=None, metadata=None):
+            return "committed"
+
+        def batch_get_documents(self, request=None, metadata=None):
+            yield BatchGetDocumentsResponse(found=Document(name=f"{root}/medicines/insulin"))
+            yield BatchGetDocumentsResponse(missing=f"{root}/medicines/unobtainium")
+
+        def run_query(self, request=None, metadata=None):
+            yield RunQueryResponse(document=Document(name=f"{root}/orders/order-1"))
+            yield RunQueryResponse()
+
+    instrument_firestore(FakeFirestoreApi)
+    api = FakeFirestoreApi()
+    counts = {(collection, operation): firestore_documents.value(collection=collection, operation=operation)
+              for collection in ("medicines", "orders", "chat_history") for operation in ("read", "write")}
+
+    assert api.commit(request={"database": client._database_string, "writes": batch._write_pbs}) == "committed"
+    assert len(list(api.batch_get_documents(request={}))) == 2
+    assert len(list(api.run_query(request={}))) == 2
+
+    def delta(collection, operation):
+        return firestore_documents.value(collection=collection, operation=operation) - counts[collection, operation]
+
+    assert (delta("medicines", "write"), delta("orders", "write"), delta("chat_history", "write")) == (1, 1, 1)
+    assert (delta("medicines", "read"), delta("orders", "read")) == (2, 1)
+
+
+def test_unknown_paths_get_a_404(endpoint):
+    response = requests.get(f"http://127.0.0.1:{endpoint.server_address[1]}/", timeout=5)
+    assert response.status_code == 404
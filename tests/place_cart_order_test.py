@@ -0,0 +1,129 @@
+# tests/place_cart_order_test.py
+
+import threading
+
+from scripts import event_loop
+from scripts.user_functions import cancel_order, list_my_orders, place_cart_order, place_order
+from scripts.user_functions_async import cancel_order_async, place_cart_order_async
+
+USER_EMAIL = "abebe@example.com"
+PRESCRIPTION = [
+    {"medicine_name": "Paracetamol", "quantity": 2},
+    {"medicine_name": "insulin", "quantity": 1},
+    {"medicine_name": "doxycycline", "quantity": 3},
+]
+
+
+def seed(db, stock=10):
+    for name, unit_price in (("paracetamol", 2.5), ("insulin", 10), ("doxycycline", 4)):
+        db.seed("medicines", name, {"name": name, "stock": stock, "unit_price": unit_price})
+    db.seed("users", USER_EMAIL, {"name": "Abebe", "recent_orders": []})
+
+
+def stocks(db):
+    return [db.data(f"medicines/{name}")["stock"] for name in ("paracetamol", "insulin", "doxycycline")]
+
+
+def test_a_prescription_is_one_order_document_in_one_commit(db):
+    seed(db)
+
+    result = place_cart_order(PRESCRIPTION, USER_EMAIL)
+
+    assert result["success"]
+    order = db.data(f"orders/{result['order_id']}")
+    assert [(item["medicine_name"], item["quantity"], item["total_price"]) for item in order["items"]] == [
+        ("paracetamol", 2, 5.0), ("insulin", 1, 10), ("doxycycline", 3, 12)]
+    assert (order["quantity"], order["total_price"]) == (6, 27.0)
+    assert stocks(db) == [8, 9, 7]
+    assert db.data(f"users/{USER_EMAIL}")["recent_orders"][0]["order_id"] == result["order_id"]
+    assert (db.rpc_counts["batch_get"], db.rpc_counts["commit"]) == (1, 1)
+    assert len(list(db.collection("orders").stream())) == 1
+    assert list_my_orders(USER_EMAIL)["data"]["orders"][0]["items"] == order["items"]
+
+
+def test_one_short_line_orders_nothing(db):
+    seed(db)
+    db.seed("medicines", "insulin", {"name": "insulin", "stock": 0, "unit_price": 10})
+
+    result = place_cart_order(PRESCRIPTION, USER_EMAIL)
+
+    assert not result["success"]
+    assert "insulin (available: 0)" in result["message"]
+    assert stocks(db) == [10, 0, 10]
+    assert list(db.collection("orders").stream()) == []
+
+
+def test_misspelled_lines_get_suggestions_and_order_nothing(db):
+    seed(db)
+
+    result = place_cart_order([{"medicine_name": "paracetamol", "quantity": 1},
+                               {"medicine_name": "insulin glargine", "quantity": 1}], USER_EMAIL)
+
+    assert not result["success"]
+    assert result["suggestions"]["insulin glargine"][0] == "insulin"
+    assert "Did you mean insulin" in result["message"]
+    assert stocks(db) == [10, 10, 10]
+
+
+def test_invalid_carts_are_rejected_before_any_read(db):
+    seed(db)
+
+    for items in ([], [{"medicine_name": "insulin", "quantity": 0}], [{"quantity": 1}],
+                  [{"medicine_name": "insulin", "quantity": 1.5}]):
+        assert not place_cart_order(items, USER_EMAIL)["success"]
+    assert db.total_rpcs == 0
+
+
+def test_repeated_medicines_are_merged_into_one_line(db):
+    seed(db)
+
+    result = place_cart_order([{"medicine_name": "insulin", "quantity": 1},
+                               {"medicine_name": "Insulin", "quantity": 2}], USER_EMAIL)
+
+    assert [(item["medicine_name"], item["quantity"]) for item in result["data"]["items"]] == [("insulin", 3)]
+    assert db.data("medicines/insulin")["stock"] == 7
+
+
+def test_cancel_restores_every_line_in_one_commit(db):
+    seed(db)
+    order_id = place_cart_order(PRESCRIPTION, USER_EMAIL)["order_id"]
+    commits = db.rpc_counts["commit"]
+
+    result = cancel_order(order_id, USER_EMAIL)
+
+    assert result == {"success": True, "message": f"Order {order_id} cancelled successfully"}
+    assert stocks(db) == [10, 10, 10]
+    assert db.data(f"orders/{order_id}")["status"] == "cancelled"
+    assert db.rpc_counts["commit"] == commits + 1
+    assert db.rpc_counts["update"] == 0
+    # a second cancellation restores nothing
+    assert not cancel_order(order_id, USER_EMAIL)["success"]
+    assert stocks(db) == [10, 10, 10]
+
+
+def test_concurrent_cancellations_restock_once(db):
+    seed(db)
+    order_id = place_order("insulin", 4, USER_EMAIL)["order_id"]
+    db.latency = 0.001
+    results = []
+
+    cancellers = [threading.Thread(target=lambda: results.append(cancel_order(order_id, USER_EMAIL)))
+                  for _ in range(8)]
+    for canceller in cancellers:
+        canceller.start()
+    for canceller in cancellers:
+        canceller.join()
+
+    assert sum(1 for result in results if result["success"]) == 1
+    assert db.data("medicines/insulin")["stock"] == 10
+
+
+def test_async_cart_order_and_cancel(db):
+    seed(db)
+
+    result = event_loop.run(place_cart_order_async(PRESCRIPTION, USER_EMAIL))
+
+    assert result["success"]
+    assert stocks(db) == [8, 9, 7]
+    assert event_loop.run(cancel_order_async(result["order_id"], USER_EMAIL))["success"]
+    assert stocks(db) == [10, 10, 10]
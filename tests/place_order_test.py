@@ -0,0 +1,103 @@
+# tests/place_order_test.py
+
+import threading
+
+from scripts.user_functions import RECENT_ORDERS_LIMIT, place_order
+
+
+def seed_medicine(db, stock=10, unit_price=2.5):
+    db.seed("medicines", "paracetamol", {"name": "paracetamol", "stock": stock, "unit_price": unit_price})
+    db.seed("users", "abebe@example.com", {"name": "Abebe", "orders": {}})
+
+
+def test_place_order_writes_stock_order_and_user_summary_in_one_commit(db):
+    seed_medicine(db)
+
+    result = place_order("Paracetamol", 3, "abebe@example.com")
+
+    assert result["success"]
+    order_id = result["order_id"]
+    assert db.data("medicines/paracetamol")["stock"] == 7
+    assert db.data(f"orders/{order_id}")["total_price"] == 7.5
+    user = db.data("users/abebe@example.com")
+    assert [(order["order_id"], order["medicine_name"], order["quantity"]) for order in user["recent_orders"]] == [
+        (order_id, "paracetamol", 3)]
+    # the legacy unbounded map is dropped
+    assert "orders" not in user
+    assert (db.rpc_counts["batch_get"], db.rpc_counts["commit"]) == (1, 1)
+    assert db.rpc_counts["get"] == db.rpc_counts["set"] == db.rpc_counts["update"] == 0
+
+
+def test_place_order_rejects_when_stock_is_short(db):
+    seed_medicine(db, stock=2)
+
+    result = place_order("paracetamol", 3, "abebe@example.com")
+
+    assert not result["success"]
+    assert result["message"] == "Not enough stock. Available: 2"
+    assert db.data("medicines/paracetamol")["stock"] == 2
+
+
+def test_place_order_never_orders_a_fuzzy_match(db):
+    seed_medicine(db)
+    db.seed("medicines", "insulin", {"name": "insulin", "stock": 10, "unit_price": 9})
+
+    for name in ("paracetmol", "insulin glargine"):
+        result = place_order(name, 1, "abebe@example.com")
+        assert not result["success"]
+        assert "Did you mean" in result["message"]
+
+    assert result["suggestions"] == {"insulin glargine": ["insulin"]}
+    assert db.data("medicines/paracetamol")["stock"] == 10
+    assert db.data("medicines/insulin")["stock"] == 10
+
+
+def test_place_order_accepts_names_and_aliases(db):
+    db.seed("medicines", "paracetamol", {"name": "Paracetamol", "aliases": ["panadol"], "stock": 10, "unit_price": 1})
+    db.seed("users", "abebe@example.com", {"name": "Abebe"})
+
+    result = place_order("Panadol 500mg tablets", 1, "abebe@example.com")
+
+    assert result["success"]
+    assert result["data"]["medicine_name"] == "paracetamol"
+
+
+def test_place_order_unknown_medicine(db):
+    result = place_order("unknownium", 1, "abebe@example.com")
+
+    assert not result["success"]
+    assert "not found" in result["message"]
+
+
+def test_place_order_creates_a_missing_user_document(db):
+    db.seed("medicines", "paracetamol", {"name": "paracetamol", "stock": 5, "unit_price": 1})
+
+    result = place_order("paracetamol", 1, "newcomer@example.com")
+
+    assert result["success"]
+    assert db.data("medicines/paracetamol")["stock"] == 4
+    assert [order["order_id"] for order in db.data("users/newcomer@example.com")["recent_orders"]] == [
+        result["order_id"]]
+    assert (db.rpc_counts["batch_get"], db.rpc_counts["commit"]) == (1, 1)
+
+
+def test_concurrent_buyers_never_oversell(db):
+    seed_medicine(db, stock=20)
+    db.latency = 0.001
+    results = []
+
+    def buy():
+        for _ in range(4):
+            results.append(place_order("paracetamol", 1, "abebe@example.com"))
+
+    buyers = [threading.Thread(target=buy) for _ in range(16)]
+    for buyer in buyers:
+        buyer.start()
+    for buyer in buyers:
+        buyer.join()
+
+    placed = sum(1 for result in results if result["success"])
+    assert placed == 20
+    assert db.data("medicines/paracetamol")["stock"] == 0
+    assert len(db.data("users/abebe@example.com")["recent_orders"]) == RECENT_ORDERS_LIMIT
+    assert len(list(db.collection("orders").stream())) == 20
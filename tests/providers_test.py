@@ -0,0 +1,52 @@
+# tests/providers_test.py
+
+import threading
+import time
+
+from firebase.db_manager import db as app_db, firestore_client
+from scripts.providers import Provider
+
+
+def test_client_is_built_once_on_first_use_even_when_raced():
+    built = []
+
+    def factory():
+        time.sleep(0.01)
+        built.append(object())
+        return built[-1]
+
+    provider = Provider("test", factory)
+    handle = provider.proxy()
+    assert not provider.created
+
+    results = []
+    threads = [threading.Thread(target=lambda: results.append(provider.get())) for _ in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert len(built) == 1
+    assert all(result is built[0] for result in results)
+    assert handle.__class__.__name__ == "LazyClient" and provider.created
+
+
+def test_override_reaches_handles_taken_before_it():
+    class Client:
+        def __init__(self, name):
+            self.name = name
+
+    provider = Provider("test", lambda: Client("real"))
+    handle = provider.proxy()
+
+    provider.override(Client("fake"))
+    assert handle.name == "fake"
+    provider.override(None)
+    assert handle.name == "real"
+
+
+def test_the_app_db_handle_serves_the_fake_without_initializing_firebase(db):
+    db.seed("medicines", "insulin", {"stock": 3})
+
+    assert app_db.collection("medicines").document("insulin").get().to_dict() == {"stock": 3}
+    assert not firestore_client.created
@@ -0,0 +1,182 @@
+# tests/response_cache_test.py
+
+import sqlite3
+
+from google.genai import types
+
+from scripts.admin_functions import add_stock
+from scripts.chat_turn import execute_user_tool, run_model_turn
+from scripts.response_cache import ResponseCache
+from scripts.user_functions import place_order
+from tests.fake_genai import FakeGenaiClient
+
+USER_EMAIL = "abebe@example.com"
+MODEL = "gemini-test"
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+
+def seed(db):
+    db.seed("medicines", "paracetamol", {"name": "paracetamol", "stock": 10, "unit_price": 2.5})
+    db.seed("users", USER_EMAIL, {"name": "Abebe", "age": 30, "recent_orders": []})
+
+
+def script(prompt):
+    if "advice" in prompt:
+        return [types.FunctionCall(name="get_health_advice", args={"symptoms": "headache"})]
+    if "order" in prompt:
+        return [types.FunctionCall(name="place_order", args={"medicine_name": "paracetamol", "quantity": 1})]
+    return [types.FunctionCall(name="check_medicine_availability", args={"medicine_name": "paracetamol"})]
+
+
+def turn(client, cache, prompt, user_email=USER_EMAIL):
+    chat = client.chats.create(model=MODEL)
+    result = run_model_turn(chat, prompt, lambda name, args: execute_user_tool(name, args, user_email, False),
+                            "user_chat", "".join, MODEL, cache=cache, cache_scope=user_email)
+    return chat, result
+
+
+def test_a_repeated_question_is_answered_without_the_model(db):
+    seed(db)
+    client = FakeGenaiClient(script=script, final_text="Rest and drink water.", latency=0.01)
+    cache = ResponseCache()
+
+    turn(client, cache, "Any advice for a headache?")
+    requests = len(client.requests)
+    chat, result = turn(client, cache, "any advice for a HEADACHE")
+
+    assert len(client.requests) == requests
+    assert result["cached"] and result["text"] == "Rest and drink water."
+    assert [fn.name for fn in result["function_calls"]] == ["get_health_advice"]
+    assert [content.role for content in chat.get_history()] == ["user", "model"]
+    stats = cache.stats()
+    assert (stats["hits"], stats["misses"]) == (1, 1)
+    assert stats["saved_seconds"] >= 0.02
+
+
+def test_changed_tool_results_go_back_to_the_model(db):
+    seed(db)
+    client = FakeGenaiClient(script=script, final_text="Yes, we have it.")
+    cache = ResponseCache()
+
+    turn(client, cache, "Do you have paracetamol?")
+    add_stock("paracetamol", 5)
+    _, result = turn(client, cache, "Do you have paracetamol?")
+
+    assert "cached" not in result
+    assert cache.stats()["hits"] == 0
+
+
+def test_an_answer_miss_hands_the_replayed_results_to_the_model(db):
+    seed(db)
+    client = FakeGenaiClient(script=script, final_text="Yes, we have it.")
+    cache = ResponseCache()
+    executed = []
+
+    def execute(name, args):
+        executed.append(name)
+        return execute_user_tool(name, args, USER_EMAIL, False)
+
+    def ask():
+        return run_model_turn(client.chats.create(model=MODEL), "Do you have paracetamol?", execute, "user_chat",
+                              "".join, MODEL, cache=cache, cache_scope=USER_EMAIL)
+
+    ask()
+    add_stock("paracetamol", 5)
+    result = ask()
+
+    # once for the cache lookup; the model asked for the same call and got those results
+    assert executed == ["check_medicine_availability", "check_medicine_availability"]
+    assert result["results"][0]["data"]["stock"] == 15
+    assert cache.answer(cache.plan_key(MODEL, USER_EMAIL, "Do you have paracetamol?"), result["results"])
+
+
+def test_orders_invalidate_the_users_entries(db, monkeypatch):
+    seed(db)
+    client = FakeGenaiClient(script=script, final_text="Done.")
+    cache = ResponseCache()
+    monkeypatch.setattr("scripts.user_functions.response_cache", cache)
+    db.seed("users", "eve@example.com", {"name": "Eve", "age": 41, "recent_orders": []})
+    turn(client, cache, "Any advice for a headache?")
+    turn(client, cache, "Any advice for a headache?", user_email="eve@example.com")
+
+    place_order("paracetamol", 1, USER_EMAIL)
+
+    assert cache.stats()["size"] == 2
+    assert turn(client, cache, "Any advice for a headache?", user_email="eve@example.com")[1].get("cached")
+
+
+def test_turns_with_side_effects_are_never_cached(db):
+    seed(db)
+    client = FakeGenaiClient(script=script, final_text="Ordered.")
+    cache = ResponseCache()
+
+    turn(client, cache, "Place an order")
+    turn(client, cache, "Place an order")
+
+    assert db.data("medicines/paracetamol")["stock"] == 8
+    assert cache.stats()["size"] == 0
+
+
+def test_entries_expire_and_the_least_recently_used_are_evicted():
+    clock = FakeClock()
+    cache = ResponseCache(ttl=60, max_entries=4, clock=clock)
+    calls = [("track_order", {"order_id": "a"})]
+    results = [{"success": True, "data": {"status": "pending"}}]
+
+    cache.store("first", USER_EMAIL, calls, results, "Pending.", 1.0)
+    cache.store("second", USER_EMAIL, calls, results, "Pending.", 1.0)
+    cache.store("third", USER_EMAIL, calls, results, "Pending.", 1.0)
+    assert cache.plan("first") is None
+    assert cache.plan("third") == calls
+    assert cache.stats()["evictions"] == 2
+
+    clock.now += 60
+    assert cache.plan("third") is None
+
+
+def test_entries_survive_a_restart_on_disk(tmp_path):
+    path = str(tmp_path / "responses.db")
+    calls = [("list_my_orders", {})]
+    results = [{"success": True, "data": {"orders": []}}]
+    ResponseCache(path=path).store("plan", USER_EMAIL, calls, results, "No orders yet.", 2.0)
+
+    restarted = ResponseCache(path=path)
+    assert restarted.plan("plan") == calls
+    assert restarted.answer("plan", results) == "No orders yet."
+    assert restarted.stats()["saved_seconds"] == 2.0
+
+    restarted.invalidate(USER_EMAIL)
+    assert ResponseCache(path=path).plan("plan") is None
+
+
+def test_the_file_is_bounded_like_the_memory(tmp_path):
+    path = str(tmp_path / "responses.db")
+    clock = FakeClock()
+    calls = [("list_my_orders", {})]
+    results = [{"success": True, "data": {"orders": []}}]
+
+    def rows():
+        return sqlite3.connect(path).execute("SELECT COUNT(*) FROM responses").fetchone()[0]
+
+    cache = ResponseCache(ttl=60, max_entries=4, path=path, clock=clock)
+    for n in range(5):
+        clock.now += 1
+        cache.store(f"plan-{n}", USER_EMAIL, calls, results, "No orders yet.", 1.0)
+    # a plan and an answer row for each of the last two turns
+    assert rows() == 4
+
+    # a restart keeps at most max_entries of the rows an earlier run left behind, the latest ones
+    restarted = ResponseCache(ttl=60, max_entries=2, path=path, clock=clock)
+    assert restarted.plan("plan-4") == calls
+    assert rows() == 2
+
+    clock.now += 60
+    assert restarted.plan("plan-4") is None
+    assert rows() == 1
@@ -0,0 +1,47 @@
+# tests/response_stream_test.py
+
+import logging
+import re
+
+from tests.fake_genai import FakeGenaiClient
+from scripts.response_stream import final_answer
+
+
+def collect(chunks):
+    received = list(chunks)
+    collect.rendered = received
+    return "".join(received)
+
+
+def ttft_and_total(caplog):
+    match = re.search(r"ttft_ms=([\d.]+) total_ms=([\d.]+)", caplog.records[-1].getMessage())
+    return float(match.group(1)), float(match.group(2))
+
+
+def test_streaming_renders_chunks_and_logs_time_to_first_token(caplog):
+    client = FakeGenaiClient(final_text="Paracetamol is in stock today", latency=0.02, chunk_latency=0.02)
+    chat = client.chats.create(model="gemini-2.5-flash")
+
+    with caplog.at_level(logging.INFO, logger="scripts.response_stream"):
+        text = final_answer(chat, "results", "user_chat", collect, stream=True)
+
+    assert text == "Paracetamol is in stock today"
+    assert len(collect.rendered) == 5
+    ttft, total = ttft_and_total(caplog)
+    assert "mode=stream" in caplog.records[-1].getMessage()
+    assert ttft < total / 2
+    assert chat.get_history()[-1].parts[0].text == text
+
+
+def test_blocking_mode_renders_once_and_first_token_is_the_whole_reply(caplog):
+    client = FakeGenaiClient(final_text="All done", latency=0.02)
+    chat = client.chats.create(model="gemini-2.5-flash")
+
+    with caplog.at_level(logging.INFO, logger="scripts.response_stream"):
+        text = final_answer(chat, "results", "admin_chat", collect, stream=False)
+
+    assert text == "All done"
+    assert collect.rendered == ["All done"]
+    ttft, total = ttft_and_total(caplog)
+    assert "mode=blocking" in caplog.records[-1].getMessage()
+    assert ttft >= 20
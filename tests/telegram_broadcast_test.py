@@ -0,0 +1,88 @@
+# tests/telegram_broadcast_test.py
+
+import time
+
+from scripts.telegram_broadcast import ChatRateLimiter, TelegramBroadcaster, load_targets
+
+
+def broadcaster(stub, targets, **options):
+    options.setdefault("rate_limiter", ChatRateLimiter(interval=0.0))
+    return TelegramBroadcaster("TOKEN", targets, api_url=stub.url, retry_delay=0.01, **options)
+
+
+def test_targets_are_sent_concurrently(stub):
+    targets = {f"slow-{n}": "@slow" for n in range(3)}
+    targets["fast"] = "@fast"
+    started = time.perf_counter()
+
+    results = broadcaster(stub, targets).broadcast("<b>New stock</b>")
+
+    assert time.perf_counter() - started < 0.6
+    assert all(result["success"] for result in results.values())
+    assert results["fast"]["message"] == "<b>New stock</b>"
+
+
+def test_rate_limited_chat_waits_retry_after_then_succeeds(stub):
+    results = broadcaster(stub, {"limited": "@limited", "fast": "@fast"}).broadcast("hello")
+
+    assert results["limited"]["success"] and results["limited"]["attempts"] == 2
+    first, second = stub.sent_to("@limited")
+    assert second - first >= 1.0
+    # the other chat is not held up by the rate-limited one
+    assert results["fast"]["latency_ms"] < 500
+
+
+def test_retry_after_beyond_the_limit_is_reported(stub):
+    results = broadcaster(stub, {"limited": "@limited"}, max_retry_after=0.5).broadcast("hello")
+
+    assert not results["limited"]["success"]
+    assert results["limited"]["attempts"] == 1
+    assert "retry after 1s" in results["limited"]["error"]
+
+
+def test_timeouts_are_retried_then_reported(stub):
+    result = broadcaster(stub, {"hang": "@hang"}, timeout=0.1, max_attempts=2).broadcast("hello")["hang"]
+
+    assert not result["success"]
+    assert result["attempts"] == 2
+    assert "Timeout" in result["error"]
+
+
+def test_client_errors_are_not_retried(stub):
+    result = broadcaster(stub, {"missing": "@missing"}).broadcast("hello")["missing"]
+
+    assert not result["success"]
+    assert result["error"] == "Bad Request: chat not found"
+    assert len(stub.sent_to("@missing")) == 1
+
+
+def test_sends_to_one_chat_are_spaced_apart(stub):
+    sender = broadcaster(stub, {"fast": "@fast"}, rate_limiter=ChatRateLimiter(interval=0.2))
+
+    for _ in range(3):
+        sender.broadcast("hello")
+
+    times = stub.sent_to("@fast")
+    assert all(later - earlier >= 0.19 for earlier, later in zip(times, times[1:]))
+
+
+def test_connections_are_kept_alive(stub):
+    sender = broadcaster(stub, {"a": "@a", "b": "@b"}, max_workers=2)
+
+    for _ in range(10):
+        sender.broadcast("hello")
+
+    assert len(stub.requests) == 20
+    assert len(stub.connections) <= 2
+
+
+def test_missing_configuration_is_reported():
+    assert not TelegramBroadcaster(None, {"channel": "@c"}).broadcast("hello")["telegram"]["success"]
+    assert not TelegramBroadcaster("TOKEN", {}).broadcast("hello")["telegram"]["success"]
+
+
+def test_load_targets():
+    assert load_targets({"TELEGRAM_TARGETS": "channel=@news, group=@chat,-100123"}) == {
+        "channel": "@news", "group": "@chat", "-100123": "-100123"}
+    assert load_targets({"CHANNEL_USERNAME": "@news", "GROUP_USERNAME": "@chat"}) == {"channel": "@news", "group": "@chat"}
+    assert load_targets({"CHANNEL_USERNAME": "@news"}) == {"channel": "@news"}
@@ -0,0 +1,146 @@
+# tests/telegram_outbox_test.py
+
+import time
+
+from scripts.telegram_broadcast import ChatRateLimiter, TelegramBroadcaster
+from scripts.telegram_outbox import TelegramOutbox
+from tests.telegram_stub import start_stub
+
+
+def outbox_for(stub, path, targets, timeout=10.0, **options):
+    broadcaster = TelegramBroadcaster("TOKEN", targets, api_url=stub.url, timeout=timeout, retry_delay=0.01,
+                                      max_attempts=1, rate_limiter=ChatRateLimiter(interval=0.0), max_workers=16)
+    options.setdefault("retry_delay", 0.01)
+    options.setdefault("poll_interval", 0.05)
+    return TelegramOutbox(str(path), broadcaster, **options)
+
+
+def wait_until_drained(outbox, timeout=10.0):
+    deadline = time.monotonic() + timeout
+    while outbox.pending() and time.monotonic() < deadline:
+        time.sleep(0.01)
+    return outbox.pending() == 0
+
+
+def test_enqueue_returns_before_anything_is_sent(stub, tmp_path):
+    outbox = outbox_for(stub, tmp_path / "outbox.db", {"channel": "@slow", "group": "@fast"})
+
+    started = time.perf_counter()
+    announcement_id = outbox.enqueue("<b>New stock</b>")
+    assert time.perf_counter() - started < 0.1
+    assert stub.requests == []
+
+    [announcement] = outbox.status(announcement_id)
+    assert {target["status"] for target in announcement["targets"].values()} == {"queued"}
+
+
+def test_worker_delivers_and_records_status(stub, tmp_path):
+    outbox = outbox_for(stub, tmp_path / "outbox.db", {"channel": "@news", "group": "@chat"})
+    announcement_id = outbox.enqueue("hello")
+    outbox.start()
+
+    assert wait_until_drained(outbox)
+    outbox.stop(1)
+    targets = outbox.status(announcement_id)[0]["targets"]
+    assert targets["channel"]["status"] == targets["group"]["status"] == "delivered"
+    assert targets["channel"]["telegram_message_id"] is not None
+    assert sorted(chat for chat, _ in stub.requests) == ["@chat", "@news"]
+
+
+def test_rejected_chat_fails_at_once_and_others_still_deliver(stub, tmp_path):
+    outbox = outbox_for(stub, tmp_path / "outbox.db", {"channel": "@news", "ghost": "@missing"})
+    announcement_id = outbox.enqueue("hello")
+
+    outbox.drain_once()
+
+    targets = outbox.status(announcement_id)[0]["targets"]
+    assert targets["channel"]["status"] == "delivered"
+    assert targets["ghost"]["status"] == "failed"
+    assert targets["ghost"]["attempts"] == 1
+    assert targets["ghost"]["error"] == "Bad Request: chat not found"
+
+
+def test_transient_failures_are_retried_with_backoff_until_max_attempts(tmp_path):
+    stub = start_stub()
+    outbox = outbox_for(stub, tmp_path / "outbox.db", {"hang": "@hang"}, timeout=0.05, max_attempts=3)
+    announcement_id = outbox.enqueue("hello")
+    outbox.start()
+    try:
+        assert wait_until_drained(outbox)
+    finally:
+        outbox.stop(1)
+        stub.shutdown()
+        stub.server_close()
+
+    target = outbox.status(announcement_id)[0]["targets"]["hang"]
+    assert target["status"] == "failed"
+    assert target["attempts"] == 3
+    assert "Timeout" in target["error"]
+
+
+def test_queued_messages_survive_a_restart(stub, tmp_path):
+    path = tmp_path / "outbox.db"
+    first = outbox_for(stub, path, {"channel": "@news"}, lease_seconds=0.2)
+    queued = first.enqueue("before the crash")
+    sending = first.enqueue("mid-send")
+    first._claim()  # claims both, then the process "dies" and its lease runs out
+
+    second = outbox_for(stub, path, {"channel": "@news"})
+    second.start()
+    assert wait_until_drained(second)
+    second.stop(1)
+
+    for announcement_id in (queued, sending):
+        assert second.status(announcement_id)[0]["targets"]["channel"]["status"] == "delivered"
+
+
+def test_rows_another_worker_holds_are_not_sent_twice(stub, tmp_path):
+    path = tmp_path / "outbox.db"
+    first = outbox_for(stub, path, {"channel": "@news"})
+    announcement_id = first.enqueue("hello")
+    [row] = first._claim()
+
+    # a second process sharing the file starts while the first is mid-send
+    second = outbox_for(stub, path, {"channel": "@news"})
+    second.start()
+    time.sleep(0.2)
+    second.stop(1)
+    assert stub.requests == []
+
+    first._record(row[0], 1, {"success": True, "message_id": 7})
+    target = second.status(announcement_id)[0]["targets"]["channel"]
+    assert (target["status"], target["telegram_message_id"]) == ("delivered", 7)
+
+
+def test_status_lists_recent_announcements_first(stub, tmp_path):
+    outbox = outbox_for(stub, tmp_path / "outbox.db", {"channel": "@news"})
+    ids = [outbox.enqueue(f"message {n}") for n in range(4)]
+
+    assert [entry["announcement_id"] for entry in outbox.status(limit=2)] == [ids[3], ids[2]]
+    assert outbox.status("unknown") == []
+
+
+def test_throughput_against_a_slow_endpoint(tmp_path):
+    stub = start_stub(latency=0.02)
+    outbox = outbox_for(stub, tmp_path / "outbox.db", {f"chat-{n}": f"@chat-{n}" for n in range(4)})
+    try:
+        started = time.perf_counter()
+        for n in range(100):
+            outbox.enqueue(f"announcement {n}")
+        enqueue_seconds = time.perf_counter() - started
+
+        started = time.perf_counter()
+        outbox.start()
+        assert wait_until_drained(outbox, timeout=30)
+        drain_seconds = time.perf_counter() - started
+    finally:
+        outbox.stop(1)
+        stub.shutdown()
+        stub.server_close()
+
+    delivered = len(stub.requests)
+    print(f"enqueue {100 / enqueue_seconds:.0f} announcements/s, deliver {delivered / drain_seconds:.0f} messages/s")
+    assert delivered == 400
+    assert enqueue_seconds < 2.0
+    # 400 sends of 20 ms each take 8 s one at a time; the worker sends a batch concurrently
+    assert drain_seconds < 4.0
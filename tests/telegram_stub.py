@@ -0,0 +1,80 @@
+# tests/telegram_stub.py
+
+"""Local Bot API stand-in for the Telegram tests.
+
+Chats named @slow, @limited, @hang and @missing misbehave; every other chat
+answers like Telegram after `latency` seconds.
+"""
+
+import json
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs
+
+
+class TelegramStub(ThreadingHTTPServer):
+    daemon_threads = True
+
+    def __init__(self, latency=0.0):
+        super().__init__(("127.0.0.1", 0), TelegramStubHandler)
+        self.latency = latency
+        self.requests = []
+        self.connections = set()
+        self.rate_limited = set()
+        self.lock = threading.Lock()
+
+    @property
+    def url(self):
+        return f"http://127.0.0.1:{self.server_address[1]}"
+
+    def handle_error(self, request, client_address):
+        # clients that timed out close the connection before the reply
+        pass
+
+    def sent_to(self, chat_id):
+        return [at for chat, at in self.requests if chat == chat_id]
+
+
+class TelegramStubHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+
+    def log_message(self, *args):
+        pass
+
+    def do_POST(self):
+        form = parse_qs(self.rfile.read(int(self.headers["Content-Length"])).decode())
+        chat_id = form["chat_id"][0]
+        with self.server.lock:
+            self.server.requests.append((chat_id, time.monotonic()))
+            self.server.connections.add(self.client_address)
+            first_time_limited = chat_id == "@limited" and chat_id not in self.server.rate_limited
+            self.server.rate_limited.add(chat_id)
+
+        if self.server.latency:
+            time.sleep(self.server.latency)
+        if chat_id == "@slow":
+            time.sleep(0.3)
+        if chat_id == "@hang":
+            time.sleep(1.0)
+        if first_time_limited:
+            self._reply(429, {"ok": False, "error_code": 429, "description": "Too Many Requests: retry after 1",
+                              "parameters": {"retry_after": 1}})
+        elif chat_id == "@missing":
+            self._reply(400, {"ok": False, "error_code": 400, "description": "Bad Request: chat not found"})
+        else:
+            self._reply(200, {"ok": True, "result": {"message_id": len(self.server.requests), "text": form["text"][0]}})
+
+    def _reply(self, status, body):
+        payload = json.dumps(body).encode()
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(payload)))
+        self.end_headers()
+        self.wfile.write(payload)
+
+
+def start_stub(latency=0.0):
+    server = TelegramStub(latency)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
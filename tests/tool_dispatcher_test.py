@@ -0,0 +1,73 @@
+# tests/tool_dispatcher_test.py
+
+import threading
+import time
+
+from scripts.tool_dispatcher import dispatch_tool_calls, tool_conflict_key
+from scripts.user_functions import check_medicine_availability
+
+
+def test_results_keep_call_order():
+    calls = [("echo", {"value": n, "delay": 0.05 * (3 - n)}) for n in range(4)]
+
+    def execute(name, args):
+        time.sleep(args["delay"])
+        return args["value"]
+
+    assert dispatch_tool_calls(calls, execute) == [0, 1, 2, 3]
+
+
+def test_four_availability_checks_take_as_long_as_the_slowest(db):
+    names = ["paracetamol", "insulin", "doxycycline", "morphine"]
+    for name in names:
+        db.seed("medicines", name, {"name": name, "stock": 1})
+    db.latency = 0.1
+    calls = [("check_medicine_availability", {"medicine_name": name}) for name in names]
+
+    started = time.perf_counter()
+    results = dispatch_tool_calls(calls, lambda name, args: check_medicine_availability(**args))
+    elapsed = time.perf_counter() - started
+
+    assert [result["data"]["name"] for result in results] == names
+    assert elapsed < 0.25
+
+
+def test_calls_on_the_same_medicine_run_one_after_another():
+    active = {"aspirin": 0}
+    overlaps = []
+    order = []
+    lock = threading.Lock()
+
+    def execute(name, args):
+        with lock:
+            active["aspirin"] += 1
+            overlaps.append(active["aspirin"])
+        time.sleep(0.02)
+        order.append(name)
+        with lock:
+            active["aspirin"] -= 1
+        return name
+
+    calls = [("add_stock", {"name": "Aspirin"}), ("delete_medicine", {"name": "aspirin"}), ("stock_out", {"name": "ASPIRIN"})]
+    dispatch_tool_calls(calls, execute)
+
+    assert max(overlaps) == 1
+    assert order == ["add_stock", "delete_medicine", "stock_out"]
+
+
+def test_conflict_keys():
+    assert tool_conflict_key("track_order", {"order_id": "abc"}) == "order:abc"
+    assert tool_conflict_key("place_order", {"medicine_name": "Vitamin C"}) == "medicine:vitamin_c"
+    assert tool_conflict_key("telegram_post", {"message": "hi"}) is None
+
+
+def test_errors_become_failed_results():
+    def execute(name, args):
+        raise RuntimeError("boom")
+
+    results = dispatch_tool_calls([("a", {}), ("b", {})], execute)
+
+    assert results == [
+        {"success": False, "message": "Error running a: boom"},
+        {"success": False, "message": "Error running b: boom"},
+    ]
@@ -0,0 +1,45 @@
+# tests/tool_response_parts_test.py
+
+from google.genai import types
+
+from tests.fake_genai import FakeGenaiClient
+from scripts.tool_dispatcher import dispatch_tool_calls, tool_response_parts
+
+
+def availability_script(count):
+    return lambda prompt: [
+        types.FunctionCall(name="check_medicine_availability", args={"medicine_name": f"medicine_{n}"})
+        for n in range(count)
+    ]
+
+
+def follow_up_request(count):
+    client = FakeGenaiClient(script=availability_script(count))
+    chat = client.chats.create(model="gemini-2.5-flash")
+
+    response = chat.send_message("do you have these medicines?")
+    fn_calls = list(response.function_calls)
+    results = dispatch_tool_calls(
+        [(fn.name, dict(fn.args)) for fn in fn_calls],
+        lambda name, args: {"success": True, "data": {"name": args["medicine_name"], "stock": 5}},
+    )
+    chat.send_message(tool_response_parts(fn_calls, results))
+    return client.requests[-1]
+
+
+def test_follow_up_sends_one_model_turn_and_one_user_turn():
+    request = follow_up_request(4)
+
+    assert [content.role for content in request["contents"]] == ["user", "model", "user"]
+    assert len(request["contents"][1].parts) == 4
+    assert [part.function_response.response["result"]["data"]["name"] for part in request["contents"][2].parts] == [
+        "medicine_0", "medicine_1", "medicine_2", "medicine_3"
+    ]
+
+
+def test_request_size_grows_linearly_with_calls():
+    sizes = {count: follow_up_request(count)["size"] for count in (1, 2, 4, 8, 16)}
+    per_call = [(sizes[b] - sizes[a]) / (b - a) for a, b in ((1, 2), (2, 4), (4, 8), (8, 16))]
+
+    # every extra call adds roughly one call and one response part, never a whole turn per call
+    assert max(per_call) - min(per_call) <= 0.1 * min(per_call)
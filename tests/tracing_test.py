@@ -0,0 +1,181 @@
+# tests/tracing_test.py
+
+import asyncio
+import json
+import logging
+import time
+
+import pytest
+from google.cloud.firestore_v1.types import Document, RunQueryResponse
+
+from scripts.telegram_broadcast import ChatRateLimiter, TelegramBroadcaster
+from scripts.tool_dispatcher import dispatch_tool_calls
+from scripts.metrics import firestore_documents
+from scripts.tracing import NOOP_SPAN, instrument_firestore, tracer, waterfall
+from scripts.user_functions import check_medicine_availability
+
+
+@pytest.fixture
+def tracing():
+    tracer.enabled = True
+    tracer.clear()
+    yield tracer
+    tracer.enabled = False
+    tracer.clear()
+
+
+def spans_by_name(trace):
+    return {span["name"]: span for span in trace["spans"]}
+
+
+def test_a_turn_nests_tool_calls_and_their_rpcs_across_threads(db, tracing, caplog):
+    for name in ("paracetamol", "insulin"):
+        db.seed("medicines", name, {"name": name, "stock": 3})
+    db.latency = 0.01
+    calls = [("check_medicine_availability", {"medicine_name": name}) for name in ("paracetamol", "insulin")]
+
+    with caplog.at_level(logging.INFO, logger="axon.trace"):
+        with tracer.turn("user_chat", session="s1"):
+            with tracer.span("gemini.send_message", "llm"):
+                time.sleep(0.005)
+            dispatch_tool_calls(calls, lambda name, args: check_medicine_availability(**args))
+
+    (trace,) = tracer.recent()
+    assert trace["attrs"] == {"session": "s1"}
+    root = trace["spans"][0]
+    assert (root["name"], root["kind"], root["parent_id"]) == ("user_chat", "turn", None)
+    tools = [span for span in trace["spans"] if span["kind"] == "tool"]
+    rpcs = [span for span in trace["spans"] if span["kind"] == "firestore"]
+    assert [span["name"] for span in tools] == ["tool.check_medicine_availability"] * 2
+    assert all(span["parent_id"] == root["span_id"] and span["attrs"]["success"] for span in tools)
+    assert {span["parent_id"] for span in rpcs} == {span["span_id"] for span in tools}
+    assert all(span["duration_ms"] >= 10 for span in rpcs)
+    # the two tool calls overlapped
+    assert trace["duration_ms"] < 5 + sum(span["duration_ms"] for span in rpcs)
+
+    logged = json.loads(caplog.records[-1].getMessage())
+    assert logged["trace_id"] == trace["trace_id"] and len(logged["spans"]) == len(trace["spans"])
+
+
+def test_errors_are_recorded_on_the_span(tracing):
+    with pytest.raises(RuntimeError):
+        with tracer.turn("admin_chat"):
+            with tracer.span("gemini.send_message", "llm"):
+                raise RuntimeError("quota exceeded")
+
+    spans = spans_by_name(tracer.recent()[0])
+    assert spans["gemini.send_message"]["error"] == "RuntimeError: quota exceeded"
+    assert spans["admin_chat"]["error"] == "RuntimeError: quota exceeded"
+
+
+def test_telegram_requests_are_traced_from_the_broadcaster_pool(stub, tracing):
+    broadcaster = TelegramBroadcaster("TOKEN", {"channel": "@channel", "missing": "@missing"}, api_url=stub.url,
+                                      rate_limiter=ChatRateLimiter(interval=0.0))
+
+    with tracer.turn("telegram_outbox"):
+        broadcaster.broadcast("hello")
+
+    http = [span for span in tracer.recent()[0]["spans"] if span["kind"] == "http"]
+    assert sorted((span["attrs"]["chat_id"], span["attrs"]["status"]) for span in http) == [
+        ("@channel", 200), ("@missing", 400)]
+
+
+def test_gapic_methods_are_wrapped_and_streams_finish_when_consumed(tracing):
+    class FakeFirestoreApi:
+        def get_document(self, request=None):
+            return {"name": request["name"]}
+
+        def run_query(self, request=None):
+            for _ in range(3):
+                time.sleep(0.01)
+                yield RunQueryResponse()
+
+        def commit(self, request=None):
+            raise ValueError("conflict")
+
+    instrument_firestore(FakeFirestoreApi)
+    instrument_firestore(FakeFirestoreApi)
+    api = FakeFirestoreApi()
+
+    with tracer.turn("user_chat"):
+        assert api.get_document(request={"name": "medicines/insulin"}) == {"name": "medicines/insulin"}
+        assert len(list(api.run_query(request={}))) == 3
+        with pytest.raises(ValueError):
+            api.commit(request={})
+
+    spans = spans_by_name(tracer.recent()[0])
+    assert spans["firestore.run_query"]["duration_ms"] >= 30
+    assert spans["firestore.commit"]["error"] == "ValueError: conflict"
+    assert spans["firestore.get_document"]["kind"] == "firestore"
+    assert sum(1 for span in tracer.recent()[0]["spans"] if span["name"] == "firestore.get_document") == 1
+
+
+def test_async_gapic_methods_are_wrapped_and_counted(tracing):
+    class FakeAsyncFirestoreApi:
+        async def get_document(self, request=None):
+            return {"name": request["name"]}
+
+        def run_query(self, request=None):
+            # like the gapic AsyncClient: an awaitable that resolves to the response stream
+            async def responses():
+                for _ in range(3):
+                    await asyncio.sleep(0.01)
+                    yield RunQueryResponse(document=Document(name="projects/p/databases/d/documents/orders/o1"))
+
+            async def call():
+                return responses()
+
+            return call()
+
+        async def commit(self, request=None):
+            raise ValueError("conflict")
+
+    instrument_firestore(FakeAsyncFirestoreApi, asynchronous=True)
+    api = FakeAsyncFirestoreApi()
+    reads = firestore_documents.value(collection="orders", operation="read")
+
+    async def turn():
+        with tracer.turn("user_chat"):
+            assert await api.get_document(request={"name": "medicines/insulin"}) == {"name": "medicines/insulin"}
+            assert len([response async for response in await api.run_query(request={})]) == 3
+            with pytest.raises(ValueError):
+                await api.commit(request={})
+
+    asyncio.run(turn())
+
+    spans = spans_by_name(tracer.recent()[0])
+    assert spans["firestore.run_query"]["duration_ms"] >= 30
+    assert spans["firestore.commit"]["error"] == "ValueError: conflict"
+    assert spans["firestore.get_document"]["kind"] == "firestore"
+    assert firestore_documents.value(collection="orders", operation="read") - reads == 3
+
+
+def test_only_the_last_turns_are_kept_and_rendered(tracing):
+    for n in range(tracer._recent.maxlen + 5):
+        with tracer.turn("user_chat", n=n):
+            with tracer.span("tool.track_order", "tool"):
+                pass
+
+    recent = tracer.recent()
+    assert len(recent) == tracer._recent.maxlen
+    assert recent[0]["attrs"]["n"] == tracer._recent.maxlen + 4
+    lines = waterfall(recent[0]).splitlines()
+    assert lines[0].startswith("user_chat ")
+    assert lines[2].lstrip().startswith("tool.track_order") and "█" in lines[2]
+
+
+def test_disabled_tracing_records_nothing_and_costs_next_to_nothing(db):
+    assert not tracer.enabled
+    assert tracer.turn("user_chat") is NOOP_SPAN and tracer.span("tool.x") is NOOP_SPAN
+    with tracer.turn("user_chat"):
+        check_medicine_availability("paracetamol")
+    assert tracer.recent() == []
+
+    spans = 100_000
+    started = time.perf_counter()
+    for _ in range(spans):
+        with tracer.span("firestore.get", "firestore"):
+            pass
+    per_span = (time.perf_counter() - started) / spans
+    # well under 1% of even a fast (1 ms) Firestore round trip
+    assert per_span < 10e-6
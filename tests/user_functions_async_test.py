@@ -0,0 +1,133 @@
+# tests/user_functions_async_test.py
+
+import asyncio
+import time
+
+from scripts import event_loop
+from scripts.chat_turn import execute_user_tool, execute_user_tool_async
+from scripts.tool_dispatcher import dispatch_async_tool_calls
+from scripts.user_functions import place_order
+from scripts.user_functions_async import check_medicine_availability_async, place_order_async
+
+USER_EMAIL = "abebe@example.com"
+
+
+def seed(db, stock=10):
+    for name in ("paracetamol", "insulin", "doxycycline", "morphine"):
+        db.seed("medicines", name, {"name": name, "stock": stock, "unit_price": 2.5})
+    db.seed("users", USER_EMAIL, {"name": "Abebe", "age": 30, "recent_orders": []})
+
+
+def without_ids(result):
+    result = dict(result)
+    for key in ("order_id", "data", "message", "next_cursor"):
+        result.pop(key, None)
+    return result
+
+
+def test_async_tools_return_what_the_sync_tools_return(db):
+    seed(db)
+    order_id = place_order("insulin", 1, USER_EMAIL)["order_id"]
+    calls = [
+        ("check_medicine_availability", {"medicine_name": "paracetamol"}),
+        ("check_medicine_availability", {"medicine_name": "unknownium"}),
+        ("track_order", {"order_id": order_id}),
+        ("track_order", {"order_id": "missing"}),
+        ("list_my_orders", {"limit": 5}),
+        ("list_my_orders", {"cursor": "missing"}),
+        ("get_health_advice", {"symptoms": "headache"}),
+        ("place_order", {"medicine_name": "morphine", "quantity": 99}),
+    ]
+
+    for name, args in calls:
+        expected = execute_user_tool(name, args, USER_EMAIL, False)
+        assert event_loop.run(execute_user_tool_async(name, args, USER_EMAIL, False)) == expected, name
+
+    placed = event_loop.run(execute_user_tool_async("place_order", {"medicine_name": "paracetamol", "quantity": 2},
+                                                    USER_EMAIL, False))
+    assert without_ids(placed) == {"success": True}
+    assert db.data(f"orders/{placed['order_id']}")["total_price"] == 5.0
+    assert db.data("medicines/paracetamol")["stock"] == 8
+
+    cancelled = event_loop.run(execute_user_tool_async("cancel_order", {"order_id": placed["order_id"]},
+                                                       USER_EMAIL, False))
+    assert cancelled["success"]
+    assert db.data(f"orders/{placed['order_id']}")["status"] == "cancelled"
+    assert db.data("medicines/paracetamol")["stock"] == 10
+    assert not event_loop.run(execute_user_tool_async("cancel_order", {"order_id": order_id}, "eve@example.com",
+                                                      False))["success"]
+
+
+def test_concurrent_async_orders_never_oversell(db):
+    seed(db, stock=20)
+    db.latency = 0.001
+
+    async def buy_all():
+        return await asyncio.gather(*(place_order_async("paracetamol", 1, USER_EMAIL) for _ in range(40)))
+
+    results = event_loop.run(buy_all())
+
+    placed = sum(1 for result in results if result["success"])
+    assert db.data("medicines/paracetamol")["stock"] == 20 - placed
+    assert len(list(db.collection("orders").stream())) == placed
+    assert all(result["success"] or "stock" in result["message"] or "high demand" in result["message"]
+               for result in results)
+
+
+def test_a_five_call_turn_overlaps_on_one_thread(db):
+    seed(db)
+    order_id = place_order("insulin", 1, USER_EMAIL)["order_id"]
+    db.latency = 0.1
+    calls = [
+        ("check_medicine_availability", {"medicine_name": "paracetamol"}),
+        ("check_medicine_availability", {"medicine_name": "doxycycline"}),
+        ("track_order", {"order_id": order_id}),
+        ("list_my_orders", {}),
+        ("get_health_advice", {"symptoms": "cough"}),
+    ]
+
+    started = time.perf_counter()
+    results = dispatch_async_tool_calls(calls, lambda name, args: execute_user_tool_async(name, args, USER_EMAIL,
+                                                                                         False))
+    elapsed = time.perf_counter() - started
+
+    assert all(result["success"] for result in results)
+    assert [result["data"]["name"] for result in results[:2]] == ["paracetamol", "doxycycline"]
+    assert elapsed < 0.25
+
+
+def test_guests_are_blocked_the_same_way(db):
+    seed(db)
+
+    result = event_loop.run(execute_user_tool_async("place_order", {"medicine_name": "paracetamol", "quantity": 1},
+                                                    "guest", True))
+
+    assert result == execute_user_tool("place_order", {"medicine_name": "paracetamol", "quantity": 1}, "guest", True)
+    assert db.data("medicines/paracetamol")["stock"] == 10
+
+
+def test_blocking_lookups_do_not_stall_the_event_loop(db, monkeypatch):
+    seed(db)
+
+    def slow_resolve(medicine_name):
+        # a medicine index rebuild streaming the whole collection
+        time.sleep(0.2)
+        return medicine_name
+
+    monkeypatch.setattr("scripts.user_functions_async.resolve_medicine_id", slow_resolve)
+
+    async def turn():
+        ticks = []
+
+        async def ticker():
+            while len(ticks) < 10:
+                await asyncio.sleep(0.01)
+                ticks.append(time.perf_counter())
+
+        result, _ = await asyncio.gather(check_medicine_availability_async("paracetamol"), ticker())
+        return result, ticks
+
+    result, ticks = event_loop.run(turn())
+
+    assert result["success"]
+    assert max(later - earlier for earlier, later in zip(ticks, ticks[1:])) < 0.1